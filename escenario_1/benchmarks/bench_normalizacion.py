@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: normalización por request
+====================================
+
+Compara el costo de normalizar la query en cada etapa por separado
+(detector + rewriter + normalizador SQL, cada uno con su pasada
+lowercase/NFD/categoría) contra un único NormalizedText compartido.
+
+Uso:
+    python escenario_1/benchmarks/bench_normalizacion.py [iteraciones]
+"""
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import yaml
+
+from escenario_1.core.entity_detector import EntityDetector
+from escenario_1.core.normalized_text import NormalizedText
+
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "entities.yaml"
+
+QUERIES = [
+    "¿Cuánto cuesta una consulta con especialista de ENSALUD?",
+    "¿Qué documentos necesito para guardia de IOSFA?",
+    "teléfono mesa operativa ASI",
+    "en cuanto tiempo debo avisar una internación ASI",
+    "Requisitos de enrolamiento del Grupo Pediátrico",
+    "Hola, buen día",
+]
+
+
+# =============================================================================
+# Implementación anterior (una normalización por etapa)
+# =============================================================================
+
+def _legacy_detector_normalize(text: str) -> str:
+    text = text.lower().strip()
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+    for char in '¿?¡!.,;:()[]{}"\'"':
+        text = text.replace(char, ' ')
+    return ' '.join(text.split())
+
+
+def _legacy_rewriter_normalize(text: str) -> str:
+    text = text.lower()
+    text = unicodedata.normalize('NFD', text)
+    return ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+
+
+def _legacy_sql_normalize(text: str) -> list:
+    return re.sub(r'[^\w\s]', ' ', text.lower()).split()
+
+
+def _legacy_detect(query: str, entities: dict, priority: list):
+    """detect() anterior: re-normaliza canónicos y aliases en cada llamada"""
+    query_padded = f" {_legacy_detector_normalize(query)} "
+    for entity_name in priority:
+        entity_config = entities.get(entity_name, {})
+        canonical = _legacy_detector_normalize(entity_config.get("canonical", entity_name))
+        if f" {canonical} " in query_padded:
+            return entity_name
+        for alias in entity_config.get("aliases", []):
+            if f" {_legacy_detector_normalize(alias)} " in query_padded:
+                return entity_name
+    return None
+
+
+def run_legacy(query: str, entities: dict, priority: list):
+    _legacy_detect(query, entities, priority)
+    _legacy_rewriter_normalize(query)
+    words = _legacy_sql_normalize(query)
+    [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def run_shared(query: str, detector: EntityDetector):
+    normalized = NormalizedText.from_text(query)
+    detector.detect(normalized)
+    normalized.folded   # rewriter
+    normalized.tokens   # normalizador SQL
+    normalized.bigrams
+
+
+def _time_per_request_us(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query in QUERIES:
+            func(query)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(QUERIES)) * 1_000_000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    entities = config.get("entities", {})
+    priority = config.get("detection", {}).get("priority", list(entities.keys()))
+    detector = EntityDetector(str(CONFIG_PATH))
+
+    legacy_us = _time_per_request_us(lambda q: run_legacy(q, entities, priority), iterations)
+    shared_us = _time_per_request_us(lambda q: run_shared(q, detector), iterations)
+
+    print("=" * 60)
+    print("BENCHMARK NORMALIZACIÓN POR REQUEST")
+    print("=" * 60)
+    print(f"Queries: {len(QUERIES)} x {iterations} iteraciones")
+    print(f"Anterior (3 normalizaciones + aliases por request): {legacy_us:8.1f} µs/request")
+    print(f"NormalizedText compartido:                          {shared_us:8.1f} µs/request")
+    print(f"Ahorro: {legacy_us - shared_us:.1f} µs/request ({legacy_us / shared_us:.1f}x)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Cobertura de la respuesta extractiva (sin LLM)
+==============================================
+
+Corre los 50 casos de tests/test_rag_50.py por el retriever real (ChromaDB
++ query rewriter) y el extractor de core/extractive.py, y mide qué parte
+de las consultas se podría responder sin Groq:
+
+- directas:  confianza >= min_confidence e intención habilitada (el
+             router no llama al LLM)
+- correctas: directas cuya respuesta contiene el dato esperado del caso
+- respaldo:  cualquier confianza (respuesta degradada por deadline) que
+             contiene el dato esperado
+
+Una directa incorrecta es una respuesta equivocada que el LLM no corrige:
+subir min_confidence hasta que no haya ninguna.
+
+Uso:
+    python escenario_1/benchmarks/extractive_coverage.py [--min-confidence 0.85] [--top-k 5] [-v]
+"""
+import sys
+import argparse
+from collections import defaultdict
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import yaml
+
+from escenario_1.core.extractive import extract_answer
+from escenario_1.core.normalized_text import NormalizedText
+from escenario_1.core.query_rewriter import get_query_expander
+from escenario_1.core.router import ChunkInfo
+from escenario_1.tests.test_rag_50 import TEST_CASES, CHROMA_PATH
+from escenario_1.rag.retriever import ChromaRetriever
+
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "scenario.yaml"
+
+
+def run_case(retriever, expander, case, top_k: int):
+    """Retrieval + extracción de un caso; retorna ExtractiveAnswer o None"""
+    normalized = NormalizedText.from_text(case.query)
+    chunks = retriever.retrieve(
+        query=case.query,
+        top_k=top_k,
+        obra_social_filter=case.obra_social,
+        normalized=normalized
+    )
+    chunks_info = [
+        ChunkInfo(
+            text=text,
+            obra_social=metadata.get("obra_social", "N/A"),
+            chunk_id=metadata.get("chunk_id", "N/A"),
+            similarity=score
+        )
+        for text, metadata, score in chunks
+    ]
+    return extract_answer(
+        normalized,
+        chunks_info,
+        expansion=expander.expand(normalized, case.obra_social),
+        ignore_terms=(case.obra_social,)
+    )
+
+
+def main():
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+        extractive_config = (yaml.safe_load(f).get("extractive") or {})
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-confidence", type=float, default=extractive_config.get("min_confidence", 0.85))
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("-v", "--verbose", action="store_true", help="Detalle por caso")
+    args = parser.parse_args()
+
+    intents = set(extractive_config.get("intents", ["telefono", "email", "url", "monto", "plazo"]))
+    retriever = ChromaRetriever(persist_directory=CHROMA_PATH)
+    expander = get_query_expander()
+
+    by_category = defaultdict(lambda: {"casos": 0, "directas": 0, "correctas": 0, "respaldo": 0})
+    wrong = []
+
+    for case in TEST_CASES:
+        answer = run_case(retriever, expander, case, args.top_k)
+        found = answer is not None and case.dato_esperado.lower() in answer.respuesta.lower()
+        direct = (
+            answer is not None
+            and answer.intent in intents
+            and answer.confidence >= args.min_confidence
+        )
+
+        stats = by_category[case.categoria]
+        stats["casos"] += 1
+        stats["directas"] += direct
+        stats["correctas"] += direct and found
+        stats["respaldo"] += found
+        if direct and not found:
+            wrong.append((case, answer))
+
+        if args.verbose:
+            mark = "OK " if found else "-- "
+            detail = f"{answer.intent} {answer.confidence:.2f} {answer.respuesta[:60]!r}" if answer else "sin dato"
+            print(f"{mark}[{case.id:2}] {'DIRECTA ' if direct else '        '}{case.query[:45]:<45} {detail}")
+
+    total = {key: sum(s[key] for s in by_category.values()) for key in ("casos", "directas", "correctas", "respaldo")}
+
+    print("=" * 72)
+    print(f"COBERTURA EXTRACTIVA - {total['casos']} casos de test_rag_50 "
+          f"(min_confidence={args.min_confidence}, top_k={args.top_k})")
+    print("=" * 72)
+    print(f"{'categoría':<14}{'casos':>8}{'directas':>10}{'correctas':>11}{'respaldo':>10}")
+    for category, stats in sorted(by_category.items()) + [("TOTAL", total)]:
+        print(f"{category:<14}{stats['casos']:>8}{stats['directas']:>10}{stats['correctas']:>11}{stats['respaldo']:>10}")
+    print("-" * 72)
+    if total["directas"]:
+        print(f"Sin LLM: {total['directas'] / total['casos']:.0%} de las consultas | "
+              f"precisión {total['correctas'] / total['directas']:.0%}")
+    for case, answer in wrong:
+        print(f"  INCORRECTA [{case.id}] {case.query!r}: esperado {case.dato_esperado!r}, "
+              f"respondió {answer.respuesta[:60]!r}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Load test: pipeline bloqueante vs ChatDispatcher
+================================================
+
+Simula N chats enviando M mensajes cada uno contra el ConsultaRouter real
+(entity detection + rewriter), con RAG y LLM simulados por latencias fijas
+(sleep = I/O de ChromaDB/Groq). Compara:
+
+- inline: process_query dentro del handler (como antes; un chat lento
+  frena a todos)
+- dispatcher con 1, 2, 4 y 8 workers
+
+Reporta throughput, espera en cola (p50/p95) y verifica el orden FIFO
+dentro de cada chat.
+
+Uso:
+    python escenario_1/benchmarks/load_dispatcher.py [chats] [mensajes_por_chat]
+"""
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.core.router import ConsultaRouter
+from escenario_1.core.entity_detector import EntityDetector
+from escenario_1.core.dispatcher import ChatDispatcher
+from escenario_1.metrics.collector import QueryMetrics
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+
+RAG_LATENCY_S = 0.02    # Encode + query ChromaDB
+LLM_LATENCY_S = 0.15    # Groq (red + generación)
+
+QUERIES = [
+    "¿Cuánto cuesta una consulta con especialista de ENSALUD?",
+    "¿Qué documentos necesito para guardia de IOSFA?",
+    "teléfono mesa operativa ASI",
+    "en cuanto tiempo debo avisar una internación ASI",
+]
+
+
+class SlowRetriever:
+    version = "load:1"
+
+    def retrieve(self, query, top_k=5, obra_social_filter=None, **kwargs):
+        time.sleep(RAG_LATENCY_S)
+        return [("Dato de prueba.", {"obra_social": obra_social_filter, "chunk_id": "x"}, 0.9)]
+
+
+class SlowLLM:
+    model = "load-test"
+
+    def generate(self, messages, **kwargs):
+        time.sleep(LLM_LATENCY_S)
+        return {"respuesta": "ok", "tokens_input": 100, "tokens_output": 5}
+
+
+def build_router() -> ConsultaRouter:
+    router = ConsultaRouter(
+        retriever=SlowRetriever(),
+        llm_client=SlowLLM(),
+        entity_detector=EntityDetector(str(CONFIG_DIR / "entities.yaml")),
+        config_path=str(CONFIG_DIR / "scenario.yaml")
+    )
+    # Sin cache: cada mensaje recorre el pipeline completo
+    router.answer_cache = None
+    return router
+
+
+async def run_load(router: ConsultaRouter, chats: int, per_chat: int, workers: int = None):
+    """
+    Envía todos los mensajes "a la vez" (como updates concurrentes de Telegram).
+
+    Returns:
+        (segundos totales, lista de ms en cola, orden correcto por chat)
+    """
+    dispatcher = ChatDispatcher(max_workers=workers) if workers else None
+    processed = {chat: [] for chat in range(chats)}
+    queue_times = []
+
+    def process(chat: int, n: int):
+        query = f"{QUERIES[(chat + n) % len(QUERIES)]} #{n}"
+        router.process_query(query, metrics=QueryMetrics(query_text=query))
+        processed[chat].append(n)
+
+    async def handler(chat: int, n: int):
+        if dispatcher is None:
+            process(chat, n)  # Bloquea el event loop
+        else:
+            _, queue_ms = await dispatcher.run(chat, process, chat, n)
+            queue_times.append(queue_ms)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        handler(chat, n) for n in range(per_chat) for chat in range(chats)
+    ])
+    elapsed = time.perf_counter() - start
+
+    if dispatcher:
+        dispatcher.shutdown()
+
+    fifo_ok = all(order == list(range(per_chat)) for order in processed.values())
+    return elapsed, queue_times, fifo_ok
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_chat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    total = chats * per_chat
+    router = build_router()
+
+    print("=" * 72)
+    print(f"LOAD TEST - {chats} chats x {per_chat} mensajes = {total} consultas")
+    print(f"Latencia simulada por consulta: RAG {RAG_LATENCY_S*1000:.0f}ms + LLM {LLM_LATENCY_S*1000:.0f}ms")
+    print("=" * 72)
+    print(f"{'modo':<16}{'total (s)':>11}{'msg/s':>9}{'speedup':>9}{'cola p50':>11}{'cola p95':>11}{'FIFO':>6}")
+
+    baseline = None
+    for workers in [None, 1, 2, 4, 8]:
+        elapsed, queue_times, fifo_ok = asyncio.run(run_load(router, chats, per_chat, workers))
+        throughput = total / elapsed
+        baseline = baseline or throughput
+        label = "inline" if workers is None else f"{workers} workers"
+        print(
+            f"{label:<16}{elapsed:>11.2f}{throughput:>9.1f}{throughput / baseline:>8.1f}x"
+            f"{percentile(queue_times, 0.5):>9.0f}ms{percentile(queue_times, 0.95):>9.0f}ms"
+            f"{'OK' if fifo_ok else 'FAIL':>6}"
+        )
+
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Load test: pipeline completo contra el stand-in LLM local
+=========================================================
+
+Levanta el servidor stand-in (llm/standin_server.py) en un thread y corre
+N chats x M mensajes por el ConsultaRouter real con el GroqClient real
+(SDK de groq + RateLimiter + single-flight) apuntando a él. Solo el RAG
+queda simulado (latencia fija). No necesita GROQ_API_KEY ni red.
+
+Con --seed las latencias y los 429 inyectados son reproducibles.
+
+Reporta latencia total y del LLM (p50/p95), primer token, esperas por
+rate limit, reintentos y 429 recibidos por el servidor.
+
+Uso:
+    python escenario_1/benchmarks/load_standin.py [chats] [mensajes_por_chat]
+        [--latency uniform:150,400] [--tps 200] [--error-429 0.1] [--seed 7] [--stream]
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.core.router import ConsultaRouter
+from escenario_1.core.entity_detector import EntityDetector
+from escenario_1.core.dispatcher import ChatDispatcher
+from escenario_1.llm.client import GroqClient
+from escenario_1.llm.rate_limiter import RateLimiter
+from escenario_1.llm.standin_server import StandinConfig, start_in_background
+from escenario_1.metrics.collector import QueryMetrics
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+
+RAG_LATENCY_S = 0.02    # Encode + query ChromaDB
+
+QUERIES = [
+    "¿Cuánto cuesta una consulta con especialista de ENSALUD?",
+    "¿Qué documentos necesito para guardia de IOSFA?",
+    "teléfono mesa operativa ASI",
+    "en cuanto tiempo debo avisar una internación ASI",
+]
+
+
+class SlowRetriever:
+    version = "load:1"
+
+    def retrieve(self, query, top_k=5, obra_social_filter=None, **kwargs):
+        time.sleep(RAG_LATENCY_S)
+        return [("Dato de prueba.", {"obra_social": obra_social_filter, "chunk_id": "x"}, 0.9)]
+
+
+def build_router(base_url: str) -> ConsultaRouter:
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=1_000_000, backoff_base_seconds=0.1)
+    router = ConsultaRouter(
+        retriever=SlowRetriever(),
+        llm_client=GroqClient(api_key="local", base_url=base_url, rate_limiter=limiter),
+        entity_detector=EntityDetector(str(CONFIG_DIR / "entities.yaml")),
+        config_path=str(CONFIG_DIR / "scenario.yaml")
+    )
+    # Sin cache: cada mensaje llega al LLM
+    router.answer_cache = None
+    return router
+
+
+async def run_load(router: ConsultaRouter, chats: int, per_chat: int, workers: int, stream: bool):
+    """Envía todos los mensajes a la vez por el dispatcher y junta las métricas"""
+    dispatcher = ChatDispatcher(max_workers=workers)
+    collected = []
+
+    def process(chat: int, n: int):
+        query = f"{QUERIES[(chat + n) % len(QUERIES)]} #{chat}-{n}"
+        metrics = QueryMetrics(query_text=query)
+        # Con on_partial el router usa generate_stream (SSE)
+        router.process_query(query, metrics=metrics, on_partial=(lambda text: None) if stream else None)
+        collected.append(metrics)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        dispatcher.run(chat, process, chat, n) for n in range(per_chat) for chat in range(chats)
+    ])
+    elapsed = time.perf_counter() - start
+    dispatcher.shutdown()
+    return elapsed, collected
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("chats", type=int, nargs="?", default=8)
+    parser.add_argument("per_chat", type=int, nargs="?", default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", default="uniform:150,400")
+    parser.add_argument("--tps", type=float, default=200)
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--stream", action="store_true")
+    args = parser.parse_args()
+
+    server, base_url = start_in_background(StandinConfig(
+        latency=args.latency,
+        tokens_per_second=args.tps,
+        error_rate_429=args.error_429,
+        retry_after_seconds=0.2,
+        seed=args.seed
+    ))
+    router = build_router(base_url)
+    total = args.chats * args.per_chat
+
+    print("=" * 72)
+    print(f"LOAD TEST (stand-in) - {args.chats} chats x {args.per_chat} mensajes = {total} consultas")
+    print(f"Servidor: {base_url} | latencia {args.latency} | {args.tps:.0f} tok/s | "
+          f"429 {args.error_429:.0%} | {'stream' if args.stream else 'sin stream'}")
+    print("=" * 72)
+
+    try:
+        elapsed, collected = asyncio.run(run_load(router, args.chats, args.per_chat, args.workers, args.stream))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    server_stats = server.RequestHandlerClass.llm.stats()
+    totals = [m.latency_total_ms for m in collected]
+    llm = [m.latency_llm_ms for m in collected]
+    first = [m.latency_first_token_ms for m in collected if m.latency_first_token_ms]
+
+    print(f"{'total (s)':<22}{elapsed:>10.2f}   ({total / elapsed:.1f} msg/s, {args.workers} workers)")
+    print(f"{'latencia total':<22}{percentile(totals, 0.5):>8.0f}ms p50 {percentile(totals, 0.95):>8.0f}ms p95")
+    print(f"{'latencia LLM':<22}{percentile(llm, 0.5):>8.0f}ms p50 {percentile(llm, 0.95):>8.0f}ms p95")
+    if first:
+        print(f"{'primer token':<22}{percentile(first, 0.5):>8.0f}ms p50 {percentile(first, 0.95):>8.0f}ms p95")
+    print(f"{'espera rate limit':<22}{sum(m.latency_throttle_ms for m in collected):>8.0f}ms total")
+    print(f"{'reintentos':<22}{sum(m.llm_retries for m in collected):>10}")
+    print(f"{'agrupadas':<22}{sum(m.llm_coalesced for m in collected):>10}")
+    print(f"{'servidor':<22}{server_stats['requests']:>10} requests, {server_stats['rejected_429']} con 429")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
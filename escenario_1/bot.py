@@ -21,9 +21,12 @@ Requisitos:
 """
 import os
 import sys
+import asyncio
 import logging
 from pathlib import Path
 
+import yaml
+
 # Agregar el directorio raíz al path para imports
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -47,8 +50,14 @@ from telegram.ext import Application, CommandHandler, MessageHandler, filters, C
 # Imports locales del escenario
 from escenario_1.rag.retriever import ChromaRetriever
 from escenario_1.llm.client import GroqClient
+from escenario_1.llm.async_client import AsyncGroqClient
+from escenario_1.llm.rate_limiter import RateLimiter, build_rate_limiter
+from escenario_1.llm.health import LLMHealth, build_llm_health
 from escenario_1.core.router import ConsultaRouter
+from escenario_1.core.cascade import CascadeRouter, build_cascade
 from escenario_1.core.entity_detector import get_entity_detector
+from escenario_1.core.streaming import ThrottledMessageEditor
+from escenario_1.core.dispatcher import ChatDispatcher
 from escenario_1.metrics.collector import QueryMetrics
 
 # Configuración de logging
@@ -61,7 +70,38 @@ logger = logging.getLogger(__name__)
 # Componentes globales (se inicializan en main)
 retriever: ChromaRetriever = None
 llm_client: GroqClient = None
+async_llm_client: AsyncGroqClient = None  # Solo si llm.async.enabled
+rate_limiter: RateLimiter = None  # Compartido por ambos clientes (misma API key)
 router: ConsultaRouter = None
+cascade: CascadeRouter = None  # Solo si cascade.enabled (SQL → extractiva → RAG+LLM)
+dispatcher: ChatDispatcher = None
+
+
+def build_stream_editor(update: Update, streaming_config: dict):
+    """
+    Crea el editor progresivo y el callback on_partial para el router.
+
+    El router puede correr en un worker, por eso el callback reenvía el
+    texto al event loop con call_soon_threadsafe (también sirve desde el loop).
+
+    Returns:
+        (editor, on_partial) o (None, None) si el streaming está deshabilitado
+    """
+    if not streaming_config.get("enabled", False):
+        return None, None
+
+    editor = ThrottledMessageEditor(
+        send=update.message.reply_text,
+        edit=lambda message, text: message.edit_text(text),
+        min_interval=streaming_config.get("edit_interval_seconds", 1.0),
+        min_chars=streaming_config.get("min_chars", 20)
+    )
+    loop = asyncio.get_running_loop()
+
+    def on_partial(text: str):
+        loop.call_soon_threadsafe(editor.push, text)
+
+    return editor, on_partial
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -88,7 +128,12 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         rag_count = retriever.count() if retriever else 0
         counts_by_os = retriever.count_by_obra_social() if retriever else {}
-        llm_ok = llm_client.is_available() if llm_client else False
+        # Estado según el tráfico real: /status no llama a Groq
+        llm_ok = llm_client.is_available(probe=False) if llm_client else False
+        health = llm_client.health.stats() if llm_client else None
+        if health and health["stale"]:
+            # Ocioso más que el TTL: probe en segundo plano para el próximo /status
+            asyncio.get_running_loop().run_in_executor(None, llm_client.is_available)
 
         status_text = (
             "Estado del Sistema - Escenario 1\n"
@@ -106,11 +151,67 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         status_text += (
             "-----------------------------------\n"
-            f"LLM: {'OK' if llm_ok else 'ERROR'}\n"
+            f"LLM: {'SIN DATOS' if llm_ok is None else 'OK' if llm_ok else 'ERROR'}\n"
             f"  Provider: Groq\n"
             f"  Modelo: {llm_client.model if llm_client else 'N/A'}"
         )
 
+        if health and health["idle_seconds"] is not None:
+            latency = health["latency_ewma_ms"]
+            status_text += (
+                f"\n  Última llamada: hace {health['idle_seconds']:.0f}s | "
+                f"Errores: {health['error_rate']:.0%} | "
+                f"Latencia: {f'{latency:.0f}ms' if latency is not None else 'N/A'}"
+            )
+
+        if router and router.answer_cache is not None:
+            cache_stats = router.answer_cache.stats()
+            status_text += (
+                "\n-----------------------------------\n"
+                f"Cache: {cache_stats['entries']} respuestas\n"
+                f"  Hits: {cache_stats['hits']} | Misses: {cache_stats['misses']} "
+                f"({cache_stats['hit_rate']:.0%})"
+            )
+
+        if cascade:
+            status_text += "\n-----------------------------------\nCascada (consultas | p50 | p95 | costo):"
+            for tier, tier_stats in cascade.stats().items():
+                status_text += (
+                    f"\n  {tier}: {tier_stats['count']} ({tier_stats['share']:.0%}) | "
+                    f"{tier_stats['latency_p50_ms']:.0f}ms | {tier_stats['latency_p95_ms']:.0f}ms | "
+                    f"US${tier_stats['cost_usd']:.4f}"
+                )
+
+        if dispatcher:
+            pool = dispatcher.stats()
+            status_text += (
+                "\n-----------------------------------\n"
+                f"Workers: {pool['running']}/{pool['max_workers']} ocupados | En cola: {pool['pending']}\n"
+                f"  Espera en cola: prom {pool['queue_ms_avg']:.0f}ms | max {pool['queue_ms_max']:.0f}ms"
+            )
+
+        if rate_limiter:
+            limits = rate_limiter.stats()
+            status_text += (
+                f"\nRate limit: {limits['queue_depth']} esperando cupo | "
+                f"Reintentos: {limits['retries']} | Espera total: {limits['wait_ms_total'] / 1000:.0f}s"
+            )
+
+        active_llm = async_llm_client or llm_client
+        if active_llm and active_llm.single_flight is not None:
+            flights = active_llm.single_flight.stats()
+            status_text += (
+                f"\nLLM agrupado: {flights['coalesced']} consultas compartieron request "
+                f"({flights['coalesced_rate']:.0%}) | Llamadas: {flights['upstream']}"
+            )
+
+        if async_llm_client:
+            llm_stats = async_llm_client.stats()
+            status_text += (
+                f"\nLLM async: {llm_stats['in_flight']}/{llm_stats['max_in_flight']} en vuelo | "
+                f"Esperando: {llm_stats['waiting']} | Timeouts: {llm_stats['timeouts']}"
+            )
+
         await update.message.reply_text(status_text)
     except Exception as e:
         await update.message.reply_text(f"Error verificando estado: {e}")
@@ -123,15 +224,31 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     logger.info(f"[Chat {chat_id}] Query: {user_message}")
 
-    # Indicador de "escribiendo..."
-    await context.bot.send_chat_action(chat_id=chat_id, action="typing")
-
     try:
         # Crear métricas
         metrics = QueryMetrics(query_text=user_message)
 
-        # Ejecutar query
-        result = router.process_query(query=user_message, metrics=metrics)
+        # Respuesta progresiva (primer mensaje con los primeros tokens)
+        editor, on_partial = build_stream_editor(update, router.config.get("streaming", {}) or {})
+
+        # Encolar en el pool ANTES de cualquier await: así se respeta el orden
+        # de llegada dentro del chat y el event loop queda libre para otros chats
+        entry = cascade or router
+        if async_llm_client:
+            job = asyncio.ensure_future(dispatcher.run_async(
+                chat_id, entry.aprocess_query,
+                query=user_message, metrics=metrics, on_partial=on_partial
+            ))
+        else:
+            job = asyncio.ensure_future(dispatcher.run(
+                chat_id, entry.process_query,
+                query=user_message, metrics=metrics, on_partial=on_partial
+            ))
+
+        # Indicador de "escribiendo..."
+        await context.bot.send_chat_action(chat_id=chat_id, action="typing")
+
+        result, metrics.latency_queue_ms = await job
 
         respuesta = result.respuesta
         entity = result.entity_result
@@ -152,14 +269,36 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.info(f"{'='*60}")
         logger.info(f"Query: {user_message[:50]}{'...' if len(user_message) > 50 else ''}")
         logger.info(f"Entidad: {entity_name} ({entity_conf})")
+        logger.info(f"Cache: {'HIT' if result.cache_hit else 'MISS'}")
+        if result.tier:
+            logger.info(f"Nivel: {result.tier}")
         logger.info(f"RAG: {chunks} chunks | sim: {top_sim:.3f} | {rag_time:.0f}ms")
         logger.info(f"LLM: {tokens_in}->{tokens_out} tokens | {llm_time:.0f}ms")
+        if metrics.latency_first_token_ms:
+            logger.info(f"Primer token: {metrics.latency_first_token_ms:.0f}ms ({editor.updates if editor else 0} envíos)")
+        logger.info(f"Cola: {metrics.latency_queue_ms:.0f}ms")
+        if metrics.latency_throttle_ms or metrics.llm_retries:
+            logger.info(
+                f"Rate limit: {metrics.latency_throttle_ms:.0f}ms de espera | "
+                f"{metrics.llm_retries} reintentos | {metrics.llm_queue_depth} antes en la cola"
+            )
+        if metrics.llm_coalesced:
+            logger.info("LLM: respuesta compartida con una consulta idéntica en vuelo (sin tokens propios)")
+        if result.table_lookup:
+            logger.info("Tabla: precio de la tabla ingestada (sin RAG ni LLM)")
+        if result.extractive:
+            logger.info("Extractiva: dato literal del chunk con confianza alta (sin LLM)")
+        if result.degraded:
+            logger.warning("Deadline: el LLM no respondió a tiempo → respuesta extractiva del chunk top")
         logger.info(f"Total: {total_time:.0f}ms")
         logger.info(f"Respuesta: {respuesta[:100]}{'...' if len(respuesta) > 100 else ''}")
         logger.info(f"{'='*60}")
 
-        # Enviar respuesta al usuario
-        await update.message.reply_text(respuesta)
+        # Enviar respuesta al usuario (o dejar el texto final en el mensaje parcial)
+        if editor is not None:
+            await editor.finish(respuesta)
+        else:
+            await update.message.reply_text(respuesta)
 
     except Exception as e:
         logger.error(f"[Chat {chat_id}] Error: {e}")
@@ -176,9 +315,40 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.error(f"Error: {context.error}")
 
 
+def build_async_llm_client(llm_config: dict, rate_limiter: RateLimiter = None, health: LLMHealth = None):
+    """Crea el cliente async según llm.async de scenario.yaml (None si está deshabilitado)"""
+    async_config = llm_config.get("async", {}) or {}
+    if not async_config.get("enabled", False):
+        return None
+
+    parameters = llm_config.get("parameters", {}) or {}
+    client = AsyncGroqClient(
+        model=llm_config.get("model", "llama-3.3-70b-versatile"),
+        temperature=parameters.get("temperature", 0.1),
+        max_tokens=parameters.get("max_tokens", 150),
+        max_in_flight=async_config.get("max_in_flight", 8),
+        pool_connections=async_config.get("pool_connections", 10),
+        keepalive_seconds=async_config.get("keepalive_seconds", 30),
+        timeout_seconds=async_config.get("timeout_seconds", 30),
+        connect_timeout_seconds=async_config.get("connect_timeout_seconds", 5),
+        rate_limiter=rate_limiter,
+        health=health,
+        coalesce=(llm_config.get("single_flight", {}) or {}).get("enabled", True),
+        base_url=llm_config.get("base_url")
+    )
+    logger.info(f"Groq async: {client.max_in_flight} en vuelo, timeout {client.timeout_seconds}s")
+    return client
+
+
+async def close_async_llm_client(application: Application):
+    """Cierra el pool HTTP del cliente async al detener el bot"""
+    if async_llm_client:
+        await async_llm_client.aclose()
+
+
 def initialize_components():
     """Inicializa los componentes del bot"""
-    global retriever, llm_client, router
+    global retriever, llm_client, async_llm_client, rate_limiter, router, cascade, dispatcher
 
     logger.info("Inicializando componentes...")
 
@@ -188,9 +358,19 @@ def initialize_components():
     retriever = ChromaRetriever(persist_directory=chroma_path)
     logger.info(f"ChromaDB: {retriever.count()} chunks cargados")
 
-    # Groq LLM
+    # Groq LLM (con rate limit RPM/TPM y salud pasiva según config)
     logger.info("Inicializando cliente Groq...")
-    llm_client = GroqClient()
+    with open(Path(__file__).parent / "config" / "scenario.yaml", 'r', encoding='utf-8') as f:
+        llm_config = yaml.safe_load(f).get("llm", {}) or {}
+    rate_limiter = build_rate_limiter(llm_config)
+    coalesce = (llm_config.get("single_flight", {}) or {}).get("enabled", True)
+    llm_client = GroqClient(
+        rate_limiter=rate_limiter,
+        health=build_llm_health(llm_config),
+        coalesce=coalesce,
+        base_url=llm_config.get("base_url")
+    )
+    # Sin tráfico previo: un único probe, que queda cacheado hasta el TTL
     if llm_client.is_available():
         logger.info(f"Groq OK: {llm_client.model}")
     else:
@@ -208,6 +388,18 @@ def initialize_components():
         config_path=str(Path(__file__).parent / "config" / "scenario.yaml")
     )
 
+    # Groq async (pool keep-alive + límite en vuelo)
+    async_llm_client = build_async_llm_client(llm_config, rate_limiter, llm_client.health)
+    router.async_llm_client = async_llm_client
+
+    # Modo Cascada: requisitos de escenario_2 antes del RAG+LLM
+    cascade = build_cascade(router, Path(__file__).parent / "config")
+
+    # Pool de workers (el pipeline no corre en el event loop)
+    max_workers = router.config.get("concurrency", {}).get("max_workers", 4)
+    dispatcher = ChatDispatcher(max_workers=max_workers)
+    logger.info(f"Dispatcher: {max_workers} workers")
+
     logger.info("Componentes inicializados correctamente")
 
 
@@ -229,7 +421,15 @@ def main():
         sys.exit(1)
 
     # Crear aplicación de Telegram
-    application = Application.builder().token(token).build()
+    # concurrent_updates: los handlers de distintos chats no se esperan entre sí
+    # (el orden dentro de cada chat lo garantiza el dispatcher)
+    application = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(True)
+        .post_shutdown(close_async_llm_client)
+        .build()
+    )
 
     # Registrar handlers
     application.add_handler(CommandHandler("start", start))
@@ -0,0 +1,178 @@
+"""
+Cache de respuestas para Modo Consulta.
+
+Evita repetir Entity → RAG → LLM para la misma pregunta (ej: varios
+administrativos preguntando lo mismo en pocos minutos).
+
+Clave: (entidad, query normalizada, versión del corpus, hash del system
+prompt, modelo). Cualquier cambio de corpus, prompt o modelo invalida
+naturalmente las entradas viejas.
+
+- TTL por entrada
+- Tamaño acotado con evicción LRU
+- Persistencia opcional en SQLite (sobrevive reinicios)
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, field
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedAnswer:
+    """Respuesta cacheada con los metadatos necesarios para reconstruir el resultado"""
+    respuesta: str
+    entity: str
+    chunks_count: int = 0
+    top_similarity: float = 0.0
+    tokens_output: int = 0
+    created_at: float = field(default_factory=time.time)
+
+
+class AnswerCache:
+    """Cache LRU con TTL y persistencia SQLite opcional (thread-safe)"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3600,
+        max_entries: int = 1000,
+        sqlite_path: str = None
+    ):
+        """
+        Args:
+            ttl_seconds: Vida de cada entrada
+            max_entries: Máximo de entradas en memoria (LRU)
+            sqlite_path: Archivo SQLite para persistir (None = solo memoria)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.sqlite_path = sqlite_path
+
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.misses = 0
+
+        if sqlite_path:
+            self._open_sqlite()
+
+    @staticmethod
+    def make_key(
+        entity: str,
+        query_text: str,
+        corpus_version: str,
+        system_prompt: str,
+        model: str
+    ) -> str:
+        """Construye la clave del cache (hash estable entre procesos)"""
+        prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+        raw = "\x1f".join([entity or "", query_text, corpus_version or "", prompt_hash, model or ""])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _open_sqlite(self):
+        """Abre la base de persistencia y carga las entradas vigentes"""
+        self._conn = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answer_cache (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answer_cache_created ON answer_cache(created_at)")
+
+        # Descartar vencidas y cargar las más recientes
+        cutoff = time.time() - self.ttl_seconds
+        self._conn.execute("DELETE FROM answer_cache WHERE created_at < ?", (cutoff,))
+        self._conn.commit()
+
+        rows = self._conn.execute(
+            "SELECT key, payload FROM answer_cache ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+
+        for key, payload in reversed(rows):
+            self._entries[key] = CachedAnswer(**json.loads(payload))
+
+        logger.info(f"AnswerCache: {len(self._entries)} entradas cargadas de {self.sqlite_path}")
+
+    def get(self, key: str) -> Optional[CachedAnswer]:
+        """Retorna la respuesta cacheada o None (miss o vencida)"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and time.time() - entry.created_at > self.ttl_seconds:
+                self._delete(key)
+                if self._conn is not None:
+                    self._conn.commit()
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, answer: CachedAnswer):
+        """Guarda una respuesta (evicta la menos usada si se excede el tamaño)"""
+        with self._lock:
+            self._entries[key] = answer
+            self._entries.move_to_end(key)
+
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answer_cache (key, payload, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(asdict(answer), ensure_ascii=False), answer.created_at)
+                )
+
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._delete(oldest_key)
+
+            if self._conn is not None:
+                self._conn.commit()
+
+    def _delete(self, key: str):
+        """Elimina una entrada (con el lock tomado; el commit lo hace quien llama)"""
+        self._entries.pop(key, None)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM answer_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        """Vacía el cache (memoria y SQLite)"""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM answer_cache")
+                self._conn.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas del cache"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "persistent": self.sqlite_path is not None
+        }
+
+    def close(self):
+        """Cierra la conexión SQLite"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,308 @@
+"""
+Modo Cascada: SQL → tabla → extractiva → RAG+LLM.
+
+Escenario 2 responde requisitos de ingreso ("internación ENSALUD",
+"guardia IOSFA") con un lookup SQLite en microsegundos y sin tokens;
+el Modo Consulta gasta RAG y Groq en cada pregunta, incluidas esas.
+CascadeRouter prueba los niveles del más barato al más caro y se queda
+con el primero que alcanza su umbral de confianza:
+
+1. sql:        Normalizer + QueryEngine de escenario_2 sobre la base de
+               requisitos (cascade.sql.min_confidence)
+2. tabla:      precio de las tablas ingestadas (tables.min_confidence)
+3. extractiva: dato literal de los chunks del RAG (extractive.min_confidence)
+4. llm:        RAG + Groq (o respuesta degradada si no entra en el deadline)
+
+Los niveles 2 a 4 son el ConsultaRouter de siempre; el nivel que respondió
+queda en ConsultaResult.tier y QueryMetrics.tier ("sin_entidad" y "cache"
+también se registran). stats() reporta por nivel cantidad, latencia
+p50/p95, tokens y costo (costs de scenario.yaml).
+"""
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional
+
+from .extractive import classify_intent
+from .normalized_text import NormalizedText
+from .router import ConsultaResult, ConsultaRouter
+from ..metrics.collector import QueryMetrics
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("sql", "tabla", "extractiva", "llm", "degradada", "cache", "sin_entidad")
+
+# Intenciones de dato puntual: la ficha de requisitos no es la respuesta
+# ("teléfono guardia ENSALUD" pide el teléfono, no la documentación)
+SQL_LITERAL_INTENTS = frozenset({"telefono", "email", "url", "monto", "plazo"})
+SQL_LITERAL_CONFIDENCE = 0.5
+
+
+@dataclass
+class SQLAnswer:
+    """Respuesta del nivel SQL (ficha de requisitos de escenario_2)"""
+    respuesta: str
+    obra_social: str
+    tipo_ingreso: str
+    confidence: float
+
+
+class SQLTier:
+    """
+    Nivel SQL: sinónimos + requisitos de escenario_2 (sin RAG ni LLM).
+
+    La conexión se comparte entre los workers del dispatcher: se abre con
+    check_same_thread=False y cada lookup toma el lock.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        from escenario_2.core.normalizer import Normalizer
+        from escenario_2.core.query_engine import QueryEngine
+
+        self.conn = conn
+        self._lock = threading.Lock()
+        self.normalizer = Normalizer(conn)
+        self.engine = QueryEngine(conn)
+
+    @classmethod
+    def from_path(cls, db_path: str) -> "SQLTier":
+        return cls(sqlite3.connect(db_path, check_same_thread=False))
+
+    def answer(self, normalized: NormalizedText) -> Optional[SQLAnswer]:
+        """
+        Ficha de requisitos para la pregunta.
+
+        Returns:
+            SQLAnswer con su confianza, o None si la pregunta no nombra
+            obra social y tipo de ingreso o no hay datos cargados
+        """
+        with self._lock:
+            query = self.normalizer.normalize(normalized.original)
+            if not query.is_valid:
+                return None
+            result = self.engine.query(query)
+        if not result.success:
+            return None
+
+        intent, _ = classify_intent(normalized)
+        confidence = SQL_LITERAL_CONFIDENCE if intent in SQL_LITERAL_INTENTS else 1.0
+        return SQLAnswer(
+            respuesta=result.respuesta,
+            obra_social=query.obra_social,
+            tipo_ingreso=query.tipo_ingreso,
+            confidence=confidence
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+@dataclass
+class TierStats:
+    """Acumulado de un nivel de la cascada"""
+    count: int = 0
+    tokens_input: int = 0
+    tokens_output: int = 0
+    cost_usd: float = 0.0
+    latencies_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+    def to_dict(self, total: int) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "share": self.count / total if total else 0.0,
+            "latency_p50_ms": percentile(self.latencies_ms, 0.5),
+            "latency_p95_ms": percentile(self.latencies_ms, 0.95),
+            "tokens_input": self.tokens_input,
+            "tokens_output": self.tokens_output,
+            "cost_usd": self.cost_usd,
+            "cost_per_query_usd": self.cost_usd / self.count if self.count else 0.0
+        }
+
+
+def tier_of(result: ConsultaResult) -> str:
+    """Nivel que respondió una consulta del ConsultaRouter"""
+    if result.table_lookup:
+        return "tabla"
+    if result.cache_hit:
+        return "cache"
+    if result.extractive:
+        return "extractiva"
+    if result.degraded:
+        return "degradada"
+    if result.llm_executed:
+        return "llm"
+    return "sin_entidad"
+
+
+class CascadeRouter:
+    """
+    Punto de entrada único: SQL → tabla → extractiva → RAG+LLM.
+
+    Misma interfaz que ConsultaRouter (process_query / aprocess_query).
+    """
+
+    def __init__(
+        self,
+        router: ConsultaRouter,
+        sql_tier: Optional[SQLTier] = None,
+        sql_min_confidence: float = 0.9,
+        costs: Optional[Dict] = None
+    ):
+        """
+        Args:
+            router: ConsultaRouter (niveles tabla, extractiva y RAG+LLM)
+            sql_tier: Nivel SQL (None = la cascada arranca en la extractiva)
+            sql_min_confidence: Confianza mínima para responder desde SQL
+            costs: Sección costs de scenario.yaml (USD por millón de tokens)
+        """
+        self.router = router
+        self.sql_tier = sql_tier
+        self.sql_min_confidence = sql_min_confidence
+        costs = costs if costs is not None else (router.config.get("costs", {}) or {})
+        self.input_per_million = costs.get("input_per_million", 0.0)
+        self.output_per_million = costs.get("output_per_million", 0.0)
+
+        self._stats_lock = threading.Lock()
+        self._tiers: Dict[str, TierStats] = {tier: TierStats() for tier in TIERS}
+
+    def process_query(
+        self,
+        query: str,
+        metrics: QueryMetrics = None,
+        on_partial=None
+    ) -> ConsultaResult:
+        """Procesa una consulta por la cascada (ver ConsultaRouter.process_query)"""
+        start = time.perf_counter()
+        metrics = metrics or QueryMetrics(query_text=query)
+
+        result = self._sql(query, metrics, start)
+        if result is None:
+            result = self.router.process_query(query, metrics=metrics, on_partial=on_partial)
+        return self._record(result, metrics, start)
+
+    async def aprocess_query(
+        self,
+        query: str,
+        metrics: QueryMetrics = None,
+        on_partial=None
+    ) -> ConsultaResult:
+        """Versión async: el lookup SQL corre en los threads acotados del router"""
+        start = time.perf_counter()
+        metrics = metrics or QueryMetrics(query_text=query)
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.router.get_executor(), self._sql, query, metrics, start)
+        if result is None:
+            result = await self.router.aprocess_query(query, metrics=metrics, on_partial=on_partial)
+        return self._record(result, metrics, start)
+
+    def _sql(self, query: str, metrics: QueryMetrics, start: float) -> Optional[ConsultaResult]:
+        """Nivel 1: ficha de requisitos si alcanza el umbral (None = seguir la cascada)"""
+        if self.sql_tier is None:
+            return None
+
+        normalized = NormalizedText.from_text(query)
+        try:
+            answer = self.sql_tier.answer(normalized)
+        except sqlite3.Error as e:
+            logger.error(f"Cascada: error en el nivel SQL: {e}")
+            return None
+        if answer is None or answer.confidence < self.sql_min_confidence:
+            return None
+
+        logger.info(
+            f"Cascada: SQL {answer.obra_social}/{answer.tipo_ingreso} "
+            f"(confianza {answer.confidence:.2f}) → sin RAG ni LLM"
+        )
+        metrics.obra_social = answer.obra_social
+        metrics.tokens_input = 0
+        metrics.tokens_output = 0
+        metrics.response_text = answer.respuesta
+        metrics.latency_total_ms = (time.perf_counter() - start) * 1000
+
+        return ConsultaResult(
+            respuesta=answer.respuesta,
+            entity_result=self.router.entity_detector.detect(normalized),
+            rag_executed=False,
+            llm_executed=False,
+            context_used=None,
+            chunks_count=0,
+            top_similarity=0.0,
+            chunks_info=[],
+            metrics=metrics,
+            tier="sql"
+        )
+
+    def _record(self, result: ConsultaResult, metrics: QueryMetrics, start: float) -> ConsultaResult:
+        """Marca el nivel que respondió y lo suma a las estadísticas"""
+        if result.tier is None:
+            result.tier = tier_of(result)
+        metrics.tier = result.tier
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        cost = (
+            metrics.tokens_input * self.input_per_million
+            + metrics.tokens_output * self.output_per_million
+        ) / 1_000_000
+
+        with self._stats_lock:
+            stats = self._tiers[result.tier]
+            stats.count += 1
+            stats.tokens_input += metrics.tokens_input
+            stats.tokens_output += metrics.tokens_output
+            stats.cost_usd += cost
+            stats.latencies_ms.append(latency_ms)
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Cantidad, latencia p50/p95, tokens y costo por nivel (solo niveles usados)"""
+        with self._stats_lock:
+            total = sum(stats.count for stats in self._tiers.values())
+            return {
+                tier: stats.to_dict(total)
+                for tier, stats in self._tiers.items()
+                if stats.count
+            }
+
+
+def build_cascade(router: ConsultaRouter, config_dir: Path) -> Optional[CascadeRouter]:
+    """
+    Crea la cascada según la sección cascade de scenario.yaml (None si está
+    deshabilitada). Sin la base de escenario_2, la cascada arranca en la
+    extractiva.
+
+    Args:
+        router: ConsultaRouter ya configurado
+        config_dir: Directorio de scenario.yaml (cascade.sql.db_path es relativo a él)
+    """
+    cascade_config = router.config.get("cascade", {}) or {}
+    if not cascade_config.get("enabled", False):
+        return None
+
+    sql_config = cascade_config.get("sql", {}) or {}
+    sql_tier = None
+    if sql_config.get("enabled", True):
+        db_path = (Path(config_dir) / sql_config.get("db_path", "../../escenario_2/data/obras_sociales.db")).resolve()
+        if db_path.exists():
+            sql_tier = SQLTier.from_path(str(db_path))
+            logger.info(f"Cascada: nivel SQL desde {db_path}")
+        else:
+            logger.warning(f"Cascada: no existe {db_path} → sin nivel SQL (python escenario_2/data/init_db.py)")
+
+    return CascadeRouter(
+        router,
+        sql_tier=sql_tier,
+        sql_min_confidence=sql_config.get("min_confidence", 0.9)
+    )
@@ -0,0 +1,45 @@
+"""
+Presupuesto de tiempo por consulta (deadline).
+
+Sin presupuesto, una consulta tarda lo que tarde Groq (20 s con la API
+saturada) y el administrativo espera frente al paciente. Deadline fija el
+momento límite cuando entra la consulta: cada etapa (entidad, RAG, LLM)
+consume del mismo presupuesto y el LLM recibe solo lo que queda.
+
+Usa time.perf_counter(), el mismo reloj de las métricas del router.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class Deadline:
+    """Momento límite de una consulta"""
+    seconds: float
+    start: float = field(default_factory=time.perf_counter)
+
+    @property
+    def expires_at(self) -> float:
+        return self.start + self.seconds
+
+    def remaining(self) -> float:
+        """Segundos que quedan del presupuesto (0 si ya venció)"""
+        return max(0.0, self.expires_at - time.perf_counter())
+
+    def expired(self) -> bool:
+        return time.perf_counter() >= self.expires_at
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+
+def build_deadline(deadline_config: Optional[Dict], start: float = None) -> Optional[Deadline]:
+    """Crea el deadline según la sección deadline de scenario.yaml (None si está deshabilitado)"""
+    config = deadline_config or {}
+    if not config.get("enabled", False):
+        return None
+    return Deadline(
+        seconds=config.get("total_seconds", 8.0),
+        start=time.perf_counter() if start is None else start
+    )
@@ -0,0 +1,203 @@
+"""
+Dispatcher de trabajo bloqueante para los handlers de Telegram.
+
+El pipeline (embeddings, ChromaDB, Groq, SQLite) es sincrónico. Ejecutarlo
+dentro de un handler async congela el event loop: una llamada lenta al LLM
+frena a todos los chats.
+
+ChatDispatcher corre cada consulta en un pool de threads:
+- Concurrencia acotada (max_workers)
+- Orden FIFO por chat (los mensajes de un mismo chat no se adelantan,
+  el historial del Modo Agente queda ordenado)
+- Chats distintos se procesan en paralelo
+- Métrica de tiempo en cola (desde que llega el mensaje hasta que empieza)
+- Cancelar al handler no libera el turno del chat mientras el worker
+  sigue corriendo la función; un trabajo cancelado antes de empezar se
+  cuenta como cancelado (no queda pendiente para siempre)
+
+Con un router async (aprocess_query + cliente LLM async), run_async mantiene
+el orden por chat pero corre la corutina en el event loop, sin ocupar un
+worker mientras espera al LLM.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ChatDispatcher:
+    """Pool de workers con orden FIFO por chat"""
+
+    def __init__(self, max_workers: int = 4, thread_name_prefix: str = "chat-worker"):
+        """
+        Args:
+            max_workers: Máximo de consultas ejecutándose en simultáneo
+            thread_name_prefix: Prefijo de los threads del pool
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=thread_name_prefix
+        )
+
+        # Un lock por chat (asyncio.Lock despierta a los waiters en orden FIFO)
+        self._chat_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._chat_waiters: Dict[Hashable, int] = {}
+
+        # Estadísticas (se actualizan desde el loop y desde los workers)
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.running = 0
+        self.cancelled = 0
+        self.queue_ms_total = 0.0
+        self.queue_ms_max = 0.0
+
+    async def run(
+        self,
+        chat_id: Hashable,
+        fn: Callable[..., Any],
+        *args,
+        **kwargs
+    ) -> Tuple[Any, float]:
+        """
+        Ejecuta fn(*args, **kwargs) en el pool respetando el orden del chat.
+
+        Args:
+            chat_id: Clave de ordenamiento (los trabajos de un mismo chat son secuenciales)
+            fn: Función bloqueante a ejecutar
+
+        Returns:
+            (resultado de fn, milisegundos en cola)
+        """
+        submitted_at = time.perf_counter()
+        async with self._chat_turn(chat_id):
+            future = self._executor.submit(self._execute, submitted_at, fn, args, kwargs)
+            waiter = asyncio.wrap_future(future)
+            try:
+                return await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                if future.cancel():
+                    self._cancelled()
+                else:
+                    # fn ya corre en el worker: el chat sigue ocupado hasta que termine
+                    await self._wait_uncancellable(waiter)
+                raise
+
+    async def run_async(
+        self,
+        chat_id: Hashable,
+        coro_fn: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs
+    ) -> Tuple[Any, float]:
+        """
+        Espera coro_fn(*args, **kwargs) en el event loop respetando el orden del chat.
+
+        No usa el pool: la concurrencia la acota el propio cliente async.
+
+        Returns:
+            (resultado de la corutina, milisegundos en cola)
+        """
+        submitted_at = time.perf_counter()
+        async with self._chat_turn(chat_id):
+            queue_ms = (time.perf_counter() - submitted_at) * 1000
+            self._started(queue_ms)
+            try:
+                return await coro_fn(*args, **kwargs), queue_ms
+            finally:
+                self._finished()
+
+    @asynccontextmanager
+    async def _chat_turn(self, chat_id: Hashable):
+        """Turno del chat: espera a que terminen sus mensajes anteriores"""
+        with self._stats_lock:
+            self.submitted += 1
+
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        self._chat_waiters[chat_id] = self._chat_waiters.get(chat_id, 0) + 1
+
+        try:
+            try:
+                await lock.acquire()
+            except asyncio.CancelledError:
+                # Cancelado esperando su turno: nunca va a empezar
+                self._cancelled()
+                raise
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            # Liberar el lock del chat cuando no quedan mensajes pendientes
+            self._chat_waiters[chat_id] -= 1
+            if self._chat_waiters[chat_id] == 0:
+                del self._chat_waiters[chat_id]
+                del self._chat_locks[chat_id]
+
+    def _started(self, queue_ms: float):
+        with self._stats_lock:
+            self.running += 1
+            self.queue_ms_total += queue_ms
+            self.queue_ms_max = max(self.queue_ms_max, queue_ms)
+
+    def _finished(self):
+        with self._stats_lock:
+            self.running -= 1
+            self.completed += 1
+
+    def _cancelled(self):
+        with self._stats_lock:
+            self.cancelled += 1
+
+    @staticmethod
+    async def _wait_uncancellable(waiter: asyncio.Future):
+        """Espera a que termine el trabajo aunque vuelvan a cancelar al handler"""
+        while not waiter.done():
+            try:
+                await asyncio.wait({waiter})
+            except asyncio.CancelledError:
+                continue
+        if not waiter.cancelled():
+            waiter.exception()  # ya nadie la espera: evita el warning de excepción sin leer
+
+    def _execute(self, submitted_at: float, fn: Callable, args: tuple, kwargs: dict) -> Tuple[Any, float]:
+        """Corre en el worker: mide la espera y ejecuta la función"""
+        queue_ms = (time.perf_counter() - submitted_at) * 1000
+        self._started(queue_ms)
+        try:
+            return fn(*args, **kwargs), queue_ms
+        finally:
+            self._finished()
+
+    @property
+    def pending(self) -> int:
+        """Trabajos enviados que todavía no empezaron"""
+        with self._stats_lock:
+            return self.submitted - self.completed - self.running - self.cancelled
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas del dispatcher"""
+        with self._stats_lock:
+            started = self.completed + self.running
+            return {
+                "max_workers": self.max_workers,
+                "running": self.running,
+                "pending": self.submitted - started - self.cancelled,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "active_chats": len(self._chat_locks),
+                "queue_ms_avg": round(self.queue_ms_total / started, 1) if started else 0.0,
+                "queue_ms_max": round(self.queue_ms_max, 1)
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Detiene el pool de workers"""
+        self._executor.shutdown(wait=wait)
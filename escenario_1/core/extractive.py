@@ -0,0 +1,261 @@
+"""
+Respuestas extractivas (sin LLM) a partir de los chunks recuperados.
+
+Buena parte de las consultas piden UN dato literal que ya está en el chunk
+top ("teléfono mesa operativa ASI", "mail auditoría ENSALUD", "valor APB
+ENSALUD"). Para esas, llamar a Groq solo agrega latencia y tokens.
+
+1. Intención de la pregunta por palabras clave de la query normalizada,
+   reforzada con la expansión del query rewriter (synonyms.yaml: "cuánto
+   dura" → "vigencia días plazo"...):
+   - telefono:   "0810-888-8274", "(011) 4959-0000", "66075765"
+   - email:      "autorizaciones@asi.com.ar"
+   - url:        "www.ensalud.org", "https://asi.com.ar/prestadores"
+   - monto:      "$2912", "$ 1.553,50"
+   - plazo:      "24 hs", "48 horas", "30 días hábiles"
+   - documentos: ítems de lista ("- DNI", "• Credencial")
+2. Extracción por regex: la línea (u oración) del chunk que contiene el
+   dato y más palabras comparte con la pregunta, así el dato llega con su
+   contexto ("Teléfono Mesa Operativa: 0810-888-8274.").
+3. Confianza (0-1): intención explícita en la query, cobertura de las
+   palabras de contenido de la pregunta en la línea elegida y ausencia de
+   otra línea igual de buena con un dato distinto. El router responde sin
+   LLM desde extractive.min_confidence (scenario.yaml).
+
+También es la respuesta de respaldo cuando el LLM no entra en el deadline
+(en ese caso se usa aunque la confianza sea baja).
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple, Union
+
+from .normalized_text import NormalizedText, normalize_text, fold
+
+# Palabras clave por intención (forma `text` de NormalizedText). El orden
+# desempata: "cuánto tiempo" es plazo aunque "cuánto" sugiera monto.
+INTENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "email": ("mail", "mails", "email", "e mail", "correo", "correos"),
+    "url": ("web", "pagina", "sitio", "link", "portal", "url", "online"),
+    "telefono": ("telefono", "telefonos", "tel", "llamar", "whatsapp", "celular", "numero"),
+    "plazo": (
+        "plazo", "plazos", "tiempo", "cuando", "vigencia", "vence", "dura", "duran",
+        "demora", "anticipacion", "avisar", "horas", "dias"
+    ),
+    "monto": (
+        "valor", "valores", "precio", "precios", "cuanto", "cuesta", "cuestan", "sale", "salen",
+        "coseguro", "coseguros", "copago", "arancel", "tarifa", "monto", "costo", "importe"
+    ),
+    "documentos": (
+        "documentos", "documentacion", "requisitos", "requisito", "papeles", "presentar", "llevar"
+    ),
+}
+
+# Peso de una palabra clave que solo aparece en la expansión del rewriter
+EXPANSION_WEIGHT = 0.5
+
+INTENT_PATTERNS: Dict[str, Pattern] = {
+    "email": re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"),
+    "url": re.compile(
+        r"(?<![@\w.-])(?:https?://)?(?:www\.)?[a-z0-9-]+(?:\.[a-z0-9-]+)*"
+        r"\.(?:com|org|net|gob|gov|edu|info)(?:\.ar)?(?:/[^\s,;)]*)?",
+        re.IGNORECASE
+    ),
+    # Característica opcional + 7/8 dígitos; no toma montos ni números con punto
+    "telefono": re.compile(
+        r"(?<![\d$.,])(?:\+?54[\s-]?)?(?:\(?0?\d{2,4}\)?[\s-]?)?\d{3,4}[\s-]?\d{4}(?![\d.,]\d)"
+    ),
+    "monto": re.compile(r"\$\s?(?:\d{1,3}(?:\.\d{3})+|\d+)(?:,\d{1,2})?"),
+    "plazo": re.compile(
+        r"\b\d+\s*(?:hs|h|horas?|d[ií]as?(?:\s+h[aá]biles)?|semanas?|mes(?:es)?|min(?:utos)?)\b",
+        re.IGNORECASE
+    ),
+}
+
+# Ítem de lista: "- DNI", "• Credencial", "1) Orden", "a. Bono"
+_LIST_ITEM = re.compile(r"^\s*(?:[-•*·▪✓✔]|\d+[.)]|[a-z][.)])\s+\S", re.IGNORECASE)
+MAX_LIST_ITEMS = 8
+
+# Palabras que no cuentan para elegir la línea (además de las palabras clave)
+_STOPWORDS = frozenset(
+    "a al como con cual cuales de del el en es hay la las lo los me mi para por que se "
+    "son su un una y o necesito debo tengo puedo donde mando envio enviar quiero saber".split()
+)
+_KEYWORD_TOKENS = frozenset(
+    token for keywords in INTENT_KEYWORDS.values() for keyword in keywords for token in keyword.split()
+)
+# La pregunta no pide un valor sino una regla ("quiénes no pagan coseguro")
+_RULE_CUES = frozenset(
+    "quien quienes exento exentos excluidos cubre cubren requiere requieren incluye incluyen".split()
+)
+
+# Línea u oración: salto de línea o punto/punto y coma seguido de espacio
+_SEGMENT_SPLIT = re.compile(r"\n+|(?<=[.;])\s+")
+_STEM = 5  # Prefijo comparado ("internacion" ~ "internaciones")
+MAX_ANSWER_CHARS = 300
+# Las listas se arman distinto que un dato puntual: no alcanzan para saltear el LLM
+MAX_LIST_CONFIDENCE = 0.6
+
+
+@dataclass
+class ExtractiveAnswer:
+    """Dato extraído de un chunk"""
+    respuesta: str
+    intent: Optional[str]
+    values: List[str] = field(default_factory=list)
+    chunk_id: Optional[str] = None
+    score: int = 0
+    confidence: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "intent": self.intent,
+            "values": self.values,
+            "chunk_id": self.chunk_id,
+            "confidence": round(self.confidence, 3)
+        }
+
+
+def classify_intent(
+    query: Union[str, NormalizedText],
+    expansion: str = ""
+) -> Tuple[Optional[str], float]:
+    """
+    Intención de la pregunta y su fuerza.
+
+    Args:
+        query: Pregunta del usuario (str o NormalizedText)
+        expansion: Sufijo del query rewriter (QueryExpander.expand)
+
+    Returns:
+        (intención, fuerza): fuerza 1.0 si la query nombra la intención,
+        EXPANSION_WEIGHT si solo la sugiere el rewriter; (None, 0.0) si no
+        pide un dato puntual
+    """
+    padded = normalize_text(query).padded
+    expanded = f" {fold(expansion)} " if expansion else ""
+    best, best_hits, best_strength = None, 0.0, 0.0
+    for intent, keywords in INTENT_KEYWORDS.items():
+        direct = sum(1 for keyword in keywords if f" {keyword} " in padded)
+        suggested = sum(1 for keyword in keywords if f" {keyword} " in expanded) if expanded else 0
+        hits = direct + EXPANSION_WEIGHT * suggested
+        if hits > best_hits:
+            best, best_hits = intent, hits
+            best_strength = 1.0 if direct else EXPANSION_WEIGHT
+    return best, best_strength
+
+
+def detect_intent(query: Union[str, NormalizedText], expansion: str = "") -> Optional[str]:
+    """Intención de la pregunta (None si no pide un dato puntual)"""
+    return classify_intent(query, expansion)[0]
+
+
+def stems(tokens: Iterable[str]) -> set:
+    """Prefijos de las palabras de contenido (sin stopwords)"""
+    return {token[:_STEM] for token in tokens if token not in _STOPWORDS}
+
+
+def _segments(text: str) -> List[str]:
+    return [s.strip() for s in _SEGMENT_SPLIT.split(text or "") if s and s.strip()]
+
+
+def _truncate(text: str) -> str:
+    return text if len(text) <= MAX_ANSWER_CHARS else text[:MAX_ANSWER_CHARS].rstrip() + "..."
+
+
+def content_stems(normalized: NormalizedText, ignore_terms: Sequence[str]) -> set:
+    """Palabras de contenido de la pregunta: sin stopwords, palabras clave ni la entidad"""
+    ignored = {token for term in ignore_terms if term for token in fold(term).split()}
+    return stems(t for t in normalized.tokens if t not in _KEYWORD_TOKENS and t not in ignored)
+
+
+def _extract_list(chunks: Sequence, content: set) -> Optional[ExtractiveAnswer]:
+    """Ítems de lista del chunk que más comparte con la pregunta (al menos 2 ítems)"""
+    best: Optional[ExtractiveAnswer] = None
+    for chunk in chunks:
+        items = [line.strip() for line in (chunk.text or "").splitlines() if _LIST_ITEM.match(line)]
+        if len(items) < 2:
+            continue
+        score = len(content & stems(NormalizedText.from_text(chunk.text).tokens))
+        if best is None or score > best.score:
+            best = ExtractiveAnswer(
+                respuesta="\n".join(items[:MAX_LIST_ITEMS]),
+                intent="documentos",
+                values=items[:MAX_LIST_ITEMS],
+                chunk_id=chunk.chunk_id,
+                score=score
+            )
+    return best
+
+
+def extract_answer(
+    query: Union[str, NormalizedText],
+    chunks: Sequence,
+    intent: Optional[str] = None,
+    expansion: str = "",
+    ignore_terms: Sequence[str] = ()
+) -> Optional[ExtractiveAnswer]:
+    """
+    Arma una respuesta sin LLM con el dato que pide la pregunta.
+
+    Args:
+        query: Pregunta del usuario (str o NormalizedText ya calculado)
+        chunks: Chunks en orden de relevancia (objetos con .text y .chunk_id,
+            p.ej. ChunkInfo del router)
+        intent: Intención ya detectada (None = clasificar la query)
+        expansion: Sufijo del query rewriter (refuerza la intención)
+        ignore_terms: Términos que no cuentan como contenido (p.ej. el alias
+            de la entidad: "ASI" no suele estar en la línea del dato)
+
+    Returns:
+        ExtractiveAnswer con su confianza, o None si ningún chunk tiene
+        algo que ver con la pregunta
+    """
+    normalized = normalize_text(query)
+    if intent is None:
+        intent, strength = classify_intent(normalized, expansion)
+    else:
+        strength = 1.0
+    content = content_stems(normalized, ignore_terms)
+    pattern = INTENT_PATTERNS.get(intent)
+
+    candidates: List[ExtractiveAnswer] = []
+    fallback: Optional[ExtractiveAnswer] = None
+    for chunk in chunks:
+        for segment in _segments(chunk.text):
+            segment_stems = stems(NormalizedText.from_text(segment).tokens)
+            score = len(content & segment_stems)
+            values = pattern.findall(segment) if pattern else []
+            candidate = ExtractiveAnswer(
+                respuesta=_truncate(segment),
+                intent=intent if values else None,
+                values=values,
+                chunk_id=chunk.chunk_id,
+                score=score
+            )
+            if values:
+                candidates.append(candidate)
+            if score > 0 and (fallback is None or score > fallback.score):
+                fallback = candidate
+
+    if intent == "documentos":
+        listed = _extract_list(chunks, content)
+        if listed is not None:
+            coverage = listed.score / len(content) if content else 1.0
+            listed.confidence = min(MAX_LIST_CONFIDENCE, strength * (0.4 + 0.4 * coverage))
+            return listed
+
+    if not candidates:
+        return fallback  # Confianza 0: solo sirve de respaldo
+
+    # Ante empate gana el chunk más relevante (primero) y la primera línea
+    best = max(candidates, key=lambda c: c.score)
+    rivals = {
+        tuple(c.values) for c in candidates
+        if c.score == best.score and set(c.values) != set(best.values)
+    }
+    coverage = best.score / len(content) if content else 1.0
+    confidence = strength * (0.4 + 0.4 * coverage + (0.0 if rivals else 0.2))
+    if _RULE_CUES & set(normalized.tokens):
+        confidence *= 0.5
+    best.confidence = round(min(1.0, confidence), 3)
+    return best
@@ -3,20 +3,49 @@ Router determinístico para Modo Consulta.
 
 Reglas estrictas:
 1. Sin entidad → mensaje fijo (NO LLM, NO RAG)
-2. Con entidad → RAG filtrado + LLM
+2. Con entidad → RAG filtrado + LLM (o dato literal del chunk, sin LLM)
 3. NO existe RAG general
 4. NO se mezclan corpora
+
+process_query (sincrónico, para workers/scripts) y aprocess_query (async,
+para el bot sin threads bloqueados) comparten las mismas etapas: _prepare
+(entidad, cache, RAG, prompt) y _complete (cache, métricas, resultado).
+
+Deadline (scenario.yaml → deadline): cada consulta tiene un presupuesto
+total. El RAG consume de él y el LLM recibe solo lo que queda (como
+timeout del cliente y como corte del router). Si el presupuesto se agota,
+la respuesta es extractiva (regex sobre el chunk top, ver extractive.py)
+y el resultado queda marcado degraded: el peor caso de latencia en la
+ventanilla queda acotado.
+
+Respuesta extractiva (scenario.yaml → extractive): si la pregunta pide un
+dato literal (teléfono, mail, web, monto, plazo) y el extractor lo
+encuentra en los chunks con confianza alta, se responde sin llamar a Groq.
+
+Tablas (scenario.yaml → tables): los precios de las tablas de coseguros
+se ingestan como filas SQLite (rag/table_store.py); "valor APB ENSALUD"
+se responde con una consulta indexada, antes del cache y sin RAG ni LLM.
 """
 import time
+import asyncio
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Callable, Tuple, Union
 from dataclasses import dataclass
 
 import yaml
 
 from .entity_detector import EntityDetector, EntityResult, get_entity_detector
+from .normalized_text import NormalizedText
+from .answer_cache import AnswerCache, CachedAnswer
+from .deadline import Deadline, build_deadline
+from .extractive import ExtractiveAnswer, classify_intent, extract_answer
+from .query_rewriter import get_query_expander
 from ..metrics.collector import QueryMetrics, count_tokens_approximate
+from ..rag.table_store import TableAnswer, TableStore
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +79,11 @@ class ConsultaResult:
     top_similarity: float
     chunks_info: list  # Lista de ChunkInfo
     metrics: Optional[QueryMetrics]
+    cache_hit: bool = False
+    degraded: bool = False  # Respuesta extractiva: el LLM no entró en el deadline
+    extractive: bool = False  # Dato literal del chunk con confianza alta (sin LLM)
+    table_lookup: bool = False  # Precio de una tabla ingestada (sin RAG ni LLM)
+    tier: Optional[str] = None  # Nivel que respondió (Modo Cascada, ver cascade.py)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -57,12 +91,34 @@ class ConsultaResult:
             "entity": self.entity_result.to_dict() if self.entity_result else None,
             "rag_executed": self.rag_executed,
             "llm_executed": self.llm_executed,
+            "cache_hit": self.cache_hit,
+            "degraded": self.degraded,
+            "extractive": self.extractive,
+            "table_lookup": self.table_lookup,
+            "tier": self.tier,
             "chunks_count": self.chunks_count,
             "top_similarity": self.top_similarity,
             "chunks_info": [c.to_dict() for c in self.chunks_info] if self.chunks_info else []
         }
 
 
+@dataclass
+class _LLMRequest:
+    """Consulta preparada para el LLM (estado entre _prepare y _complete)"""
+    query: str
+    normalized: NormalizedText
+    entity_result: EntityResult
+    messages: List[Dict[str, str]]
+    context: str
+    chunks_info: list
+    chunks_count: int
+    top_similarity: float
+    cache_key: Optional[str]
+    start_time: float
+    deadline: Optional[Deadline] = None
+    extraction: Optional[ExtractiveAnswer] = None
+
+
 class ConsultaRouter:
     """
     Router determinístico para Modo Consulta.
@@ -70,7 +126,10 @@ class ConsultaRouter:
     Flujo:
     1. Entity Detection (sin LLM)
     2. Si entity == null → respuesta fija (sin RAG, sin LLM)
-    3. Si entity != null → RAG filtrado → LLM
+    3. Si pide un precio que está en las tablas → valor exacto (sin RAG, sin LLM)
+    4. Si la pregunta está en cache → respuesta cacheada (sin RAG, sin LLM)
+    5. Si entity != null → RAG filtrado → dato literal con confianza alta (sin LLM)
+    6. Si no → LLM; si el LLM no entra en el deadline → respuesta extractiva (degraded)
     """
 
     def __init__(
@@ -78,10 +137,13 @@ class ConsultaRouter:
         retriever,  # ChromaRetriever
         llm_client,  # GroqClient
         entity_detector: EntityDetector = None,
-        config_path: str = None
+        config_path: str = None,
+        async_llm_client=None,  # AsyncGroqClient (opcional, para aprocess_query)
+        table_store: TableStore = None  # None = según tables de scenario.yaml
     ):
         self.retriever = retriever
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
         self.entity_detector = entity_detector or get_entity_detector()
 
         # Cargar config del escenario
@@ -94,10 +156,436 @@ class ConsultaRouter:
         self.system_prompt = self.config.get("prompt", {}).get("system", "")
         self.top_k = self.config.get("rag", {}).get("top_k", 3)
 
+        # Cache de respuestas
+        self.answer_cache = self._build_answer_cache(Path(config_path).parent)
+
+        # Deadline por consulta (None = sin presupuesto)
+        self.deadline_config = self.config.get("deadline", {}) or {}
+        self.min_llm_seconds = self.deadline_config.get("min_llm_seconds", 0.5)
+        self._llm_executor: Optional[ThreadPoolExecutor] = None
+        self._llm_executor_lock = threading.Lock()
+
+        # Trabajo bloqueante de aprocess_query (mismo tope que el ChatDispatcher)
+        self.max_workers = (self.config.get("concurrency", {}) or {}).get("max_workers", 4)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+        # Respuesta extractiva (sin LLM) para datos literales
+        extractive_config = self.config.get("extractive", {}) or {}
+        self.extractive_enabled = extractive_config.get("enabled", False)
+        self.extractive_min_confidence = extractive_config.get("min_confidence", 0.85)
+        self.extractive_intents = set(
+            extractive_config.get("intents", ["telefono", "email", "url", "monto", "plazo"])
+        )
+
+        # Precios de las tablas ingestadas (consulta indexada, sin RAG ni LLM)
+        tables_config = self.config.get("tables", {}) or {}
+        self.table_min_confidence = tables_config.get("min_confidence", 0.8)
+        self.table_store = table_store if table_store is not None else self._build_table_store(
+            Path(config_path).parent
+        )
+
+    def _build_answer_cache(self, config_dir: Path) -> Optional[AnswerCache]:
+        """Crea el cache de respuestas según config (None si está deshabilitado)"""
+        cache_config = self.config.get("cache", {}) or {}
+        if not cache_config.get("enabled", False):
+            return None
+
+        sqlite_path = cache_config.get("sqlite_path")
+        if sqlite_path:
+            sqlite_path = str((config_dir / sqlite_path).resolve())
+
+        return AnswerCache(
+            ttl_seconds=cache_config.get("ttl_seconds", 3600),
+            max_entries=cache_config.get("max_entries", 1000),
+            sqlite_path=sqlite_path
+        )
+
+    def _build_table_store(self, config_dir: Path) -> Optional[TableStore]:
+        """Abre las tablas ingestadas según config (None si está deshabilitado o no se ingestaron)"""
+        tables_config = self.config.get("tables", {}) or {}
+        sqlite_path = tables_config.get("sqlite_path")
+        if not tables_config.get("enabled", False) or not sqlite_path:
+            return None
+
+        sqlite_path = (config_dir / sqlite_path).resolve()
+        if not sqlite_path.exists():
+            logger.warning(f"Tablas: no existe {sqlite_path} (python -m escenario_1.rag.table_store DATA_DIR)")
+            return None
+        return TableStore(str(sqlite_path))
+
+    def _cache_key(self, entity_result: EntityResult, normalized: NormalizedText) -> str:
+        """Clave del cache: entidad + query canónica + corpus + prompt + modelo"""
+        corpus_version = "{}:{}".format(
+            self.config.get("cache", {}).get("corpus_version", ""),
+            getattr(self.retriever, "version", "")
+        )
+        return AnswerCache.make_key(
+            entity=entity_result.entity,
+            query_text=normalized.text,
+            corpus_version=corpus_version,
+            system_prompt=self.system_prompt,
+            model=getattr(self.llm_client, "model", "")
+        )
+
+    def _partial_callback(
+        self,
+        on_partial: Callable[[str], None],
+        llm_start: float,
+        metrics: Optional[QueryMetrics]
+    ) -> Callable[[str], None]:
+        """Adapta on_partial (texto acumulado) a on_delta (fragmentos) y mide el primer token"""
+        parts = []
+
+        def on_delta(delta: str):
+            if not parts and metrics:
+                metrics.latency_first_token_ms = (time.perf_counter() - llm_start) * 1000
+            parts.append(delta)
+            on_partial("".join(parts))
+
+        return on_delta
+
+    def _call_llm(
+        self,
+        messages: list,
+        on_partial: Optional[Callable[[str], None]],
+        llm_start: float,
+        metrics: Optional[QueryMetrics],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Llama al LLM, en streaming si hay callback y el cliente lo soporta.
+
+        on_partial recibe el texto acumulado (no el fragmento) en cada delta.
+        timeout (presupuesto restante) se pasa al cliente solo si hay deadline.
+        """
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        if on_partial is None or not hasattr(self.llm_client, "generate_stream"):
+            return self.llm_client.generate(messages, **kwargs)
+
+        on_delta = self._partial_callback(on_partial, llm_start, metrics)
+        return self.llm_client.generate_stream(messages, on_delta=on_delta, **kwargs)
+
+    async def _acall_llm(
+        self,
+        messages: list,
+        on_partial: Optional[Callable[[str], None]],
+        llm_start: float,
+        metrics: Optional[QueryMetrics],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Versión async de _call_llm.
+
+        Sin cliente async, el cliente sincrónico corre en get_executor().
+        """
+        client = self.async_llm_client
+        if client is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.get_executor(), self._call_llm, messages, on_partial, llm_start, metrics, timeout
+            )
+
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        if on_partial is None or not hasattr(client, "agenerate_stream"):
+            return await client.agenerate(messages, **kwargs)
+
+        on_delta = self._partial_callback(on_partial, llm_start, metrics)
+        return await client.agenerate_stream(messages, on_delta=on_delta, **kwargs)
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """
+        Threads del trabajo bloqueante en modo async (creados al primer uso).
+
+        Acotados a concurrency.max_workers: run_async del dispatcher no usa
+        su pool, así que el tope lo pone este executor. CascadeRouter corre
+        acá su nivel SQL.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="router")
+            return self._executor
+
+    # =========================================================================
+    # Deadline
+    # =========================================================================
+
+    def _get_llm_executor(self) -> ThreadPoolExecutor:
+        """Threads para esperar al LLM sincrónico con corte por deadline (creados al primer uso)"""
+        with self._llm_executor_lock:
+            if self._llm_executor is None:
+                # Holgura para llamadas vencidas que siguen en segundo plano
+                workers = 2 * self.max_workers
+                self._llm_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-deadline")
+            return self._llm_executor
+
+    @staticmethod
+    def _guard_partial(
+        on_partial: Optional[Callable[[str], None]]
+    ) -> Tuple[Optional[Callable[[str], None]], threading.Event]:
+        """on_partial que deja de emitir una vez vencido el plazo (el mensaje ya tiene la respuesta final)"""
+        closed = threading.Event()
+        if on_partial is None:
+            return None, closed
+
+        def guarded(text: str):
+            if not closed.is_set():
+                on_partial(text)
+
+        return guarded, closed
+
+    def _call_llm_bounded(
+        self,
+        request: _LLMRequest,
+        on_partial: Optional[Callable[[str], None]],
+        llm_start: float,
+        metrics: Optional[QueryMetrics]
+    ) -> Dict[str, Any]:
+        """
+        _call_llm acotado al presupuesto restante de la consulta.
+
+        El cliente recibe el presupuesto como timeout (acota su espera de
+        cupo, reintentos y request), y además el router deja de esperar al
+        vencer el plazo aunque el cliente no lo respete. La llamada vencida
+        sigue en segundo plano: si termina bien, su respuesta va al cache.
+        El presupuesto se mide cuando la llamada arranca en el pool, no al
+        encolarla (ver _call_llm_within).
+        """
+        deadline = request.deadline
+        if deadline is None:
+            return self._call_llm(request.messages, on_partial, llm_start, metrics)
+
+        guarded, closed = self._guard_partial(on_partial)
+        future = self._get_llm_executor().submit(
+            self._call_llm_within, deadline, request.messages, guarded, llm_start, metrics
+        )
+        try:
+            return future.result(timeout=deadline.remaining())
+        except FutureTimeoutError:  # alias de TimeoutError recién en Python 3.11
+            if future.done():
+                return future.result()
+            closed.set()
+            future.add_done_callback(lambda f: self._cache_late_answer(request, f))
+            return {"respuesta": "", "error": "deadline", "deadline_exceeded": True}
+
+    def _call_llm_within(
+        self,
+        deadline: Deadline,
+        messages: list,
+        on_partial: Optional[Callable[[str], None]],
+        llm_start: float,
+        metrics: Optional[QueryMetrics]
+    ) -> Dict[str, Any]:
+        """
+        Corre en el pool llm-deadline. Con el pool ocupado por llamadas
+        vencidas, la consulta espera en cola y el usuario ya recibió la
+        respuesta degradada: si al arrancar no queda presupuesto, no se
+        gasta un request ni cupo de Groq.
+        """
+        remaining = deadline.remaining()
+        if remaining <= 0 or remaining < self.min_llm_seconds:
+            return {"respuesta": "", "error": "deadline", "deadline_exceeded": True}
+        return self._call_llm(messages, on_partial, llm_start, metrics, remaining)
+
+    async def _acall_llm_bounded(
+        self,
+        request: _LLMRequest,
+        on_partial: Optional[Callable[[str], None]],
+        llm_start: float,
+        metrics: Optional[QueryMetrics]
+    ) -> Dict[str, Any]:
+        """Versión async de _call_llm_bounded (al vencer el plazo, la llamada se cancela)"""
+        deadline = request.deadline
+        if deadline is None:
+            return await self._acall_llm(request.messages, on_partial, llm_start, metrics)
+
+        guarded, closed = self._guard_partial(on_partial)
+        try:
+            return await asyncio.wait_for(
+                self._acall_llm(request.messages, guarded, llm_start, metrics, deadline.remaining()),
+                timeout=deadline.remaining()
+            )
+        finally:
+            closed.set()
+
+    def _llm_budget_exhausted(self, request: _LLMRequest) -> bool:
+        """True si tras el RAG no queda presupuesto suficiente para llamar al LLM"""
+        return request.deadline is not None and request.deadline.remaining() < self.min_llm_seconds
+
+    @staticmethod
+    def _deadline_exceeded(request: _LLMRequest, llm_result: Optional[Dict[str, Any]]) -> bool:
+        """True si el LLM falló por falta de tiempo (no por otro error)"""
+        if request.deadline is None:
+            return False
+        if llm_result is not None and "error" not in llm_result:
+            return False
+        return bool((llm_result or {}).get("deadline_exceeded")) or request.deadline.expired()
+
+    def _cache_late_answer(self, request: _LLMRequest, future: Future):
+        """Guarda en cache la respuesta del LLM que llegó después del deadline"""
+        if request.cache_key is None or future.cancelled() or future.exception() is not None:
+            return
+        llm_result = future.result()
+        if "error" in llm_result:
+            return
+        self._cache_answer(request, llm_result["respuesta"], llm_result.get("tokens_output", 0))
+        logger.info(f"Deadline: respuesta tardía del LLM guardada en cache ({request.entity_result.entity})")
+
+    # =========================================================================
+    # Tablas ingestadas
+    # =========================================================================
+
+    def _table_lookup(self, normalized: NormalizedText, entity_result: EntityResult) -> Optional[TableAnswer]:
+        """Precio de la tabla si la pregunta pide un monto y la fila alcanza el umbral"""
+        expansion = get_query_expander().expand(normalized, entity_result.entity)
+        if classify_intent(normalized, expansion)[0] != "monto":
+            return None
+        answer = self.table_store.lookup(
+            entity_result.rag_filter,
+            normalized,
+            ignore_terms=(entity_result.matched_term, entity_result.entity)
+        )
+        if answer is None or answer.confidence < self.table_min_confidence:
+            return None
+        return answer
+
+    def _table_result(
+        self,
+        answer: TableAnswer,
+        entity_result: EntityResult,
+        start_time: float,
+        metrics: Optional[QueryMetrics]
+    ) -> ConsultaResult:
+        logger.info(
+            f"Tabla: {answer.prestacion} de {answer.chunk_id} "
+            f"(confianza {answer.confidence:.2f}) → sin RAG ni LLM"
+        )
+        if metrics:
+            metrics.table_lookup = True
+            metrics.response_text = answer.respuesta
+            metrics.tokens_input = 0
+            metrics.tokens_output = 0
+            metrics.latency_total_ms = (time.perf_counter() - start_time) * 1000
+
+        return ConsultaResult(
+            respuesta=answer.respuesta,
+            entity_result=entity_result,
+            rag_executed=False,
+            llm_executed=False,
+            context_used=None,
+            chunks_count=0,
+            top_similarity=0.0,
+            chunks_info=[],
+            metrics=metrics,
+            table_lookup=True
+        )
+
+    # =========================================================================
+    # Respuesta extractiva
+    # =========================================================================
+
+    def _extract(
+        self,
+        normalized: NormalizedText,
+        entity_result: EntityResult,
+        chunks_info: list
+    ) -> Optional[ExtractiveAnswer]:
+        """Dato literal de los chunks (intención reforzada con la expansión del rewriter)"""
+        if not chunks_info:
+            return None
+        return extract_answer(
+            normalized,
+            chunks_info,
+            expansion=get_query_expander().expand(normalized, entity_result.entity),
+            ignore_terms=(entity_result.matched_term, entity_result.entity)
+        )
+
+    def _answers_without_llm(self, extraction: Optional[ExtractiveAnswer]) -> bool:
+        """True si el dato extraído alcanza para responder sin LLM"""
+        return (
+            self.extractive_enabled
+            and extraction is not None
+            and extraction.intent in self.extractive_intents
+            and extraction.confidence >= self.extractive_min_confidence
+        )
+
+    def _extractive_result(self, request: _LLMRequest, metrics: Optional[QueryMetrics]) -> ConsultaResult:
+        """Resultado con el dato literal del chunk (sin LLM); se cachea como una respuesta del LLM"""
+        extraction = request.extraction
+        logger.info(
+            f"Extractiva: {extraction.intent} de {extraction.chunk_id} "
+            f"(confianza {extraction.confidence:.2f}) → sin LLM"
+        )
+        self._cache_answer(request, extraction.respuesta, 0)
+
+        if metrics:
+            metrics.extractive = True
+            metrics.tokens_input = 0
+            metrics.tokens_output = 0
+            metrics.response_text = extraction.respuesta
+            metrics.latency_total_ms = (time.perf_counter() - request.start_time) * 1000
+
+        context = request.context
+        return ConsultaResult(
+            respuesta=extraction.respuesta,
+            entity_result=request.entity_result,
+            rag_executed=True,
+            llm_executed=False,
+            context_used=context[:500] + "..." if len(context) > 500 else context,
+            chunks_count=request.chunks_count,
+            top_similarity=request.top_similarity,
+            chunks_info=request.chunks_info,
+            metrics=metrics,
+            extractive=True
+        )
+
+    def _degraded(
+        self,
+        request: _LLMRequest,
+        llm_start: float,
+        metrics: Optional[QueryMetrics],
+        reason: str
+    ) -> ConsultaResult:
+        """Respuesta extractiva (sin LLM) desde los chunks del RAG; no se cachea"""
+        extracted = request.extraction or self._extract(request.normalized, request.entity_result, request.chunks_info)
+        if extracted is not None:
+            note = self.deadline_config.get("degraded_note", "")
+            respuesta = f"{extracted.respuesta}\n\n{note}".strip()
+        else:
+            respuesta = self.deadline_config.get(
+                "unavailable_message",
+                "La consulta está demorando más de lo habitual. Intentá de nuevo en unos minutos."
+            )
+
+        detail = f"{extracted.intent or 'línea'} de {extracted.chunk_id}" if extracted else "sin dato extraíble"
+        logger.warning(f"Deadline ({request.deadline.seconds:.1f}s): {reason} → respuesta extractiva ({detail})")
+
+        if metrics:
+            metrics.degraded = True
+            metrics.tokens_output = 0
+            metrics.latency_llm_ms = (time.perf_counter() - llm_start) * 1000
+            metrics.response_text = respuesta
+            metrics.latency_total_ms = (time.perf_counter() - request.start_time) * 1000
+
+        context = request.context
+        return ConsultaResult(
+            respuesta=respuesta,
+            entity_result=request.entity_result,
+            rag_executed=True,
+            llm_executed=False,
+            context_used=context[:500] + "..." if len(context) > 500 else context,
+            chunks_count=request.chunks_count,
+            top_similarity=request.top_similarity,
+            chunks_info=request.chunks_info,
+            metrics=metrics,
+            degraded=True
+        )
+
     def process_query(
         self,
         query: str,
-        metrics: QueryMetrics = None
+        metrics: QueryMetrics = None,
+        on_partial: Callable[[str], None] = None
     ) -> ConsultaResult:
         """
         Procesa una consulta en Modo Consulta.
@@ -105,17 +593,82 @@ class ConsultaRouter:
         Args:
             query: Pregunta del usuario
             metrics: Objeto de métricas (opcional)
+            on_partial: Callback con la respuesta parcial mientras el LLM
+                genera (opcional; solo se invoca si se ejecuta el LLM)
 
         Returns:
             ConsultaResult con respuesta y metadatos
         """
+        prepared = self._prepare(query, metrics)
+        if isinstance(prepared, ConsultaResult):
+            return prepared
+
+        llm_start = time.perf_counter()
+        if self._llm_budget_exhausted(prepared):
+            return self._degraded(prepared, llm_start, metrics, "sin presupuesto para el LLM")
+
+        try:
+            llm_result = self._call_llm_bounded(prepared, on_partial, llm_start, metrics)
+        except Exception as e:
+            logger.error(f"Error en LLM: {e}")
+            llm_result = None
+
+        if self._deadline_exceeded(prepared, llm_result):
+            return self._degraded(prepared, llm_start, metrics, "el LLM no respondió a tiempo")
+        return self._complete(prepared, llm_result, llm_start, metrics)
+
+    async def aprocess_query(
+        self,
+        query: str,
+        metrics: QueryMetrics = None,
+        on_partial: Callable[[str], None] = None
+    ) -> ConsultaResult:
+        """
+        Versión async de process_query.
+
+        Entity detection, cache y RAG (embeddings + ChromaDB, bloqueantes)
+        corren en get_executor(); el LLM se espera sin ocupar un thread
+        si hay async_llm_client. on_partial se invoca en el event loop.
+        """
+        loop = asyncio.get_running_loop()
+        prepared = await loop.run_in_executor(self.get_executor(), self._prepare, query, metrics)
+        if isinstance(prepared, ConsultaResult):
+            return prepared
+
+        llm_start = time.perf_counter()
+        if self._llm_budget_exhausted(prepared):
+            return self._degraded(prepared, llm_start, metrics, "sin presupuesto para el LLM")
+
+        try:
+            llm_result = await self._acall_llm_bounded(prepared, on_partial, llm_start, metrics)
+        except Exception as e:
+            logger.error(f"Error en LLM: {e}")
+            llm_result = None
+
+        if self._deadline_exceeded(prepared, llm_result):
+            return self._degraded(prepared, llm_start, metrics, "el LLM no respondió a tiempo")
+        return self._complete(prepared, llm_result, llm_start, metrics)
+
+    def _prepare(self, query: str, metrics: Optional[QueryMetrics]) -> Union[ConsultaResult, _LLMRequest]:
+        """
+        Etapas previas al LLM: entidad, cache, RAG y extracción.
+
+        Returns:
+            ConsultaResult si la consulta se resuelve sin LLM (sin entidad,
+            precio de tabla, cache hit o dato literal con confianza alta), o _LLMRequest con
+            los mensajes listos para el LLM
+        """
         start_time = time.perf_counter()
+        # El presupuesto corre desde que entra la consulta (el RAG también consume)
+        deadline = build_deadline(self.deadline_config, start=start_time)
 
         # =====================================================================
         # PASO 1: Entity Detection (código puro, ~0.1ms)
         # =====================================================================
         entity_start = time.perf_counter()
-        entity_result = self.entity_detector.detect(query)
+        # Normalización única, compartida por detector y rewriter
+        normalized = NormalizedText.from_text(query)
+        entity_result = self.entity_detector.detect(normalized)
         entity_time_ms = (time.perf_counter() - entity_start) * 1000
 
         logger.info(f"Entity detection: {entity_result.entity} ({entity_result.confidence}) en {entity_time_ms:.2f}ms")
@@ -148,7 +701,44 @@ class ConsultaRouter:
                 metrics=metrics
             )
 
-        # CASO B/C: Con entidad → RAG filtrado + LLM
+        # CASO B: Precio en las tablas ingestadas → consulta indexada (NO RAG, NO LLM).
+        # Antes del cache: el valor de la tabla es exacto y siempre el vigente
+        if self.table_store is not None:
+            table_answer = self._table_lookup(normalized, entity_result)
+            if table_answer is not None:
+                return self._table_result(table_answer, entity_result, start_time, metrics)
+
+        # CASO C: Pregunta repetida → respuesta cacheada (NO RAG, NO LLM)
+        cache_key = None
+        if self.answer_cache is not None:
+            cache_key = self._cache_key(entity_result, normalized)
+            cached = self.answer_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Cache HIT: {entity_result.entity} → respuesta cacheada")
+
+                if metrics:
+                    metrics.cache_hit = True
+                    metrics.response_text = cached.respuesta
+                    metrics.tokens_input = 0
+                    metrics.tokens_output = 0
+                    metrics.rag_chunks_count = cached.chunks_count
+                    metrics.rag_top_similarity = cached.top_similarity
+                    metrics.latency_total_ms = (time.perf_counter() - start_time) * 1000
+
+                return ConsultaResult(
+                    respuesta=cached.respuesta,
+                    entity_result=entity_result,
+                    rag_executed=False,
+                    llm_executed=False,
+                    context_used=None,
+                    chunks_count=cached.chunks_count,
+                    top_similarity=cached.top_similarity,
+                    chunks_info=[],
+                    metrics=metrics,
+                    cache_hit=True
+                )
+
+        # CASO D: Con entidad → RAG filtrado + LLM
         logger.info(f"Entidad detectada: {entity_result.entity} → RAG filtrado")
 
         # =====================================================================
@@ -162,7 +752,8 @@ class ConsultaRouter:
         chunks = self.retriever.retrieve(
             query=query,
             top_k=self.top_k,
-            obra_social_filter=rag_filter
+            obra_social_filter=rag_filter,
+            normalized=normalized
         )
 
         # Construir contexto y chunks_info
@@ -194,9 +785,15 @@ class ConsultaRouter:
         logger.info(f"RAG: {len(chunks)} chunks recuperados (filter={rag_filter}) en {rag_time_ms:.2f}ms")
 
         # =====================================================================
-        # PASO 4: LLM (solo responde con el contexto filtrado)
+        # PASO 4: Respuesta extractiva (dato literal en los chunks, ~1ms)
+        # =====================================================================
+        extraction = None
+        if self.extractive_enabled or deadline is not None:
+            extraction = self._extract(normalized, entity_result, chunks_info)
+
+        # =====================================================================
+        # PASO 5: LLM (solo responde con el contexto filtrado)
         # =====================================================================
-        llm_start = time.perf_counter()
 
         # Construir mensajes
         user_content = f"CONTEXTO:\n{context}\n\nPREGUNTA:\n{query}"
@@ -219,34 +816,84 @@ class ConsultaRouter:
             metrics.tokens_query = tokens_query
             metrics.tokens_context = tokens_context
 
-        # Llamar al LLM
-        try:
-            llm_result = self.llm_client.generate(messages)
+        request = _LLMRequest(
+            query=query,
+            normalized=normalized,
+            entity_result=entity_result,
+            messages=messages,
+            context=context,
+            chunks_info=chunks_info,
+            chunks_count=len(chunks),
+            top_similarity=top_similarity,
+            cache_key=cache_key,
+            start_time=start_time,
+            deadline=deadline,
+            extraction=extraction
+        )
+        if self._answers_without_llm(extraction):
+            return self._extractive_result(request, metrics)
+        return request
+
+    def _cache_answer(self, request: _LLMRequest, respuesta: str, tokens_output: int):
+        if request.cache_key is None or self.answer_cache is None:
+            return
+        self.answer_cache.put(request.cache_key, CachedAnswer(
+            respuesta=respuesta,
+            entity=request.entity_result.entity,
+            chunks_count=request.chunks_count,
+            top_similarity=request.top_similarity,
+            tokens_output=tokens_output
+        ))
+
+    def _complete(
+        self,
+        request: _LLMRequest,
+        llm_result: Optional[Dict[str, Any]],
+        llm_start: float,
+        metrics: Optional[QueryMetrics]
+    ) -> ConsultaResult:
+        """Etapa posterior al LLM: cache, métricas y resultado (llm_result None = excepción)"""
+        llm_ok = False
+        if llm_result is not None:
             respuesta = llm_result["respuesta"]
             tokens_output = llm_result.get("tokens_output", count_tokens_approximate(respuesta))
-        except Exception as e:
-            logger.error(f"Error en LLM: {e}")
+            llm_ok = "error" not in llm_result
+        else:
             respuesta = "Error al procesar la consulta."
             tokens_output = 0
 
+        # Guardar en cache solo respuestas exitosas
+        if llm_ok:
+            self._cache_answer(request, respuesta, tokens_output)
+
         llm_time_ms = (time.perf_counter() - llm_start) * 1000
 
         if metrics:
             metrics.tokens_output = tokens_output
             metrics.latency_llm_ms = llm_time_ms
+            limits = (llm_result or {}).get("rate_limit") or {}
+            metrics.latency_throttle_ms = limits.get("throttle_wait_ms", 0.0)
+            metrics.llm_retries = limits.get("retries", 0)
+            metrics.llm_queue_depth = limits.get("queue_depth", 0)
+            if (llm_result or {}).get("coalesced"):
+                # Respuesta compartida: el request (y sus tokens) lo pagó otra consulta
+                metrics.llm_coalesced = True
+                metrics.tokens_input = 0
+                metrics.tokens_output = 0
             metrics.response_text = respuesta
-            metrics.latency_total_ms = (time.perf_counter() - start_time) * 1000
+            metrics.latency_total_ms = (time.perf_counter() - request.start_time) * 1000
 
         logger.info(f"LLM: {tokens_output} tokens output en {llm_time_ms:.2f}ms")
 
+        context = request.context
         return ConsultaResult(
             respuesta=respuesta,
-            entity_result=entity_result,
+            entity_result=request.entity_result,
             rag_executed=True,
             llm_executed=True,
             context_used=context[:500] + "..." if len(context) > 500 else context,
-            chunks_count=len(chunks),
-            top_similarity=top_similarity,
-            chunks_info=chunks_info,
+            chunks_count=request.chunks_count,
+            top_similarity=request.top_similarity,
+            chunks_info=request.chunks_info,
             metrics=metrics
         )
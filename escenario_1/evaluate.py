@@ -11,7 +11,7 @@ Uso:
 import os
 import sys
 import json
-import time
+import yaml
 from pathlib import Path
 from datetime import datetime
 from dataclasses import dataclass, asdict
@@ -31,6 +31,7 @@ for env_path in [project_root / "backend" / ".env", project_root / ".env"]:
 # Imports del escenario
 from escenario_1.rag.retriever import ChromaRetriever
 from escenario_1.llm.client import GroqClient
+from escenario_1.llm.rate_limiter import build_rate_limiter
 from escenario_1.core.router import ConsultaRouter
 from escenario_1.core.entity_detector import get_entity_detector, reset_entity_detector
 from escenario_1.metrics.collector import QueryMetrics
@@ -85,8 +86,13 @@ def check_response(respuesta: str, esperado: str) -> bool:
     return False
 
 
-def run_evaluation(delay_seconds: int = 3) -> List[TestResult]:
-    """Ejecuta la evaluación completa"""
+def run_evaluation() -> List[TestResult]:
+    """
+    Ejecuta la evaluación completa.
+
+    El rate limit de Groq lo maneja el cliente (llm.rate_limit en
+    scenario.yaml): las queries esperan cupo solo cuando hace falta.
+    """
 
     print("=" * 80)
     print("EVALUACIÓN ESCENARIO 1 - 20 PREGUNTAS")
@@ -101,7 +107,11 @@ def run_evaluation(delay_seconds: int = 3) -> List[TestResult]:
     retriever = ChromaRetriever(persist_directory=chroma_path)
     print(f"   ChromaDB: {retriever.count()} chunks")
 
-    llm_client = GroqClient()
+    config_path = Path(__file__).parent / "config" / "scenario.yaml"
+    with open(config_path, 'r', encoding='utf-8') as f:
+        llm_config = yaml.safe_load(f).get("llm", {}) or {}
+    rate_limiter = build_rate_limiter(llm_config)
+    llm_client = GroqClient(rate_limiter=rate_limiter, base_url=llm_config.get("base_url"))
     print(f"   Groq: {llm_client.model}")
 
     reset_entity_detector()
@@ -113,13 +123,15 @@ def run_evaluation(delay_seconds: int = 3) -> List[TestResult]:
         retriever=retriever,
         llm_client=llm_client,
         entity_detector=entity_detector,
-        config_path=str(Path(__file__).parent / "config" / "scenario.yaml")
+        config_path=str(config_path)
     )
 
     # Cargar queries
     queries = load_test_queries()
     print(f"\n📝 Queries a evaluar: {len(queries)}")
-    print(f"⏱️  Delay entre queries: {delay_seconds}s (rate limit Groq)")
+    if rate_limiter:
+        print(f"⏱️  Rate limit Groq: {rate_limiter.requests.capacity:.0f} req/min, "
+              f"{rate_limiter.tokens.capacity:.0f} tokens/min")
 
     results = []
 
@@ -127,7 +139,7 @@ def run_evaluation(delay_seconds: int = 3) -> List[TestResult]:
     print(f"{'ID':<4} {'Categoría':<15} {'OS':<10} {'OK':<4} {'Sim':<6} {'ms':<6} Query")
     print("─" * 80)
 
-    for i, q in enumerate(queries):
+    for q in queries:
         query_id = q["id"]
         categoria = q["categoria"]
         obra_social = q.get("obra_social")
@@ -170,12 +182,13 @@ def run_evaluation(delay_seconds: int = 3) -> List[TestResult]:
         query_short = query[:40] + "..." if len(query) > 40 else query
         print(f"{query_id:<4} {categoria:<15} {os_str:<10} {status:<4} {result.top_similarity:.3f} {metrics.latency_total_ms:>5.0f} {query_short}")
 
-        # Rate limit delay (excepto última query)
-        if i < len(queries) - 1:
-            time.sleep(delay_seconds)
-
     print("─" * 80)
 
+    if rate_limiter:
+        limits = rate_limiter.stats()
+        print(f"⏱️  Espera por rate limit: {limits['wait_ms_total'] / 1000:.1f}s "
+              f"({limits['throttled']} queries demoradas, {limits['retries']} reintentos)")
+
     return results
 
 
@@ -339,8 +352,8 @@ def main():
         print("❌ GROQ_API_KEY no configurado")
         sys.exit(1)
 
-    # Ejecutar evaluación (3 segundos de delay para rate limit)
-    results = run_evaluation(delay_seconds=3)
+    # Ejecutar evaluación
+    results = run_evaluation()
 
     # Generar informe
     report = generate_report(results)
@@ -0,0 +1,390 @@
+"""
+Cliente LLM asíncrono para Escenario 1 (Groq)
+
+GroqClient envuelve el SDK sincrónico: cada llamada concurrente ocupa un
+thread bloqueado con su propio socket. AsyncGroqClient usa AsyncGroq sobre
+un único httpx.AsyncClient:
+- Pool de conexiones keep-alive compartido (sin handshake TLS por consulta)
+- Límite de llamadas en vuelo (semáforo): el resto espera su turno
+- Timeout por request (conexión y total, incluido el streaming)
+- Rate limit RPM/TPM y reintentos con backoff (RateLimiter, opcional)
+- Cada llamada alimenta la salud pasiva del LLM (LLMHealth, compartible)
+- Requests idénticos en vuelo comparten una sola llamada (SingleFlight)
+- timeout opcional por llamada: presupuesto restante de la consulta
+  (deadline del router) para cupo, reintentos y request
+
+Mismo formato de respuesta que GroqClient (dict con error, no excepción).
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Any, Awaitable, Callable, Optional, Tuple
+
+import httpx
+from groq import AsyncGroq
+
+from .rate_limiter import (
+    RateLimiter, estimate_tokens, is_retryable, is_timeout, error_headers, budget_remaining
+)
+from .health import LLMHealth
+from .single_flight import SingleFlight, request_key, mark_coalesced
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGroqClient:
+    """Cliente asíncrono para Groq Cloud - Modo Consulta"""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        model: str = "llama-3.3-70b-versatile",
+        temperature: float = 0.1,
+        max_tokens: int = 150,
+        max_in_flight: int = 8,
+        pool_connections: int = 10,
+        keepalive_seconds: float = 30,
+        timeout_seconds: float = 30,
+        connect_timeout_seconds: float = 5,
+        rate_limiter: RateLimiter = None,
+        health: LLMHealth = None,
+        coalesce: bool = True,
+        base_url: str = None
+    ):
+        """
+        Args:
+            api_key: API key de Groq (o usa GROQ_API_KEY env var)
+            model: Modelo a usar
+            temperature: Temperatura para generación
+            max_tokens: Máximo de tokens en respuesta
+            max_in_flight: Máximo de llamadas simultáneas al LLM
+            pool_connections: Conexiones HTTP en el pool (keep-alive)
+            keepalive_seconds: Tiempo que una conexión ociosa queda abierta
+            timeout_seconds: Timeout total por request (incluye el streaming)
+            connect_timeout_seconds: Timeout de conexión
+            rate_limiter: Limitador RPM/TPM con reintentos (opcional, compartible)
+            health: Salud pasiva del LLM (compartible con el cliente sincrónico)
+            coalesce: Agrupar requests idénticos concurrentes en una sola llamada
+            base_url: URL del servidor (o GROQ_BASE_URL env var; p.ej. el stand-in local)
+        """
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        if not self.api_key:
+            raise ValueError("GROQ_API_KEY no configurado")
+
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_in_flight = max_in_flight
+        self.timeout_seconds = timeout_seconds
+        self.rate_limiter = rate_limiter
+        self.health = health or LLMHealth()
+        self.single_flight = SingleFlight() if coalesce else None
+
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_connections,
+                max_keepalive_connections=pool_connections,
+                keepalive_expiry=keepalive_seconds
+            ),
+            timeout=httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+        )
+        # Sin base_url, el SDK usa GROQ_BASE_URL o la API de Groq
+        self.base_url = base_url or os.getenv("GROQ_BASE_URL")
+        # Con limitador, los reintentos son suyos (no los del SDK)
+        if rate_limiter is not None:
+            self.client = AsyncGroq(
+                api_key=self.api_key, base_url=self.base_url, http_client=self._http, max_retries=0
+            )
+        else:
+            self.client = AsyncGroq(api_key=self.api_key, base_url=self.base_url, http_client=self._http)
+
+        # Límite de llamadas en vuelo (las demás esperan sin ocupar thread ni socket)
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.timeouts = 0
+
+        logger.info(f"AsyncGroqClient inicializado: modelo={self.model}, en vuelo={max_in_flight}")
+
+    async def _limited(self, call: Callable[[], Any], budget: Optional[float] = None) -> Any:
+        """Ejecuta call() respetando el límite de vuelo y el timeout total (o el presupuesto, si es menor)"""
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        timeout = self.timeout_seconds if budget is None else min(self.timeout_seconds, budget)
+        self.in_flight += 1
+        try:
+            return await asyncio.wait_for(call(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise TimeoutError(f"Groq no respondió en {timeout:.1f}s")
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def _error(self, e: Exception, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "respuesta": f"Error: {str(e)}",
+            "tokens_input": 0,
+            "tokens_output": 0,
+            "model": self.model,
+            "provider": "groq",
+            "error": str(e),
+            "deadline_exceeded": timeout is not None and is_timeout(e)
+        }
+
+    async def _acreate(
+        self,
+        messages: List[Dict[str, str]],
+        consume: Callable[[Any], Awaitable[Any]],
+        can_retry: Optional[Callable[[], bool]] = None,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        create + consume(respuesta) dentro del límite de vuelo, respetando el rate limit.
+
+        Args:
+            consume: Procesa la respuesta del SDK (o el stream) dentro del timeout
+            can_retry: False si ya no se puede reintentar (p.ej. stream a medias)
+            timeout: Presupuesto en segundos para espera de cupo, reintentos
+                y request (None = solo el timeout del cliente)
+
+        Returns:
+            (resultado de consume, datos de rate limit para las métricas)
+        """
+        completions = self.client.chat.completions
+        limiter = self.rate_limiter
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        if limiter is None:
+            async def call():
+                return await consume(await completions.create(messages=messages, **kwargs))
+            return await self._limited(call, budget_remaining(deadline)), {}
+
+        async def call():
+            raw = await completions.with_raw_response.create(messages=messages, **kwargs)
+            limiter.update_from_headers(raw.headers)
+            return await consume(await raw.parse())
+
+        estimated = estimate_tokens(messages, kwargs.get("max_tokens") or self.max_tokens)
+        # El cupo se espera fuera del semáforo: no ocupa un lugar en vuelo
+        wait_ms, queue_depth = await limiter.aacquire(estimated, max_wait=budget_remaining(deadline))
+        attempt = 0
+        while True:
+            try:
+                return await self._limited(call, budget_remaining(deadline)), {
+                    "throttle_wait_ms": wait_ms,
+                    "retries": attempt,
+                    "queue_depth": queue_depth,
+                    "estimated_tokens": estimated
+                }
+            except Exception as e:
+                headers = error_headers(e)
+                limiter.update_from_headers(headers)
+                attempt += 1
+                if attempt > limiter.max_retries or not is_retryable(e) or (can_retry and not can_retry()):
+                    raise
+                delay = limiter.backoff(attempt, headers)
+                if delay > limiter.backoff_max:
+                    raise  # retry-after mayor que el tope: no se reintenta
+                if deadline is not None and delay >= deadline - time.monotonic():
+                    raise  # El reintento no entra en el presupuesto
+                status = getattr(e, "status_code", None) or type(e).__name__
+                logger.warning(f"Groq {status}: reintento {attempt}/{limiter.max_retries} en {delay:.1f}s")
+                # El reintento reserva su cupo y espera al menos el backoff
+                limiter.release(estimated)
+                retry_wait_ms, _ = await limiter.aacquire(
+                    estimated, max_wait=budget_remaining(deadline), min_wait=delay
+                )
+                wait_ms += retry_wait_ms
+
+    def _record_success(self, start: float, limits: Dict[str, Any]):
+        """Registra en la salud la latencia de la llamada (sin la espera por rate limit)"""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.health.record_success(elapsed_ms - (limits or {}).get("throttle_wait_ms", 0))
+
+    def _record_usage(self, limits: Dict[str, Any], tokens_input: int, tokens_output: int):
+        """Corrige la reserva de tokens del limitador con el uso real"""
+        if self.rate_limiter is not None and limits:
+            self.rate_limiter.record_usage(limits["estimated_tokens"], tokens_input + tokens_output)
+
+    def _request_key(self, messages: List[Dict[str, str]]) -> str:
+        return request_key(self.model, messages, temperature=self.temperature, max_tokens=self.max_tokens)
+
+    async def agenerate(self, messages: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Genera respuesta a partir de mensajes (equivalente async de generate).
+
+        Si hay un request idéntico en vuelo, espera y comparte su resultado
+        (marcado con "coalesced": True).
+
+        Args:
+            messages: Lista de mensajes [{"role": "...", "content": "..."}]
+            timeout: Presupuesto en segundos de la consulta (None = sin límite)
+
+        Returns:
+            Dict con respuesta y tokens
+        """
+        if self.single_flight is None:
+            return await self._agenerate(messages, timeout)
+
+        result, shared = await self.single_flight.ado(
+            self._request_key(messages),
+            lambda: self._agenerate(messages, timeout)
+        )
+        return mark_coalesced(result) if shared else result
+
+    async def _agenerate(self, messages: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Llamada real a Groq (sin agrupar)"""
+        async def consume(response):
+            return response
+
+        start = time.perf_counter()
+        try:
+            response, limits = await self._acreate(
+                messages,
+                consume,
+                timeout=timeout,
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature
+            )
+
+            respuesta = response.choices[0].message.content or ""
+
+            tokens_input = 0
+            tokens_output = 0
+            if hasattr(response, 'usage') and response.usage:
+                tokens_input = response.usage.prompt_tokens
+                tokens_output = response.usage.completion_tokens
+
+            logger.info(f"Groq async: {len(respuesta)} chars, {tokens_input}+{tokens_output} tokens")
+            self._record_usage(limits, tokens_input, tokens_output)
+            self._record_success(start, limits)
+
+            return {
+                "respuesta": respuesta,
+                "tokens_input": tokens_input,
+                "tokens_output": tokens_output,
+                "model": self.model,
+                "provider": "groq",
+                "rate_limit": limits
+            }
+
+        except Exception as e:
+            logger.error(f"Error en Groq (async): {e}")
+            self.health.record_failure(e)
+            return self._error(e, timeout)
+
+    async def agenerate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        on_delta: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Genera respuesta en streaming (equivalente async de generate_stream).
+
+        Args:
+            messages: Lista de mensajes [{"role": "...", "content": "..."}]
+            on_delta: Callback con cada fragmento de texto (se llama en el event loop)
+            timeout: Presupuesto en segundos de la consulta (None = sin límite)
+
+        Returns:
+            Dict con respuesta completa y tokens (mismo formato que agenerate)
+        """
+        if self.single_flight is None:
+            return await self._agenerate_stream(messages, on_delta, timeout)
+
+        result, shared = await self.single_flight.ado(
+            self._request_key(messages),
+            lambda: self._agenerate_stream(messages, on_delta, timeout)
+        )
+        if not shared:
+            return result
+        # Seguidora: el stream lo recibió la líder; se entrega el texto completo de una vez
+        if on_delta and "error" not in result:
+            on_delta(result["respuesta"])
+        return mark_coalesced(result)
+
+    async def _agenerate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        on_delta: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Llamada real a Groq en streaming (sin agrupar)"""
+        parts: List[str] = []
+        usage = None
+
+        async def consume(stream):
+            nonlocal usage
+            async for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        if on_delta:
+                            on_delta(delta)
+
+                # Groq informa el uso en el último chunk (x_groq.usage)
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(x_groq, "usage", None) or getattr(chunk, "usage", None) or usage
+
+        start = time.perf_counter()
+        try:
+            _, limits = await self._acreate(
+                messages,
+                consume,
+                can_retry=lambda: not parts,
+                timeout=timeout,
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True
+            )
+
+            respuesta = "".join(parts)
+
+            tokens_input = usage.prompt_tokens if usage else 0
+            tokens_output = usage.completion_tokens if usage else len(respuesta) // 4
+
+            logger.info(f"Groq async stream: {len(respuesta)} chars, {tokens_input}+{tokens_output} tokens")
+            self._record_usage(limits, tokens_input, tokens_output)
+            self._record_success(start, limits)
+
+            return {
+                "respuesta": respuesta,
+                "tokens_input": tokens_input,
+                "tokens_output": tokens_output,
+                "model": self.model,
+                "provider": "groq",
+                "rate_limit": limits
+            }
+
+        except Exception as e:
+            logger.error(f"Error en Groq (async stream): {e}")
+            self.health.record_failure(e)
+            return self._error(e, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del cliente (llamadas en vuelo y en espera)"""
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "timeouts": self.timeouts
+        }
+
+    async def aclose(self):
+        """Cierra el pool de conexiones"""
+        await self.client.close()
+        await self._http.aclose()
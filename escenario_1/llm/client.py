@@ -1,13 +1,33 @@
 """
 Cliente LLM para Escenario 1 (Groq)
 Simplificado y autocontenido.
+
+Con un RateLimiter (rate_limiter.py), cada llamada espera cupo RPM/TPM y
+reintenta con backoff ante 429 / 5xx en vez de devolver error.
+
+Requests idénticos en vuelo comparten una sola llamada (SingleFlight).
+
+La disponibilidad sale del tráfico real (LLMHealth, health.py): no se
+llama a la API para saber si Groq responde, salvo tras un período ocioso.
+
+generate/generate_stream aceptan timeout: el presupuesto que le queda a la
+consulta (deadline del router). Acota la espera de cupo, los reintentos y
+el request HTTP; si se agota, el error viene marcado "deadline_exceeded".
 """
 import os
+import time
 import logging
-from typing import Dict, List, Any
+import threading
+from typing import Dict, List, Any, Callable, Optional, Tuple
 
 from groq import Groq
 
+from .rate_limiter import (
+    RateLimiter, estimate_tokens, is_retryable, is_timeout, error_headers, budget_remaining
+)
+from .health import LLMHealth
+from .single_flight import SingleFlight, request_key, mark_coalesced
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,7 +39,11 @@ class GroqClient:
         api_key: str = None,
         model: str = "llama-3.3-70b-versatile",
         temperature: float = 0.1,
-        max_tokens: int = 150
+        max_tokens: int = 150,
+        rate_limiter: RateLimiter = None,
+        health: LLMHealth = None,
+        coalesce: bool = True,
+        base_url: str = None
     ):
         """
         Args:
@@ -27,6 +51,10 @@ class GroqClient:
             model: Modelo a usar
             temperature: Temperatura para generación
             max_tokens: Máximo de tokens en respuesta
+            rate_limiter: Limitador RPM/TPM con reintentos (opcional, compartible)
+            health: Salud pasiva del LLM (compartible con el cliente async)
+            coalesce: Agrupar requests idénticos concurrentes en una sola llamada
+            base_url: URL del servidor (o GROQ_BASE_URL env var; p.ej. el stand-in local)
         """
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         if not self.api_key:
@@ -36,36 +64,176 @@ class GroqClient:
         self.temperature = temperature
         self.max_tokens = max_tokens
 
-        self.client = Groq(api_key=self.api_key)
-        logger.info(f"GroqClient inicializado: modelo={self.model}")
+        self.rate_limiter = rate_limiter
+        self.health = health or LLMHealth()
+        self._probe_lock = threading.Lock()
+        self.single_flight = SingleFlight() if coalesce else None
+
+        # Sin base_url, el SDK usa GROQ_BASE_URL o la API de Groq
+        self.base_url = base_url or os.getenv("GROQ_BASE_URL")
+        # Con limitador, los reintentos son suyos (no los del SDK)
+        if rate_limiter is not None:
+            self.client = Groq(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        else:
+            self.client = Groq(api_key=self.api_key, base_url=self.base_url)
+        logger.info(f"GroqClient inicializado: modelo={self.model}"
+                    + (f", servidor={self.base_url}" if self.base_url else ""))
+
+    def is_available(self, probe: bool = True) -> Optional[bool]:
+        """
+        Verifica si Groq está disponible según el tráfico real (LLMHealth).
+
+        Solo llama a la API (probe de 1 token) si el cliente estuvo ocioso
+        más que el TTL de salud; el resultado queda registrado como tráfico.
+
+        Args:
+            probe: False para no llamar nunca a la API (p.ej. desde /status)
+
+        Returns:
+            True/False, o None si todavía no hubo tráfico ni probe
+        """
+        # Un solo probe a la vez: los demás llamadores leen el estado actual
+        if probe and self.health.is_stale() and self._probe_lock.acquire(blocking=False):
+            try:
+                if self.health.is_stale():
+                    self._probe()
+            finally:
+                self._probe_lock.release()
+        return self.health.is_healthy()
 
-    def is_available(self) -> bool:
-        """Verifica si Groq está disponible"""
+    def _probe(self):
+        """Llamada mínima a la API para refrescar el estado de salud"""
+        self.health.probes += 1
+        start = time.perf_counter()
         try:
-            self.client.chat.completions.create(
+            _, limits = self._create(
+                [{"role": "user", "content": "test"}],
                 model=self.model,
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=5
+                max_tokens=1
             )
-            return True
+            self._record_success(start, limits)
         except Exception as e:
             logger.warning(f"Groq no disponible: {e}")
-            return False
+            self.health.record_failure(e)
 
-    def generate(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    def _record_success(self, start: float, limits: Dict[str, Any]):
+        """Registra en la salud la latencia de la llamada (sin la espera por rate limit)"""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.health.record_success(elapsed_ms - (limits or {}).get("throttle_wait_ms", 0))
+
+    def _create(
+        self,
+        messages: List[Dict[str, str]],
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        chat.completions.create respetando el rate limit.
+
+        Args:
+            timeout: Presupuesto en segundos para espera de cupo, reintentos
+                y request HTTP (None = sin límite)
+
+        Returns:
+            (respuesta del SDK, datos de rate limit para las métricas)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def request_kwargs() -> Dict[str, Any]:
+            # Timeout del SDK = lo que queda del presupuesto en cada intento
+            if deadline is None:
+                return kwargs
+            return dict(kwargs, timeout=budget_remaining(deadline))
+
+        limiter = self.rate_limiter
+        if limiter is None:
+            return self.client.chat.completions.create(messages=messages, **request_kwargs()), {}
+
+        estimated = estimate_tokens(messages, kwargs.get("max_tokens") or self.max_tokens)
+        wait_ms, queue_depth = limiter.acquire(estimated, max_wait=budget_remaining(deadline))
+        attempt = 0
+        while True:
+            try:
+                raw = self.client.chat.completions.with_raw_response.create(
+                    messages=messages, **request_kwargs()
+                )
+                limiter.update_from_headers(raw.headers)
+                return raw.parse(), {
+                    "throttle_wait_ms": wait_ms,
+                    "retries": attempt,
+                    "queue_depth": queue_depth,
+                    "estimated_tokens": estimated
+                }
+            except Exception as e:
+                headers = error_headers(e)
+                limiter.update_from_headers(headers)
+                attempt += 1
+                if attempt > limiter.max_retries or not is_retryable(e):
+                    raise
+                delay = limiter.backoff(attempt, headers)
+                if delay > limiter.backoff_max:
+                    raise  # retry-after mayor que el tope: no se reintenta
+                if deadline is not None and delay >= deadline - time.monotonic():
+                    raise  # El reintento no entra en el presupuesto
+                status = getattr(e, "status_code", None) or type(e).__name__
+                logger.warning(f"Groq {status}: reintento {attempt}/{limiter.max_retries} en {delay:.1f}s")
+                # El reintento reserva su cupo y espera al menos el backoff
+                limiter.release(estimated)
+                retry_wait_ms, _ = limiter.acquire(
+                    estimated, max_wait=budget_remaining(deadline), min_wait=delay
+                )
+                wait_ms += retry_wait_ms
+
+    def _record_usage(self, limits: Dict[str, Any], tokens_input: int, tokens_output: int):
+        """Corrige la reserva de tokens del limitador con el uso real"""
+        if self.rate_limiter is not None and limits:
+            self.rate_limiter.record_usage(limits["estimated_tokens"], tokens_input + tokens_output)
+
+    def _request_key(self, messages: List[Dict[str, str]]) -> str:
+        return request_key(self.model, messages, temperature=self.temperature, max_tokens=self.max_tokens)
+
+    def _error(self, e: Exception, timeout: Optional[float]) -> Dict[str, Any]:
+        return {
+            "respuesta": f"Error: {str(e)}",
+            "tokens_input": 0,
+            "tokens_output": 0,
+            "model": self.model,
+            "provider": "groq",
+            "error": str(e),
+            "deadline_exceeded": timeout is not None and is_timeout(e)
+        }
+
+    def generate(self, messages: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Genera respuesta a partir de mensajes.
 
+        Si hay un request idéntico en vuelo, espera y comparte su resultado
+        (marcado con "coalesced": True).
+
         Args:
             messages: Lista de mensajes [{"role": "...", "content": "..."}]
+            timeout: Presupuesto en segundos de la consulta (None = sin límite)
 
         Returns:
             Dict con respuesta y tokens
         """
+        if self.single_flight is None:
+            return self._generate(messages, timeout)
+
+        result, shared = self.single_flight.do(
+            self._request_key(messages),
+            lambda: self._generate(messages, timeout)
+        )
+        return mark_coalesced(result) if shared else result
+
+    def _generate(self, messages: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Llamada real a Groq (sin agrupar)"""
+        start = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
+            response, limits = self._create(
+                messages,
+                timeout=timeout,
                 model=self.model,
-                messages=messages,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature
             )
@@ -79,22 +247,106 @@ class GroqClient:
                 tokens_output = response.usage.completion_tokens
 
             logger.info(f"Groq respuesta: {len(respuesta)} chars, {tokens_input}+{tokens_output} tokens")
+            self._record_usage(limits, tokens_input, tokens_output)
+            self._record_success(start, limits)
 
             return {
                 "respuesta": respuesta,
                 "tokens_input": tokens_input,
                 "tokens_output": tokens_output,
                 "model": self.model,
-                "provider": "groq"
+                "provider": "groq",
+                "rate_limit": limits
             }
 
         except Exception as e:
             logger.error(f"Error en Groq: {e}")
+            self.health.record_failure(e)
+            return self._error(e, timeout)
+
+    def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        on_delta: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Genera respuesta en streaming.
+
+        Args:
+            messages: Lista de mensajes [{"role": "...", "content": "..."}]
+            on_delta: Callback con cada fragmento de texto a medida que llega
+            timeout: Presupuesto en segundos de la consulta (None = sin límite)
+
+        Returns:
+            Dict con respuesta completa y tokens (mismo formato que generate)
+        """
+        if self.single_flight is None:
+            return self._generate_stream(messages, on_delta, timeout)
+
+        result, shared = self.single_flight.do(
+            self._request_key(messages),
+            lambda: self._generate_stream(messages, on_delta, timeout)
+        )
+        if not shared:
+            return result
+        # Seguidora: el stream lo recibió la líder; se entrega el texto completo de una vez
+        if on_delta and "error" not in result:
+            on_delta(result["respuesta"])
+        return mark_coalesced(result)
+
+    def _generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        on_delta: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Llamada real a Groq en streaming (sin agrupar)"""
+        parts: List[str] = []
+        usage = None
+        start = time.perf_counter()
+
+        try:
+            stream, limits = self._create(
+                messages,
+                timeout=timeout,
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True
+            )
+
+            for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        if on_delta:
+                            on_delta(delta)
+
+                # Groq informa el uso en el último chunk (x_groq.usage)
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(x_groq, "usage", None) or getattr(chunk, "usage", None) or usage
+
+            respuesta = "".join(parts)
+
+            tokens_input = usage.prompt_tokens if usage else 0
+            tokens_output = usage.completion_tokens if usage else len(respuesta) // 4
+
+            logger.info(f"Groq stream: {len(respuesta)} chars, {tokens_input}+{tokens_output} tokens")
+            self._record_usage(limits, tokens_input, tokens_output)
+            self._record_success(start, limits)
+
             return {
-                "respuesta": f"Error: {str(e)}",
-                "tokens_input": 0,
-                "tokens_output": 0,
+                "respuesta": respuesta,
+                "tokens_input": tokens_input,
+                "tokens_output": tokens_output,
                 "model": self.model,
                 "provider": "groq",
-                "error": str(e)
+                "rate_limit": limits
             }
+
+        except Exception as e:
+            logger.error(f"Error en Groq (stream): {e}")
+            self.health.record_failure(e)
+            return self._error(e, timeout)
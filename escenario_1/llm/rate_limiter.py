@@ -0,0 +1,325 @@
+"""
+Rate limiting de llamadas al LLM (Groq).
+
+Groq limita por requests por minuto (RPM) y tokens por minuto (TPM). Sin
+control, un pico de consultas termina en 429 y el usuario ve un error.
+
+RateLimiter:
+- Dos token buckets (RPM y TPM) configurados desde scenario.yaml
+- Cada llamada reserva su cupo y espera su turno: los pedidos se encolan
+  en vez de fallar (la reserva puede dejar el bucket en negativo; el
+  siguiente espera a que se reponga)
+- Se sincroniza con los headers de Groq (x-ratelimit-remaining-*,
+  retry-after): si el servidor ve menos cupo que nosotros (otro proceso
+  con la misma API key), manda el servidor
+- Ante 429 / 5xx / errores de conexión: reintento con backoff exponencial
+  con jitter; un retry-after pausa a todos los llamadores (sin recortarlo:
+  si supera backoff_max no se reintenta). Cada reintento vuelve a pasar
+  por acquire (reserva su cupo y respeta la pausa)
+- Con max_wait (presupuesto de la consulta), si el cupo no llega a tiempo
+  se devuelve la reserva y se levanta TimeoutError sin esperar
+
+Thread-safe (workers del dispatcher) y usable desde async (aacquire).
+"""
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# "2m59.56s", "7.66s", "120ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Convierte una duración de header de Groq ("1m2.5s", "120ms", "3") a segundos"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Bucket con reposición continua; admite saldo negativo (reservas encoladas)"""
+
+    def __init__(self, capacity: float, per_minute: float):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._updated)
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+        self._updated = max(self._updated, now)
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Descuenta amount y retorna los segundos hasta que la reserva queda cubierta"""
+        self._refill(now)
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount: float, now: float):
+        """Devuelve (o cobra, si es negativo) una diferencia de reserva"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, remaining: float, now: float):
+        """Ajusta al cupo informado por el servidor si es menor que el local"""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """Token buckets RPM/TPM + backoff compartidos por los clientes LLM"""
+
+    def __init__(
+        self,
+        requests_per_minute: float = 30,
+        tokens_per_minute: float = 12000,
+        max_retries: int = 4,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 30.0
+    ):
+        """
+        Args:
+            requests_per_minute: Cupo de requests por minuto (RPM)
+            tokens_per_minute: Cupo de tokens por minuto (TPM, entrada + salida)
+            max_retries: Reintentos ante 429 / 5xx / errores de conexión
+            backoff_base_seconds: Espera base del backoff exponencial
+            backoff_max_seconds: Tope de espera por reintento (un retry-after
+                mayor corta los reintentos)
+        """
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base_seconds
+        self.backoff_max = backoff_max_seconds
+
+        self._lock = threading.Lock()
+        self._paused_until = 0.0  # retry-after global
+
+        # Estadísticas
+        self.waiting = 0
+        self.throttled = 0
+        self.retries = 0
+        self.wait_ms_total = 0.0
+
+    # =========================================================================
+    # Reserva de cupo
+    # =========================================================================
+
+    def _reserve(
+        self,
+        estimated_tokens: int,
+        max_wait: Optional[float] = None,
+        min_wait: float = 0.0
+    ) -> Tuple[float, int]:
+        """Reserva cupo. Retorna (segundos a esperar, llamadas ya en espera)"""
+        with self._lock:
+            now = time.monotonic()
+            ahead = self.waiting
+            wait = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(estimated_tokens, now),
+                self._paused_until - now,
+                min_wait
+            )
+            if max_wait is not None and wait > max_wait:
+                # No alcanza el presupuesto: se libera la reserva para los demás
+                self.requests.refund(1, now)
+                self.tokens.refund(estimated_tokens, now)
+                self.throttled += 1
+                raise TimeoutError(
+                    f"Rate limit: la espera ({wait:.1f}s) excede el presupuesto ({max_wait:.1f}s)"
+                )
+            if wait > 0:
+                self.throttled += 1
+                self.waiting += 1
+            return max(wait, 0.0), ahead
+
+    def _waited(self, wait: float):
+        with self._lock:
+            self.waiting -= 1
+            self.wait_ms_total += wait * 1000
+
+    def acquire(
+        self,
+        estimated_tokens: int,
+        max_wait: Optional[float] = None,
+        min_wait: float = 0.0
+    ) -> Tuple[float, int]:
+        """
+        Espera (bloqueando) hasta que haya cupo para la llamada.
+
+        Args:
+            estimated_tokens: Tokens estimados (entrada + salida)
+            max_wait: Segundos máximos de espera (None = sin límite)
+            min_wait: Espera mínima (backoff de un reintento)
+
+        Returns:
+            (milisegundos de espera, llamadas que ya esperaban al encolarse)
+
+        Raises:
+            TimeoutError: si el cupo llega después de max_wait
+        """
+        wait, ahead = self._reserve(estimated_tokens, max_wait, min_wait)
+        if wait > 0:
+            logger.info(f"Rate limit: esperando {wait:.1f}s ({ahead} antes en la cola)")
+            try:
+                time.sleep(wait)
+            finally:
+                self._waited(wait)
+        return wait * 1000, ahead
+
+    async def aacquire(
+        self,
+        estimated_tokens: int,
+        max_wait: Optional[float] = None,
+        min_wait: float = 0.0
+    ) -> Tuple[float, int]:
+        """Versión async de acquire (no bloquea el event loop; cancelable)"""
+        wait, ahead = self._reserve(estimated_tokens, max_wait, min_wait)
+        if wait > 0:
+            logger.info(f"Rate limit: esperando {wait:.1f}s ({ahead} antes en la cola)")
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._waited(wait)
+        return wait * 1000, ahead
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Corrige la reserva de tokens con el uso real informado por Groq"""
+        if actual_tokens <= 0:
+            return
+        with self._lock:
+            self.tokens.refund(estimated_tokens - actual_tokens, time.monotonic())
+
+    def release(self, estimated_tokens: int):
+        """Devuelve los tokens de un intento fallido (el request sí cuenta para el RPM)"""
+        with self._lock:
+            self.tokens.refund(estimated_tokens, time.monotonic())
+
+    # =========================================================================
+    # Headers y reintentos
+    # =========================================================================
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]):
+        """Sincroniza los buckets con los headers x-ratelimit-* de Groq"""
+        if not headers:
+            return
+        with self._lock:
+            now = time.monotonic()
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            if remaining_requests is not None:
+                self.requests.sync(float(remaining_requests), now)
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if remaining_tokens is not None:
+                self.tokens.sync(float(remaining_tokens), now)
+
+    def backoff(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """
+        Segundos a esperar antes del reintento `attempt` (1, 2, ...).
+
+        Usa retry-after si el servidor lo informa (y pausa a todos los
+        llamadores), sin recortarlo: el llamador no reintenta si supera
+        backoff_max o su presupuesto. Si no, backoff exponencial con jitter
+        (entre la mitad y el total de la espera del intento).
+
+        El reintento espera con acquire(min_wait=backoff): reserva su cupo
+        y respeta la pausa global como cualquier otra llamada.
+        """
+        retry_after = parse_duration(headers.get("retry-after")) if headers else None
+
+        with self._lock:
+            self.retries += 1
+            if retry_after is not None:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                return retry_after
+
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del limitador (cola, esperas y reintentos)"""
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                "queue_depth": self.waiting,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "wait_ms_total": round(self.wait_ms_total, 1),
+                "requests_available": round(self.requests.level, 1),
+                "tokens_available": round(self.tokens.level)
+            }
+
+
+# Errores que vale la pena reintentar: cupo agotado y fallas transitorias del servidor
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_retryable(error: Exception) -> bool:
+    """True para 429 / 5xx / errores de conexión o timeout del SDK"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def is_timeout(error: Exception) -> bool:
+    """True si el error es por tiempo: presupuesto agotado o timeout del SDK"""
+    return isinstance(error, TimeoutError) or type(error).__name__ == "APITimeoutError"
+
+
+def budget_remaining(deadline: Optional[float]) -> Optional[float]:
+    """
+    Segundos que quedan hasta deadline (time.monotonic()); None sin deadline.
+
+    Raises:
+        TimeoutError: si el presupuesto ya se agotó
+    """
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Presupuesto de tiempo de la consulta agotado")
+    return remaining
+
+
+def error_headers(error: Exception) -> Optional[Mapping[str, str]]:
+    """Headers de la respuesta HTTP asociada a un error del SDK (si hay)"""
+    return getattr(getattr(error, "response", None), "headers", None)
+
+
+def estimate_tokens(messages, max_tokens: int) -> int:
+    """Tokens que reserva una llamada: prompt aproximado (4 chars ~ 1 token) + salida máxima"""
+    return sum(len(m.get("content") or "") for m in messages) // 4 + max_tokens
+
+
+def build_rate_limiter(llm_config: Dict) -> Optional[RateLimiter]:
+    """Crea el limitador según llm.rate_limit de scenario.yaml (None si está deshabilitado)"""
+    config = (llm_config or {}).get("rate_limit", {}) or {}
+    if not config.get("enabled", False):
+        return None
+
+    return RateLimiter(
+        requests_per_minute=config.get("requests_per_minute", 30),
+        tokens_per_minute=config.get("tokens_per_minute", 12000),
+        max_retries=config.get("max_retries", 4),
+        backoff_base_seconds=config.get("backoff_base_seconds", 1.0),
+        backoff_max_seconds=config.get("backoff_max_seconds", 30.0)
+    )
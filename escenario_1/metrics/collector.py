@@ -23,13 +23,33 @@ class QueryMetrics:
     # Latencias (ms)
     latency_faiss_ms: float = 0  # También usado para ChromaDB
     latency_llm_ms: float = 0
+    latency_first_token_ms: float = 0  # Streaming: hasta el primer texto del LLM
     latency_total_ms: float = 0
+    latency_queue_ms: float = 0  # Espera en el pool de workers (antes de empezar)
+    latency_throttle_ms: float = 0  # Espera por rate limit de Groq (cola + backoff)
+
+    # Rate limit
+    llm_retries: int = 0  # Reintentos (429 / 5xx / conexión)
+    llm_queue_depth: int = 0  # Llamadas que ya esperaban cupo al encolarse
+    llm_coalesced: bool = False  # Resultado compartido de un request idéntico en vuelo (sin tokens propios)
 
     # RAG
     rag_used: bool = False
     rag_chunks_count: int = 0
     rag_top_similarity: float = 0
 
+    # Cache de respuestas
+    cache_hit: bool = False
+
+    # Deadline: respuesta extractiva porque el LLM no entró en el presupuesto
+    degraded: bool = False
+    # Dato literal del chunk con confianza alta: respondido sin LLM
+    extractive: bool = False
+    # Precio de una tabla ingestada (consulta SQLite indexada, sin RAG ni LLM)
+    table_lookup: bool = False
+    # Modo Cascada: nivel que respondió (sql, extractiva, llm, degradada, cache, sin_entidad)
+    tier: Optional[str] = None
+
     # Respuesta
     response_text: str = ""
 
@@ -49,10 +69,21 @@ class QueryMetrics:
             "tokens_total": self.tokens_total,
             "latency_faiss_ms": self.latency_faiss_ms,
             "latency_llm_ms": self.latency_llm_ms,
+            "latency_first_token_ms": self.latency_first_token_ms,
             "latency_total_ms": self.latency_total_ms,
+            "latency_queue_ms": self.latency_queue_ms,
+            "latency_throttle_ms": self.latency_throttle_ms,
+            "llm_retries": self.llm_retries,
+            "llm_queue_depth": self.llm_queue_depth,
+            "llm_coalesced": self.llm_coalesced,
             "rag_used": self.rag_used,
             "rag_chunks_count": self.rag_chunks_count,
             "rag_top_similarity": self.rag_top_similarity,
+            "cache_hit": self.cache_hit,
+            "degraded": self.degraded,
+            "extractive": self.extractive,
+            "table_lookup": self.table_lookup,
+            "tier": self.tier,
             "success": self.success,
             "error_message": self.error_message
         }
@@ -6,6 +6,7 @@ Usa embeddings de SentenceTransformer (bge-large-en-v1.5)
 from typing import List, Tuple, Optional
 import os
 import json
+import time
 import logging
 from pathlib import Path
 
@@ -14,6 +15,7 @@ from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 
 from ..core.query_rewriter import rewrite_query
+from ..core.normalized_text import NormalizedText
 
 logger = logging.getLogger(__name__)
 
@@ -25,13 +27,16 @@ class ChromaRetriever:
         self,
         persist_directory: str = None,
         collection_name: str = "obras_sociales",
-        embedding_model: str = "BAAI/bge-large-en-v1.5"
+        embedding_model: str = "BAAI/bge-large-en-v1.5",
+        table_store=None  # TableStore (opcional): filas de las tablas al ingestar
     ):
         """
         Args:
             persist_directory: Directorio para persistir la DB
             collection_name: Nombre de la colección
             embedding_model: Modelo para generar embeddings
+            table_store: Si se pasa, add_chunks también parsea los chunks
+                de tabla (es_tabla) a filas SQLite (ver table_store.py)
         """
         # Resolver path por defecto
         if persist_directory is None:
@@ -42,6 +47,7 @@ class ChromaRetriever:
         self.persist_directory = persist_directory
         self.collection_name = collection_name
         self.embedding_model_name = embedding_model
+        self.table_store = table_store
 
         # Inicializar cliente Chroma con persistencia
         self.client = chromadb.PersistentClient(
@@ -59,8 +65,15 @@ class ChromaRetriever:
         logger.info(f"Cargando modelo de embeddings: {embedding_model}")
         self.model = SentenceTransformer(embedding_model)
 
+        # Versión del corpus (la usa el cache de respuestas del router)
+        self.version = self._compute_version()
+
         logger.info(f"ChromaRetriever inicializado: {self.collection.count()} documentos")
 
+    def _compute_version(self) -> str:
+        """Identificador de la versión del corpus indexado"""
+        return f"{self.collection_name}:{self.collection.count()}"
+
     def _embed_texts(self, texts: List[str]) -> List[List[float]]:
         """Genera embeddings para una lista de textos"""
         embeddings = self.model.encode(texts, normalize_embeddings=True)
@@ -118,6 +131,11 @@ class ChromaRetriever:
 
             added += len(batch)
 
+            # Tablas: además del texto, filas consultables (prestación, plan, valor)
+            if self.table_store is not None:
+                self.table_store.add_chunks(batch)
+
+        self.version = f"{self._compute_version()}:{time.time():.0f}"
         logger.info(f"Total chunks en colección: {self.collection.count()}")
         return added
 
@@ -127,7 +145,8 @@ class ChromaRetriever:
         top_k: int = 5,
         obra_social_filter: str = None,
         min_score: float = 0.3,
-        use_rewriter: bool = True
+        use_rewriter: bool = True,
+        normalized: NormalizedText = None
     ) -> List[Tuple[str, dict, float]]:
         """
         Recupera documentos relevantes CON FILTRO NATIVO
@@ -138,6 +157,7 @@ class ChromaRetriever:
             obra_social_filter: Filtrar por obra social
             min_score: Score mínimo (0-1, cosine similarity)
             use_rewriter: Si True, aplica query rewriting
+            normalized: NormalizedText de la query ya calculado por el router
 
         Returns:
             Lista de tuplas (chunk_text, metadata, score)
@@ -145,7 +165,7 @@ class ChromaRetriever:
         # Aplicar query rewriting si está habilitado
         search_query = query
         if use_rewriter:
-            search_query = rewrite_query(query, obra_social_filter)
+            search_query = rewrite_query(normalized or query, obra_social_filter)
 
         # Construir filtro nativo de Chroma
         where_filter = None
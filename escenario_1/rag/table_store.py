@@ -0,0 +1,441 @@
+"""
+Tablas de los documentos en SQLite (ingesta) para responder precios sin LLM.
+
+Los chunks de tabla (es_tabla, tabla_numero) llegan a ChromaDB como texto
+plano: para "valor coseguro médico especialista ENSALUD" el LLM relee la
+tabla entera de coseguros buscando un número. TableStore parsea esos
+chunks al ingestar y guarda una fila por (prestación, plan, valor):
+
+- Tablas con pipes:  "| Prestación | Delta Plus | Quantum |"
+                     "| Médico especialista | $2912 | Sin cargo |"
+- Líneas con monto:  "Médico de familia / pediatra: $1553"
+
+Cada fila se indexa por los prefijos de las palabras de su prestación
+(tabla_terminos), así el router resuelve la pregunta con una consulta
+indexada y responde el valor exacto sin RAG ni LLM.
+
+Reconstruir desde los JSON de chunks (sin re-embeddings):
+    python -m escenario_1.rag.table_store DATA_DIR [--db shared/data/tablas.db]
+"""
+import os
+import re
+import json
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+from ..core.extractive import INTENT_PATTERNS, content_stems, stems
+from ..core.normalized_text import NormalizedText, normalize_text, fold
+
+logger = logging.getLogger(__name__)
+
+_MONTO = INTENT_PATTERNS["monto"]
+# Celdas sin monto que igual son un valor de la tabla
+_FREE_VALUE = re.compile(r"\b(?:sin cargo|exentos?|no abona|no paga|no aplica|sin coseguro)\b", re.IGNORECASE)
+_SEPARATOR_CELL = re.compile(r"^:?-{2,}:?$")
+_LABEL_TRIM = " \t:-–—•*·|"
+# Encabezados de columna que nombran el valor, no un plan
+_GENERIC_HEADERS = frozenset(
+    "valor valores monto importe precio precios coseguro coseguros copago arancel tarifa".split()
+)
+# Palabras de la pregunta que no distinguen una prestación de otra
+_QUERY_IGNORE = ("plan", "planes", "consulta", "consultas", "sesion", "sesiones")
+_PARENTHESIS = re.compile(r"\([^)]*\)")
+# Tope de confianza si la pregunta no nombra completa ninguna variante de la prestación
+_PARTIAL_MAX_CONFIDENCE = 0.5
+
+
+@dataclass
+class TableRow:
+    """Fila de una tabla: prestación (y plan) con su valor"""
+    prestacion: str
+    valor_texto: str
+    plan: Optional[str] = None
+    valor: Optional[float] = None
+    fila: int = 0
+
+
+@dataclass
+class TableAnswer:
+    """Valor encontrado en las tablas para una pregunta"""
+    respuesta: str
+    prestacion: str
+    values: List[str]
+    chunk_id: str
+    confidence: float
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """'$2.912,50' → 2912.5 (None si no es un monto)"""
+    match = _MONTO.search(text or "")
+    if not match:
+        return None
+    number = match.group(0).replace("$", "").replace(" ", "").replace(".", "").replace(",", ".")
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def _is_value(cell: str) -> bool:
+    return bool(_MONTO.search(cell) or _FREE_VALUE.search(cell))
+
+
+def _pipe_rows(text: str) -> List[List[str]]:
+    rows = []
+    for line in text.splitlines():
+        if line.count("|") < 2:
+            continue
+        cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+        if all(not cell or _SEPARATOR_CELL.match(cell) for cell in cells):
+            continue
+        rows.append(cells)
+    return rows
+
+
+def _parse_pipe_table(text: str) -> List[TableRow]:
+    rows = _pipe_rows(text)
+    if len(rows) < 2:
+        return []
+
+    header = rows[0] if not any(_is_value(cell) for cell in rows[0][1:]) else None
+    parsed = []
+    for index, cells in enumerate(rows[1:] if header else rows, start=1):
+        label = cells[0].strip(_LABEL_TRIM)
+        if not label or _MONTO.search(label):
+            continue
+        for column, cell in enumerate(cells[1:], start=1):
+            if not cell or not _is_value(cell):
+                continue
+            plan = None
+            if header and column < len(header) and fold(header[column]) not in _GENERIC_HEADERS:
+                plan = header[column] or None
+            parsed.append(TableRow(
+                prestacion=label,
+                valor_texto=cell,
+                plan=plan,
+                valor=parse_amount(cell),
+                fila=index
+            ))
+    return parsed
+
+
+def _parse_value_lines(text: str) -> List[TableRow]:
+    parsed = []
+    for index, line in enumerate(text.splitlines(), start=1):
+        match = _MONTO.search(line)
+        if match:
+            label, value = line[:match.start()], match.group(0)
+        elif ":" in line and _FREE_VALUE.search(line.split(":", 1)[1]):
+            label, value = line.split(":", 1)
+            value = value.strip()
+        else:
+            continue
+        label = label.strip(_LABEL_TRIM)
+        if len(label) < 2 or not re.search(r"[a-záéíóúñ]", label, re.IGNORECASE):
+            continue
+        parsed.append(TableRow(prestacion=label, valor_texto=value, valor=parse_amount(value), fila=index))
+    return parsed
+
+
+def parse_table(text: str) -> List[TableRow]:
+    """
+    Filas (prestación, plan, valor) de un chunk de tabla.
+
+    Tabla con pipes si la hay; si no, las líneas "prestación: $monto".
+    """
+    return _parse_pipe_table(text or "") or _parse_value_lines(text or "")
+
+
+def _label_alternatives(prestacion: str) -> List[set]:
+    """
+    'Médico de familia / pediatra' → [{medic, famil}, {pedia}];
+    lo que está entre paréntesis es opcional ('Kinesiología (sesión)')
+    """
+    alternatives = []
+    for part in prestacion.split("/"):
+        for variant in (part, _PARENTHESIS.sub(" ", part)):
+            alternative = stems(NormalizedText.from_text(variant).tokens)
+            if alternative and alternative not in alternatives:
+                alternatives.append(alternative)
+    return alternatives
+
+
+def _add_value(rows: List[tuple], plan: Optional[str], value: str):
+    """Agrega (plan, valor) sin repetir el valor de la misma prestación en otra tabla"""
+    for index, (other_plan, other_value) in enumerate(rows):
+        if other_value == value and (other_plan is None or plan is None or other_plan == plan):
+            if other_plan is None and plan:
+                rows[index] = (plan, value)
+            return
+    rows.append((plan, value))
+
+
+class TableStore:
+    """Filas de las tablas de los documentos, indexadas por término (thread-safe)"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tabla_filas (
+            id INTEGER PRIMARY KEY,
+            obra_social TEXT NOT NULL,
+            chunk_id TEXT NOT NULL,
+            tabla_numero INTEGER,
+            fila INTEGER NOT NULL,
+            prestacion TEXT NOT NULL,
+            plan TEXT,
+            valor REAL,
+            valor_texto TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tabla_filas_chunk ON tabla_filas(obra_social, chunk_id);
+
+        CREATE TABLE IF NOT EXISTS tabla_terminos (
+            obra_social TEXT NOT NULL,
+            termino TEXT NOT NULL,
+            fila_id INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tabla_terminos ON tabla_terminos(obra_social, termino);
+        CREATE INDEX IF NOT EXISTS idx_tabla_terminos_fila ON tabla_terminos(fila_id);
+    """
+
+    def __init__(self, sqlite_path: str = ":memory:"):
+        """
+        Args:
+            sqlite_path: Archivo SQLite (":memory:" para tests)
+        """
+        self.sqlite_path = sqlite_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(sqlite_path, check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+    # =========================================================================
+    # Ingesta
+    # =========================================================================
+
+    def add_chunks(self, chunks: List[dict]) -> int:
+        """
+        Parsea los chunks de tabla (es_tabla) y reemplaza sus filas.
+
+        Args:
+            chunks: Chunks con el formato de add_chunks de ChromaRetriever
+                {obra_social, chunk_id, texto, es_tabla, tabla_numero, ...}
+
+        Returns:
+            Filas guardadas
+        """
+        added = 0
+        with self._lock:
+            for chunk in chunks:
+                if not chunk.get("es_tabla"):
+                    continue
+                obra_social = chunk.get("obra_social", "UNKNOWN").upper()
+                chunk_id = str(chunk.get("chunk_id", ""))
+                self._delete_chunk(obra_social, chunk_id)
+                for row in parse_table(chunk.get("texto", "")):
+                    self._insert(obra_social, chunk_id, chunk.get("tabla_numero"), row)
+                    added += 1
+            self._conn.commit()
+        logger.info(f"TableStore: {added} filas de tablas guardadas")
+        return added
+
+    def _delete_chunk(self, obra_social: str, chunk_id: str):
+        ids = [
+            row[0] for row in self._conn.execute(
+                "SELECT id FROM tabla_filas WHERE obra_social = ? AND chunk_id = ?",
+                (obra_social, chunk_id)
+            )
+        ]
+        if ids:
+            marks = ",".join("?" * len(ids))
+            self._conn.execute(f"DELETE FROM tabla_terminos WHERE fila_id IN ({marks})", ids)
+            self._conn.execute(f"DELETE FROM tabla_filas WHERE id IN ({marks})", ids)
+
+    def _insert(self, obra_social: str, chunk_id: str, tabla_numero, row: TableRow):
+        cur = self._conn.execute(
+            """
+            INSERT INTO tabla_filas
+            (obra_social, chunk_id, tabla_numero, fila, prestacion, plan, valor, valor_texto)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (obra_social, chunk_id, tabla_numero, row.fila, row.prestacion, row.plan, row.valor, row.valor_texto)
+        )
+        terms = set().union(*_label_alternatives(row.prestacion))
+        self._conn.executemany(
+            "INSERT INTO tabla_terminos (obra_social, termino, fila_id) VALUES (?, ?, ?)",
+            [(obra_social, term, cur.lastrowid) for term in terms]
+        )
+
+    def clear(self, obra_social: str = None):
+        """Borra las filas (de una obra social o todas) antes de re-ingestar"""
+        with self._lock:
+            if obra_social:
+                self._conn.execute(
+                    "DELETE FROM tabla_terminos WHERE obra_social = ?", (obra_social.upper(),)
+                )
+                self._conn.execute("DELETE FROM tabla_filas WHERE obra_social = ?", (obra_social.upper(),))
+            else:
+                self._conn.execute("DELETE FROM tabla_terminos")
+                self._conn.execute("DELETE FROM tabla_filas")
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tabla_filas").fetchone()[0]
+
+    # =========================================================================
+    # Consulta
+    # =========================================================================
+
+    def _candidates(self, obra_social: str, terms: set) -> List[tuple]:
+        """Filas de la obra social que comparten algún término con la pregunta (índice)"""
+        marks = ",".join("?" * len(terms))
+        with self._lock:
+            return self._conn.execute(
+                f"""
+                SELECT prestacion, plan, valor_texto, chunk_id FROM tabla_filas
+                WHERE id IN (
+                    SELECT fila_id FROM tabla_terminos
+                    WHERE obra_social = ? AND termino IN ({marks})
+                )
+                ORDER BY tabla_numero, fila, id
+                """,
+                (obra_social.upper(), *sorted(terms))
+            ).fetchall()
+
+    def lookup(
+        self,
+        obra_social: str,
+        query: Union[str, NormalizedText],
+        ignore_terms: Sequence[str] = ()
+    ) -> Optional[TableAnswer]:
+        """
+        Valor de la prestación que nombra la pregunta.
+
+        Confianza (0-1): mitad cobertura de la prestación (alguna de sus
+        variantes "a / b"), mitad cobertura de la pregunta; se reduce a la
+        mitad si otra prestación empata con un valor distinto y no pasa de
+        0.5 si la pregunta no nombra completa ninguna variante.
+
+        Args:
+            obra_social: Entidad detectada (filtro obligatorio)
+            query: Pregunta del usuario (str o NormalizedText)
+            ignore_terms: Términos que no cuentan (alias de la entidad)
+
+        Returns:
+            TableAnswer, o None si ninguna fila comparte términos con la pregunta
+        """
+        content = content_stems(normalize_text(query), (*ignore_terms, *_QUERY_IGNORE))
+        if not content:
+            return None
+        rows = self._candidates(obra_social, content)
+        if not rows:
+            return None
+
+        # Una entrada por prestación: sus filas (una por plan) y el mejor puntaje
+        groups: "OrderedDict[str, dict]" = OrderedDict()
+        for prestacion, plan, valor_texto, chunk_id in rows:
+            group = groups.get(prestacion)
+            if group is None:
+                matched, coverage = set(), 0.0
+                for alternative in _label_alternatives(prestacion):
+                    hit = alternative & content
+                    if (len(hit) / len(alternative), len(hit)) > (coverage, len(matched)):
+                        matched, coverage = hit, len(hit) / len(alternative)
+                group = groups[prestacion] = {
+                    "rows": [], "matched": matched, "coverage": coverage, "chunk_id": chunk_id
+                }
+            _add_value(group["rows"], plan, valor_texto)
+
+        # Ante empate gana la primera tabla y la primera fila
+        prestacion, best = max(groups.items(), key=lambda item: (item[1]["coverage"], len(item[1]["matched"])))
+        rows = best["rows"]
+        matched = set(best["matched"])
+
+        # Planes nombrados en la pregunta ("especialista delta plus")
+        named = [
+            (plan, value) for plan, value in rows
+            if plan and stems(NormalizedText.from_text(plan).tokens) <= content
+        ]
+        if named:
+            rows = named
+            for plan, _ in named:
+                matched |= stems(NormalizedText.from_text(plan).tokens)
+
+        rivals = [
+            group for name, group in groups.items()
+            if name != prestacion
+            and (group["coverage"], len(group["matched"])) == (best["coverage"], len(best["matched"]))
+            and group["rows"] != best["rows"]
+        ]
+        confidence = 0.5 * best["coverage"] + 0.5 * len(content & matched) / len(content)
+        if rivals:
+            confidence *= 0.5
+        # Sin ninguna variante completa es otra prestación que comparte
+        # palabras ("internación" → "Internación domiciliaria")
+        if best["coverage"] < 1.0:
+            confidence = min(confidence, _PARTIAL_MAX_CONFIDENCE)
+
+        if len(rows) == 1:
+            plan, value = rows[0]
+            respuesta = f"{prestacion}: {value}" + (f" (plan {plan})" if plan else "")
+        else:
+            respuesta = f"{prestacion}: " + " | ".join(
+                f"{plan}: {value}" if plan else value for plan, value in rows
+            )
+
+        return TableAnswer(
+            respuesta=respuesta,
+            prestacion=prestacion,
+            values=[value for _, value in rows],
+            chunk_id=best["chunk_id"],
+            confidence=round(min(1.0, confidence), 3)
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def load_tables_from_json_files(store: TableStore, data_dir: str) -> int:
+    """
+    Carga las tablas de los *_chunks_flat.json (mismo recorrido que
+    load_chunks_from_json_files de retriever.py)
+
+    Returns:
+        Total de filas guardadas
+    """
+    total = 0
+    for obra_social_dir in sorted(os.listdir(data_dir)):
+        dir_path = os.path.join(data_dir, obra_social_dir)
+        if not os.path.isdir(dir_path):
+            continue
+        for filename in sorted(os.listdir(dir_path)):
+            if not filename.endswith('_chunks_flat.json'):
+                continue
+            with open(os.path.join(dir_path, filename), 'r', encoding='utf-8') as f:
+                total += store.add_chunks(json.load(f))
+    return total
+
+
+def main():
+    default_db = Path(__file__).parent.parent.parent / "shared" / "data" / "tablas.db"
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data_dir", help="Directorio con subcarpetas de obras sociales (*_chunks_flat.json)")
+    parser.add_argument("--db", default=str(default_db), help="Archivo SQLite de tablas")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = TableStore(args.db)
+    store.clear()
+    total = load_tables_from_json_files(store, args.data_dir)
+    print(f"{total} filas de tablas en {args.db}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Fixtures compartidas para tests de Escenario 1.
+
+Los dobles de retriever y LLM permiten testear el router sin ChromaDB,
+sin modelo de embeddings y sin GROQ_API_KEY.
+"""
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+import yaml
+
+from escenario_1.core.entity_detector import EntityDetector
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+
+
+class FakeRetriever:
+    """Retriever en memoria: devuelve siempre los mismos chunks"""
+
+    def __init__(self, chunks=None):
+        self.version = "fake:1"
+        self.calls = 0
+        self.chunks = chunks if chunks is not None else [
+            (
+                "Teléfono Mesa Operativa: 0810-888-8274. Mail: autorizaciones@asi.com.ar",
+                {"obra_social": "ASI", "chunk_id": "asi_1"},
+                0.91,
+            ),
+        ]
+
+    def retrieve(self, query, top_k=5, obra_social_filter=None, **kwargs):
+        self.calls += 1
+        return [c for c in self.chunks if c[1]["obra_social"] == obra_social_filter][:top_k]
+
+
+class FakeLLM:
+    """Cliente LLM que cuenta llamadas y responde un texto fijo"""
+
+    def __init__(self, respuesta="El teléfono es 0810-888-8274.", model="fake-model"):
+        self.model = model
+        self.respuesta = respuesta
+        self.calls = 0
+
+    def generate(self, messages, **kwargs):
+        self.calls += 1
+        return {
+            "respuesta": self.respuesta,
+            "tokens_input": 100,
+            "tokens_output": 12,
+            "model": self.model,
+            "provider": "fake",
+        }
+
+    def generate_stream(self, messages, on_delta=None, **kwargs):
+        result = self.generate(messages)
+        for word in result["respuesta"].split(" "):
+            if on_delta:
+                on_delta(word + " ")
+        return result
+
+
+@pytest.fixture
+def fake_retriever():
+    return FakeRetriever()
+
+
+@pytest.fixture
+def fake_llm():
+    return FakeLLM()
+
+
+@pytest.fixture
+def make_router(tmp_path, fake_retriever, fake_llm):
+    """
+    Fábrica de ConsultaRouter con dobles y overrides de scenario.yaml.
+
+    La respuesta extractiva (sin LLM) arranca deshabilitada: los chunks de
+    prueba tienen el dato literal y los tests del camino LLM lo saltearían.
+    Se habilita con make_router(extractive={"enabled": True}). Las tablas
+    ingestadas tampoco se abren: se inyectan con table_store=TableStore().
+
+    Uso: router = make_router(cache={"enabled": True})
+    """
+    from escenario_1.core.router import ConsultaRouter
+
+    def _make(retriever=None, llm_client=None, table_store=None, **overrides):
+        with open(CONFIG_DIR / "scenario.yaml", 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+        overrides = {"extractive": {"enabled": False}, "tables": {"enabled": False}, **overrides}
+        for section, values in overrides.items():
+            if isinstance(values, dict):
+                config.setdefault(section, {}).update(values)
+            else:
+                config[section] = values
+
+        config_path = tmp_path / "scenario.yaml"
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f, allow_unicode=True)
+
+        return ConsultaRouter(
+            retriever=retriever or fake_retriever,
+            llm_client=llm_client or fake_llm,
+            entity_detector=EntityDetector(str(CONFIG_DIR / "entities.yaml")),
+            config_path=str(config_path),
+            table_store=table_store
+        )
+
+    return _make
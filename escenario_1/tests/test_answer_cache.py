@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test unitario: AnswerCache
+Verifica TTL, evicción LRU, persistencia SQLite e integración con el router
+"""
+import sys
+import time
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.core.answer_cache import AnswerCache, CachedAnswer
+from escenario_1.metrics.collector import QueryMetrics
+
+
+def _answer(text="respuesta"):
+    return CachedAnswer(respuesta=text, entity="ASI", chunks_count=1, top_similarity=0.9)
+
+
+class TestCacheKey:
+    """Tests de la clave del cache"""
+
+    def test_key_depends_on_all_parts(self):
+        """Cambiar corpus, prompt o modelo cambia la clave"""
+        base = dict(entity="ASI", query_text="telefono asi", corpus_version="v1",
+                    system_prompt="prompt", model="m1")
+        key = AnswerCache.make_key(**base)
+        for field, value in [("entity", "IOSFA"), ("corpus_version", "v2"),
+                             ("system_prompt", "otro"), ("model", "m2")]:
+            assert AnswerCache.make_key(**{**base, field: value}) != key
+
+    def test_key_is_stable(self):
+        """La clave es determinística (sirve entre procesos)"""
+        args = ("ASI", "telefono asi", "v1", "prompt", "m1")
+        assert AnswerCache.make_key(*args) == AnswerCache.make_key(*args)
+
+
+class TestCacheBehavior:
+    """Tests de TTL y evicción"""
+
+    def test_ttl_expires(self):
+        """Las entradas vencidas se descartan"""
+        cache = AnswerCache(ttl_seconds=10)
+        old = _answer()
+        old.created_at = time.time() - 60
+        cache.put("k", old)
+        assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """Se evicta la entrada menos usada"""
+        cache = AnswerCache(max_entries=2)
+        cache.put("a", _answer("a"))
+        cache.put("b", _answer("b"))
+        cache.get("a")
+        cache.put("c", _answer("c"))
+        assert cache.get("b") is None
+        assert cache.get("a").respuesta == "a"
+        assert cache.get("c").respuesta == "c"
+
+    def test_sqlite_persistence(self, tmp_path):
+        """Las respuestas sobreviven a un reinicio"""
+        db = str(tmp_path / "cache.db")
+        cache = AnswerCache(sqlite_path=db)
+        cache.put("k", _answer("persistida"))
+        cache.close()
+
+        reloaded = AnswerCache(sqlite_path=db)
+        assert reloaded.get("k").respuesta == "persistida"
+        reloaded.close()
+
+
+class TestRouterCache:
+    """Integración con ConsultaRouter"""
+
+    def test_repeat_question_hits_cache(self, make_router, fake_retriever, fake_llm):
+        """La segunda pregunta igual no ejecuta RAG ni LLM"""
+        router = make_router(cache={"enabled": True})
+
+        first = router.process_query("¿Teléfono de la mesa operativa de ASI?")
+        assert first.cache_hit is False
+        assert first.llm_executed is True
+
+        metrics = QueryMetrics(query_text="telefono de la mesa operativa de asi")
+        second = router.process_query("telefono de la mesa operativa de asi", metrics=metrics)
+        assert second.cache_hit is True
+        assert second.llm_executed is False
+        assert second.respuesta == first.respuesta
+        assert metrics.cache_hit is True
+        assert metrics.tokens_total == 0
+        assert fake_llm.calls == 1
+        assert fake_retriever.calls == 1
+
+    def test_llm_errors_are_not_cached(self, make_router, fake_llm):
+        """Respuestas con error no se cachean"""
+        router = make_router(cache={"enabled": True})
+        fake_llm.generate = lambda messages, **kw: {"respuesta": "Error: 429", "error": "429"}
+
+        router.process_query("mail autorizaciones ASI")
+        assert len(router.answer_cache) == 0
+
+    def test_cache_disabled(self, make_router):
+        """Con cache deshabilitado el router no crea cache"""
+        router = make_router(cache={"enabled": False})
+        assert router.answer_cache is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test unitario: camino async
+Verifica aprocess_query (cliente LLM async y fallback al sincrónico) y
+ChatDispatcher.run_async
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.core.dispatcher import ChatDispatcher
+from escenario_1.metrics.collector import QueryMetrics
+
+
+class FakeAsyncLLM:
+    """Cliente async en memoria: registra llamadas y respuestas concurrentes"""
+
+    def __init__(self, respuesta="Respuesta async.", delay=0.0):
+        self.model = "fake-async"
+        self.respuesta = respuesta
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def agenerate(self, messages, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return {"respuesta": self.respuesta, "tokens_input": 50, "tokens_output": 4, "model": self.model}
+
+    async def agenerate_stream(self, messages, on_delta=None, **kwargs):
+        result = await self.agenerate(messages)
+        for word in result["respuesta"].split(" "):
+            if on_delta:
+                on_delta(word + " ")
+        return result
+
+
+class TestAsyncRouter:
+    """Tests de ConsultaRouter.aprocess_query"""
+
+    def test_uses_async_client(self, make_router, fake_llm):
+        """Con async_llm_client, el LLM sincrónico no se usa"""
+        router = make_router(cache={"enabled": False})
+        router.async_llm_client = FakeAsyncLLM()
+        metrics = QueryMetrics(query_text="q")
+
+        result = asyncio.run(router.aprocess_query("teléfono mesa operativa ASI", metrics=metrics))
+
+        assert result.respuesta == "Respuesta async."
+        assert result.llm_executed
+        assert router.async_llm_client.calls == 1
+        assert fake_llm.calls == 0
+        assert metrics.tokens_output == 4
+        assert metrics.latency_total_ms > 0
+
+    def test_same_result_as_sync(self, make_router):
+        """aprocess_query sin cliente async equivale a process_query"""
+        router = make_router(cache={"enabled": False})
+        query = "teléfono mesa operativa ASI"
+
+        sync_result = router.process_query(query)
+        async_result = asyncio.run(router.aprocess_query(query))
+
+        assert async_result.to_dict() == sync_result.to_dict()
+
+    def test_no_entity_skips_llm(self, make_router):
+        router = make_router(cache={"enabled": False})
+        router.async_llm_client = FakeAsyncLLM()
+
+        result = asyncio.run(router.aprocess_query("hola, cómo estás?"))
+
+        assert not result.llm_executed
+        assert router.async_llm_client.calls == 0
+
+    def test_streaming_partials_and_first_token(self, make_router):
+        router = make_router(cache={"enabled": False})
+        router.async_llm_client = FakeAsyncLLM(respuesta="uno dos tres")
+        metrics = QueryMetrics(query_text="q")
+        partials = []
+
+        asyncio.run(router.aprocess_query("teléfono ASI", metrics=metrics, on_partial=partials.append))
+
+        assert partials == ["uno ", "uno dos ", "uno dos tres "]
+        assert metrics.latency_first_token_ms > 0
+
+    def test_async_llm_exception_returns_error_message(self, make_router):
+        class BrokenLLM(FakeAsyncLLM):
+            async def agenerate(self, messages, **kwargs):
+                raise TimeoutError("sin respuesta")
+
+        router = make_router(cache={"enabled": False})
+        router.async_llm_client = BrokenLLM()
+
+        result = asyncio.run(router.aprocess_query("teléfono ASI"))
+
+        assert result.respuesta == "Error al procesar la consulta."
+
+    def test_cache_filled_by_async_path(self, make_router):
+        router = make_router(cache={"enabled": True, "sqlite_path": None})
+        router.async_llm_client = FakeAsyncLLM()
+
+        asyncio.run(router.aprocess_query("teléfono ASI"))
+        second = asyncio.run(router.aprocess_query("teléfono ASI"))
+
+        assert second.cache_hit
+        assert router.async_llm_client.calls == 1
+
+
+class TestRunAsync:
+    """Tests de ChatDispatcher.run_async"""
+
+    def test_fifo_per_chat_and_parallel_chats(self):
+        dispatcher = ChatDispatcher(max_workers=1)
+        order = {"a": [], "b": []}
+        active = {"n": 0, "max": 0}
+
+        async def work(chat, i):
+            active["n"] += 1
+            active["max"] = max(active["max"], active["n"])
+            await asyncio.sleep(0.02 if i == 0 else 0.001)
+            order[chat].append(i)
+            active["n"] -= 1
+            return i
+
+        async def scenario():
+            return await asyncio.gather(*[
+                dispatcher.run_async(chat, work, chat, i) for i in range(4) for chat in ("a", "b")
+            ])
+
+        results = asyncio.run(scenario())
+        dispatcher.shutdown()
+
+        assert order == {"a": [0, 1, 2, 3], "b": [0, 1, 2, 3]}
+        # Un worker en el pool, pero los dos chats avanzan a la vez en el loop
+        assert active["max"] == 2
+        assert [r for r, _ in results] == [0, 0, 1, 1, 2, 2, 3, 3]
+        assert dispatcher.stats()["completed"] == 8
+        assert dispatcher.stats()["active_chats"] == 0
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test unitario: Modo Cascada
+Verifica que los requisitos de ingreso salgan del nivel SQL (escenario_2)
+sin RAG ni LLM, que las preguntas de dato puntual sigan a la extractiva o
+al LLM, y el registro de nivel, latencia y costo
+"""
+import sys
+import asyncio
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.core.cascade import CascadeRouter, SQLTier, build_cascade
+from escenario_1.core.normalized_text import NormalizedText
+from escenario_1.metrics.collector import QueryMetrics
+from escenario_2.data.init_db import init_database, seed_ensalud
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Base de escenario_2 con schema y datos de ENSALUD"""
+    path = tmp_path / "obras_sociales.db"
+    conn = init_database(str(path))
+    seed_ensalud(conn)
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def sql_tier(db_path):
+    tier = SQLTier.from_path(str(db_path))
+    yield tier
+    tier.close()
+
+
+class TestSQLTier:
+    """Tests de la confianza del nivel SQL"""
+
+    def test_requisitos_con_confianza_total(self, sql_tier):
+        answer = sql_tier.answer(NormalizedText.from_text("internación ENSALUD"))
+        assert answer.obra_social == "ENSALUD"
+        assert answer.tipo_ingreso == "internacion"
+        assert answer.confidence == 1.0
+
+    def test_dato_puntual_baja_la_confianza(self, sql_tier):
+        answer = sql_tier.answer(NormalizedText.from_text("teléfono guardia ENSALUD"))
+        assert answer.confidence < 0.9
+
+    def test_sin_tipo_de_ingreso_no_responde(self, sql_tier):
+        assert sql_tier.answer(NormalizedText.from_text("coseguros ENSALUD")) is None
+
+
+class TestCascadeRouter:
+    """Tests del orden de los niveles"""
+
+    def test_sql_sin_rag_ni_llm(self, make_router, sql_tier, fake_retriever, fake_llm):
+        cascade = CascadeRouter(make_router(), sql_tier=sql_tier)
+        metrics = QueryMetrics(query_text="q")
+
+        result = cascade.process_query("que necesito para una internación de ENSALUD", metrics=metrics)
+
+        assert result.tier == "sql"
+        assert result.to_dict()["tier"] == "sql"
+        assert not result.rag_executed and not result.llm_executed
+        assert result.entity_result.entity == "ENSALUD"
+        assert fake_retriever.calls == 0 and fake_llm.calls == 0
+        assert metrics.tier == "sql" and metrics.tokens_total == 0
+
+    def test_confianza_baja_sigue_al_llm(self, make_router, sql_tier, fake_llm):
+        cascade = CascadeRouter(make_router(), sql_tier=sql_tier)
+        result = cascade.process_query("teléfono guardia ENSALUD")
+        assert result.tier == "llm"
+        assert fake_llm.calls == 1
+
+    def test_dato_literal_en_la_extractiva(self, make_router, sql_tier, fake_llm):
+        cascade = CascadeRouter(make_router(extractive={"enabled": True}), sql_tier=sql_tier)
+        result = cascade.process_query("teléfono mesa operativa ASI")
+        assert result.tier == "extractiva"
+        assert fake_llm.calls == 0
+
+    @pytest.mark.parametrize("query,tier", [
+        ("hola", "sin_entidad"),
+        ("teléfono mesa operativa ASI", "llm"),
+    ])
+    def test_sin_nivel_sql(self, make_router, query, tier):
+        cascade = CascadeRouter(make_router(), sql_tier=None)
+        assert cascade.process_query(query).tier == tier
+
+    def test_async(self, make_router, sql_tier, fake_llm):
+        cascade = CascadeRouter(make_router(), sql_tier=sql_tier)
+        result = asyncio.run(cascade.aprocess_query("guardia ENSALUD"))
+        assert result.tier == "sql"
+        assert fake_llm.calls == 0
+
+
+class TestCascadeStats:
+    """Tests del reporte por nivel"""
+
+    def test_cantidad_y_costo_por_nivel(self, make_router, sql_tier):
+        cascade = CascadeRouter(
+            make_router(cache={"enabled": False}),
+            sql_tier=sql_tier,
+            costs={"input_per_million": 1.0, "output_per_million": 2.0}
+        )
+        cascade.process_query("internación ENSALUD")
+        cascade.process_query("guardia ENSALUD")
+        metrics = QueryMetrics(query_text="q")
+        cascade.process_query("teléfono mesa operativa ASI", metrics=metrics)
+
+        stats = cascade.stats()
+        assert set(stats) == {"sql", "llm"}
+        assert stats["sql"]["count"] == 2
+        assert stats["sql"]["cost_usd"] == 0.0
+        assert stats["llm"]["share"] == pytest.approx(1 / 3)
+        assert stats["llm"]["cost_usd"] == pytest.approx((metrics.tokens_input + 2 * 12) / 1_000_000)
+        assert stats["sql"]["latency_p95_ms"] >= stats["sql"]["latency_p50_ms"] > 0
+
+
+class TestBuildCascade:
+    """Tests de la sección cascade de scenario.yaml"""
+
+    def test_deshabilitada(self, make_router, tmp_path):
+        assert build_cascade(make_router(cascade={"enabled": False}), tmp_path) is None
+
+    def test_db_relativa_a_la_config(self, make_router, db_path, tmp_path):
+        router = make_router(cascade={"enabled": True, "sql": {"db_path": db_path.name, "min_confidence": 0.8}})
+        cascade = build_cascade(router, tmp_path)
+        assert cascade.sql_tier is not None
+        assert cascade.sql_min_confidence == 0.8
+        cascade.sql_tier.close()
+
+    def test_sin_base_arranca_en_la_extractiva(self, make_router, tmp_path):
+        router = make_router(cascade={"enabled": True, "sql": {"db_path": "no_existe.db"}})
+        assert build_cascade(router, tmp_path).sql_tier is None
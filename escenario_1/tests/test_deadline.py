@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Test unitario: deadline por consulta
+Verifica la extracción sin LLM (teléfono, mail, monto, plazo), el corte del
+router cuando el LLM no responde a tiempo (sync y async) y la propagación
+del presupuesto al cliente y al rate limiter
+"""
+import sys
+import time
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.core.extractive import detect_intent, extract_answer
+from escenario_1.llm.rate_limiter import RateLimiter
+from escenario_1.llm.single_flight import SingleFlight
+from escenario_1.metrics.collector import QueryMetrics
+
+CHUNKS = [
+    SimpleNamespace(
+        chunk_id="asi_1",
+        text="Teléfono Mesa Operativa: 0810-888-8274. Mail: autorizaciones@asi.com.ar"
+    ),
+    SimpleNamespace(
+        chunk_id="asi_2",
+        text="Coseguros:\nPediatra $1553\nEspecialista $2.912,50\n"
+             "Internaciones: avisar dentro de las 24 hs hábiles."
+    ),
+]
+
+
+class SlowLLM:
+    """Cliente sincrónico que tarda `delay` segundos y registra el timeout recibido"""
+
+    def __init__(self, delay):
+        self.model = "slow"
+        self.delay = delay
+        self.timeouts = []
+        self.done = threading.Event()
+
+    def generate(self, messages, timeout=None):
+        self.timeouts.append(timeout)
+        time.sleep(self.delay)
+        self.done.set()
+        return {"respuesta": "Respuesta del LLM.", "tokens_input": 100, "tokens_output": 5}
+
+    def generate_stream(self, messages, on_delta=None, timeout=None):
+        on_delta("Respuesta ")
+        return self.generate(messages, timeout=timeout)
+
+
+class SlowAsyncLLM:
+    def __init__(self, delay):
+        self.model = "slow-async"
+        self.delay = delay
+        self.cancelled = False
+
+    async def agenerate(self, messages, timeout=None):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return {"respuesta": "Respuesta del LLM.", "tokens_input": 100, "tokens_output": 5}
+
+
+class TestExtractive:
+    """Tests de la respuesta extractiva"""
+
+    @pytest.mark.parametrize("query,intent", [
+        ("teléfono mesa operativa ASI", "telefono"),
+        ("mail de autorizaciones ASI", "email"),
+        ("¿Cuánto cuesta el especialista en ASI?", "monto"),
+        ("en cuánto tiempo debo avisar una internación ASI", "plazo"),
+        ("que cubre el PMI", None),
+    ])
+    def test_detect_intent(self, query, intent):
+        assert detect_intent(query) == intent
+
+    @pytest.mark.parametrize("query,value,chunk_id", [
+        ("teléfono mesa operativa ASI", "0810-888-8274", "asi_1"),
+        ("mail de autorizaciones ASI", "autorizaciones@asi.com.ar", "asi_1"),
+        ("cuánto cuesta el especialista", "$2.912,50", "asi_2"),
+        ("en cuánto tiempo debo avisar una internación", "24 hs", "asi_2"),
+    ])
+    def test_extrae_el_dato_con_su_linea(self, query, value, chunk_id):
+        answer = extract_answer(query, CHUNKS)
+        assert answer.values == [value]
+        assert answer.chunk_id == chunk_id
+        assert value in answer.respuesta
+
+    def test_sin_relacion_devuelve_none(self):
+        assert extract_answer("que cubre el PMI", CHUNKS) is None
+
+
+class TestRouterDeadline:
+    """Tests del corte por deadline en ConsultaRouter"""
+
+    def test_llm_lento_devuelve_respuesta_extractiva(self, make_router):
+        llm = SlowLLM(delay=0.5)
+        router = make_router(llm_client=llm, deadline={"total_seconds": 0.15, "min_llm_seconds": 0.0})
+        metrics = QueryMetrics(query_text="q")
+
+        start = time.perf_counter()
+        result = router.process_query("teléfono mesa operativa ASI", metrics=metrics)
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.4
+        assert result.degraded
+        assert not result.llm_executed
+        assert result.respuesta.startswith("Teléfono Mesa Operativa: 0810-888-8274.")
+        assert result.to_dict()["degraded"] is True
+        assert metrics.degraded is True
+        # El cliente recibió el presupuesto restante como timeout
+        assert 0 < llm.timeouts[0] <= 0.15
+
+    def test_respuesta_tardia_va_al_cache(self, make_router):
+        llm = SlowLLM(delay=0.2)
+        router = make_router(llm_client=llm, deadline={"total_seconds": 0.05, "min_llm_seconds": 0.0})
+
+        first = router.process_query("teléfono mesa operativa ASI")
+        assert first.degraded
+        # La llamada vencida termina en segundo plano y deja la respuesta en el cache
+        deadline = time.monotonic() + 2
+        while len(router.answer_cache) == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        second = router.process_query("teléfono mesa operativa ASI")
+        assert second.cache_hit
+        assert second.respuesta == "Respuesta del LLM."
+
+    def test_llamada_encolada_y_vencida_no_llama_al_llm(self, make_router):
+        """Con el pool llm-deadline lleno, la llamada que arranca vencida se saltea"""
+        llm = SlowLLM(delay=0.4)
+        router = make_router(
+            llm_client=llm,
+            cache={"enabled": False},
+            concurrency={"max_workers": 1},   # pool llm-deadline de 2 threads
+            deadline={"total_seconds": 0.05, "min_llm_seconds": 0.0}
+        )
+
+        results = [router.process_query("teléfono mesa operativa ASI") for _ in range(3)]
+        router._get_llm_executor().shutdown(wait=True)
+
+        assert all(result.degraded for result in results)
+        assert len(llm.timeouts) == 2
+
+    def test_parciales_se_cortan_al_vencer(self, make_router):
+        llm = SlowLLM(delay=0.3)
+        router = make_router(llm_client=llm, deadline={"total_seconds": 0.1, "min_llm_seconds": 0.0})
+        partials = []
+
+        result = router.process_query("teléfono mesa operativa ASI", on_partial=partials.append)
+        seen = len(partials)
+        llm.done.wait(timeout=2)
+
+        assert result.degraded
+        assert len(partials) == seen
+
+    def test_sin_presupuesto_no_llama_al_llm(self, make_router, fake_llm):
+        router = make_router(deadline={"total_seconds": 0.5, "min_llm_seconds": 1.0})
+
+        result = router.process_query("mail de autorizaciones ASI")
+
+        assert result.degraded
+        assert fake_llm.calls == 0
+        assert "autorizaciones@asi.com.ar" in result.respuesta
+
+    def test_llm_a_tiempo_no_degrada(self, make_router):
+        router = make_router(cache={"enabled": False})
+        result = router.process_query("teléfono mesa operativa ASI")
+        assert not result.degraded
+        assert result.llm_executed
+
+    def test_sin_chunks_mensaje_fijo(self, make_router):
+        from escenario_1.tests.conftest import FakeRetriever
+        router = make_router(
+            retriever=FakeRetriever(chunks=[]),
+            deadline={"total_seconds": 0.1, "min_llm_seconds": 1.0, "unavailable_message": "Demorado."}
+        )
+        assert router.process_query("teléfono mesa operativa ASI").respuesta == "Demorado."
+
+    def test_async_cancela_la_llamada(self, make_router):
+        router = make_router(cache={"enabled": False}, deadline={"total_seconds": 0.1, "min_llm_seconds": 0.0})
+        router.async_llm_client = SlowAsyncLLM(delay=1.0)
+
+        result = asyncio.run(router.aprocess_query("teléfono mesa operativa ASI"))
+
+        assert result.degraded
+        assert router.async_llm_client.cancelled
+        assert "0810-888-8274" in result.respuesta
+
+
+class TestBudgetPropagation:
+    """El presupuesto llega al rate limiter y a las llamadas agrupadas"""
+
+    def test_rate_limiter_no_espera_mas_que_el_presupuesto(self):
+        limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=100000)
+        limiter.acquire(10)
+
+        with pytest.raises(TimeoutError):
+            limiter.acquire(10, max_wait=1.0)
+        # La reserva rechazada se devolvió: el bucket sigue con el saldo del primer acquire
+        assert limiter.stats()["queue_depth"] == 0
+        assert limiter.requests.level > -0.5
+
+    def test_lider_cancelada_no_cancela_seguidoras(self):
+        flights = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(1.0)
+            return "ok"
+
+        async def scenario():
+            leader = asyncio.create_task(flights.ado("k", upstream))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flights.ado("k", upstream))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await asyncio.gather(follower, return_exceptions=True)
+
+        (result,) = asyncio.run(scenario())
+        assert isinstance(result, TimeoutError)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Test unitario: ChatDispatcher
+Verifica orden FIFO por chat, límite de concurrencia y métricas de cola
+"""
+import sys
+import time
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.core.dispatcher import ChatDispatcher
+
+
+class TestChatDispatcher:
+    """Tests del pool de workers"""
+
+    def test_returns_result_and_queue_time(self):
+        """run() retorna el resultado de la función y el tiempo en cola"""
+        dispatcher = ChatDispatcher(max_workers=2)
+
+        async def scenario():
+            return await dispatcher.run(1, lambda a, b=0: a + b, 2, b=3)
+
+        result, queue_ms = asyncio.run(scenario())
+        dispatcher.shutdown()
+        assert result == 5
+        assert queue_ms >= 0
+
+    def test_fifo_per_chat(self):
+        """Los mensajes de un chat se ejecutan en orden de llegada, sin solaparse"""
+        dispatcher = ChatDispatcher(max_workers=4)
+        order = []
+        active = {"n": 0, "max": 0}
+        lock = threading.Lock()
+
+        def work(i):
+            with lock:
+                active["n"] += 1
+                active["max"] = max(active["max"], active["n"])
+            # Los primeros mensajes son los más lentos: sin FIFO se adelantarían
+            time.sleep(0.02 if i < 3 else 0.001)
+            order.append(i)
+            with lock:
+                active["n"] -= 1
+
+        async def scenario():
+            await asyncio.gather(*[dispatcher.run("chat", work, i) for i in range(8)])
+
+        asyncio.run(scenario())
+        dispatcher.shutdown()
+        assert order == list(range(8))
+        assert active["max"] == 1
+
+    def test_concurrency_is_bounded(self):
+        """Nunca corren más de max_workers trabajos en simultáneo"""
+        dispatcher = ChatDispatcher(max_workers=2)
+        active = {"n": 0, "max": 0}
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                active["n"] += 1
+                active["max"] = max(active["max"], active["n"])
+            time.sleep(0.02)
+            with lock:
+                active["n"] -= 1
+
+        async def scenario():
+            await asyncio.gather(*[dispatcher.run(chat, work) for chat in range(6)])
+
+        asyncio.run(scenario())
+        stats = dispatcher.stats()
+        dispatcher.shutdown()
+        assert active["max"] == 2
+        assert stats["completed"] == 6
+        assert stats["pending"] == 0
+        assert stats["active_chats"] == 0
+        assert stats["queue_ms_max"] > 0
+
+    def test_chats_run_in_parallel(self):
+        """Chats distintos no se esperan entre sí (el loop no se bloquea)"""
+        dispatcher = ChatDispatcher(max_workers=8)
+
+        async def scenario():
+            start = time.perf_counter()
+            await asyncio.gather(*[dispatcher.run(chat, time.sleep, 0.1) for chat in range(8)])
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(scenario())
+        dispatcher.shutdown()
+        # Secuencial serían 0.8s
+        assert elapsed < 0.4
+
+    def test_exceptions_propagate(self):
+        """Un error en el worker llega al handler y no traba el chat"""
+        dispatcher = ChatDispatcher(max_workers=1)
+
+        def fail():
+            raise ValueError("boom")
+
+        async def scenario():
+            with pytest.raises(ValueError):
+                await dispatcher.run(1, fail)
+            return await dispatcher.run(1, lambda: "ok")
+
+        result, _ = asyncio.run(scenario())
+        dispatcher.shutdown()
+        assert result == "ok"
+
+    def test_cancel_keeps_chat_turn_until_worker_ends(self):
+        """Cancelar al handler no deja correr el siguiente mensaje del chat en paralelo"""
+        dispatcher = ChatDispatcher(max_workers=2)
+        events = []
+
+        def work(name):
+            events.append(f"{name}-start")
+            time.sleep(0.1)
+            events.append(f"{name}-end")
+
+        async def scenario():
+            first = asyncio.ensure_future(dispatcher.run(1, work, "a"))
+            await asyncio.sleep(0.03)
+            first.cancel()
+            await dispatcher.run(1, work, "b")
+            with pytest.raises(asyncio.CancelledError):
+                await first
+
+        asyncio.run(scenario())
+        stats = dispatcher.stats()
+        dispatcher.shutdown()
+        assert events == ["a-start", "a-end", "b-start", "b-end"]
+        assert stats["completed"] == 2
+        assert stats["pending"] == 0
+
+    def test_cancelled_before_start_is_not_pending(self):
+        """Un trabajo cancelado en cola (pool o turno del chat) no queda pendiente"""
+        dispatcher = ChatDispatcher(max_workers=1)
+        ran = []
+
+        async def scenario():
+            busy = asyncio.ensure_future(dispatcher.run(1, time.sleep, 0.1))
+            queued = asyncio.ensure_future(dispatcher.run(2, ran.append, "pool"))
+            same_chat = asyncio.ensure_future(dispatcher.run(1, ran.append, "chat"))
+            await asyncio.sleep(0.03)
+            queued.cancel()
+            same_chat.cancel()
+            await busy
+            await asyncio.gather(queued, same_chat, return_exceptions=True)
+
+        asyncio.run(scenario())
+        stats = dispatcher.stats()
+        dispatcher.shutdown()
+        assert ran == []
+        assert stats["cancelled"] == 2
+        assert stats["pending"] == 0
+        assert dispatcher.pending == 0
+
+
+class TestAsyncRouterBound:
+    """run_async no usa el pool: el router acota su trabajo bloqueante"""
+
+    def test_prepare_respects_max_workers(self, make_router, fake_retriever):
+        active = {"n": 0, "max": 0}
+        lock = threading.Lock()
+        retrieve = fake_retriever.retrieve
+
+        def slow_retrieve(*args, **kwargs):
+            with lock:
+                active["n"] += 1
+                active["max"] = max(active["max"], active["n"])
+            time.sleep(0.02)
+            with lock:
+                active["n"] -= 1
+            return retrieve(*args, **kwargs)
+
+        fake_retriever.retrieve = slow_retrieve
+        router = make_router(concurrency={"max_workers": 2}, cache={"enabled": False})
+        dispatcher = ChatDispatcher(max_workers=2)
+
+        async def scenario():
+            await asyncio.gather(*[
+                dispatcher.run_async(chat, router.aprocess_query, "teléfono mesa operativa ASI")
+                for chat in range(6)
+            ])
+
+        asyncio.run(scenario())
+        dispatcher.shutdown()
+        assert fake_retriever.calls == 6
+        assert active["max"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
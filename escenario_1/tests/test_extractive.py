@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test unitario: respuesta extractiva
+Verifica la clasificación de intención (reglas + expansión del rewriter),
+la extracción por tipo de dato, la confianza y que el router saltee el LLM
+solo con confianza alta
+"""
+import sys
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.core.extractive import classify_intent, extract_answer
+from escenario_1.core.query_rewriter import get_query_expander
+from escenario_1.metrics.collector import QueryMetrics
+from escenario_1.tests.conftest import FakeRetriever
+
+# Chunks con el formato de los documentos de contacto y coseguros
+CHUNKS = [
+    SimpleNamespace(chunk_id="ensalud_contacto", text=(
+        "CONTACTO ENSALUD\n"
+        "Teléfono: 6607-5765\n"
+        "Mail administración: administracion@ensalud.org\n"
+        "Mail auditoría: auditoria@ensalud.org\n"
+        "Web prestadores: www.ensalud.org/prestadores"
+    )),
+    SimpleNamespace(chunk_id="ensalud_coseguros", text=(
+        "COSEGUROS ENSALUD\n"
+        "Médico de familia / pediatra: $1553\n"
+        "Médico especialista: $2912\n"
+        "APB: $6000\n"
+        "Las autorizaciones tienen una vigencia de 30 días."
+    )),
+    SimpleNamespace(chunk_id="ensalud_guardia", text=(
+        "Documentación para guardia:\n"
+        "- DNI\n"
+        "- Credencial\n"
+        "- VALIDADOR"
+    )),
+]
+
+
+def extract(query, entity="ENSALUD"):
+    expansion = get_query_expander().expand(query, entity)
+    return extract_answer(query, CHUNKS, expansion=expansion, ignore_terms=(entity,))
+
+
+class TestClassifyIntent:
+    """Tests de la clasificación de intención"""
+
+    @pytest.mark.parametrize("query,intent", [
+        ("web prestadores ENSALUD", "url"),
+        ("mail auditoría ENSALUD", "email"),
+        ("valor APB ENSALUD", "monto"),
+        ("documentación internación IOSFA", "documentos"),
+    ])
+    def test_reglas(self, query, intent):
+        assert classify_intent(query) == (intent, 1.0)
+
+    def test_expansion_del_rewriter(self):
+        """'que necesito' no nombra documentos; la expansión del rewriter sí"""
+        assert classify_intent("que necesito para guardia") == (None, 0.0)
+        expansion = get_query_expander().expand("que necesito para guardia", "IOSFA")
+        assert classify_intent("que necesito para guardia", expansion) == ("documentos", 0.5)
+
+
+class TestExtractAnswer:
+    """Tests de extracción y confianza"""
+
+    @pytest.mark.parametrize("query,value", [
+        ("mail auditoría ENSALUD", "auditoria@ensalud.org"),
+        ("web prestadores ENSALUD", "www.ensalud.org/prestadores"),
+        ("valor APB ENSALUD", "$6000"),
+        ("cuanto cuesta médico especialista ENSALUD", "$2912"),
+        ("vigencia de las autorizaciones ENSALUD", "30 días"),
+        ("teléfono ENSALUD", "6607-5765"),
+    ])
+    def test_dato_literal_con_confianza_alta(self, query, value):
+        answer = extract(query)
+        assert answer.values == [value]
+        assert answer.confidence >= 0.85
+
+    def test_mail_no_se_confunde_con_web(self):
+        assert extract("web prestadores ENSALUD").values == ["www.ensalud.org/prestadores"]
+
+    def test_dato_ambiguo_baja_la_confianza(self):
+        """'mail ENSALUD' tiene dos candidatos igual de buenos"""
+        answer = extract("mail ENSALUD")
+        assert answer.confidence < 0.85
+
+    def test_pregunta_de_regla_baja_la_confianza(self):
+        answer = extract("quienes no pagan coseguro ENSALUD")
+        assert answer.confidence < 0.85
+
+    def test_lista_de_documentos(self):
+        answer = extract("documentación para guardia ENSALUD")
+        assert answer.intent == "documentos"
+        assert answer.values == ["- DNI", "- Credencial", "- VALIDADOR"]
+        assert answer.confidence <= 0.6
+
+
+class TestRouterExtractive:
+    """El router responde sin LLM solo con confianza alta"""
+
+    def test_dato_literal_sin_llm(self, make_router, fake_llm):
+        router = make_router(extractive={"enabled": True})
+        metrics = QueryMetrics(query_text="q")
+
+        result = router.process_query("teléfono mesa operativa ASI", metrics=metrics)
+
+        assert fake_llm.calls == 0
+        assert result.extractive
+        assert not result.llm_executed
+        assert result.respuesta == "Teléfono Mesa Operativa: 0810-888-8274."
+        assert result.to_dict()["extractive"] is True
+        assert metrics.extractive and metrics.tokens_input == 0
+
+    def test_respuesta_extractiva_se_cachea(self, make_router, fake_retriever):
+        router = make_router(extractive={"enabled": True})
+        router.process_query("teléfono mesa operativa ASI")
+        second = router.process_query("teléfono mesa operativa ASI")
+
+        assert second.cache_hit
+        assert fake_retriever.calls == 1
+
+    def test_confianza_baja_usa_el_llm(self, make_router, fake_llm):
+        router = make_router(extractive={"enabled": True, "min_confidence": 1.1})
+        result = router.process_query("teléfono mesa operativa ASI")
+        assert fake_llm.calls == 1
+        assert not result.extractive
+
+    def test_intencion_no_habilitada_usa_el_llm(self, make_router, fake_llm):
+        router = make_router(extractive={"enabled": True, "intents": ["email"]})
+        router.process_query("teléfono mesa operativa ASI")
+        assert fake_llm.calls == 1
+
+    def test_sin_chunks_usa_el_llm(self, make_router, fake_llm):
+        router = make_router(retriever=FakeRetriever(chunks=[]), extractive={"enabled": True})
+        router.process_query("teléfono mesa operativa ASI")
+        assert fake_llm.calls == 1
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test unitario: LLMHealth
+Verifica la salud pasiva del LLM (tasa de error, EWMA de latencia y
+vencimiento por inactividad)
+"""
+import sys
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.llm import health as health_module
+from escenario_1.llm.health import LLMHealth, build_llm_health
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj manual para time.time() del módulo"""
+    now = {"t": 1_000_000.0}
+    monkeypatch.setattr(health_module.time, "time", lambda: now["t"])
+    return now
+
+
+class TestLLMHealth:
+    """Tests de LLMHealth"""
+
+    def test_sin_trafico(self):
+        health = LLMHealth()
+        assert health.is_healthy() is None
+        assert health.is_stale()
+        assert health.stats()["idle_seconds"] is None
+
+    def test_exito_marca_sano(self):
+        health = LLMHealth()
+        health.record_success(800)
+        assert health.is_healthy() is True
+        assert not health.is_stale()
+        assert health.latency_ewma_ms == 800
+
+    def test_latencia_ewma(self):
+        health = LLMHealth(latency_alpha=0.5)
+        health.record_success(1000)
+        health.record_success(2000)
+        assert health.latency_ewma_ms == pytest.approx(1500)
+
+    def test_falla_aislada_no_marca_caido(self):
+        health = LLMHealth(window=10, max_error_rate=0.5)
+        for _ in range(5):
+            health.record_success(500)
+        health.record_failure("429")
+
+        assert health.error_rate == pytest.approx(1 / 6)
+        assert health.is_healthy() is True
+
+    def test_fallas_seguidas_marcan_caido(self):
+        health = LLMHealth(window=4, max_error_rate=0.5)
+        health.record_success(500)
+        for _ in range(3):
+            health.record_failure(TimeoutError("sin respuesta"))
+
+        assert health.is_healthy() is False
+        assert health.stats()["last_error"] == "sin respuesta"
+
+        # Un éxito posterior alcanza para volver a OK
+        health.record_success(500)
+        assert health.is_healthy() is True
+
+    def test_ventana_olvida_fallas_viejas(self):
+        health = LLMHealth(window=3)
+        health.record_failure("x")
+        for _ in range(3):
+            health.record_success(500)
+        assert health.error_rate == 0.0
+
+    def test_vence_por_inactividad(self, clock):
+        health = LLMHealth(idle_ttl_seconds=300)
+        health.record_success(500)
+
+        clock["t"] += 299
+        assert not health.is_stale()
+        clock["t"] += 2
+        assert health.is_stale()
+        assert health.stats()["idle_seconds"] == pytest.approx(301)
+        # El último estado conocido se mantiene
+        assert health.is_healthy() is True
+
+    def test_build_desde_config(self):
+        health = build_llm_health({"health": {"idle_ttl_seconds": 60, "window": 5}})
+        assert health.idle_ttl_seconds == 60
+        assert health._outcomes.maxlen == 5
+        assert build_llm_health({}).idle_ttl_seconds == 300
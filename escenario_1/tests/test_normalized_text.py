@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test unitario: NormalizedText
+Verifica la normalización única compartida por detector y rewriter
+"""
+import sys
+import unicodedata
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.core.normalized_text import NormalizedText, normalize_text, fold
+from escenario_1.core.query_rewriter import rewrite_query
+
+
+def _legacy_fold(text: str) -> str:
+    """Normalización anterior (NFD + filtro Mn) para comparar"""
+    text = unicodedata.normalize('NFD', text.lower())
+    return ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+
+
+class TestForms:
+    """Tests de las formas normalizadas"""
+
+    def test_all_forms(self):
+        """Calcula todas las formas en una pasada"""
+        nt = NormalizedText.from_text("¿Cuánto cuesta en ENSALUD?")
+        assert nt.original == "¿Cuánto cuesta en ENSALUD?"
+        assert nt.lower == "¿cuánto cuesta en ensalud?"
+        assert nt.folded == "¿cuanto cuesta en ensalud?"
+        assert nt.text == "cuanto cuesta en ensalud"
+        assert nt.tokens == ("cuanto", "cuesta", "en", "ensalud")
+        assert nt.bigrams == ("cuanto cuesta", "cuesta en", "en ensalud")
+
+    def test_padded(self):
+        """padded permite matching por palabra completa"""
+        nt = NormalizedText.from_text("Documentación básica")
+        assert " asi " not in nt.padded
+        assert " basica " in nt.padded
+
+    def test_ngrams(self):
+        """ngrams(n) genérico"""
+        nt = NormalizedText.from_text("valor coseguro especialista ensalud")
+        assert nt.ngrams(1) == nt.tokens
+        assert nt.ngrams(3) == ("valor coseguro especialista", "coseguro especialista ensalud")
+
+    def test_empty(self):
+        """Texto vacío o None"""
+        for value in ("", None):
+            nt = NormalizedText.from_text(value)
+            assert nt.text == ""
+            assert nt.tokens == ()
+
+
+class TestAccentTable:
+    """La tabla de traducción equivale a la normalización NFD anterior"""
+
+    @pytest.mark.parametrize("text", [
+        "Internación programada", "Ñandú pingüino", "ÁÉÍÓÚ àèìòù", "cirugía",
+        "Teléfono de auditoría", "a\u0301rbol",  # tilde combinante suelta
+    ])
+    def test_matches_legacy(self, text):
+        assert NormalizedText.from_text(text).folded == _legacy_fold(text)
+
+
+class TestSharing:
+    """El mismo objeto se reutiliza entre etapas"""
+
+    def test_normalize_text_reuses_instance(self):
+        """normalize_text no recalcula si ya es NormalizedText"""
+        nt = NormalizedText.from_text("guardia IOSFA")
+        assert normalize_text(nt) is nt
+
+    def test_fold(self):
+        """fold devuelve la forma canónica"""
+        assert fold(" ASI? ") == "asi"
+        assert fold("i.o.s.f.a") == "i o s f a"
+
+    def test_rewriter_accepts_normalized(self):
+        """rewrite_query acepta NormalizedText y preserva el original"""
+        query = "¿Cuánto cuesta la consulta?"
+        assert rewrite_query(NormalizedText.from_text(query)) == rewrite_query(query)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
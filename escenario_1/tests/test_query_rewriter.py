@@ -11,7 +11,10 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from escenario_1.core.query_rewriter import rewrite_query
+from escenario_1.core.query_rewriter import (
+    rewrite_query, get_query_expander, reset_query_expander, QueryExpander
+)
+from escenario_1.core.normalized_text import NormalizedText
 
 
 class TestQueryExpansion:
@@ -139,5 +142,65 @@ class TestEdgeCases:
         assert "consulta médica" in result
 
 
+class TestTrieExpansion:
+    """Tests del trie de expansiones (longest match + dedup)"""
+
+    def test_longest_match_wins(self):
+        """'para guardia' gana sobre 'guardia' (no se disparan ambos)"""
+        result = rewrite_query("documentos para guardia")
+        assert "checklist" in result
+        assert result.lower().count("validador") == 1
+        assert result.lower().count("guardia") == 1
+
+    def test_output_is_deduplicated(self):
+        """Ningún token de expansión se repite ni duplica la query"""
+        query = "que necesito para internarme"
+        result = rewrite_query(query)
+        added = result[len(query):].split()
+        assert len(added) == len(set(t.lower() for t in added))
+        assert "internación" in added
+
+    def test_matches_without_accents(self):
+        """Los patrones del YAML matchean con o sin tildes"""
+        expander = get_query_expander()
+        with_accents = expander.expand("¿En cuánto tiempo debo avisar una internación?")
+        assert with_accents == expander.expand("en cuanto tiempo debo avisar una internacion")
+        assert "denuncia" in with_accents
+
+    def test_token_boundaries(self):
+        """Un patrón no matchea dentro de otra palabra"""
+        expander = get_query_expander()
+        assert expander.expand("guardiania") == ""
+
+    def test_plurals_expand_like_singular(self):
+        """Los plurales matchean el patrón en singular"""
+        expander = get_query_expander()
+        assert expander.expand("guardias").split()[1:] == expander.expand("guardia").split()
+        assert "hospitalización" in expander.expand("requisitos para internaciones")
+        assert "autorización" in expander.expand("necesito autorizaciones previas")
+        assert "coseguro" in expander.expand("cuanto salen las consultas")
+        assert "validador" in expander.expand("documentos piden en guardias")
+
+    def test_cache_by_normalized_query(self):
+        """Queries que normalizan igual comparten entrada de cache"""
+        reset_query_expander()
+        expander = get_query_expander()
+        expander.expand("¿Cuánto cuesta?", "ENSALUD")
+        expander.expand(NormalizedText.from_text("cuanto cuesta"), "ensalud")
+        info = expander.cache_info()
+        assert info.hits == 1
+        assert info.misses == 1
+
+    def test_custom_config(self, tmp_path):
+        """La tabla se carga desde YAML"""
+        config = tmp_path / "synonyms.yaml"
+        config.write_text(
+            'expansions:\n  "mesa operativa": "teléfono contacto"\n',
+            encoding="utf-8"
+        )
+        expander = QueryExpander(str(config))
+        assert expander.expand("Mesa Operativa ASI") == "teléfono contacto"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
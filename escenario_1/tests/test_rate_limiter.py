@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Test unitario: RateLimiter
+Verifica buckets RPM/TPM, cola de espera, sincronización con headers de
+Groq y backoff de reintentos
+"""
+import sys
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.llm import rate_limiter as rl
+from escenario_1.llm.rate_limiter import (
+    RateLimiter, TokenBucket, parse_duration, is_retryable, estimate_tokens, build_rate_limiter
+)
+
+
+class FakeClock:
+    """Reloj manual: sleep avanza el tiempo en vez de bloquear"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rl.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(rl.time, "sleep", fake.sleep)
+    return fake
+
+
+class TestParseDuration:
+    """Tests del parseo de duraciones de headers"""
+
+    @pytest.mark.parametrize("value,expected", [
+        ("3", 3.0),
+        ("7.66s", 7.66),
+        ("120ms", 0.12),
+        ("1m2.5s", 62.5),
+        ("1h", 3600.0),
+    ])
+    def test_formatos(self, value, expected):
+        assert parse_duration(value) == pytest.approx(expected)
+
+    def test_invalido(self):
+        assert parse_duration(None) is None
+        assert parse_duration("pronto") is None
+
+
+class TestTokenBucket:
+    """Tests del bucket con reposición continua"""
+
+    def test_reserva_y_reposicion(self, clock):
+        bucket = TokenBucket(capacity=60, per_minute=60)  # 1 por segundo
+        assert bucket.reserve(60, clock.now) == 0.0
+        # Sin saldo: la siguiente reserva espera 1 segundo
+        assert bucket.reserve(1, clock.now) == pytest.approx(1.0)
+        # Reservas encoladas: la tercera espera detrás de la segunda
+        assert bucket.reserve(1, clock.now) == pytest.approx(2.0)
+        # Pasados 3 segundos, hay saldo de nuevo
+        assert bucket.reserve(1, clock.now + 3) == 0.0
+
+    def test_no_supera_capacidad(self, clock):
+        bucket = TokenBucket(capacity=10, per_minute=60)
+        bucket.refund(100, clock.now + 500)
+        assert bucket.level == 10
+
+
+class TestRateLimiter:
+    """Tests de RateLimiter"""
+
+    def test_dentro_del_cupo_no_espera(self, clock):
+        limiter = RateLimiter(requests_per_minute=30, tokens_per_minute=12000)
+        assert limiter.acquire(100) == (0.0, 0)
+        assert clock.sleeps == []
+        assert limiter.stats()["throttled"] == 0
+
+    def test_rpm_agotado_encola(self, clock):
+        limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=12000)
+        limiter.acquire(10)
+        limiter.acquire(10)
+
+        wait_ms, ahead = limiter.acquire(10)
+
+        # 2 RPM: una request cada 30 segundos
+        assert wait_ms == pytest.approx(30000)
+        assert ahead == 0
+        assert limiter.stats()["throttled"] == 1
+        assert limiter.stats()["wait_ms_total"] == pytest.approx(30000)
+
+    def test_tpm_agotado_encola(self, clock):
+        limiter = RateLimiter(requests_per_minute=30, tokens_per_minute=600)
+        limiter.acquire(600)
+
+        wait_ms, _ = limiter.acquire(100)
+
+        # 600 TPM = 10 tokens/s: 100 tokens tardan 10 segundos
+        assert wait_ms == pytest.approx(10000)
+
+    def test_uso_real_devuelve_reserva(self, clock):
+        limiter = RateLimiter(requests_per_minute=30, tokens_per_minute=1000)
+        limiter.acquire(1000)
+        limiter.record_usage(estimated_tokens=1000, actual_tokens=300)
+
+        assert limiter.acquire(700) == (0.0, 0)
+
+    def test_headers_bajan_el_cupo(self, clock):
+        limiter = RateLimiter(requests_per_minute=30, tokens_per_minute=12000)
+        limiter.update_from_headers({
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-remaining-tokens": "11000"
+        })
+
+        stats = limiter.stats()
+        assert stats["requests_available"] == 0
+        assert stats["tokens_available"] == 11000
+        wait_ms, _ = limiter.acquire(10)
+        assert wait_ms == pytest.approx(2000)
+
+    def test_cola_cuenta_llamadas_en_espera(self):
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=100000)
+        for _ in range(600):
+            limiter.requests.reserve(1, rl.time.monotonic())
+
+        def worker():
+            limiter.acquire(10)
+
+        first = threading.Thread(target=worker)
+        first.start()
+        while limiter.stats()["queue_depth"] == 0:
+            pass
+        _, ahead = limiter.acquire(10)
+        first.join()
+
+        assert ahead == 1
+        assert limiter.stats()["queue_depth"] == 0
+
+    def test_aacquire(self, monkeypatch):
+        limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=12000)
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+
+        monkeypatch.setattr(rl.asyncio, "sleep", fake_sleep)
+
+        async def scenario():
+            await limiter.aacquire(10)
+            return await limiter.aacquire(10)
+
+        wait_ms, _ = asyncio.run(scenario())
+
+        assert wait_ms == pytest.approx(60000, rel=0.01)
+        assert len(sleeps) == 1
+
+
+class TestBackoff:
+    """Tests del backoff de reintentos"""
+
+    def test_exponencial_con_jitter(self):
+        limiter = RateLimiter(backoff_base_seconds=1.0, backoff_max_seconds=5.0)
+        for attempt, ceiling in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (8, 5.0)]:
+            delay = limiter.backoff(attempt)
+            assert ceiling / 2 <= delay <= ceiling
+        assert limiter.stats()["retries"] == 5
+
+    def test_retry_after_pausa_a_todos(self, clock):
+        limiter = RateLimiter()
+
+        assert limiter.backoff(1, {"retry-after": "7"}) == 7.0
+
+        # Otra llamada con cupo local igual espera la pausa del servidor
+        wait_ms, _ = limiter.acquire(10)
+        assert wait_ms == pytest.approx(7000)
+
+    def test_retry_after_no_se_recorta(self, clock):
+        """Un retry-after mayor que backoff_max se devuelve entero (el cliente no reintenta)"""
+        limiter = RateLimiter(backoff_max_seconds=30.0)
+        delay = limiter.backoff(1, {"retry-after": "60"})
+        assert delay == 60.0 and delay > limiter.backoff_max
+
+        wait_ms, _ = limiter.acquire(10)
+        assert wait_ms == pytest.approx(60000)
+
+    def test_reintento_pasa_por_acquire(self, clock):
+        """El reintento reserva cupo, espera al menos el backoff y respeta la pausa"""
+        limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=1000)
+        limiter.acquire(500)
+        limiter.acquire(500)
+
+        # Intento fallido: devuelve sus tokens, el request queda contado
+        limiter.release(500)
+        wait_ms, _ = limiter.acquire(500, min_wait=1.0)
+        assert wait_ms == pytest.approx(30000)   # 1 request/30s, no solo el backoff
+
+        limiter.backoff(1, {"retry-after": "5"})
+        with pytest.raises(TimeoutError):
+            limiter.acquire(10, max_wait=4.0, min_wait=1.0)
+
+
+class TestHelpers:
+    """Tests de funciones auxiliares"""
+
+    def test_is_retryable(self):
+        class APIStatusError(Exception):
+            def __init__(self, status_code):
+                self.status_code = status_code
+
+        class APIConnectionError(Exception):
+            pass
+
+        assert is_retryable(APIStatusError(429))
+        assert is_retryable(APIStatusError(503))
+        assert not is_retryable(APIStatusError(400))
+        assert not is_retryable(APIStatusError(401))
+        assert is_retryable(APIConnectionError())
+        assert not is_retryable(ValueError("x"))
+
+    def test_estimate_tokens(self):
+        messages = [{"role": "system", "content": "a" * 400}, {"role": "user", "content": "b" * 40}]
+        assert estimate_tokens(messages, max_tokens=150) == 110 + 150
+
+    def test_build_rate_limiter(self):
+        assert build_rate_limiter({}) is None
+        assert build_rate_limiter({"rate_limit": {"enabled": False}}) is None
+
+        limiter = build_rate_limiter({"rate_limit": {"enabled": True, "requests_per_minute": 10}})
+        assert limiter.requests.capacity == 10
+        assert limiter.tokens.capacity == 12000
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test unitario: SingleFlight
+Verifica que llamadas idénticas concurrentes compartan un solo request al
+LLM (threads y asyncio) y que el router lo refleje en las métricas
+"""
+import sys
+import time
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.llm.single_flight import SingleFlight, request_key, mark_coalesced
+from escenario_1.metrics.collector import QueryMetrics
+
+MESSAGES = [{"role": "system", "content": "s"}, {"role": "user", "content": "¿convenio ASI suspendido?"}]
+
+
+class TestRequestKey:
+    """Tests de la clave de request"""
+
+    def test_misma_clave_para_request_identico(self):
+        a = request_key("m", MESSAGES, temperature=0.1, max_tokens=150)
+        b = request_key("m", [dict(m) for m in MESSAGES], max_tokens=150, temperature=0.1)
+        assert a == b
+
+    def test_cambia_con_mensajes_o_parametros(self):
+        base = request_key("m", MESSAGES, temperature=0.1, max_tokens=150)
+        assert request_key("otro", MESSAGES, temperature=0.1, max_tokens=150) != base
+        assert request_key("m", MESSAGES[:1], temperature=0.1, max_tokens=150) != base
+        assert request_key("m", MESSAGES, temperature=0.5, max_tokens=150) != base
+
+
+class TestSingleFlightThreads:
+    """Tests de SingleFlight.do (workers del dispatcher)"""
+
+    def test_llamadas_concurrentes_comparten_request(self):
+        flights = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def upstream():
+            calls.append(1)
+            release.wait(timeout=2)
+            return {"respuesta": "suspendido"}
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(flights.do, "k", upstream) for _ in range(5)]
+            while flights.stats()["coalesced"] < 4:
+                time.sleep(0.001)
+            release.set()
+            results = [f.result() for f in futures]
+
+        assert len(calls) == 1
+        assert all(result == {"respuesta": "suspendido"} for result, _ in results)
+        assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+        stats = flights.stats()
+        assert stats["upstream"] == 1
+        assert stats["coalesced"] == 4
+        assert stats["in_flight"] == 0
+
+    def test_no_es_cache(self):
+        """Terminada la llamada, la misma clave vuelve a ir al LLM"""
+        flights = SingleFlight()
+        flights.do("k", lambda: 1)
+        result, shared = flights.do("k", lambda: 2)
+        assert result == 2
+        assert not shared
+
+    def test_excepcion_llega_a_las_seguidoras(self):
+        flights = SingleFlight()
+        release = threading.Event()
+
+        def upstream():
+            release.wait(timeout=2)
+            raise TimeoutError("sin respuesta")
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(flights.do, "k", upstream) for _ in range(3)]
+            while flights.stats()["coalesced"] < 2:
+                time.sleep(0.001)
+            release.set()
+            for future in futures:
+                with pytest.raises(TimeoutError):
+                    future.result()
+
+
+class TestSingleFlightAsync:
+    """Tests de SingleFlight.ado (cliente async)"""
+
+    def test_llamadas_concurrentes_comparten_request(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"respuesta": "suspendido"}
+
+        async def scenario():
+            return await asyncio.gather(*[flights.ado("k", upstream) for _ in range(4)])
+
+        results = asyncio.run(scenario())
+
+        assert len(calls) == 1
+        assert [shared for _, shared in results] == [False, True, True, True]
+        assert flights.stats()["in_flight"] == 0
+
+    def test_excepcion_llega_a_las_seguidoras(self):
+        flights = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.01)
+            raise TimeoutError("sin respuesta")
+
+        async def scenario():
+            return await asyncio.gather(*[flights.ado("k", upstream) for _ in range(3)], return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(r, TimeoutError) for r in results)
+
+    def test_claves_distintas_no_se_agrupan(self):
+        flights = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        async def scenario():
+            return await asyncio.gather(flights.ado("a", upstream), flights.ado("b", upstream))
+
+        asyncio.run(scenario())
+        assert flights.stats()["upstream"] == 2
+        assert flights.stats()["coalesced"] == 0
+
+
+class TestCoalescedMetrics:
+    """El router marca las respuestas compartidas y no les cuenta tokens"""
+
+    def test_resultado_compartido(self, make_router):
+        class CoalescedLLM:
+            model = "fake"
+
+            def generate(self, messages, **kwargs):
+                return mark_coalesced({"respuesta": "Compartida.", "tokens_input": 80, "tokens_output": 5})
+
+        router = make_router(cache={"enabled": False}, streaming={"enabled": False})
+        router.llm_client = CoalescedLLM()
+        metrics = QueryMetrics(query_text="q")
+
+        result = router.process_query("teléfono mesa operativa ASI", metrics=metrics)
+
+        assert result.respuesta == "Compartida."
+        assert metrics.llm_coalesced is True
+        assert metrics.tokens_input == 0
+        assert metrics.tokens_output == 0
+        assert metrics.to_dict()["llm_coalesced"] is True
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test unitario: servidor LLM stand-in
+Verifica el protocolo chat-completions (JSON y SSE), la inyección de 429,
+el límite de requests por minuto y las respuestas echo/canned
+"""
+import sys
+import json
+import random
+import http.client
+import pytest
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.llm.standin_server import LatencyModel, StandinConfig, start_in_background
+
+PATH = "/openai/v1/chat/completions"
+MESSAGES = [
+    {"role": "system", "content": "Sos un asistente."},
+    {"role": "user", "content": "teléfono mesa operativa ASI"}
+]
+
+
+@pytest.fixture
+def standin():
+    """Levanta un servidor por test; devuelve una función post(body) -> (status, headers, body)"""
+    servers = []
+
+    def start(**config):
+        server, base_url = start_in_background(StandinConfig(**config))
+        servers.append(server)
+        url = urlparse(base_url)
+
+        def post(body, path=PATH):
+            conn = http.client.HTTPConnection(url.hostname, url.port, timeout=5)
+            conn.request("POST", path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            data = response.read().decode("utf-8")
+            conn.close()
+            return response.status, dict(response.getheaders()), data
+
+        post.server = server
+        return post
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestLatencyModel:
+    """Tests de las distribuciones de latencia"""
+
+    def test_fixed(self):
+        assert LatencyModel("fixed:250").sample(random.Random(1)) == 0.25
+
+    def test_uniform_en_rango_y_reproducible(self):
+        a = [LatencyModel("uniform:100,200").sample(random.Random(7)) for _ in range(3)]
+        b = [LatencyModel("uniform:100,200").sample(random.Random(7)) for _ in range(3)]
+        assert a == b
+        assert all(0.1 <= s <= 0.2 for s in a)
+
+    def test_normal_nunca_negativa(self):
+        model = LatencyModel("normal:0,100")
+        rng = random.Random(3)
+        assert all(model.sample(rng) >= 0 for _ in range(50))
+
+    @pytest.mark.parametrize("spec", ["gamma:1,2", "uniform:100", "fixed:1,2"])
+    def test_spec_invalida(self, spec):
+        with pytest.raises(ValueError):
+            LatencyModel(spec)
+
+
+class TestStandinServer:
+    """Tests del servidor HTTP"""
+
+    def test_completion_echo(self, standin):
+        post = standin()
+        status, _, data = post({"model": "llama-3.3-70b-versatile", "messages": MESSAGES, "max_tokens": 150})
+
+        assert status == 200
+        payload = json.loads(data)
+        assert payload["object"] == "chat.completion"
+        assert payload["model"] == "llama-3.3-70b-versatile"
+        assert payload["choices"][0]["message"]["content"] == "Respuesta a: teléfono mesa operativa ASI"
+        usage = payload["usage"]
+        assert usage["prompt_tokens"] > 0
+        assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+
+    def test_max_tokens_recorta(self, standin):
+        post = standin()
+        _, _, data = post({"model": "m", "messages": MESSAGES, "max_tokens": 2})
+        assert json.loads(data)["choices"][0]["message"]["content"] == "Respuesta a: "
+
+    def test_stream_sse(self, standin):
+        post = standin(mode="canned", default_response="uno dos tres")
+        status, headers, data = post({"model": "m", "messages": MESSAGES, "stream": True})
+
+        assert status == 200
+        assert headers["Content-Type"] == "text/event-stream"
+        events = [line[len("data: "):] for line in data.split("\n") if line.startswith("data: ")]
+        assert events[-1] == "[DONE]"
+        chunks = [json.loads(e) for e in events[:-1]]
+        text = "".join(c["choices"][0]["delta"].get("content") or "" for c in chunks)
+        assert text == "uno dos tres"
+        # Uso en x_groq del último chunk (como Groq)
+        assert chunks[-1]["x_groq"]["usage"]["completion_tokens"] > 0
+        assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+    def test_canned_por_palabra_clave(self, standin):
+        post = standin(mode="canned", canned={"mesa operativa": "0800-111-2222"})
+        _, _, data = post({"model": "m", "messages": MESSAGES})
+        assert json.loads(data)["choices"][0]["message"]["content"] == "0800-111-2222"
+
+    def test_429_inyectado(self, standin):
+        post = standin(error_rate_429=1.0, retry_after_seconds=2)
+        status, headers, data = post({"model": "m", "messages": MESSAGES})
+
+        assert status == 429
+        assert headers["retry-after"] == "2.00"
+        assert json.loads(data)["error"]["code"] == "rate_limit_exceeded"
+        assert post.server.RequestHandlerClass.llm.stats()["rejected_429"] == 1
+
+    def test_limite_rpm(self, standin):
+        post = standin(requests_per_minute=2)
+
+        first = post({"model": "m", "messages": MESSAGES})
+        second = post({"model": "m", "messages": MESSAGES})
+        third = post({"model": "m", "messages": MESSAGES})
+
+        assert first[0] == 200 and first[1]["x-ratelimit-remaining-requests"] == "1"
+        assert second[0] == 200 and second[1]["x-ratelimit-remaining-requests"] == "0"
+        assert third[0] == 429
+        assert float(third[1]["retry-after"]) > 50
+
+    def test_ruta_desconocida(self, standin):
+        post = standin()
+        status, _, _ = post({"model": "m", "messages": MESSAGES}, path="/v2/otra")
+        assert status == 404
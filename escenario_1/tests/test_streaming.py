@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test unitario: Streaming
+Verifica el editor progresivo (throttling) y el callback on_partial del router
+"""
+import sys
+import asyncio
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.core.streaming import ThrottledMessageEditor, MAX_MESSAGE_CHARS
+from escenario_1.metrics.collector import QueryMetrics
+
+
+class FakeChat:
+    """Registra envíos y ediciones como lo haría Telegram"""
+
+    def __init__(self):
+        self.sent = []
+        self.edits = []
+
+    async def send(self, text):
+        self.sent.append(text)
+        return len(self.sent)
+
+    async def edit(self, message, text):
+        self.edits.append((message, text))
+
+
+class TestThrottledMessageEditor:
+    """Tests del editor progresivo"""
+
+    def test_final_text_without_partials(self):
+        """Sin parciales, finish envía un único mensaje"""
+        chat = FakeChat()
+
+        async def scenario():
+            editor = ThrottledMessageEditor(chat.send, chat.edit, min_interval=0.01)
+            await editor.finish("Respuesta final")
+
+        asyncio.run(scenario())
+        assert chat.sent == ["Respuesta final"]
+        assert chat.edits == []
+
+    def test_partials_are_throttled(self):
+        """Muchos parciales seguidos generan pocas ediciones"""
+        chat = FakeChat()
+
+        async def scenario():
+            editor = ThrottledMessageEditor(chat.send, chat.edit, min_interval=0.05, min_chars=1)
+            text = ""
+            for i in range(100):
+                text += f"palabra{i} "
+                editor.push(text)
+                await asyncio.sleep(0.001)
+            await editor.finish(text.strip())
+
+        asyncio.run(scenario())
+        assert len(chat.sent) == 1
+        assert len(chat.edits) < 20
+        # El último texto visible es la respuesta completa, sin cursor
+        assert chat.edits[-1][1] == " ".join(f"palabra{i}" for i in range(100))
+
+    def test_min_chars_delays_first_message(self):
+        """No se envía nada hasta tener min_chars"""
+        chat = FakeChat()
+
+        async def scenario():
+            editor = ThrottledMessageEditor(chat.send, chat.edit, min_interval=0.01, min_chars=50)
+            editor.push("Hola")
+            await asyncio.sleep(0.05)
+            assert chat.sent == []
+            await editor.finish("Hola, respuesta completa")
+
+        asyncio.run(scenario())
+        assert chat.sent == ["Hola, respuesta completa"]
+
+    def test_long_text_is_truncated(self):
+        """Nunca se supera el límite de Telegram"""
+        chat = FakeChat()
+
+        async def scenario():
+            editor = ThrottledMessageEditor(chat.send, chat.edit)
+            await editor.finish("x" * (MAX_MESSAGE_CHARS + 100))
+
+        asyncio.run(scenario())
+        assert len(chat.sent[0]) == MAX_MESSAGE_CHARS
+
+
+class TestRouterStreaming:
+    """Integración on_partial con ConsultaRouter"""
+
+    def test_on_partial_receives_accumulated_text(self, make_router, fake_llm):
+        """Los parciales son prefijos crecientes de la respuesta final"""
+        router = make_router(cache={"enabled": False})
+        partials = []
+        metrics = QueryMetrics(query_text="telefono ASI")
+
+        result = router.process_query("telefono ASI", metrics=metrics, on_partial=partials.append)
+
+        assert len(partials) > 1
+        assert all(partials[i + 1].startswith(partials[i]) for i in range(len(partials) - 1))
+        assert partials[-1].strip() == result.respuesta
+        assert metrics.latency_first_token_ms > 0
+
+    def test_no_partials_without_llm(self, make_router):
+        """Sin entidad no hay LLM ni parciales"""
+        router = make_router()
+        partials = []
+        router.process_query("hola", on_partial=partials.append)
+        assert partials == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
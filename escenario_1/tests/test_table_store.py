@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test unitario: tablas ingestadas
+Verifica el parseo de chunks de tabla (pipes y líneas con monto), la
+consulta indexada con su confianza y que el router responda precios sin
+RAG ni LLM
+"""
+import sys
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_1.rag.table_store import TableStore, parse_amount, parse_table
+from escenario_1.core.cascade import CascadeRouter
+from escenario_1.metrics.collector import QueryMetrics
+
+PIPE_TABLE = (
+    "COSEGUROS ENSALUD\n"
+    "| Prestación | Delta Plus | Quantum |\n"
+    "|---|---|---|\n"
+    "| Médico de familia / pediatra | $1553 | Sin cargo |\n"
+    "| Médico especialista | $2912 | Sin cargo |\n"
+    "| Imágenes baja complejidad | $971 | Sin cargo |\n"
+    "| Imágenes alta complejidad | $4854 | Sin cargo |\n"
+    "| Kinesiología (sesión) | $971 | Sin cargo |"
+)
+VALUE_LINES = (
+    "Valores de coseguro\n"
+    "Laboratorio básico: $971\n"
+    "APB: $6000\n"
+    "Médico especialista: $2912"
+)
+CHUNKS = [
+    {"obra_social": "ENSALUD", "chunk_id": "t1", "texto": PIPE_TABLE, "es_tabla": True, "tabla_numero": 1},
+    {"obra_social": "ENSALUD", "chunk_id": "t2", "texto": VALUE_LINES, "es_tabla": True, "tabla_numero": 2},
+    {"obra_social": "ENSALUD", "chunk_id": "texto", "texto": "APB: $1", "es_tabla": False},
+]
+
+
+@pytest.fixture
+def store():
+    store = TableStore()
+    store.add_chunks(CHUNKS)
+    yield store
+    store.close()
+
+
+class TestParseTable:
+    """Tests del parseo de chunks de tabla"""
+
+    def test_tabla_con_pipes(self):
+        rows = parse_table(PIPE_TABLE)
+        assert len(rows) == 10
+        assert (rows[2].prestacion, rows[2].plan, rows[2].valor) == ("Médico especialista", "Delta Plus", 2912.0)
+        assert rows[3].valor_texto == "Sin cargo" and rows[3].valor is None
+
+    def test_lineas_con_monto(self):
+        rows = parse_table(VALUE_LINES)
+        assert [(r.prestacion, r.valor_texto) for r in rows] == [
+            ("Laboratorio básico", "$971"), ("APB", "$6000"), ("Médico especialista", "$2912")
+        ]
+
+    def test_parse_amount(self):
+        assert parse_amount("$2.912,50") == 2912.5
+        assert parse_amount("Sin cargo") is None
+
+
+class TestLookup:
+    """Tests de la consulta indexada"""
+
+    def test_solo_chunks_de_tabla(self, store):
+        assert store.count() == 13
+
+    @pytest.mark.parametrize("query,respuesta", [
+        ("valor APB ENSALUD", "APB: $6000"),
+        ("coseguro laboratorio básico ENSALUD", "Laboratorio básico: $971"),
+        ("tarifa consulta pediatra ENSALUD", "Médico de familia / pediatra: Delta Plus: $1553 | Quantum: Sin cargo"),
+        ("cuanto sale kinesiología ENSALUD", "Kinesiología (sesión): Delta Plus: $971 | Quantum: Sin cargo"),
+        ("coseguro médico especialista plan delta plus", "Médico especialista: $2912 (plan Delta Plus)"),
+    ])
+    def test_valor_exacto(self, store, query, respuesta):
+        answer = store.lookup("ENSALUD", query, ignore_terms=("ENSALUD",))
+        assert answer.respuesta == respuesta
+        assert answer.confidence == 1.0
+
+    def test_prestacion_ambigua_baja_la_confianza(self, store):
+        """'imágenes' nombra dos filas con valores distintos"""
+        assert store.lookup("ENSALUD", "coseguro imágenes ENSALUD").confidence < 0.8
+
+    def test_prestacion_parcial_no_alcanza_el_umbral(self, store):
+        """'internación' no nombra 'Internación domiciliaria', aunque sea la única candidata"""
+        store.add_chunks([{
+            "obra_social": "ENSALUD", "chunk_id": "t3", "es_tabla": True, "tabla_numero": 3,
+            "texto": "Internación domiciliaria: $5000"
+        }])
+        answer = store.lookup("ENSALUD", "valor internación ensalud", ignore_terms=("ENSALUD",))
+        assert answer.prestacion == "Internación domiciliaria"
+        assert answer.confidence <= 0.5
+        assert store.lookup("ENSALUD", "especialista ENSALUD", ignore_terms=("ENSALUD",)).confidence <= 0.5
+
+    def test_filtra_por_obra_social(self, store):
+        assert store.lookup("ASI", "valor APB") is None
+
+    def test_reingesta_reemplaza_las_filas(self, store):
+        store.add_chunks([{**CHUNKS[1], "texto": "APB: $7000"}])
+        assert store.lookup("ENSALUD", "valor APB").respuesta == "APB: $7000"
+        assert store.lookup("ENSALUD", "coseguro laboratorio básico") is None
+
+
+class TestRouterTables:
+    """El router responde precios de tabla sin RAG ni LLM"""
+
+    def test_precio_sin_rag_ni_llm(self, make_router, store, fake_retriever, fake_llm):
+        router = make_router(table_store=store)
+        metrics = QueryMetrics(query_text="q")
+
+        result = router.process_query("valor APB ENSALUD", metrics=metrics)
+
+        assert result.respuesta == "APB: $6000"
+        assert result.table_lookup and not result.rag_executed
+        assert fake_retriever.calls == 0 and fake_llm.calls == 0
+        assert metrics.table_lookup and metrics.tokens_total == 0
+        assert CascadeRouter(router).process_query("valor APB ENSALUD").tier == "tabla"
+
+    def test_pregunta_sin_monto_usa_el_rag(self, make_router, store, fake_retriever):
+        router = make_router(table_store=store)
+        router.process_query("mail de auditoría ENSALUD")
+        assert fake_retriever.calls == 1
+
+    def test_confianza_baja_usa_el_llm(self, make_router, store, fake_llm):
+        router = make_router(table_store=store)
+        result = router.process_query("coseguro imágenes ENSALUD")
+        assert not result.table_lookup
+        assert fake_llm.calls == 1
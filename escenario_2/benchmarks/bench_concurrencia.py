@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark: lecturas durante escrituras
+======================================
+
+N workers consultan requisitos y coseguros mientras un supervisor escribe
+en loop (cada escritura mantiene la transacción abierta HOLD_MS, como un
+commit lento a disco). Compara:
+
+- compartida: una sola conexión con un lock alrededor de cada operación
+  (la forma segura de compartir la conexión que usaba ConsultaBot)
+- wal: ConnectionManager (lector read-only por thread + escritor único)
+- memoria: MemorySnapshot (lecturas de la copia en memoria de cada
+  thread, escrituras al disco y copia nueva tras cada commit)
+
+Reporta lecturas/s y latencia de lectura p50/p95/max.
+
+Uso:
+    python escenario_2/benchmarks/bench_concurrencia.py [workers] [segundos]
+"""
+import sys
+import time
+import sqlite3
+import tempfile
+import threading
+import contextlib
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_2.core.db import ConnectionManager, MemorySnapshot
+from escenario_2.core.normalizer import Normalizer
+from escenario_2.core.query_engine import QueryEngine
+from escenario_2.data.init_db import init_database, seed_ensalud
+
+HOLD_MS = 20           # Transacción de escritura abierta
+WRITE_PAUSE_MS = 5     # Pausa del supervisor entre escrituras
+
+QUERIES = ["internación ensalud", "guardia ensalud", "ambulatorio ensalud", "traslados ensalud"]
+
+
+def _create_db(directory: Path) -> Path:
+    path = directory / "obras_sociales.db"
+    with contextlib.redirect_stdout(None):
+        conn = init_database(str(path))
+        seed_ensalud(conn)
+    conn.close()
+    return path
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _write(conn: sqlite3.Connection, n: int):
+    conn.execute(
+        "INSERT OR REPLACE INTO sinonimos (palabra, categoria, valor_normalizado) VALUES (?, 'prestacion', 'bench')",
+        (f"bench_{n % 10}",)
+    )
+    time.sleep(HOLD_MS / 1000)
+
+
+def run(mode: str, workers: int, seconds: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _create_db(Path(tmp))
+
+        if mode in ("wal", "memoria"):
+            db = ConnectionManager(path) if mode == "wal" else MemorySnapshot(path)
+            lock = contextlib.nullcontext()
+
+            def write(n):
+                with db.writer() as conn:
+                    _write(conn, n)
+        else:
+            db = sqlite3.connect(path, check_same_thread=False)
+            lock = threading.RLock()
+
+            def write(n):
+                with lock:
+                    _write(db, n)
+                    db.commit()
+
+        normalizer = Normalizer(db)
+        engine = QueryEngine(db)
+        normalized = [normalizer.normalize(q) for q in QUERIES]
+
+        stop = threading.Event()
+        latencies = [[] for _ in range(workers)]
+        writes = 0
+
+        def reader(i: int):
+            n = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                with lock:
+                    engine.query(normalized[n % len(normalized)])
+                    engine.query_coseguros("ENSALUD")
+                latencies[i].append((time.perf_counter() - start) * 1000)
+                n += 1
+
+        def supervisor():
+            nonlocal writes
+            while not stop.is_set():
+                write(writes)
+                writes += 1
+                time.sleep(WRITE_PAUSE_MS / 1000)
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(workers)]
+        threads.append(threading.Thread(target=supervisor))
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        db.close()
+
+    all_latencies = [ms for worker in latencies for ms in worker]
+    return len(all_latencies) / seconds, all_latencies, writes
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+
+    print("=" * 72)
+    print(f"LECTURAS DURANTE ESCRITURAS - {workers} workers, {seconds:.0f}s por modo")
+    print(f"Escritura: transacción abierta {HOLD_MS}ms, pausa {WRITE_PAUSE_MS}ms")
+    print("=" * 72)
+    print(f"{'modo':<12}{'lecturas/s':>12}{'p50 (ms)':>11}{'p95 (ms)':>11}{'max (ms)':>11}{'escrituras':>12}")
+
+    for mode in ("compartida", "wal", "memoria"):
+        reads_per_s, latencies, writes = run(mode, workers, seconds)
+        print(
+            f"{mode:<12}{reads_per_s:>12.0f}{percentile(latencies, 0.5):>11.2f}"
+            f"{percentile(latencies, 0.95):>11.2f}{max(latencies, default=0):>11.2f}{writes:>12}"
+        )
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
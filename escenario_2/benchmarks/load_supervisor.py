@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Load test: event loop de Telegram con escrituras de supervisor
+==============================================================
+
+N chats mandan consultas (ChatDispatcher.run_async + AsyncQueryEngine)
+mientras un supervisor agrega y quita restricciones en loop. Cada
+escritura hace commit, recarga el RestrictionIndex y recalcula la
+AnswerTable de la obra social. Compara:
+
+- bloqueante: el handler de supervisor llama a engine.add_restriccion
+  directo (como antes): todo eso corre en el event loop
+- async: el handler espera a AsyncQueryEngine (threads de base de datos)
+
+Un heartbeat cada HEARTBEAT_MS mide el lag del event loop (cuánto tarda
+en despertar de más): es lo que siente cada chat esperando su respuesta.
+
+Uso:
+    python escenario_2/benchmarks/load_supervisor.py [chats] [mensajes_por_chat]
+"""
+import sys
+import time
+import asyncio
+import tempfile
+import contextlib
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_2.core.answer_table import AnswerTable
+from escenario_2.core.async_engine import AsyncQueryEngine
+from escenario_2.core.db import ConnectionManager
+from escenario_2.core.dispatcher import ChatDispatcher
+from escenario_2.core.normalizer import Normalizer
+from escenario_2.core.query_engine import QueryEngine
+from escenario_2.data.init_db import init_database, seed_ensalud
+
+HEARTBEAT_MS = 5
+MESSAGE_GAP_MS = 2     # Pausa entre mensajes de un mismo chat
+DB_WORKERS = 4
+
+QUERIES = ["internación ensalud", "guardia ensalud", "ambulatorio ensalud", "coseguros ensalud"]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _create_db(directory: Path) -> Path:
+    path = directory / "obras_sociales.db"
+    with contextlib.redirect_stdout(None):
+        conn = init_database(str(path))
+        seed_ensalud(conn)
+    conn.close()
+    return path
+
+
+async def run(mode: str, chats: int, per_chat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConnectionManager(_create_db(Path(tmp)))
+        normalizer = Normalizer(db)
+        engine = QueryEngine(db)
+        answers = AnswerTable(normalizer, engine)
+        aengine = AsyncQueryEngine(engine, max_workers=DB_WORKERS)
+        dispatcher = ChatDispatcher(max_workers=DB_WORKERS)
+
+        def process(text: str) -> str:
+            normalized = normalizer.normalize(text)
+            return answers.get(normalized, coseguros="coseguro" in text) or engine.query(normalized).respuesta
+
+        async def handle_message(chat: int, n: int):
+            await asyncio.sleep(n * MESSAGE_GAP_MS / 1000)
+            start = time.perf_counter()
+            await dispatcher.run_async(chat, aengine.run, process, QUERIES[(chat + n) % len(QUERIES)])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        async def supervisor():
+            nonlocal writes
+            while not done.is_set():
+                if mode == "async":
+                    await aengine.add_restriccion("ENSALUD", "falta_pago", "Solo guardia", tipos_permitidos="guardia")
+                    await aengine.remove_restriccion("ENSALUD")
+                else:
+                    engine.add_restriccion("ENSALUD", "falta_pago", "Solo guardia", tipos_permitidos="guardia")
+                    engine.remove_restriccion("ENSALUD")
+                writes += 2
+                await asyncio.sleep(0)
+
+        async def heartbeat():
+            while not done.is_set():
+                expected = time.perf_counter() + HEARTBEAT_MS / 1000
+                await asyncio.sleep(HEARTBEAT_MS / 1000)
+                lags.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+        latencies, lags, writes = [], [], 0
+        done = asyncio.Event()
+        background = [asyncio.create_task(supervisor()), asyncio.create_task(heartbeat())]
+
+        start = time.perf_counter()
+        await asyncio.gather(*[handle_message(chat, n) for chat in range(chats) for n in range(per_chat)])
+        elapsed = time.perf_counter() - start
+        done.set()
+        await asyncio.gather(*background)
+
+        aengine.shutdown()
+        dispatcher.shutdown()
+        db.close()
+
+    return elapsed, latencies, lags, writes
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    per_chat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print("=" * 78)
+    print(f"LOAD TEST - {chats} chats x {per_chat} mensajes con supervisor escribiendo en loop")
+    print("=" * 78)
+    print(f"{'modo':<12}{'total (s)':>10}{'msg p50':>10}{'msg p95':>10}{'lag p95':>10}{'lag max':>10}{'escrituras':>12}")
+
+    for mode in ("bloqueante", "async"):
+        elapsed, latencies, lags, writes = asyncio.run(run(mode, chats, per_chat))
+        print(
+            f"{mode:<12}{elapsed:>10.2f}{percentile(latencies, 0.5):>9.1f}ms{percentile(latencies, 0.95):>8.1f}ms"
+            f"{percentile(lags, 0.95):>8.1f}ms{max(lags, default=0):>8.1f}ms{writes:>12}"
+        )
+    print("=" * 78)
+    print("lag = demora extra del event loop en despertar (0 = responde al instante)")
+
+
+if __name__ == "__main__":
+    main()
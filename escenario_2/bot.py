@@ -16,12 +16,17 @@ Comandos de supervisor (requieren PIN):
 - /restricciones:PIN [OBRA_SOCIAL]
 
 El mensaje con PIN se borra automáticamente.
+
+Las consultas corren en un pool de workers (BOT_MAX_WORKERS, default 4)
+con orden FIFO por chat; el event loop de Telegram nunca ejecuta SQL de
+consultas ni de comandos de supervisor: los handlers esperan con await
+al AsyncQueryEngine (threads de base de datos). Con BOT_DB_IN_MEMORY=1 las
+lecturas salen de una copia en memoria de la base (ver core/db.py).
 """
 import os
 import re
 import sys
 import logging
-import sqlite3
 from pathlib import Path
 from functools import wraps
 from dotenv import load_dotenv
@@ -33,7 +38,12 @@ from telegram.ext import Application, CommandHandler, MessageHandler, filters, C
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from escenario_2.core.normalizer import Normalizer
+from escenario_2.core.normalized_text import NormalizedText
 from escenario_2.core.query_engine import QueryEngine
+from escenario_2.core.answer_table import AnswerTable
+from escenario_2.core.async_engine import AsyncQueryEngine
+from escenario_2.core.db import ConnectionManager, MemorySnapshot
+from escenario_2.core.dispatcher import ChatDispatcher
 
 # Configurar logging
 logging.basicConfig(
@@ -174,19 +184,31 @@ def supervisor_required(func):
 class ConsultaBot:
     """Bot de consultas sin LLM."""
 
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, in_memory: bool = False, db_workers: int = 4):
         """
         Inicializa el bot.
 
         Args:
             db_path: Ruta a la base de datos SQLite
+            in_memory: Leer de copias en memoria (las escrituras van al disco)
+            db_workers: Threads de base de datos del AsyncQueryEngine
         """
         if db_path is None:
             db_path = Path(__file__).parent / "data" / "obras_sociales.db"
 
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.normalizer = Normalizer(self.conn)
-        self.engine = QueryEngine(self.conn)
+        if in_memory:
+            self.db = MemorySnapshot(db_path)
+        else:
+            # WAL: cada worker lee con su conexión read-only; los comandos de
+            # supervisor escriben por un único escritor sin frenar las consultas
+            self.db = ConnectionManager(db_path)
+        self.normalizer = Normalizer(self.db)
+        self.engine = QueryEngine(self.db)
+        # Respuestas renderizadas al arrancar; se invalidan con los comandos
+        # de supervisor, add_sinonimo y el vencimiento de restricciones
+        self.answers = AnswerTable(self.normalizer, self.engine)
+        # API async para los handlers (nunca SQL en el event loop)
+        self.aengine = AsyncQueryEngine(self.engine, max_workers=db_workers)
 
         logger.info(f"Bot inicializado con DB: {db_path}")
 
@@ -200,31 +222,48 @@ class ConsultaBot:
         Returns:
             Respuesta formateada
         """
-        # 1. Normalizar
-        normalized = self.normalizer.normalize(text)
+        # 1. Normalizar (una sola pasada, compartida por los pasos siguientes)
+        text_normalized = NormalizedText.from_text(text)
+        normalized = self.normalizer.normalize(text_normalized)
         logger.info(f"Normalizado: {normalized.to_dict()}")
 
         # 2. Detectar si es consulta de coseguros
-        text_lower = text.lower()
+        text_lower = text_normalized.folded
         if any(word in text_lower for word in ['coseguro', 'copago', 'pago', 'valor', 'precio']):
             if normalized.obra_social:
+                answer = self.answers.get(normalized, coseguros=True)
+                if answer is not None:
+                    return answer
                 result = self.engine.query_coseguros(normalized.obra_social)
                 return result.respuesta
 
-        # 3. Query normal por tipo de ingreso
+        # 3. Query normal por tipo de ingreso (precalculada si es completa)
+        answer = self.answers.get(normalized)
+        if answer is not None:
+            return answer
         result = self.engine.query(normalized)
         return result.respuesta
 
+    async def aprocess_message(self, text: str) -> str:
+        """process_message en un thread de base de datos (para los handlers)"""
+        return await self.aengine.run(self.process_message, text)
+
 
 # Instancia global del bot
 bot_instance: ConsultaBot = None
 
+# Pool de workers (se crea en main)
+dispatcher: ChatDispatcher = None
+
 
 def get_bot() -> ConsultaBot:
     """Obtiene o crea la instancia del bot."""
     global bot_instance
     if bot_instance is None:
-        bot_instance = ConsultaBot()
+        bot_instance = ConsultaBot(
+            in_memory=os.getenv("BOT_DB_IN_MEMORY", "0") == "1",
+            db_workers=int(os.getenv("BOT_MAX_WORKERS", "4"))
+        )
     return bot_instance
 
 
@@ -291,14 +330,15 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler para mensajes de texto."""
     user_text = update.message.text
     user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
 
     logger.info(f"[User {user_id}] Mensaje: {user_text}")
 
     try:
         bot = get_bot()
-        response = bot.process_message(user_text)
+        response, queue_ms = await dispatcher.run_async(chat_id, bot.aprocess_message, user_text)
 
-        logger.info(f"[User {user_id}] Respuesta: {response[:100]}...")
+        logger.info(f"[User {user_id}] Respuesta ({queue_ms:.0f}ms en cola): {response[:100]}...")
 
         await update.message.reply_text(response)
 
@@ -371,7 +411,7 @@ async def restriccion_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     # Agregar restricción
     bot = get_bot()
-    success = bot.engine.add_restriccion(
+    success = await bot.aengine.add_restriccion(
         obra_social=obra_social,
         tipo_restriccion=tipo_restriccion,
         mensaje=mensaje,
@@ -424,7 +464,7 @@ async def quitar_restriccion_command(update: Update, context: ContextTypes.DEFAU
     tipo_restriccion = args[1].lower() if len(args) > 1 else None
 
     bot = get_bot()
-    count = bot.engine.remove_restriccion(obra_social, tipo_restriccion)
+    count = await bot.aengine.remove_restriccion(obra_social, tipo_restriccion)
 
     if count > 0:
         response = "👤 Acción de supervisor\n\n"
@@ -456,7 +496,7 @@ async def listar_restricciones_command(update: Update, context: ContextTypes.DEF
     obra_social = args[0].upper() if args else None
 
     bot = get_bot()
-    restricciones = bot.engine.list_restricciones(obra_social)
+    restricciones = await bot.aengine.list_restricciones(obra_social)
 
     if not restricciones:
         response = "👤 Acción de supervisor\n\n"
@@ -513,8 +553,18 @@ def main():
         logger.error("Ejecutá primero: python escenario_2/data/init_db.py")
         sys.exit(1)
 
-    # Crear aplicación
-    application = Application.builder().token(token).build()
+    # Orden FIFO por chat; el SQL corre en los threads del AsyncQueryEngine
+    global dispatcher
+    max_workers = int(os.getenv("BOT_MAX_WORKERS", "4"))
+    dispatcher = ChatDispatcher(max_workers=max_workers)
+    logger.info(f"Dispatcher: {max_workers} workers")
+
+    # Abrir la base y precalcular respuestas antes de atender (fuera del event loop)
+    get_bot()
+
+    # Crear aplicación (concurrent_updates: los chats no se esperan entre sí;
+    # el orden dentro de cada chat lo garantiza el dispatcher)
+    application = Application.builder().token(token).concurrent_updates(True).build()
 
     # Agregar handlers - Comandos generales
     application.add_handler(CommandHandler("start", start_command))
@@ -1,11 +1,20 @@
 """Core modules for Escenario 2."""
+from .normalized_text import NormalizedText
 from .normalizer import Normalizer, NormalizedQuery, get_normalizer
 from .query_engine import QueryEngine, QueryResult
+from .answer_table import AnswerTable
+from .async_engine import AsyncQueryEngine
+from .db import ConnectionManager, MemorySnapshot
 
 __all__ = [
+    "NormalizedText",
     "Normalizer",
     "NormalizedQuery",
     "get_normalizer",
     "QueryEngine",
-    "QueryResult"
+    "QueryResult",
+    "AnswerTable",
+    "AsyncQueryEngine",
+    "ConnectionManager",
+    "MemorySnapshot"
 ]
@@ -0,0 +1,171 @@
+"""
+Respuestas precalculadas para Escenario 2.
+
+El espacio de respuestas es chico: obras sociales × tipos de ingreso, más
+el listado de coseguros de cada obra social. Sin esta tabla, cada mensaje
+corre dos JOINs (restricciones y requisitos), arma sqlite3.Row y formatea
+el texto. AnswerTable renderiza todas las respuestas al arrancar (con el
+mismo QueryEngine) y las sirve con un lookup en un dict.
+
+Invalidación precisa:
+- add_restriccion / remove_restriccion → se recalcula esa obra social
+- add_sinonimo → obra social nueva: se calcula; tipo de ingreso nuevo:
+  se recalcula todo
+- una restricción empieza (fecha_inicio) o vence (fecha_fin) → recálculo
+  completo al pasar la medianoche de ese día (UTC, igual que date('now')
+  de SQLite)
+- commit de otra conexión (RestrictionIndex lo detecta con data_version)
+  → recálculo completo
+
+Los recálculos se serializan con _rebuild_lock (render y reemplazo del
+dict juntos): uno más viejo no pisa el resultado de uno más nuevo.
+"""
+import math
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from .normalizer import Normalizer, NormalizedQuery
+from .query_engine import QueryEngine
+
+logger = logging.getLogger(__name__)
+
+INGRESO = "ingreso"
+COSEGUROS = "coseguros"
+
+
+class AnswerTable:
+    """Respuestas renderizadas por (obra social, tipo de ingreso) y coseguros (thread-safe)"""
+
+    def __init__(self, normalizer: Normalizer, engine: QueryEngine):
+        """
+        Args:
+            normalizer: Normalizador (sus sinónimos definen obras sociales y tipos)
+            engine: Motor de consultas que renderiza cada respuesta
+        """
+        self.normalizer = normalizer
+        self.engine = engine
+
+        self._answers: Dict[Tuple, str] = {}
+        self._expires_at = math.inf
+        self._stale = False
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+        normalizer.add_listener(self._on_sinonimo)
+        engine.add_listener(self.refresh)
+        engine.restrictions.add_listener(self._on_reload)
+        self.rebuild()
+
+    def _obras_sociales(self):
+        return sorted(set(self.normalizer.sinonimos["obra_social"].values()))
+
+    def _tipos_ingreso(self):
+        return sorted(set(self.normalizer.sinonimos["tipo_ingreso"].values()))
+
+    def _render(self, obra_social: str) -> Dict[Tuple, str]:
+        """Todas las respuestas de una obra social"""
+        answers = {
+            (INGRESO, obra_social, tipo): self.engine.query(
+                NormalizedQuery(obra_social=obra_social, tipo_ingreso=tipo)
+            ).respuesta
+            for tipo in self._tipos_ingreso()
+        }
+        answers[(COSEGUROS, obra_social)] = self.engine.query_coseguros(obra_social).respuesta
+        return answers
+
+    def _next_boundary(self) -> float:
+        """Próxima medianoche (UTC) en la que empieza o vence una restricción"""
+        return self.engine.restrictions.next_wakeup()
+
+    def rebuild(self):
+        """Recalcula todas las respuestas"""
+        with self._rebuild_lock:
+            # Un commit externo visto durante el render deja _stale en True
+            self._stale = False
+            answers = {}
+            for obra_social in self._obras_sociales():
+                answers.update(self._render(obra_social))
+            expires_at = self._next_boundary()
+
+            with self._lock:
+                self._answers = answers
+                self._expires_at = expires_at
+                self.rebuilds += 1
+        logger.info(f"AnswerTable: {len(answers)} respuestas precalculadas")
+
+    def refresh(self, obra_social: str):
+        """Recalcula las respuestas de una obra social (cambio de restricciones)"""
+        with self._rebuild_lock:
+            answers = self._render(obra_social)
+            expires_at = self._next_boundary()
+
+            with self._lock:
+                merged = {key: value for key, value in self._answers.items() if key[1] != obra_social}
+                merged.update(answers)
+                self._answers = merged
+                self._expires_at = expires_at
+        logger.info(f"AnswerTable: respuestas de {obra_social} recalculadas")
+
+    def _on_sinonimo(self, categoria: str, valor: str):
+        if categoria == "obra_social":
+            self.refresh(valor)
+        elif categoria == "tipo_ingreso":
+            self.rebuild()
+
+    def _on_reload(self):
+        # Puede llegar en medio de un _render: se marca y recalcula get()
+        self._stale = True
+
+    def _expire(self):
+        """Recálculo completo si hubo un commit externo o empezó o venció una restricción"""
+        with self._rebuild_lock:
+            if self._stale:
+                logger.info("AnswerTable: restricciones cambiadas por otra conexión")
+                self.rebuild()
+            elif time.time() >= self._expires_at:
+                logger.info("AnswerTable: empezó o venció una restricción")
+                self.rebuild()
+
+    def get(self, normalized: NormalizedQuery, coseguros: bool = False) -> Optional[str]:
+        """
+        Respuesta precalculada.
+
+        Args:
+            normalized: Query normalizada
+            coseguros: True para el listado de coseguros de la obra social
+
+        Returns:
+            Texto de la respuesta, o None si la query no tiene respuesta
+            precalculada (falta obra social o tipo de ingreso)
+        """
+        self.engine.restrictions.refresh_if_due()
+        if self._stale or time.time() >= self._expires_at:
+            self._expire()
+
+        if coseguros:
+            key = (COSEGUROS, normalized.obra_social)
+        else:
+            key = (INGRESO, normalized.obra_social, normalized.tipo_ingreso)
+
+        with self._lock:
+            answer = self._answers.get(key)
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return answer
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "answers": len(self._answers),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rebuilds": self.rebuilds
+            }
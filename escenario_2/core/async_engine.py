@@ -0,0 +1,81 @@
+"""
+API async del QueryEngine para los handlers de Telegram.
+
+Los comandos de supervisor llamaban a add_restriccion / remove_restriccion
+/ list_restricciones directamente dentro del handler async: el commit, la
+recarga del RestrictionIndex y el recálculo de AnswerTable corrían en el
+event loop y frenaban a todos los chats mientras tanto.
+
+AsyncQueryEngine encola cada llamada en sus threads de base de datos
+(ThreadPoolExecutor = threads + cola de pedidos) y el handler la espera
+con await:
+
+- max_workers=1: un único thread de base de datos; alcanza con una
+  sqlite3.Connection suelta (abierta con check_same_thread=False)
+- max_workers>1: lecturas en paralelo; requiere ConnectionManager o
+  MemorySnapshot (una conexión de lectura por thread). Las escrituras
+  igual pasan de a una por el escritor.
+"""
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from .normalizer import NormalizedQuery
+from .query_engine import QueryEngine, QueryResult
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncQueryEngine:
+    """QueryEngine con métodos async que corren en threads de base de datos"""
+
+    def __init__(self, engine: QueryEngine, max_workers: int = 1, thread_name_prefix: str = "sqlite"):
+        """
+        Args:
+            engine: Motor de consultas sincrónico
+            max_workers: Threads de base de datos (ver docstring del módulo)
+            thread_name_prefix: Prefijo de los threads
+        """
+        self.engine = engine
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecuta fn(*args, **kwargs) en un thread de base de datos"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def query(self, normalized: NormalizedQuery) -> QueryResult:
+        return await self.run(self.engine.query, normalized)
+
+    async def query_coseguros(self, obra_social: str, plan: str = None) -> QueryResult:
+        return await self.run(self.engine.query_coseguros, obra_social, plan)
+
+    async def add_restriccion(
+        self,
+        obra_social: str,
+        tipo_restriccion: str,
+        mensaje: str,
+        tipos_bloqueados: str = None,
+        tipos_permitidos: str = None,
+        fecha_fin: str = None
+    ) -> bool:
+        return await self.run(
+            self.engine.add_restriccion,
+            obra_social, tipo_restriccion, mensaje,
+            tipos_bloqueados=tipos_bloqueados,
+            tipos_permitidos=tipos_permitidos,
+            fecha_fin=fecha_fin
+        )
+
+    async def remove_restriccion(self, obra_social: str, tipo_restriccion: str = None) -> int:
+        return await self.run(self.engine.remove_restriccion, obra_social, tipo_restriccion)
+
+    async def list_restricciones(self, obra_social: str = None) -> List[Dict]:
+        return await self.run(self.engine.list_restricciones, obra_social)
+
+    def shutdown(self, wait: bool = True):
+        """Espera los pedidos en curso y libera los threads"""
+        self._executor.shutdown(wait=wait)
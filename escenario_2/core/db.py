@@ -0,0 +1,233 @@
+"""
+Capa de conexiones SQLite para Escenario 2.
+
+ConsultaBot abría una sola conexión (check_same_thread=False) compartida
+por los workers del dispatcher y los comandos de supervisor: el commit()
+de add_restriccion frenaba las lecturas y usar la misma conexión desde
+varios threads a la vez no es seguro.
+
+ConnectionManager:
+- WAL: los lectores no esperan al escritor; synchronous=NORMAL,
+  mmap_size y cache_size para lecturas en memoria
+- Cada thread lee con su propia conexión read-only (URI mode=ro)
+- Las escrituras pasan por un único escritor serializado con un lock
+
+MemorySnapshot (BOT_DB_IN_MEMORY=1): la base pesa unos cientos de KB y
+casi no se escribe. Cada thread lector lee de su propia copia en memoria
+(Connection.backup del archivo), sin páginas de archivo ni locks
+compartidos. Las escrituras van solo al disco; tras cada commit las
+copias se vuelven a sacar con backup en el próximo reader() de cada
+thread, así date('now'), lastrowid y los ids son los del disco. Cambios
+hechos al disco por otros procesos no se ven hasta la próxima escritura
+propia o un reinicio.
+
+QueryEngine, Normalizer y RestrictionIndex aceptan un ConnectionManager,
+un MemorySnapshot o una sqlite3.Connection (SingleConnection: la misma
+conexión para leer y escribir, como antes).
+"""
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024      # 256 MB
+DEFAULT_CACHE_SIZE_KIB = 16 * 1024         # 16 MB por conexión
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+
+
+class SingleConnection:
+    """Una sola conexión para leer y escribir (tests, SQLTier de escenario_1)"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._write_lock = threading.RLock()
+
+    def reader(self) -> sqlite3.Connection:
+        return self.conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Transacción de escritura: commit al salir, rollback si falla"""
+        with self._write_lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class ConnectionManager:
+    """WAL + un lector read-only por thread + un único escritor (thread-safe)"""
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        mmap_size: int = DEFAULT_MMAP_SIZE,
+        cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB,
+        busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS
+    ):
+        """
+        Args:
+            db_path: Ruta a la base SQLite (debe existir: init_db.py)
+            mmap_size: Bytes mapeados en memoria por conexión
+            cache_size_kib: Cache de páginas por conexión (KiB)
+            busy_timeout_ms: Espera ante un lock antes de fallar
+        """
+        self.db_path = Path(db_path).resolve()
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"No existe la base {self.db_path}")
+
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+
+        # Escritor: fija WAL (persistente en el archivo) antes de abrir lectores
+        self._writer = self._connect(str(self.db_path), uri=False)
+        mode = self._writer.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        self._writer.execute("PRAGMA synchronous = NORMAL")
+        if mode.lower() != "wal":
+            logger.warning(f"SQLite: journal_mode={mode} (sin WAL) en {self.db_path}")
+
+        # data_version visto desde fuera del escritor: cambia con cada commit
+        self._monitor = self._connect(self._read_only_uri(), uri=True)
+        self._monitor_lock = threading.Lock()
+
+        logger.info(f"ConnectionManager: {self.db_path} (journal_mode={mode})")
+
+    def _read_only_uri(self) -> str:
+        return f"{self.db_path.as_uri()}?mode=ro"
+
+    def _connect(self, target: str, uri: bool) -> sqlite3.Connection:
+        # check_same_thread=False solo para poder cerrarlas desde close()
+        conn = sqlite3.connect(target, uri=uri, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """Conexión read-only del thread actual (se crea en el primer uso)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect(self._read_only_uri(), uri=True)
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Transacción de escritura en el único escritor: commit al salir, rollback si falla"""
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+
+    def data_version(self) -> int:
+        """Cambia cada vez que alguna conexión (incluido el escritor) hace commit"""
+        with self._monitor_lock:
+            return self._monitor.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self._monitor.close()
+        self._writer.close()
+
+
+class MemorySnapshot:
+    """Copia en memoria por thread para leer + escritor en disco (thread-safe)"""
+
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        Args:
+            db_path: Ruta a la base SQLite (debe existir: init_db.py)
+        """
+        self.db_path = Path(db_path).resolve()
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"No existe la base {self.db_path}")
+
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._version = 0
+
+        self._disk = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._disk.row_factory = sqlite3.Row
+        logger.info(f"MemorySnapshot: {self.db_path} (copias en memoria por thread)")
+
+    def reader(self) -> sqlite3.Connection:
+        """Copia en memoria del thread actual (se crea o actualiza si hubo escrituras)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            # backup igual puede escribir la copia; query_only frena el resto
+            conn.execute("PRAGMA query_only = 1")
+            self._local.conn = conn
+            self._local.version = None
+            with self._readers_lock:
+                self._readers.append(conn)
+
+        if self._local.version != self._version:
+            # Con el lock: el backup no ve una transacción del escritor a medias
+            with self._write_lock:
+                self._disk.backup(conn)
+                self._local.version = self._version
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Transacción en disco: commit al salir, rollback si falla"""
+        with self._write_lock:
+            try:
+                yield self._disk
+                self._disk.commit()
+                self._version += 1
+            except Exception:
+                self._disk.rollback()
+                raise
+
+    def data_version(self) -> int:
+        """Cambia con cada escritura (solo este proceso refresca las copias)"""
+        return self._version
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self._disk.close()
+
+
+Database = Union[ConnectionManager, MemorySnapshot, SingleConnection]
+
+
+def as_database(conn: Union[sqlite3.Connection, Database]) -> Database:
+    """Envuelve una sqlite3.Connection suelta en SingleConnection"""
+    if isinstance(conn, sqlite3.Connection):
+        return SingleConnection(conn)
+    return conn
@@ -0,0 +1,82 @@
+"""
+Migraciones del schema de Escenario 2.
+
+La versión aplicada se guarda en PRAGMA user_version: bases creadas con
+un schema.sql anterior se actualizan al abrirlas (QueryEngine llama a
+migrate) sin volver a correr init_db.py.
+
+Versiones:
+1. restriccion_tipos: tipos_bloqueados / tipos_permitidos ('internacion,
+   ambulatorio') pasan a una fila por tipo con índice compuesto. Las
+   columnas TEXT se mantienen para mostrarlas en /restricciones.
+"""
+import logging
+import sqlite3
+from typing import FrozenSet, Optional
+
+logger = logging.getLogger(__name__)
+
+BLOQUEADO = "bloqueado"
+PERMITIDO = "permitido"
+
+
+def parse_tipos(value: Optional[str]) -> FrozenSet[str]:
+    """'internacion, ambulatorio' → frozenset({'internacion', 'ambulatorio'})"""
+    if not value:
+        return frozenset()
+    return frozenset(t.strip() for t in value.split(',') if t.strip())
+
+
+def insert_tipos(
+    conn: sqlite3.Connection,
+    restriccion_id: int,
+    tipos_bloqueados: Optional[str],
+    tipos_permitidos: Optional[str]
+):
+    """Filas de restriccion_tipos de una restricción (sin commit)"""
+    rows = [(restriccion_id, tipo, BLOQUEADO) for tipo in parse_tipos(tipos_bloqueados)]
+    rows += [(restriccion_id, tipo, PERMITIDO) for tipo in parse_tipos(tipos_permitidos)]
+    conn.executemany("""
+        INSERT OR IGNORE INTO restriccion_tipos (restriccion_id, tipo_ingreso, modo)
+        VALUES (?, ?, ?)
+    """, rows)
+
+
+def _v1_restriccion_tipos(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS restriccion_tipos (
+            restriccion_id INTEGER NOT NULL,
+            tipo_ingreso TEXT NOT NULL,
+            modo TEXT NOT NULL,
+            PRIMARY KEY (restriccion_id, modo, tipo_ingreso),
+            FOREIGN KEY (restriccion_id) REFERENCES restricciones(id)
+        ) WITHOUT ROWID
+    """)
+    rows = conn.execute("""
+        SELECT id, tipos_bloqueados, tipos_permitidos FROM restricciones
+        WHERE id NOT IN (SELECT restriccion_id FROM restriccion_tipos)
+    """).fetchall()
+    for restriccion_id, tipos_bloqueados, tipos_permitidos in rows:
+        insert_tipos(conn, restriccion_id, tipos_bloqueados, tipos_permitidos)
+
+
+MIGRATIONS = [
+    _v1_restriccion_tipos,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Aplica las migraciones pendientes (cada una en su transacción).
+
+    Returns:
+        Versión del schema después de migrar
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        with conn:
+            MIGRATIONS[target - 1](conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+        logger.info(f"Schema migrado a la versión {target}")
+    return max(version, SCHEMA_VERSION)
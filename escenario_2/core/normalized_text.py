@@ -0,0 +1,114 @@
+"""
+Texto normalizado compartido entre etapas del pipeline.
+
+Antes cada etapa normalizaba la query por su cuenta (EntityDetector._normalize,
+query_rewriter._normalize_for_matching, Normalizer.normalize de escenario_2),
+cada una con su propia pasada lowercase/NFD/categoría.
+
+NormalizedText se calcula UNA vez por request y contiene todas las formas:
+- original:  texto tal cual lo escribió el usuario
+- lower:     lowercase
+- folded:    lowercase sin tildes (conserva puntuación)
+- text:      folded sin puntuación y con espacios colapsados
+- tokens:    palabras de `text`
+- bigrams:   pares de palabras consecutivas
+
+Implementación con tablas de str.translate (una pasada en C) en lugar de
+unicodedata.normalize + filtro por carácter en Python.
+"""
+import string
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+
+
+def _build_accent_table() -> Dict[int, Optional[str]]:
+    """
+    Tabla de traducción carácter acentuado → carácter base.
+
+    Se construye una sola vez con NFD sobre los bloques Latin-1 Supplement y
+    Latin Extended (equivale al filtro por categoría 'Mn' del código anterior).
+    Las marcas combinantes sueltas (texto ya descompuesto) se eliminan.
+    """
+    table: Dict[int, Optional[str]] = {}
+    for code in range(0x00C0, 0x0250):
+        char = chr(code)
+        decomposed = unicodedata.normalize('NFD', char)
+        base = ''.join(c for c in decomposed if unicodedata.category(c) != 'Mn')
+        if base != char:
+            table[code] = base
+    for code in range(0x0300, 0x0370):
+        table[code] = None
+    return table
+
+
+# Puntuación a reemplazar por espacio (incluye signos de apertura del español
+# y comillas tipográficas). El guion bajo se conserva como parte de palabra.
+PUNCTUATION = ''.join(c for c in string.punctuation if c != '_') + '¿¡«»“”‘’'
+
+_ACCENT_TABLE = _build_accent_table()
+_PUNCTUATION_TABLE = str.maketrans({c: ' ' for c in PUNCTUATION})
+
+
+@dataclass(frozen=True)
+class NormalizedText:
+    """Formas normalizadas de un texto, calculadas una sola vez"""
+    original: str
+    lower: str
+    folded: str
+    text: str
+    tokens: Tuple[str, ...]
+    bigrams: Tuple[str, ...]
+
+    @classmethod
+    def from_text(cls, text: str) -> "NormalizedText":
+        """
+        Normaliza un texto.
+
+        "¿Cuánto cuesta en ENSALUD?" →
+            folded="¿cuanto cuesta en ensalud?", text="cuanto cuesta en ensalud"
+        """
+        text = text or ""
+        lower = text.lower()
+        folded = lower.translate(_ACCENT_TABLE)
+        tokens = tuple(folded.translate(_PUNCTUATION_TABLE).split())
+        bigrams = tuple(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return cls(
+            original=text,
+            lower=lower,
+            folded=folded,
+            text=" ".join(tokens),
+            tokens=tokens,
+            bigrams=bigrams
+        )
+
+    @property
+    def padded(self) -> str:
+        """`text` con espacios en los extremos (matching por palabra completa)"""
+        return f" {self.text} "
+
+    def ngrams(self, n: int) -> Tuple[str, ...]:
+        """N-gramas de palabras (n=1 tokens, n=2 bigrams)"""
+        if n == 1:
+            return self.tokens
+        if n == 2:
+            return self.bigrams
+        return tuple(
+            " ".join(self.tokens[i:i + n])
+            for i in range(len(self.tokens) - n + 1)
+        )
+
+    def __str__(self) -> str:
+        return self.original
+
+
+def normalize_text(value: Union[str, NormalizedText]) -> NormalizedText:
+    """Devuelve el NormalizedText de `value` (sin recalcular si ya lo es)"""
+    if isinstance(value, NormalizedText):
+        return value
+    return NormalizedText.from_text(value)
+
+
+def fold(text: str) -> str:
+    """Forma canónica (`text`) de un string de configuración (aliases, patrones)"""
+    return NormalizedText.from_text(text).text
@@ -7,10 +7,12 @@ Usa la tabla de sinónimos para convertir:
 - "pediatra" → "consulta_pediatra"
 """
 import sqlite3
-import re
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 
+from .db import Database, as_database
+from .normalized_text import NormalizedText, normalize_text, fold
+
 
 @dataclass
 class NormalizedQuery:
@@ -39,10 +41,21 @@ class Normalizer:
     Normaliza el input del usuario usando sinónimos de la DB.
     """
 
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
+    def __init__(self, conn: Union[sqlite3.Connection, Database]):
+        self.db = as_database(conn)
+        # Avisos de sinónimos nuevos (ej: AnswerTable agrega la obra social o el tipo)
+        self._listeners: List[Callable[[str, str], None]] = []
         self._load_sinonimos()
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexión de lectura del thread actual"""
+        return self.db.reader()
+
+    def add_listener(self, callback: Callable[[str, str], None]):
+        """Registra un callback(categoria, valor) que se llama en cada add_sinonimo."""
+        self._listeners.append(callback)
+
     def _load_sinonimos(self):
         """Carga todos los sinónimos en memoria para búsqueda rápida."""
         cursor = self.conn.cursor()
@@ -54,29 +67,27 @@ class Normalizer:
             "prestacion": {}
         }
 
+        # Claves en forma canónica (sin tildes): "internación" e "internacion"
+        # comparten entrada
         for palabra, categoria, valor in cursor.fetchall():
-            self.sinonimos[categoria][palabra.lower()] = valor
+            self.sinonimos[categoria][fold(palabra)] = valor
 
-    def normalize(self, text: str) -> NormalizedQuery:
+    def normalize(self, text: Union[str, NormalizedText]) -> NormalizedQuery:
         """
         Normaliza un texto de usuario.
 
         Args:
-            text: Texto libre del usuario (ej: "internación ensalud")
+            text: Texto libre del usuario (ej: "internación ensalud") o su
+                  NormalizedText si ya fue calculado
 
         Returns:
             NormalizedQuery con los valores detectados
         """
-        result = NormalizedQuery(raw_text=text)
-
-        # Limpiar y tokenizar
-        text_lower = text.lower()
-        # Remover puntuación pero mantener espacios
-        text_clean = re.sub(r'[^\w\s]', ' ', text_lower)
-        words = text_clean.split()
+        normalized = normalize_text(text)
+        result = NormalizedQuery(raw_text=normalized.original)
 
         # Buscar matches en cada categoría
-        for word in words:
+        for word in normalized.tokens:
             # Buscar obra social
             if word in self.sinonimos["obra_social"]:
                 result.obra_social = self.sinonimos["obra_social"][word]
@@ -90,9 +101,7 @@ class Normalizer:
                 result.prestacion = self.sinonimos["prestacion"][word]
 
         # También buscar frases de 2 palabras (ej: "asi salud", "en salud")
-        for i in range(len(words) - 1):
-            phrase = f"{words[i]} {words[i+1]}"
-
+        for phrase in normalized.bigrams:
             if phrase in self.sinonimos["obra_social"]:
                 result.obra_social = self.sinonimos["obra_social"][phrase]
 
@@ -100,15 +109,17 @@ class Normalizer:
 
     def add_sinonimo(self, palabra: str, categoria: str, valor: str):
         """Agrega un nuevo sinónimo a la DB y al cache."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT OR IGNORE INTO sinonimos (palabra, categoria, valor_normalizado)
-            VALUES (?, ?, ?)
-        """, (palabra.lower(), categoria, valor))
-        self.conn.commit()
+        with self.db.writer() as conn:
+            conn.execute("""
+                INSERT OR IGNORE INTO sinonimos (palabra, categoria, valor_normalizado)
+                VALUES (?, ?, ?)
+            """, (palabra.lower(), categoria, valor))
 
         # Actualizar cache
-        self.sinonimos[categoria][palabra.lower()] = valor
+        self.sinonimos[categoria][fold(palabra)] = valor
+
+        for callback in self._listeners:
+            callback(categoria, valor)
 
 
 def get_normalizer(db_path: str = None) -> Normalizer:
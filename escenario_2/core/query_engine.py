@@ -4,10 +4,13 @@ Motor de consultas SQL para Escenario 2.
 Sin LLM - Solo lookup + formateo.
 """
 import sqlite3
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List, Union
 from dataclasses import dataclass
 
+from .db import Database, as_database
 from .normalizer import NormalizedQuery
+from .migrations import insert_tipos, migrate
+from .restriction_index import RestrictionIndex
 
 
 @dataclass
@@ -29,9 +32,33 @@ class QueryEngine:
     3. Formatea respuesta
     """
 
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
-        self.conn.row_factory = sqlite3.Row
+    def __init__(self, conn: Union[sqlite3.Connection, Database]):
+        """
+        Args:
+            conn: Conexión SQLite, ConnectionManager o MemorySnapshot (ver core/db.py)
+        """
+        if isinstance(conn, sqlite3.Connection):
+            conn.row_factory = sqlite3.Row
+        self.db = as_database(conn)
+        with self.db.writer() as writer:
+            migrate(writer)
+        # Restricciones activas en memoria (se recargan en add/remove_restriccion)
+        self.restrictions = RestrictionIndex(self.db)
+        # Avisos de cambios en restricciones (ej: AnswerTable recalcula esa obra social)
+        self._listeners: List[Callable[[str], None]] = []
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexión de lectura del thread actual"""
+        return self.db.reader()
+
+    def add_listener(self, callback: Callable[[str], None]):
+        """Registra un callback(obra_social) que se llama al cambiar sus restricciones."""
+        self._listeners.append(callback)
+
+    def _notify(self, obra_social: str):
+        for callback in self._listeners:
+            callback(obra_social)
 
     def query(self, normalized: NormalizedQuery) -> QueryResult:
         """
@@ -81,41 +108,7 @@ class QueryEngine:
 
     def _check_restricciones(self, obra_social: str, tipo_ingreso: str) -> Optional[Dict]:
         """Verifica si hay restricciones activas para esta obra social y tipo."""
-        cursor = self.conn.cursor()
-
-        cursor.execute("""
-            SELECT r.*, os.nombre as obra_social_nombre
-            FROM restricciones r
-            JOIN obras_sociales os ON r.obra_social_id = os.id
-            WHERE os.codigo = ?
-              AND r.activa = 1
-              AND (r.fecha_fin IS NULL OR r.fecha_fin >= date('now'))
-              AND r.fecha_inicio <= date('now')
-        """, (obra_social,))
-
-        restricciones = cursor.fetchall()
-
-        for rest in restricciones:
-            tipos_bloqueados = rest['tipos_bloqueados']
-            tipos_permitidos = rest['tipos_permitidos']
-
-            # Si no hay ni bloqueados ni permitidos → bloquea TODO
-            if not tipos_bloqueados and not tipos_permitidos:
-                return dict(rest)
-
-            # Si hay lista de bloqueados, verificar si este tipo está
-            if tipos_bloqueados:
-                bloqueados = [t.strip() for t in tipos_bloqueados.split(',')]
-                if tipo_ingreso in bloqueados:
-                    return dict(rest)
-
-            # Si hay lista de permitidos, bloquear los que NO están
-            if tipos_permitidos:
-                permitidos = [t.strip() for t in tipos_permitidos.split(',')]
-                if tipo_ingreso not in permitidos:
-                    return dict(rest)
-
-        return None
+        return self.restrictions.check(obra_social, tipo_ingreso)
 
     def _get_requisitos(self, obra_social: str, tipo_ingreso: str) -> Optional[sqlite3.Row]:
         """Obtiene requisitos de la DB."""
@@ -347,23 +340,26 @@ class QueryEngine:
         Returns:
             True si se agregó correctamente
         """
-        cursor = self.conn.cursor()
-
-        # Obtener ID de obra social
-        cursor.execute("SELECT id FROM obras_sociales WHERE codigo = ?", (obra_social,))
-        result = cursor.fetchone()
-        if not result:
-            return False
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
 
-        os_id = result[0]
+            # Obtener ID de obra social
+            cursor.execute("SELECT id FROM obras_sociales WHERE codigo = ?", (obra_social,))
+            result = cursor.fetchone()
+            if not result:
+                return False
 
-        cursor.execute("""
-            INSERT INTO restricciones
-            (obra_social_id, tipo_restriccion, mensaje, tipos_bloqueados, tipos_permitidos, fecha_inicio, fecha_fin)
-            VALUES (?, ?, ?, ?, ?, date('now'), ?)
-        """, (os_id, tipo_restriccion, mensaje, tipos_bloqueados, tipos_permitidos, fecha_fin))
+            os_id = result[0]
 
-        self.conn.commit()
+            cursor.execute("""
+                INSERT INTO restricciones
+                (obra_social_id, tipo_restriccion, mensaje, tipos_bloqueados, tipos_permitidos, fecha_inicio, fecha_fin)
+                VALUES (?, ?, ?, ?, ?, date('now'), ?)
+            """, (os_id, tipo_restriccion, mensaje, tipos_bloqueados, tipos_permitidos, fecha_fin))
+            insert_tipos(conn, cursor.lastrowid, tipos_bloqueados, tipos_permitidos)
+
+        self.restrictions.reload()
+        self._notify(obra_social)
         return True
 
     def remove_restriccion(self, obra_social: str, tipo_restriccion: str = None) -> int:
@@ -377,23 +373,26 @@ class QueryEngine:
         Returns:
             Número de restricciones desactivadas
         """
-        cursor = self.conn.cursor()
-
-        if tipo_restriccion:
-            cursor.execute("""
-                UPDATE restricciones SET activa = 0
-                WHERE obra_social_id = (SELECT id FROM obras_sociales WHERE codigo = ?)
-                  AND tipo_restriccion = ?
-                  AND activa = 1
-            """, (obra_social, tipo_restriccion))
-        else:
-            cursor.execute("""
-                UPDATE restricciones SET activa = 0
-                WHERE obra_social_id = (SELECT id FROM obras_sociales WHERE codigo = ?)
-                  AND activa = 1
-            """, (obra_social,))
-
-        self.conn.commit()
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+
+            if tipo_restriccion:
+                cursor.execute("""
+                    UPDATE restricciones SET activa = 0
+                    WHERE obra_social_id = (SELECT id FROM obras_sociales WHERE codigo = ?)
+                      AND tipo_restriccion = ?
+                      AND activa = 1
+                """, (obra_social, tipo_restriccion))
+            else:
+                cursor.execute("""
+                    UPDATE restricciones SET activa = 0
+                    WHERE obra_social_id = (SELECT id FROM obras_sociales WHERE codigo = ?)
+                      AND activa = 1
+                """, (obra_social,))
+
+        if cursor.rowcount:
+            self.restrictions.reload()
+            self._notify(obra_social)
         return cursor.rowcount
 
     def list_restricciones(self, obra_social: str = None) -> List[Dict]:
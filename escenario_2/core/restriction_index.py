@@ -0,0 +1,174 @@
+"""
+Índice en memoria de restricciones activas para Escenario 2.
+
+_check_restricciones corría un JOIN con date('now') en cada consulta y
+volvía a partir los strings 'internacion,ambulatorio' de tipos_bloqueados
+y tipos_permitidos. RestrictionIndex carga una vez las restricciones
+vigentes o futuras, con sus tipos (tabla restriccion_tipos) en
+frozensets, y las agrupa por obra social: el chequeo es un lookup en un
+dict.
+
+Vigencia:
+- Se programa un despertador (wake_at) para la próxima medianoche UTC en
+  la que una restricción empieza (fecha_inicio) o vence (día siguiente a
+  fecha_fin); al pasarlo se recalcula qué restricciones están activas.
+  UTC, igual que date('now') de SQLite.
+- add_restriccion / remove_restriccion recargan el índice (reload).
+- Commits de otras conexiones (ej: el bot de escenario_2 mientras la
+  cascada de escenario_1 lee la misma base) se detectan con
+  PRAGMA data_version, sin leer tablas, y se avisan a los listeners
+  (AnswerTable recalcula sus respuestas).
+
+Lee con el lector del thread actual (ver core/db.py).
+"""
+import math
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple, Union
+
+from .db import Database, as_database
+from .migrations import BLOQUEADO, PERMITIDO
+
+
+def _utc_midnight(day: date) -> float:
+    """Epoch de las 00:00 UTC de ese día"""
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+
+
+def _utc_today(now: float) -> date:
+    return datetime.fromtimestamp(now, timezone.utc).date()
+
+
+@dataclass(frozen=True)
+class IndexedRestriccion:
+    """Restricción con sus tipos pre-parseados"""
+    data: Dict                    # fila de restricciones + obra_social_nombre
+    bloqueados: FrozenSet[str]
+    permitidos: FrozenSet[str]
+    fecha_inicio: date
+    fecha_fin: Optional[date]     # None = indefinida
+
+    def is_active(self, today: date) -> bool:
+        return self.fecha_inicio <= today and (self.fecha_fin is None or self.fecha_fin >= today)
+
+    def blocks(self, tipo_ingreso: str) -> bool:
+        """True si la restricción aplica a este tipo de ingreso"""
+        # Si no hay ni bloqueados ni permitidos → bloquea TODO
+        if not self.bloqueados and not self.permitidos:
+            return True
+        if tipo_ingreso in self.bloqueados:
+            return True
+        # Si hay lista de permitidos, bloquear los que NO están
+        return bool(self.permitidos) and tipo_ingreso not in self.permitidos
+
+
+class RestrictionIndex:
+    """Restricciones activas por obra social (thread-safe)"""
+
+    def __init__(self, conn: Union[sqlite3.Connection, Database]):
+        self.db = as_database(conn)
+        self._lock = threading.Lock()
+
+        self._pending: Tuple[IndexedRestriccion, ...] = ()
+        self._active: Dict[str, Tuple[IndexedRestriccion, ...]] = {}
+        self._today: Optional[date] = None
+        self._data_version: Optional[int] = None
+        self.wake_at = math.inf
+        self._listeners: List[Callable[[], None]] = []
+
+        self.reload()
+
+    def add_listener(self, callback: Callable[[], None]):
+        """callback() cuando se recarga por un commit de otra conexión"""
+        self._listeners.append(callback)
+
+    def reload(self):
+        """Recarga las restricciones desde la base (cambios de supervisor)"""
+        # La versión se lee antes: un commit durante la carga fuerza otra recarga
+        data_version = self.db.data_version()
+        conn = self.db.reader()
+        cursor = conn.execute("""
+            SELECT r.*, os.codigo AS obra_social_codigo, os.nombre AS obra_social_nombre
+            FROM restricciones r
+            JOIN obras_sociales os ON r.obra_social_id = os.id
+            WHERE r.activa = 1
+              AND (r.fecha_fin IS NULL OR r.fecha_fin >= date('now'))
+            ORDER BY r.id
+        """)
+        columns = [c[0] for c in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        tipos: Dict[Tuple[int, str], set] = {}
+        for restriccion_id, tipo_ingreso, modo in conn.execute("""
+            SELECT t.restriccion_id, t.tipo_ingreso, t.modo
+            FROM restriccion_tipos t
+            JOIN restricciones r ON t.restriccion_id = r.id
+            WHERE r.activa = 1
+        """):
+            tipos.setdefault((restriccion_id, modo), set()).add(tipo_ingreso)
+
+        pending = []
+        for data in rows:
+            codigo = data.pop("obra_social_codigo")
+            pending.append((codigo, IndexedRestriccion(
+                data=data,
+                bloqueados=frozenset(tipos.get((data["id"], BLOQUEADO), ())),
+                permitidos=frozenset(tipos.get((data["id"], PERMITIDO), ())),
+                fecha_inicio=date.fromisoformat(str(data["fecha_inicio"])[:10]),
+                fecha_fin=date.fromisoformat(str(data["fecha_fin"])[:10]) if data["fecha_fin"] else None
+            )))
+
+        with self._lock:
+            self._pending = tuple(pending)
+            self._data_version = data_version
+            self._schedule(_utc_today(time.time()))
+
+    def _schedule(self, today: date):
+        """Activas de hoy y próximo despertador (con el lock tomado)"""
+        active: Dict[str, list] = {}
+        boundaries = []
+        for codigo, rest in self._pending:
+            if rest.is_active(today):
+                active.setdefault(codigo, []).append(rest)
+            elif rest.fecha_inicio > today:
+                boundaries.append(rest.fecha_inicio)
+            if rest.fecha_fin is not None and rest.fecha_fin >= today:
+                boundaries.append(rest.fecha_fin + timedelta(days=1))
+
+        self._active = {codigo: tuple(rests) for codigo, rests in active.items()}
+        self._today = today
+        self.wake_at = _utc_midnight(min(boundaries)) if boundaries else math.inf
+
+    def next_wakeup(self) -> float:
+        """Epoch de la próxima medianoche en la que cambia alguna restricción"""
+        self.refresh_if_due()
+        return self.wake_at
+
+    def refresh_if_due(self):
+        """Recarga si otra conexión hizo commit; recalcula las activas si pasó wake_at"""
+        if self.db.data_version() != self._data_version:
+            self.reload()
+            for callback in self._listeners:
+                callback()
+            return
+        now = time.time()
+        if now >= self.wake_at:
+            with self._lock:
+                if now >= self.wake_at:
+                    self._schedule(_utc_today(now))
+
+    def check(self, obra_social: str, tipo_ingreso: str) -> Optional[Dict]:
+        """
+        Primera restricción activa que aplica a la obra social y el tipo.
+
+        Returns:
+            Fila de la restricción (con obra_social_nombre) o None
+        """
+        self.refresh_if_due()
+        for rest in self._active.get(obra_social, ()):
+            if rest.blocks(tipo_ingreso):
+                return dict(rest.data)
+        return None
@@ -4,9 +4,14 @@ Inicialización de la base de datos SQLite para Escenario 2.
 Uso:
     python escenario_2/data/init_db.py
 """
+import sys
 import sqlite3
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from escenario_2.core.migrations import migrate
+
 
 def init_database(db_path: str = None) -> sqlite3.Connection:
     """
@@ -31,6 +36,7 @@ def init_database(db_path: str = None) -> sqlite3.Connection:
         schema = f.read()
 
     conn.executescript(schema)
+    migrate(conn)
 
     # Insertar sinónimos base
     _seed_sinonimos(conn)
@@ -71,6 +71,16 @@ CREATE TABLE IF NOT EXISTS restricciones (
     FOREIGN KEY (obra_social_id) REFERENCES obras_sociales(id)
 );
 
+-- Tipos de ingreso de cada restricción (tipos_bloqueados / tipos_permitidos
+-- normalizados; sin filas = bloquea todo). Ver core/migrations.py
+CREATE TABLE IF NOT EXISTS restriccion_tipos (
+    restriccion_id INTEGER NOT NULL,
+    tipo_ingreso TEXT NOT NULL,            -- 'internacion', 'guardia'
+    modo TEXT NOT NULL,                    -- 'bloqueado' o 'permitido'
+    PRIMARY KEY (restriccion_id, modo, tipo_ingreso),
+    FOREIGN KEY (restriccion_id) REFERENCES restricciones(id)
+) WITHOUT ROWID;
+
 -- Índices para búsquedas rápidas
 CREATE INDEX IF NOT EXISTS idx_requisitos_tipo ON requisitos(tipo_ingreso);
 CREATE INDEX IF NOT EXISTS idx_coseguros_plan ON coseguros(plan);
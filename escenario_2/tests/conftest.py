@@ -0,0 +1,24 @@
+"""
+Fixtures compartidas para tests de Escenario 2.
+
+Cada test recibe una base SQLite temporal inicializada con schema + datos
+semilla (no toca data/obras_sociales.db).
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import pytest
+
+from escenario_2.data.init_db import init_database, seed_ensalud
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Ruta a una base temporal con schema y datos de ENSALUD"""
+    path = tmp_path / "obras_sociales.db"
+    conn = init_database(str(path))
+    seed_ensalud(conn)
+    conn.close()
+    return path
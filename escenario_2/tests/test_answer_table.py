@@ -0,0 +1,118 @@
+"""
+Tests de la tabla de respuestas precalculadas.
+
+Verifica que cada respuesta sea idéntica a la del QueryEngine y que se
+invalide con los comandos de supervisor, add_sinonimo y el vencimiento
+de restricciones.
+"""
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import sqlite3
+import pytest
+
+from escenario_2.core.answer_table import AnswerTable
+from escenario_2.core.normalizer import Normalizer, NormalizedQuery
+from escenario_2.core.query_engine import QueryEngine
+
+
+@pytest.fixture
+def components(db_path):
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    normalizer = Normalizer(conn)
+    engine = QueryEngine(conn)
+    yield normalizer, engine, AnswerTable(normalizer, engine)
+    conn.close()
+
+
+def test_respuestas_iguales_al_engine(components):
+    normalizer, engine, table = components
+    for text in ["internación ensalud", "guardia ensalud", "ambulatorio ensalud"]:
+        normalized = normalizer.normalize(text)
+        assert table.get(normalized) == engine.query(normalized).respuesta
+
+    normalized = normalizer.normalize("coseguros ensalud")
+    assert table.get(normalized, coseguros=True) == engine.query_coseguros("ENSALUD").respuesta
+    assert table.stats()["hits"] == 4
+
+
+def test_query_incompleta_no_tiene_respuesta(components):
+    normalizer, _, table = components
+    assert table.get(normalizer.normalize("ensalud")) is None
+    assert table.get(normalizer.normalize("internación")) is None
+
+
+def test_restriccion_invalida_la_obra_social(components):
+    normalizer, engine, table = components
+    normalized = normalizer.normalize("internación ensalud")
+
+    engine.add_restriccion("ENSALUD", "falta_pago", "ENSALUD con pagos pendientes", tipos_permitidos="guardia")
+    assert "⛔" in table.get(normalized)
+    assert "⛔" not in table.get(normalizer.normalize("guardia ensalud"))
+
+    engine.remove_restriccion("ENSALUD")
+    assert "⛔" not in table.get(normalized)
+    assert table.get(normalized) == engine.query(normalized).respuesta
+
+
+def test_sinonimo_nuevo_agrega_respuestas(components):
+    normalizer, engine, table = components
+    normalizer.add_sinonimo("hospitalizacion", "tipo_ingreso", "hospitalizacion")
+    normalized = NormalizedQuery(obra_social="ENSALUD", tipo_ingreso="hospitalizacion")
+    assert table.get(normalized) == engine.query(normalized).respuesta
+
+
+def test_vencimiento_de_restriccion_recalcula(components, monkeypatch):
+    normalizer, engine, table = components
+    normalized = normalizer.normalize("internación ensalud")
+    engine.add_restriccion("ENSALUD", "cupo", "Sin cupo", tipos_bloqueados="internacion", fecha_fin="2999-12-31")
+    assert table._expires_at < float("inf")
+    assert "⛔" in table.get(normalized)
+
+    # Pasa la medianoche del día siguiente a fecha_fin
+    later = table._expires_at + 1
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert "⛔" not in table.get(normalized)
+    assert table._expires_at == float("inf")
+
+
+def test_commit_de_otra_conexion_recalcula(components, db_path):
+    normalizer, engine, table = components
+    normalized = normalizer.normalize("internación ensalud")
+    assert "⛔" not in table.get(normalized)
+
+    other = sqlite3.connect(db_path)
+    engine_other = QueryEngine(other)
+    engine_other.add_restriccion("ENSALUD", "cupo", "Sin cupo", tipos_bloqueados="internacion")
+    other.close()
+
+    assert "⛔" in table.get(normalized)
+    assert table.get(normalized) == engine.query(normalized).respuesta
+
+
+def test_recalculo_viejo_no_pisa_uno_nuevo(components):
+    """Un refresh que renderizó antes de la restricción termina después que el de add_restriccion"""
+    normalizer, engine, table = components
+    normalized = normalizer.normalize("internación ensalud")
+    render = table._render
+    rendered = threading.Event()
+
+    def slow_render(obra_social):
+        answers = render(obra_social)
+        if not rendered.is_set():
+            rendered.set()
+            time.sleep(0.2)
+        return answers
+
+    table._render = slow_render
+    stale = threading.Thread(target=table.refresh, args=("ENSALUD",))
+    stale.start()
+    assert rendered.wait(timeout=5)
+    engine.add_restriccion("ENSALUD", "cupo", "Sin cupo", tipos_bloqueados="internacion")
+    stale.join()
+
+    assert "⛔" in table.get(normalized)
@@ -0,0 +1,96 @@
+"""
+Tests del QueryEngine async (threads de base de datos para los handlers).
+"""
+import sys
+import asyncio
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import sqlite3
+import pytest
+
+from escenario_2.core.async_engine import AsyncQueryEngine
+from escenario_2.core.db import ConnectionManager
+from escenario_2.core.normalizer import Normalizer
+from escenario_2.core.query_engine import QueryEngine
+
+
+@pytest.fixture
+def single(db_path):
+    """Conexión suelta: un único thread de base de datos"""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    engine = QueryEngine(conn)
+    aengine = AsyncQueryEngine(engine)
+    yield Normalizer(conn), aengine
+    aengine.shutdown()
+    conn.close()
+
+
+def test_mismas_respuestas_que_el_engine(single):
+    normalizer, aengine = single
+    normalized = normalizer.normalize("internación ensalud")
+
+    async def scenario():
+        return await aengine.query(normalized), await aengine.query_coseguros("ENSALUD")
+
+    result, coseguros = asyncio.run(scenario())
+    assert result.respuesta == aengine.engine.query(normalized).respuesta
+    assert coseguros.respuesta == aengine.engine.query_coseguros("ENSALUD").respuesta
+
+
+def test_restricciones_async(single):
+    normalizer, aengine = single
+
+    async def scenario():
+        added = await aengine.add_restriccion("ENSALUD", "falta_pago", "Solo guardia", tipos_permitidos="guardia")
+        listed = await aengine.list_restricciones("ENSALUD")
+        blocked = await aengine.query(normalizer.normalize("internación ensalud"))
+        removed = await aengine.remove_restriccion("ENSALUD")
+        return added, listed, blocked, removed
+
+    added, listed, blocked, removed = asyncio.run(scenario())
+    assert added and removed == 1
+    assert listed[0]["mensaje"] == "Solo guardia"
+    assert "⛔" in blocked.respuesta
+
+
+def test_corre_fuera_del_event_loop(single):
+    _, aengine = single
+
+    async def scenario():
+        return await aengine.run(lambda: threading.current_thread().name)
+
+    assert asyncio.run(scenario()).startswith("sqlite")
+
+
+def test_el_loop_sigue_atendiendo_durante_escrituras(db_path):
+    """Con ConnectionManager: consultas y escrituras concurrentes sin errores"""
+    db = ConnectionManager(db_path)
+    engine = QueryEngine(db)
+    aengine = AsyncQueryEngine(engine, max_workers=4)
+    normalized = Normalizer(db).normalize("guardia ensalud")
+    ticks = []
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(1)
+            await asyncio.sleep(0)
+
+    async def supervisor():
+        for _ in range(5):
+            await aengine.add_restriccion("ENSALUD", "cupo", "Sin cupo", tipos_bloqueados="internacion")
+            await aengine.remove_restriccion("ENSALUD")
+
+    async def scenario():
+        queries = [aengine.query(normalized) for _ in range(40)]
+        results = await asyncio.gather(supervisor(), ticker(), *queries)
+        return results[2:]
+
+    results = asyncio.run(scenario())
+    aengine.shutdown()
+    db.close()
+
+    assert all(r.success and "⛔" not in r.respuesta for r in results)
+    assert len(ticks) == 10
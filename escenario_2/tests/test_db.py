@@ -0,0 +1,165 @@
+"""
+Tests de la capa de conexiones (WAL, lector por thread, escritor único)
+y de la copia en memoria que se vuelve a sacar del disco tras cada escritura.
+"""
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import sqlite3
+import pytest
+
+from escenario_2.core.db import ConnectionManager, MemorySnapshot
+from escenario_2.core.normalizer import Normalizer
+from escenario_2.core.query_engine import QueryEngine
+
+
+@pytest.fixture
+def db(db_path):
+    manager = ConnectionManager(db_path)
+    yield manager
+    manager.close()
+
+
+def test_wal_y_pragmas(db):
+    assert db.reader().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with db.writer() as conn:
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert db.reader().execute("PRAGMA mmap_size").fetchone()[0] > 0
+
+
+def test_lector_por_thread_y_read_only(db):
+    main_reader = db.reader()
+    assert db.reader() is main_reader
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db.reader()))
+    thread.start()
+    thread.join()
+    assert other[0] is not main_reader
+
+    with pytest.raises(sqlite3.OperationalError):
+        main_reader.execute("DELETE FROM sinonimos")
+
+
+def test_lecturas_no_esperan_al_escritor(db):
+    """Con la transacción de escritura abierta, otro thread sigue leyendo"""
+    engine = QueryEngine(db)
+    normalized = Normalizer(db).normalize("internación ensalud")
+    writing = threading.Event()
+    done = threading.Event()
+
+    def supervisor():
+        with db.writer() as conn:
+            conn.execute("UPDATE requisitos SET documentacion = 'nueva'")
+            writing.set()
+            done.wait(timeout=5)
+
+    thread = threading.Thread(target=supervisor)
+    thread.start()
+    writing.wait(timeout=5)
+    before = engine.query(normalized)
+    done.set()
+    thread.join()
+
+    assert before.success
+    assert before.data["documentacion"] != "nueva"
+
+
+def test_escrituras_visibles_para_los_lectores(db):
+    engine = QueryEngine(db)
+    normalizer = Normalizer(db)
+    events = []
+    engine.add_listener(events.append)
+
+    assert engine.add_restriccion("ENSALUD", "falta_pago", "Solo guardia", tipos_permitidos="guardia")
+    assert "⛔" in engine.query(normalizer.normalize("internación ensalud")).respuesta
+    assert engine.list_restricciones("ENSALUD")[0]["tipos_permitidos"] == "guardia"
+    assert events == ["ENSALUD"]
+
+    normalizer.add_sinonimo("sanatorio", "tipo_ingreso", "internacion")
+    assert db.reader().execute("SELECT COUNT(*) FROM sinonimos WHERE palabra = 'sanatorio'").fetchone()[0] == 1
+
+
+def test_base_inexistente(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ConnectionManager(tmp_path / "no_existe.db")
+
+
+@pytest.fixture
+def snapshot(db_path):
+    snap = MemorySnapshot(db_path)
+    yield snap
+    snap.close()
+
+
+def test_snapshot_lee_de_memoria(snapshot, db_path):
+    """Un cambio directo al archivo no llega a la copia"""
+    engine = QueryEngine(snapshot)
+    normalized = Normalizer(snapshot).normalize("internación ensalud")
+    before = engine.query(normalized).respuesta
+
+    disk = sqlite3.connect(db_path)
+    disk.execute("UPDATE requisitos SET documentacion = 'nueva'")
+    disk.commit()
+    disk.close()
+
+    assert engine.query(normalized).respuesta == before
+    with pytest.raises(sqlite3.OperationalError):
+        snapshot.reader().execute("DELETE FROM sinonimos")
+
+
+def test_snapshot_replica_escrituras_al_disco(snapshot, db_path):
+    engine = QueryEngine(snapshot)
+    normalizer = Normalizer(snapshot)
+    assert engine.add_restriccion("ENSALUD", "falta_pago", "Solo guardia", tipos_permitidos="guardia")
+    normalizer.add_sinonimo("sanatorio", "tipo_ingreso", "internacion")
+
+    assert "⛔" in engine.query(normalizer.normalize("sanatorio ensalud")).respuesta
+
+    disk = sqlite3.connect(db_path)
+    assert disk.execute("SELECT COUNT(*) FROM restriccion_tipos").fetchone()[0] == 1
+    assert disk.execute("SELECT COUNT(*) FROM sinonimos WHERE palabra = 'sanatorio'").fetchone()[0] == 1
+    disk.close()
+
+    assert engine.remove_restriccion("ENSALUD") == 1
+    assert "⛔" not in engine.query(normalizer.normalize("internación ensalud")).respuesta
+
+
+def test_snapshot_copia_las_filas_del_disco(snapshot, db_path):
+    """Una fila escrita por fuera corre los ids: la copia sale del disco y no diverge"""
+    disk = sqlite3.connect(db_path)
+    disk.execute("""
+        INSERT INTO restricciones (obra_social_id, tipo_restriccion, mensaje, fecha_inicio, activa)
+        VALUES ((SELECT id FROM obras_sociales WHERE codigo = 'ENSALUD'), 'externa', 'Otra conexión', '2000-01-01', 0)
+    """)
+    disk.commit()
+
+    engine = QueryEngine(snapshot)
+    assert engine.add_restriccion("ENSALUD", "cupo", "Sin cupo", tipos_bloqueados="internacion")
+
+    sql_restricciones = "SELECT id, tipo_restriccion, fecha_inicio, created_at FROM restricciones ORDER BY id"
+    sql_tipos = "SELECT restriccion_id, tipo_ingreso, modo FROM restriccion_tipos ORDER BY 1, 2, 3"
+    for sql in (sql_restricciones, sql_tipos):
+        assert [tuple(row) for row in snapshot.reader().execute(sql)] == disk.execute(sql).fetchall()
+    disk.close()
+
+
+def test_snapshot_lectores_por_thread(snapshot):
+    engine = QueryEngine(snapshot)
+    normalized = Normalizer(snapshot).normalize("guardia ensalud")
+    results = []
+
+    def worker():
+        for _ in range(20):
+            results.append(engine.query(normalized).success)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    engine.add_restriccion("ENSALUD", "cupo", "Sin cupo", tipos_bloqueados="internacion")
+    for t in threads:
+        t.join()
+    assert results == [True] * 80
@@ -0,0 +1,41 @@
+"""
+Tests del normalizador de Escenario 2 con NormalizedText compartido.
+"""
+import sys
+import sqlite3
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from escenario_2.core.normalizer import Normalizer
+from escenario_2.core.normalized_text import NormalizedText
+
+
+def test_normalize_accepts_normalized_text(db_path):
+    """El normalizador consume el NormalizedText ya calculado"""
+    conn = sqlite3.connect(db_path)
+    normalizer = Normalizer(conn)
+
+    text = NormalizedText.from_text("¿Internación en ENSALUD?")
+    result = normalizer.normalize(text)
+
+    assert result.obra_social == "ENSALUD"
+    assert result.tipo_ingreso == "internacion"
+    assert result.raw_text == "¿Internación en ENSALUD?"
+    assert normalizer.normalize(text.original).to_dict() == result.to_dict()
+    conn.close()
+
+
+def test_sinonimos_sin_tildes(db_path):
+    """Sinónimos con y sin tilde se resuelven igual"""
+    conn = sqlite3.connect(db_path)
+    normalizer = Normalizer(conn)
+
+    for text in ("cirugía asi salud", "cirugia ASI", "derivación iosfa"):
+        result = normalizer.normalize(text)
+        assert result.obra_social is not None, text
+        assert result.tipo_ingreso is not None, text
+
+    normalizer.add_sinonimo("Quirófano", "tipo_ingreso", "internacion")
+    assert normalizer.normalize("quirofano ensalud").tipo_ingreso == "internacion"
+    conn.close()
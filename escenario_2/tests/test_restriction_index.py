@@ -0,0 +1,116 @@
+"""
+Tests del índice en memoria de restricciones activas.
+
+Verifica que el chequeo coincida con las reglas de tipos bloqueados y
+permitidos, el despertador en fecha_inicio / fecha_fin y la recarga por
+comandos de supervisor y por commits de otras conexiones.
+"""
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import sqlite3
+import pytest
+
+from escenario_2.core.migrations import SCHEMA_VERSION, insert_tipos, migrate
+from escenario_2.core.query_engine import QueryEngine
+from escenario_2.core.restriction_index import RestrictionIndex
+
+
+@pytest.fixture
+def engine(db_path):
+    conn = sqlite3.connect(db_path)
+    yield QueryEngine(conn)
+    conn.close()
+
+
+def _insert(conn, fecha_inicio, fecha_fin=None, bloqueados=None):
+    cursor = conn.execute("""
+        INSERT INTO restricciones
+        (obra_social_id, tipo_restriccion, mensaje, tipos_bloqueados, fecha_inicio, fecha_fin)
+        VALUES ((SELECT id FROM obras_sociales WHERE codigo = 'ENSALUD'), 'cupo', 'Sin cupo', ?, ?, ?)
+    """, (bloqueados, fecha_inicio, fecha_fin))
+    insert_tipos(conn, cursor.lastrowid, bloqueados, None)
+    conn.commit()
+
+
+def test_sin_restricciones(engine):
+    assert engine.restrictions.check("ENSALUD", "internacion") is None
+    assert engine.restrictions.wake_at == float("inf")
+
+
+def test_permitidos_y_bloqueados(engine):
+    engine.add_restriccion("ENSALUD", "falta_pago", "Solo guardia", tipos_permitidos="guardia, traslados")
+    index = engine.restrictions
+    assert index.check("ENSALUD", "internacion")["mensaje"] == "Solo guardia"
+    assert index.check("ENSALUD", "traslados") is None
+    assert index.check("ENSALUD", "guardia") is None
+    assert index.check("ENSALUD", "internacion")["obra_social_nombre"]
+
+    engine.remove_restriccion("ENSALUD")
+    assert index.check("ENSALUD", "internacion") is None
+
+
+def test_restriccion_total(engine):
+    engine.add_restriccion("ENSALUD", "convenio_suspendido", "Convenio suspendido")
+    assert engine.restrictions.check("ENSALUD", "guardia") is not None
+    assert engine.restrictions.check("ASI", "guardia") is None
+
+
+def test_despertador_en_inicio_y_fin(engine, monkeypatch):
+    today = datetime.now(timezone.utc).date()
+    _insert(engine.conn, (today + timedelta(days=2)).isoformat(), (today + timedelta(days=4)).isoformat())
+    index = RestrictionIndex(engine.conn)
+    assert index.check("ENSALUD", "internacion") is None
+
+    # Empieza: medianoche de fecha_inicio
+    start = index.wake_at
+    monkeypatch.setattr(time, "time", lambda: start + 1)
+    assert index.check("ENSALUD", "internacion") is not None
+
+    # Vence: medianoche del día siguiente a fecha_fin
+    end = index.wake_at
+    assert end - start == 3 * 86400
+    monkeypatch.setattr(time, "time", lambda: end + 1)
+    assert index.check("ENSALUD", "internacion") is None
+    assert index.wake_at == float("inf")
+
+
+def test_commit_de_otra_conexion(engine, db_path):
+    engine.restrictions.check("ENSALUD", "internacion")
+    other = sqlite3.connect(db_path)
+    _insert(other, "2000-01-01", bloqueados="internacion")
+    other.close()
+    assert engine.restrictions.check("ENSALUD", "internacion") is not None
+    assert engine.restrictions.check("ENSALUD", "guardia") is None
+
+
+def test_add_restriccion_escribe_restriccion_tipos(engine):
+    engine.add_restriccion("ENSALUD", "cupo", "Sin cupo", tipos_bloqueados="internacion,ambulatorio")
+    rows = engine.conn.execute("SELECT tipo_ingreso, modo FROM restriccion_tipos ORDER BY tipo_ingreso").fetchall()
+    assert [tuple(r) for r in rows] == [("ambulatorio", "bloqueado"), ("internacion", "bloqueado")]
+
+
+def test_migracion_de_base_anterior(db_path):
+    """Base sin restriccion_tipos: la migración la crea y la completa"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE restriccion_tipos")
+    conn.execute("PRAGMA user_version = 0")
+    conn.execute("""
+        INSERT INTO restricciones
+        (obra_social_id, tipo_restriccion, mensaje, tipos_permitidos, fecha_inicio)
+        VALUES ((SELECT id FROM obras_sociales WHERE codigo = 'ENSALUD'), 'falta_pago', 'Solo guardia',
+                'guardia, traslados', date('now'))
+    """)
+    conn.commit()
+
+    engine = QueryEngine(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert engine.restrictions.check("ENSALUD", "internacion") is not None
+    assert engine.restrictions.check("ENSALUD", "traslados") is None
+    assert migrate(conn) == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM restriccion_tipos").fetchone()[0] == 2
+    conn.close()
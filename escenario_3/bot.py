@@ -14,9 +14,11 @@ Uso:
 """
 import os
 import sys
+import asyncio
 import logging
 from pathlib import Path
-from typing import Dict
+
+import yaml
 
 # Agregar el directorio raíz al path
 project_root = Path(__file__).parent.parent
@@ -40,8 +42,14 @@ from telegram.ext import Application, CommandHandler, MessageHandler, filters, C
 # Imports locales del escenario
 from escenario_3.rag.retriever import ChromaRetriever
 from escenario_3.llm.client import GroqClient
+from escenario_3.llm.async_client import AsyncGroqClient
+from escenario_3.llm.rate_limiter import RateLimiter, build_rate_limiter
+from escenario_3.llm.health import LLMHealth, build_llm_health
 from escenario_3.core.router import AgenteRouter
+from escenario_3.core.session import SessionStore
 from escenario_3.core.entity_detector import get_entity_detector
+from escenario_3.core.streaming import ThrottledMessageEditor
+from escenario_3.core.dispatcher import ChatDispatcher
 from escenario_3.metrics.collector import QueryMetrics
 
 # Configuración de logging
@@ -54,31 +62,67 @@ logger = logging.getLogger(__name__)
 # Componentes globales
 retriever: ChromaRetriever = None
 llm_client: GroqClient = None
+async_llm_client: AsyncGroqClient = None  # Solo si llm.async.enabled
+rate_limiter: RateLimiter = None  # Compartido por ambos clientes (misma API key)
+dispatcher: ChatDispatcher = None
 
-# Routers por chat_id (cada usuario tiene su propio historial)
-routers: Dict[int, AgenteRouter] = {}
+# Router único (compartido) + sesiones por chat_id (historial de cada usuario)
+router: AgenteRouter = None
+sessions: SessionStore = None
 
 
-def get_router(chat_id: int) -> AgenteRouter:
-    """Obtiene o crea un router para el chat"""
-    if chat_id not in routers:
-        routers[chat_id] = AgenteRouter(
-            retriever=retriever,
-            llm_client=llm_client,
-            entity_detector=get_entity_detector(
-                str(Path(__file__).parent / "config" / "entities.yaml")
-            ),
-            config_path=str(Path(__file__).parent / "config" / "scenario.yaml")
-        )
-    return routers[chat_id]
+def build_stream_editor(update: Update, streaming_config: dict):
+    """
+    Crea el editor progresivo y el callback on_partial para el router.
+
+    El router puede correr en un worker, por eso el callback reenvía el
+    texto al event loop con call_soon_threadsafe (también sirve desde el loop).
+
+    Returns:
+        (editor, on_partial) o (None, None) si el streaming está deshabilitado
+    """
+    if not streaming_config.get("enabled", False):
+        return None, None
+
+    editor = ThrottledMessageEditor(
+        send=update.message.reply_text,
+        edit=lambda message, text: message.edit_text(text),
+        min_interval=streaming_config.get("edit_interval_seconds", 1.0),
+        min_chars=streaming_config.get("min_chars", 20)
+    )
+    loop = asyncio.get_running_loop()
+
+    def on_partial(text: str):
+        loop.call_soon_threadsafe(editor.push, text)
+
+    return editor, on_partial
+
+
+def process_turn(chat_id: int, query: str, metrics: QueryMetrics, on_partial):
+    """
+    Corre en el worker: obtiene la sesión (puede leer el historial de
+    SQLite si el chat no estaba en memoria) y procesa la consulta.
+    """
+    session = sessions.get(chat_id)
+    return router.process_query(query=query, metrics=metrics, on_partial=on_partial, session=session)
+
+
+async def aprocess_turn(chat_id: int, query: str, metrics: QueryMetrics, on_partial):
+    """
+    Versión async de process_turn (cliente LLM async, sin ocupar un worker).
+    La sesión se carga en los threads acotados del router, como _prepare.
+    """
+    loop = asyncio.get_running_loop()
+    session = await loop.run_in_executor(router.get_executor(), sessions.get, chat_id)
+    return await router.aprocess_query(query=query, metrics=metrics, on_partial=on_partial, session=session)
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando /start"""
     chat_id = update.effective_chat.id
-    # Limpiar historial al iniciar
-    if chat_id in routers:
-        routers[chat_id].clear_history()
+    # Limpiar historial al iniciar (en el turno del chat: un mensaje en curso
+    # no puede volver a agregar historial después del borrado)
+    await dispatcher.run(chat_id, sessions.clear, chat_id)
 
     await update.message.reply_text(
         "Hola! Soy el asistente del Grupo Pediátrico (Modo Agente).\n\n"
@@ -104,8 +148,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando /clear - limpia historial"""
     chat_id = update.effective_chat.id
-    if chat_id in routers:
-        routers[chat_id].clear_history()
+    await dispatcher.run(chat_id, sessions.clear, chat_id)
     await update.message.reply_text("Historial de conversación limpiado.")
 
 
@@ -113,18 +156,28 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando /status"""
     try:
         chat_id = update.effective_chat.id
-        router = get_router(chat_id) if chat_id in routers else None
-        history_turns = len(router.history) // 2 if router else 0
+        session = sessions.peek(chat_id)
+        history_turns = session.turns if session else 0
+        session_stats = sessions.stats()
 
         rag_count = retriever.count() if retriever else 0
         counts_by_os = retriever.count_by_obra_social() if retriever else {}
-        llm_ok = llm_client.is_available() if llm_client else False
+        # Estado según el tráfico real: /status no llama a Groq
+        llm_ok = llm_client.is_available(probe=False) if llm_client else False
+        health = llm_client.health.stats() if llm_client else None
+        if health and health["stale"]:
+            # Ocioso más que el TTL: probe en segundo plano para el próximo /status
+            asyncio.get_running_loop().run_in_executor(None, llm_client.is_available)
 
         status_text = (
             "Estado del Sistema - Escenario 3 (Modo Agente)\n"
             "===============================================\n"
             f"Modo: Agente (con memoria)\n"
             f"Historial: {history_turns} turnos\n"
+            f"Sesiones: {session_stats['active']}/{session_stats['max_sessions']} activas "
+            f"({session_stats['turns']} turnos, ~{session_stats['memory_kb']:.0f} KB)\n"
+            f"  Expiradas: {session_stats['expired']} | Evictadas (LRU): {session_stats['evicted']}\n"
+            f"  Persistencia: {router.history_backend.stats()['backend']}\n"
             "-----------------------------------------------\n"
             f"RAG: {'OK' if rag_count > 0 else 'ERROR'}\n"
             f"  Tipo: ChromaDB (shared)\n"
@@ -137,11 +190,49 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         status_text += (
             "-----------------------------------------------\n"
-            f"LLM: {'OK' if llm_ok else 'ERROR'}\n"
+            f"LLM: {'SIN DATOS' if llm_ok is None else 'OK' if llm_ok else 'ERROR'}\n"
             f"  Provider: Groq\n"
             f"  Modelo: {llm_client.model if llm_client else 'N/A'}"
         )
 
+        if health and health["idle_seconds"] is not None:
+            latency = health["latency_ewma_ms"]
+            status_text += (
+                f"\n  Última llamada: hace {health['idle_seconds']:.0f}s | "
+                f"Errores: {health['error_rate']:.0%} | "
+                f"Latencia: {f'{latency:.0f}ms' if latency is not None else 'N/A'}"
+            )
+
+        if dispatcher:
+            pool = dispatcher.stats()
+            status_text += (
+                "\n-----------------------------------------------\n"
+                f"Workers: {pool['running']}/{pool['max_workers']} ocupados | En cola: {pool['pending']}\n"
+                f"  Espera en cola: prom {pool['queue_ms_avg']:.0f}ms | max {pool['queue_ms_max']:.0f}ms"
+            )
+
+        if rate_limiter:
+            limits = rate_limiter.stats()
+            status_text += (
+                f"\nRate limit: {limits['queue_depth']} esperando cupo | "
+                f"Reintentos: {limits['retries']} | Espera total: {limits['wait_ms_total'] / 1000:.0f}s"
+            )
+
+        active_llm = async_llm_client or llm_client
+        if active_llm and active_llm.single_flight is not None:
+            flights = active_llm.single_flight.stats()
+            status_text += (
+                f"\nLLM agrupado: {flights['coalesced']} consultas compartieron request "
+                f"({flights['coalesced_rate']:.0%}) | Llamadas: {flights['upstream']}"
+            )
+
+        if async_llm_client:
+            llm_stats = async_llm_client.stats()
+            status_text += (
+                f"\nLLM async: {llm_stats['in_flight']}/{llm_stats['max_in_flight']} en vuelo | "
+                f"Esperando: {llm_stats['waiting']} | Timeouts: {llm_stats['timeouts']}"
+            )
+
         await update.message.reply_text(status_text)
     except Exception as e:
         await update.message.reply_text(f"Error verificando estado: {e}")
@@ -154,18 +245,28 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     logger.info(f"[Chat {chat_id}] Query: {user_message}")
 
-    # Indicador de "escribiendo..."
-    await context.bot.send_chat_action(chat_id=chat_id, action="typing")
-
     try:
-        # Obtener router del usuario
-        router = get_router(chat_id)
-
         # Crear métricas
         metrics = QueryMetrics(query_text=user_message)
 
-        # Ejecutar query
-        result = router.process_query(query=user_message, metrics=metrics)
+        # Respuesta progresiva (primer mensaje con los primeros tokens)
+        editor, on_partial = build_stream_editor(update, router.config.get("streaming", {}) or {})
+
+        # Encolar en el pool ANTES de cualquier await: los turnos del chat se
+        # ejecutan en orden de llegada (el historial no se desordena)
+        if async_llm_client:
+            job = asyncio.ensure_future(dispatcher.run_async(
+                chat_id, aprocess_turn, chat_id, user_message, metrics, on_partial
+            ))
+        else:
+            job = asyncio.ensure_future(dispatcher.run(
+                chat_id, process_turn, chat_id, user_message, metrics, on_partial
+            ))
+
+        # Indicador de "escribiendo..."
+        await context.bot.send_chat_action(chat_id=chat_id, action="typing")
+
+        result, metrics.latency_queue_ms = await job
 
         respuesta = result.respuesta
         entity = result.entity_result
@@ -187,13 +288,28 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.info(f"{'='*60}")
         logger.info(f"Query: {user_message[:50]}{'...' if len(user_message) > 50 else ''}")
         logger.info(f"Entidad: {entity_name} ({entity_conf})")
-        logger.info(f"RAG: {chunks} chunks | sim: {top_sim:.3f} | {rag_time:.0f}ms")
+        logger.info(f"RAG: {chunks} chunks | sim: {top_sim:.3f} | {rag_time:.0f}ms{' (reuso)' if metrics.rag_reused else ''}")
+        logger.info(f"Chunks repetidos: {metrics.rag_chunks_reused} | {metrics.tokens_context_reused} tokens")
         logger.info(f"LLM: {tokens_in}->{tokens_out} tokens | {llm_time:.0f}ms")
-        logger.info(f"Historial: {history} turnos")
+        if metrics.latency_first_token_ms:
+            logger.info(f"Primer token: {metrics.latency_first_token_ms:.0f}ms ({editor.updates if editor else 0} envíos)")
+        logger.info(f"Historial: {history} turnos | {metrics.tokens_history} tokens (resumen: {metrics.tokens_summary})")
+        logger.info(f"Cola: {metrics.latency_queue_ms:.0f}ms")
+        if metrics.latency_throttle_ms or metrics.llm_retries:
+            logger.info(
+                f"Rate limit: {metrics.latency_throttle_ms:.0f}ms de espera | "
+                f"{metrics.llm_retries} reintentos | {metrics.llm_queue_depth} antes en la cola"
+            )
+        if metrics.llm_coalesced:
+            logger.info("LLM: respuesta compartida con una consulta idéntica en vuelo (sin tokens propios)")
         logger.info(f"Total: {total_time:.0f}ms")
         logger.info(f"{'='*60}")
 
-        await update.message.reply_text(respuesta)
+        # Enviar respuesta al usuario (o dejar el texto final en el mensaje parcial)
+        if editor is not None:
+            await editor.finish(respuesta)
+        else:
+            await update.message.reply_text(respuesta)
 
     except Exception as e:
         logger.error(f"[Chat {chat_id}] Error: {e}")
@@ -209,9 +325,40 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.error(f"Error: {context.error}")
 
 
+def build_async_llm_client(llm_config: dict, rate_limiter: RateLimiter = None, health: LLMHealth = None):
+    """Crea el cliente async según llm.async de scenario.yaml (None si está deshabilitado)"""
+    async_config = llm_config.get("async", {}) or {}
+    if not async_config.get("enabled", False):
+        return None
+
+    parameters = llm_config.get("parameters", {}) or {}
+    client = AsyncGroqClient(
+        model=llm_config.get("model", "llama-3.3-70b-versatile"),
+        temperature=parameters.get("temperature", 0.3),
+        max_tokens=parameters.get("max_tokens", 300),
+        max_in_flight=async_config.get("max_in_flight", 8),
+        pool_connections=async_config.get("pool_connections", 10),
+        keepalive_seconds=async_config.get("keepalive_seconds", 30),
+        timeout_seconds=async_config.get("timeout_seconds", 30),
+        connect_timeout_seconds=async_config.get("connect_timeout_seconds", 5),
+        rate_limiter=rate_limiter,
+        health=health,
+        coalesce=(llm_config.get("single_flight", {}) or {}).get("enabled", True),
+        base_url=llm_config.get("base_url")
+    )
+    logger.info(f"Groq async: {client.max_in_flight} en vuelo, timeout {client.timeout_seconds}s")
+    return client
+
+
+async def close_async_llm_client(application: Application):
+    """Cierra el pool HTTP del cliente async al detener el bot"""
+    if async_llm_client:
+        await async_llm_client.aclose()
+
+
 def initialize_components():
     """Inicializa los componentes del bot"""
-    global retriever, llm_client
+    global retriever, llm_client, async_llm_client, rate_limiter, dispatcher, router, sessions
 
     logger.info("Inicializando componentes...")
 
@@ -221,14 +368,54 @@ def initialize_components():
     retriever = ChromaRetriever(persist_directory=chroma_path)
     logger.info(f"ChromaDB: {retriever.count()} chunks cargados")
 
-    # Groq LLM
+    # Groq LLM (con rate limit RPM/TPM y salud pasiva según config)
     logger.info("Inicializando cliente Groq...")
-    llm_client = GroqClient()
+    with open(Path(__file__).parent / "config" / "scenario.yaml", 'r', encoding='utf-8') as f:
+        llm_config = yaml.safe_load(f).get("llm", {}) or {}
+    rate_limiter = build_rate_limiter(llm_config)
+    coalesce = (llm_config.get("single_flight", {}) or {}).get("enabled", True)
+    llm_client = GroqClient(
+        rate_limiter=rate_limiter,
+        health=build_llm_health(llm_config),
+        coalesce=coalesce,
+        base_url=llm_config.get("base_url")
+    )
+    # Sin tráfico previo: un único probe, que queda cacheado hasta el TTL
     if llm_client.is_available():
         logger.info(f"Groq OK: {llm_client.model}")
     else:
         logger.warning("Groq no disponible")
 
+    # Router (uno solo para todos los chats)
+    logger.info("Inicializando router...")
+    router = AgenteRouter(
+        retriever=retriever,
+        llm_client=llm_client,
+        entity_detector=get_entity_detector(
+            str(Path(__file__).parent / "config" / "entities.yaml")
+        ),
+        config_path=str(Path(__file__).parent / "config" / "scenario.yaml")
+    )
+
+    # Groq async (pool keep-alive + límite en vuelo)
+    async_llm_client = build_async_llm_client(llm_config, rate_limiter, llm_client.health)
+    router.async_llm_client = async_llm_client
+
+    # Sesiones por chat (acotadas por TTL de inactividad y LRU)
+    sessions_config = router.config.get("sessions", {}) or {}
+    sessions = SessionStore(
+        max_sessions=sessions_config.get("max_sessions", 1000),
+        idle_ttl_seconds=sessions_config.get("idle_ttl_seconds", 3600),
+        backend=router.history_backend,
+        load_messages=router.max_history_turns * 2
+    )
+    logger.info(f"Sesiones: max {sessions.max_sessions}, TTL {sessions.idle_ttl_seconds}s")
+
+    # Pool de workers (el pipeline no corre en el event loop)
+    max_workers = router.config.get("concurrency", {}).get("max_workers", 4)
+    dispatcher = ChatDispatcher(max_workers=max_workers)
+    logger.info(f"Dispatcher: {max_workers} workers")
+
     logger.info("Componentes inicializados correctamente")
 
 
@@ -250,7 +437,15 @@ def main():
         sys.exit(1)
 
     # Crear aplicación de Telegram
-    application = Application.builder().token(token).build()
+    # concurrent_updates: los handlers de distintos chats no se esperan entre sí
+    # (el orden dentro de cada chat lo garantiza el dispatcher)
+    application = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(True)
+        .post_shutdown(close_async_llm_client)
+        .build()
+    )
 
     # Registrar handlers
     application.add_handler(CommandHandler("start", start))
@@ -275,6 +470,9 @@ def main():
 
     application.run_polling(allowed_updates=Update.ALL_TYPES)
 
+    # Escribir el historial pendiente antes de salir
+    router.history_backend.close()
+
 
 if __name__ == "__main__":
     main()
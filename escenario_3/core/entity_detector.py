@@ -8,12 +8,13 @@ Reglas:
 - NO existe RAG general
 - NO se mezclan corpora
 """
-import unicodedata
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple, Union
 from dataclasses import dataclass
 import yaml
 
+from .normalized_text import NormalizedText, normalize_text, fold
+
 
 @dataclass
 class EntityResult:
@@ -22,7 +23,7 @@ class EntityResult:
     entity_type: Optional[str]      # obra_social | institucion | None
     rag_filter: Optional[str]       # Valor para filtrar RAG
     matched_term: Optional[str]     # Término que matcheó
-    confidence: str                 # exact | alias | none
+    confidence: str                 # exact | alias | carried | none
 
     @property
     def detected(self) -> bool:
@@ -68,6 +69,8 @@ class EntityDetector:
         self._entities: Dict[str, Dict] = {}
         self._priority: List[str] = []
         self._no_entity_message: str = ""
+        # (entidad, canónico padded, [(alias, alias padded)]) en orden de prioridad
+        self._patterns: List[Tuple[str, str, List[Tuple[str, str]]]] = []
         self._load_config()
 
     def _load_config(self):
@@ -82,46 +85,43 @@ class EntityDetector:
             "¿Para qué obra social es la consulta (IOSFA, ENSALUD, ASI) o es para el Grupo Pediátrico?\nVolvé a hacer la pregunta especificándolo."
         )
 
+        # Pre-normalizar canónicos y aliases una sola vez (no en cada detect)
+        self._patterns = []
+        for entity_name in self._priority:
+            entity_config = self._entities.get(entity_name, {})
+            canonical_padded = f" {fold(entity_config.get('canonical', entity_name))} "
+            aliases = [
+                (alias, f" {fold(alias)} ")
+                for alias in entity_config.get("aliases", [])
+            ]
+            self._patterns.append((entity_name, canonical_padded, aliases))
+
     def _normalize(self, text: str) -> str:
         """
-        Normaliza texto para matching:
-        - Lowercase
-        - Remueve acentos
-        - Remueve puntuación (¿?¡!.,;:)
-        - Limpia espacios extras
+        Normaliza texto para matching (lowercase, sin acentos, sin puntuación,
+        espacios colapsados). Ver NormalizedText.
         """
-        text = text.lower().strip()
-        # Remover acentos
-        text = unicodedata.normalize('NFD', text)
-        text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
-        # Remover puntuación común (incluyendo comillas)
-        for char in '¿?¡!.,;:()[]{}"\'"':
-            text = text.replace(char, ' ')
-        # Limpiar espacios múltiples
-        text = ' '.join(text.split())
-        return text
-
-    def detect(self, query: str) -> EntityResult:
+        return fold(text)
+
+    def detect(self, query: Union[str, NormalizedText]) -> EntityResult:
         """
         Detecta entidad en la query.
 
         Args:
-            query: Texto de la consulta del usuario
+            query: Texto de la consulta del usuario o su NormalizedText
+                   (si el router ya lo calculó)
 
         Returns:
             EntityResult con la entidad detectada o None
         """
-        query_normalized = self._normalize(query)
+        # Word boundary con espacios
+        query_padded = normalize_text(query).padded
 
         # Evaluar entidades en orden de prioridad
-        for entity_name in self._priority:
+        for entity_name, canonical_padded, aliases in self._patterns:
             entity_config = self._entities.get(entity_name, {})
-            aliases = entity_config.get("aliases", [])
 
-            # Verificar nombre canónico (exact) - usando word boundary con espacios
-            canonical_normalized = self._normalize(entity_config.get("canonical", entity_name))
-            query_padded = f" {query_normalized} "
-            canonical_padded = f" {canonical_normalized} "
+            # Verificar nombre canónico (exact)
             if canonical_padded in query_padded:
                 return EntityResult(
                     entity=entity_name,
@@ -131,10 +131,8 @@ class EntityDetector:
                     confidence="exact"
                 )
 
-            # Verificar aliases - usando word boundary con espacios
-            for alias in aliases:
-                alias_normalized = self._normalize(alias)
-                alias_padded = f" {alias_normalized} "
+            # Verificar aliases
+            for alias, alias_padded in aliases:
                 if alias_padded in query_padded:
                     return EntityResult(
                         entity=entity_name,
@@ -0,0 +1,130 @@
+"""
+Política de historial por presupuesto de tokens (Modo Agente).
+
+Antes: se enviaban los últimos N turnos completos, sin importar su largo.
+Una respuesta larga inflaba todos los prompts siguientes.
+
+Ahora:
+- Los turnos recientes se envían textuales mientras entren en el presupuesto
+  (`history_token_budget`), con un mínimo de `min_recent_turns`
+- Los turnos más viejos se pliegan en un resumen corrido, generado de forma
+  extractiva (sin LLM): la pregunta + la oración más informativa de la respuesta
+- El resumen también tiene tope (`summary_max_tokens`); se descartan primero
+  las líneas más antiguas
+
+Así el tamaño del prompt queda aproximadamente constante por turno.
+"""
+import re
+from typing import Dict, Set
+
+from .normalized_text import NormalizedText
+from .session import ChatSession
+from ..metrics.collector import count_tokens_approximate
+
+# Oraciones: cortar en . ! ? o saltos de línea / viñetas
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+# Datos concretos: montos, teléfonos, mails, días/horas
+_DATA_PATTERN = re.compile(r"\d|\$|@")
+
+_QUESTION_MAX_CHARS = 120
+_SENTENCE_MAX_CHARS = 200
+
+
+def _tokens(message: Dict[str, str]) -> int:
+    return count_tokens_approximate(message["content"])
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+
+def best_sentence(answer: str, question_tokens: Set[str]) -> str:
+    """
+    Elige la oración más informativa de una respuesta.
+
+    Puntaje: palabras compartidas con la pregunta + datos concretos
+    (números, montos, mails). A igual puntaje gana la primera.
+    """
+    best, best_score = "", -1.0
+    for sentence in _SENTENCE_SPLIT.split(answer):
+        sentence = sentence.strip(" -•*\t")
+        if len(sentence) < 3:
+            continue
+        tokens = set(NormalizedText.from_text(sentence).tokens)
+        score = len(tokens & question_tokens) + 2 * len(_DATA_PATTERN.findall(sentence)) ** 0.5
+        if score > best_score:
+            best, best_score = sentence, score
+    return best
+
+
+def summarize_turn(user: str, assistant: str) -> str:
+    """Resume un turno en una línea: pregunta → dato principal de la respuesta"""
+    question_tokens = set(NormalizedText.from_text(user).tokens)
+    sentence = best_sentence(assistant, question_tokens)
+    line = f"- {_truncate(user, _QUESTION_MAX_CHARS)}"
+    if sentence:
+        line += f" → {_truncate(sentence, _SENTENCE_MAX_CHARS)}"
+    return line
+
+
+class TokenBudgetHistory:
+    """Mantiene el historial de una sesión dentro de un presupuesto de tokens"""
+
+    def __init__(
+        self,
+        budget_tokens: int = 600,
+        summary_max_tokens: int = 150,
+        min_recent_turns: int = 1,
+        max_turns: int = None
+    ):
+        """
+        Args:
+            budget_tokens: Tokens máximos de historial textual (sin el resumen)
+            summary_max_tokens: Tokens máximos del resumen corrido
+            min_recent_turns: Turnos que siempre se envían textuales
+            max_turns: Tope adicional de turnos textuales (None = solo presupuesto)
+        """
+        self.budget_tokens = budget_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.min_recent_turns = min_recent_turns
+        self.max_turns = max_turns
+
+    def trim(self, session: ChatSession) -> int:
+        """
+        Pliega en el resumen los turnos que exceden el presupuesto.
+
+        Returns:
+            Cantidad de turnos plegados
+        """
+        history = session.history
+        # Tokens por turno (pares user + assistant), del más viejo al más nuevo
+        turns = [history[i:i + 2] for i in range(0, len(history) - 1, 2)]
+        total = sum(_tokens(m) for turn in turns for m in turn)
+
+        folded = 0
+        while len(turns) - folded > self.min_recent_turns and (
+            total > self.budget_tokens
+            or (self.max_turns is not None and len(turns) - folded > self.max_turns)
+        ):
+            total -= sum(_tokens(m) for m in turns[folded])
+            folded += 1
+
+        if not folded:
+            return 0
+
+        lines = [summarize_turn(t[0]["content"], t[1]["content"]) for t in turns[:folded]]
+        session.summary = self._cap("\n".join(filter(None, [session.summary] + lines)))
+        session.history = history[folded * 2:]
+        return folded
+
+    def _cap(self, summary: str) -> str:
+        """Recorta el resumen descartando las líneas más antiguas"""
+        lines = summary.split("\n")
+        while len(lines) > 1 and count_tokens_approximate("\n".join(lines)) > self.summary_max_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def tokens(self, session: ChatSession) -> int:
+        """Tokens de historial que se envían al LLM (textual + resumen)"""
+        return sum(_tokens(m) for m in session.history) + count_tokens_approximate(session.summary)
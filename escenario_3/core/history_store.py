@@ -0,0 +1,357 @@
+"""
+Backends de persistencia del historial de conversación (Modo Agente).
+
+La sesión en memoria (ChatSession) es la copia de trabajo; el backend es la
+fuente durable: al crear una sesión (chat nuevo, reinicio del bot, sesión
+expirada) se cargan los últimos N turnos desde el backend.
+
+- MemoryHistoryBackend: sin persistencia (comportamiento original)
+- SQLiteHistoryBackend: SQLite en modo WAL
+    - Escrituras append-only, encoladas y escritas en lotes por un thread
+      propio (el worker que atiende el chat no espera al disco)
+    - Lectura de los últimos N mensajes con una sola query indexada
+    - Compactación periódica: poda turnos viejos por chat y chats inactivos
+    - WAL permite leer mientras otro proceso escribe (varios workers)
+"""
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Hashable, List
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryHistoryBackend:
+    """Backend nulo: el historial vive solo en la sesión en memoria"""
+
+    def load(self, chat_id: Hashable, limit_messages: int) -> List[Dict[str, str]]:
+        return []
+
+    def append(self, chat_id: Hashable, messages: List[Dict[str, str]]):
+        pass
+
+    def clear(self, chat_id: Hashable):
+        pass
+
+    def flush(self, timeout: float = None):
+        pass
+
+    def compact(self) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"backend": "memory"}
+
+
+# Operaciones de la cola de escritura
+_APPEND = "append"
+_CLEAR = "clear"
+_FLUSH = "flush"
+_COMPACT = "compact"
+_STOP = "stop"
+
+
+class SQLiteHistoryBackend:
+    """Historial persistente en SQLite (WAL) con escrituras en lote"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_chat_messages_chat ON chat_messages(chat_id, id);
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        batch_size: int = 50,
+        flush_interval_ms: float = 200,
+        keep_messages: int = 100,
+        retention_days: float = 30,
+        compact_interval_seconds: float = 600
+    ):
+        """
+        Args:
+            db_path: Archivo SQLite (se crea si no existe)
+            batch_size: Máximo de operaciones por transacción
+            flush_interval_ms: Espera máxima antes de escribir un lote incompleto
+            keep_messages: Mensajes que se conservan por chat al compactar
+            retention_days: Chats sin actividad por más días se eliminan al compactar
+            compact_interval_seconds: Cada cuánto compacta el thread de escritura
+        """
+        self.db_path = str(db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.keep_messages = keep_messages
+        self.retention_days = retention_days
+        self.compact_interval = compact_interval_seconds
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # Conexión de escritura (solo la usa el thread writer)
+        self._writer_conn = self._connect()
+        self._writer_conn.executescript(self.SCHEMA)
+        self._writer_conn.commit()
+
+        # Conexiones de lectura por thread (WAL: lectores no bloquean al writer)
+        self._local = threading.local()
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        # Operaciones (appends y clears) encoladas sin commit (el writer puede
+        # tenerlas ya fuera de la cola): load() las espera antes de leer
+        self._unwritten = 0
+        self._unwritten_lock = threading.Lock()
+        self._last_compact = time.monotonic()
+        self.written = 0
+        self.batches = 0
+        self.compacted = 0
+
+        self._writer = threading.Thread(target=self._writer_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+        logger.info(f"SQLiteHistoryBackend: {self.db_path} (WAL, lotes de {batch_size})")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # =========================================================================
+    # API
+    # =========================================================================
+
+    def load(self, chat_id: Hashable, limit_messages: int) -> List[Dict[str, str]]:
+        """Últimos `limit_messages` mensajes del chat, en orden cronológico"""
+        # Lo encolado por este proceso tiene que ser visible
+        if self._unwritten:
+            self.flush()
+
+        rows = self._reader().execute(
+            """
+            SELECT role, content FROM (
+                SELECT id, role, content FROM chat_messages
+                WHERE chat_id = ? ORDER BY id DESC LIMIT ?
+            ) ORDER BY id
+            """,
+            (str(chat_id), limit_messages)
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append(self, chat_id: Hashable, messages: List[Dict[str, str]]):
+        """Encola mensajes para escribir (no bloquea)"""
+        now = time.time()
+        with self._unwritten_lock:
+            self._unwritten += len(messages)
+        for message in messages:
+            self._queue.put((_APPEND, (str(chat_id), message["role"], message["content"], now)))
+
+    def clear(self, chat_id: Hashable):
+        """Encola el borrado del historial de un chat (respeta el orden con los appends)"""
+        with self._unwritten_lock:
+            self._unwritten += 1
+        self._queue.put((_CLEAR, str(chat_id)))
+
+    def flush(self, timeout: float = None):
+        """Espera a que todo lo encolado esté escrito"""
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        done.wait(timeout)
+
+    def compact(self) -> int:
+        """
+        Poda el historial: conserva los últimos `keep_messages` por chat y
+        elimina chats inactivos. Retorna filas eliminadas.
+        """
+        done = threading.Event()
+        result = {}
+        self._queue.put((_COMPACT, (done, result)))
+        done.wait()
+        return result.get("deleted", 0)
+
+    def close(self):
+        """Escribe lo pendiente y cierra las conexiones"""
+        if self._writer.is_alive():
+            self._queue.put((_STOP, None))
+            self._writer.join()
+        self._writer_conn.close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "backend": "sqlite",
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "compacted": self.compacted
+        }
+
+    # =========================================================================
+    # Thread de escritura
+    # =========================================================================
+
+    def _writer_loop(self):
+        """Agrupa operaciones en transacciones y compacta periódicamente"""
+        while True:
+            try:
+                op = self._queue.get(timeout=self.compact_interval)
+            except queue.Empty:
+                op = None
+
+            batch = [op] if op is not None else []
+            deadline = time.monotonic() + self.flush_interval
+            while batch and len(batch) < self.batch_size and batch[-1][0] == _APPEND:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            stop = self._apply(batch)
+
+            if time.monotonic() - self._last_compact >= self.compact_interval:
+                self._compact()
+
+            if stop:
+                return
+
+    def _apply(self, batch: List[tuple]) -> bool:
+        """Escribe un lote en una transacción. Retorna True si hay que detenerse."""
+        rows = []
+        stop = False
+        flushes = []
+        compactions = []
+
+        try:
+            for kind, payload in batch:
+                if kind == _APPEND:
+                    rows.append(payload)
+                    continue
+
+                # Operación de control: escribir lo acumulado antes
+                self._insert(rows)
+                rows = []
+
+                if kind == _CLEAR:
+                    self._writer_conn.execute("DELETE FROM chat_messages WHERE chat_id = ?", (payload,))
+                elif kind == _FLUSH:
+                    flushes.append(payload)
+                elif kind == _COMPACT:
+                    compactions.append(payload)
+                elif kind == _STOP:
+                    stop = True
+
+            self._insert(rows)
+            self._writer_conn.commit()
+            if batch:
+                self.batches += 1
+        except sqlite3.Error as e:
+            logger.error(f"Error escribiendo historial: {e}")
+            self._writer_conn.rollback()
+
+        written = sum(1 for kind, _ in batch if kind in (_APPEND, _CLEAR))
+        if written:
+            with self._unwritten_lock:
+                self._unwritten -= written
+
+        for done, result in compactions:
+            result["deleted"] = self._compact()
+            done.set()
+        for done in flushes:
+            done.set()
+
+        return stop
+
+    def _insert(self, rows: List[tuple]):
+        if rows:
+            self._writer_conn.executemany(
+                "INSERT INTO chat_messages (chat_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self.written += len(rows)
+
+    def _compact(self) -> int:
+        """Poda mensajes viejos (corre en el thread writer)"""
+        self._last_compact = time.monotonic()
+        cutoff = time.time() - self.retention_days * 86400
+        try:
+            cur = self._writer_conn.execute(
+                """
+                DELETE FROM chat_messages WHERE chat_id IN (
+                    SELECT chat_id FROM chat_messages GROUP BY chat_id HAVING MAX(created_at) < ?
+                )
+                """,
+                (cutoff,)
+            )
+            deleted = cur.rowcount
+            cur = self._writer_conn.execute(
+                """
+                DELETE FROM chat_messages WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (PARTITION BY chat_id ORDER BY id DESC) AS rn
+                        FROM chat_messages
+                    ) WHERE rn > ?
+                )
+                """,
+                (self.keep_messages,)
+            )
+            deleted += cur.rowcount
+            self._writer_conn.commit()
+            self._writer_conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            logger.error(f"Error compactando historial: {e}")
+            self._writer_conn.rollback()
+            return 0
+
+        self.compacted += deleted
+        if deleted:
+            logger.info(f"Historial compactado: {deleted} mensajes eliminados")
+        return deleted
+
+
+def build_history_backend(config: Dict, config_dir: Path):
+    """
+    Crea el backend según la sección `history:` de scenario.yaml.
+
+    Args:
+        config: Sección history (puede ser None)
+        config_dir: Directorio de scenario.yaml (las rutas son relativas a él)
+    """
+    config = config or {}
+    backend = config.get("backend", "memory")
+
+    if backend == "memory":
+        return MemoryHistoryBackend()
+
+    if backend == "sqlite":
+        return SQLiteHistoryBackend(
+            db_path=(config_dir / config.get("sqlite_path", "../data/history.db")).resolve(),
+            batch_size=config.get("batch_size", 50),
+            flush_interval_ms=config.get("flush_interval_ms", 200),
+            keep_messages=config.get("keep_messages", 100),
+            retention_days=config.get("retention_days", 30),
+            compact_interval_seconds=config.get("compact_interval_seconds", 600)
+        )
+
+    raise ValueError(f"Backend de historial desconocido: {backend}")
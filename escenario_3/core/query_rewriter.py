@@ -2,147 +2,210 @@
 Query Rewriter para mejorar retrieval semántico.
 
 Transforma queries coloquiales en queries que matchean mejor con el contenido de los chunks.
+
+La tabla de expansiones vive en config/synonyms.yaml y se compila en un trie
+de tokens:
+- Una sola pasada sobre la query (no se recorren los ~70 patrones)
+- Gana el patrón más largo ("para guardia" sobre "guardia")
+- Plurales en singular de los dos lados del trie ("guardias",
+  "internaciones" matchean "guardia", "internacion")
+- La salida es un set deduplicado de tokens (embeddings más cortos)
+- Resultado memoizado por (query normalizada, obra_social)
 """
-import re
-import unicodedata
-from typing import List
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import yaml
+
+from .normalized_text import NormalizedText, normalize_text, fold
+
+
+# Clave reservada en los nodos del trie para la expansión terminal
+# (los tokens normalizados nunca son vacíos)
+_TERMINAL = ""
+
+# Consonantes tras las que el plural agrega -es (internacion → internaciones)
+_PLURAL_ES = "lnrdzj"
 
 
-def _normalize_for_matching(text: str) -> str:
+def _singular(token: str) -> str:
     """
-    Normaliza texto para matching de patrones.
-    Remueve tildes y convierte a lowercase.
+    Singular aproximado de un token normalizado (clave del trie).
+    No es un stemmer: solo recorta la -s o -es del plural.
 
-    "¿Cuánto cuesta?" → "cuanto cuesta"
+    "guardias" → "guardia", "internaciones" → "internacion",
+    "disponibles" → "disponible"
     """
-    text = text.lower()
-    # Remover tildes
-    text = unicodedata.normalize('NFD', text)
-    text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
-    return text
-
-
-# Mapeo de sinónimos/expansiones para mejorar retrieval
-SYNONYM_EXPANSIONS = {
-    # Coseguros/precios
-    "cuanto cuesta": "valor precio coseguro tarifa",
-    "cuanto sale": "valor precio coseguro tarifa",
-    "cuanto es el coseguro": "valor precio coseguro",
-    "cuanto es el copago": "valor precio coseguro",
-    "que precio tiene": "valor precio coseguro tarifa",
-    "importe de coseguro": "valor precio coseguro tarifa pesos consulta especialista",
-    "importe coseguro": "valor precio coseguro tarifa pesos consulta especialista",
-
-    # Médicos
-    "pediatra": "pediatra médico familia generalista",
-    "ginecologo": "ginecólogo tocoginecólogo",
-    "clinico": "clínico médico familia generalista",
-    "medico de cabecera": "médico familia generalista",
-
-    # Exenciones
-    "quienes no pagan": "exentos excluidos programas HIV oncología discapacidad PMI guardia urgencia",
-    "quien no paga": "exentos excluidos programas HIV oncología discapacidad PMI",
-    "no paga coseguro": "exentos excluidos programas HIV oncología",
-    "estan exentos": "exentos excluidos programas HIV oncología discapacidad PMI",
-    "exentos de coseguro": "exentos programas HIV oncología discapacidad PMI guardia",
-
-    # Imágenes
-    "tomografia": "TAC tomografía alta complejidad",
-    "resonancia": "RMN resonancia magnética alta complejidad",
-    "ecografia": "ecografía imágenes baja complejidad",
-    "radiografia": "RX radiografía imágenes baja complejidad",
-    "imagenes alta complejidad": "TAC RMN tomografía resonancia endoscopia medicina nuclear",
-    "imágenes alta complejidad": "TAC RMN tomografía resonancia endoscopia medicina nuclear",
-
-    # Autorizaciones
-    "necesito autorizacion": "requiere autorización previa",
-    "tengo que pedir autorizacion": "requiere autorización previa",
-    "hay que autorizar": "requiere autorización previa",
-
-    # Documentación
-    "que necesito": "requisitos documentación documentos",
-    "que documentos": "requisitos documentación",
-    "que tengo que llevar": "requisitos documentación documentos",
-    "que debo presentar": "requisitos documentación documentos",
-
-    # Guardia - enfatizar documentación e ingreso
-    "guardia": "guardia ingreso documentación validador DNI",
-    "urgencia": "guardia urgencia emergencia ingreso",
-    "para guardia": "ingreso guardia documentación validador DNI checklist",
-
-    # Internación
-    "internarme": "internación internación programada",
-    "internacion": "internación hospitalización",
-
-    # Salud mental
-    "salud mental": "psiquiatría psicología turnos salud mental",
-    "turnos de salud mental": "psiquiatría turnos teléfono 11-5702-9599",
-    "telefono salud mental": "psiquiatría turnos teléfono 11-5702-9599",
-
-    # Tiempos y vigencia
-    "cuanto tiempo": "plazo días horas vigencia",
-    "en cuanto tiempo": "plazo días horas",
-    "cuanto dura": "vigencia días plazo tiempo duración",
-    "cuanto duran": "vigencia días plazo tiempo duración",
-    "debo avisar": "denuncia plazo 24 horas",
-    "avisar una internación": "denuncia internación plazo 24 horas",
-
-    # Coseguros específicos (para que matcheen con COSEGUROS_VALORES)
-    "coseguro fonoaudiología": "coseguro fonoaudiología valor prestaciones tarifa sesión",
-    "coseguro laboratorio": "coseguro laboratorio valor prestaciones determinaciones tarifa",
-    "coseguro fono": "coseguro fonoaudiología valor prestaciones",
-    "coseguro especialista": "coseguro médicos especialistas valor tarifa precio consulta",
-    "especialista": "médicos especialistas consulta valor tarifa precio",
-
-    # Planes
-    "planes disponibles": "planes Delta Krono Quantum Integral Total Global categorías",
-    "que planes tiene": "planes Delta Krono Quantum Integral Total Global",
-    "que planes hay": "planes Delta Krono Quantum categorías",
-}
-
-# Palabras a agregar según contexto de obra social
-OBRA_SOCIAL_CONTEXT = {
-    "ENSALUD": ["ENSALUD", "prestaciones"],
-    "ASI": ["ASI", "ASI Salud"],
-    "IOSFA": ["IOSFA", "fuerzas armadas"],
-    "GRUPO_PEDIATRICO": ["grupo pediátrico", "pediatría"],
-}
-
-
-def rewrite_query(query: str, obra_social: str = None) -> str:
+    if len(token) <= 3 or not token.endswith("s"):
+        return token
+    stem = token[:-2]
+    if token.endswith("es") and stem[-1:] in _PLURAL_ES and stem[-2:-1] in "aeiou":
+        return stem
+    return token[:-1]
+
+
+class QueryExpander:
+    """
+    Motor de expansión de queries basado en un trie de tokens.
+    NO usa LLM. Configurado desde YAML.
+    """
+
+    def __init__(self, config_path: str = None):
+        """
+        Args:
+            config_path: Ruta a synonyms.yaml (opcional, busca por defecto)
+        """
+        if config_path is None:
+            possible_paths = [
+                Path(__file__).parent.parent / "config" / "synonyms.yaml",
+                Path(__file__).parent.parent.parent / "config" / "synonyms.yaml",
+            ]
+            for p in possible_paths:
+                if p.exists():
+                    config_path = str(p)
+                    break
+
+        if config_path is None:
+            raise FileNotFoundError("No se encontró config/synonyms.yaml")
+
+        self.config_path = Path(config_path)
+        self._trie: Dict = {}
+        self._context: Dict[str, List[Tuple[str, str]]] = {}
+        self._load_config()
+
+    def _load_config(self):
+        """Carga la tabla desde YAML y compila el trie"""
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+
+        self._trie = {}
+        for pattern, expansion in (config.get("expansions") or {}).items():
+            tokens = [_singular(token) for token in fold(pattern).split()]
+            if not tokens:
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_TERMINAL] = self._compile_tokens(expansion)
+
+        self._context = {
+            obra_social.upper(): self._compile_tokens(" ".join(words))
+            for obra_social, words in (config.get("obra_social_context") or {}).items()
+        }
+
+        cache_size = (config.get("cache") or {}).get("max_size", 1024)
+        self._expand_cached = lru_cache(maxsize=cache_size)(self._expand)
+
+    @staticmethod
+    def _compile_tokens(text: str) -> List[Tuple[str, str]]:
+        """Separa una expansión en (token original, token normalizado)"""
+        return [(token, fold(token)) for token in text.split() if fold(token)]
+
+    def _match(self, tokens: Tuple[str, ...]) -> List[List[Tuple[str, str]]]:
+        """
+        Recorre la query una vez y devuelve las expansiones matcheadas.
+        En cada posición se queda con el patrón más largo y salta al final
+        del match (los patrones no se solapan).
+        """
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self._trie
+            best = None
+            best_end = i
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _TERMINAL in node:
+                    best = node[_TERMINAL]
+                    best_end = j
+            if best is None:
+                i += 1
+            else:
+                matches.append(best)
+                i = best_end
+        return matches
+
+    def _expand(self, query_text: str, obra_social: Optional[str]) -> str:
+        """
+        Calcula el sufijo de expansión para una query normalizada.
+
+        Returns:
+            Tokens agregados (deduplicados, sin repetir los de la query)
+        """
+        tokens = tuple(query_text.split())
+        seen = set(tokens)
+        added: List[str] = []
+
+        def emit(expansion: List[Tuple[str, str]]):
+            for token, key in expansion:
+                if key not in seen:
+                    seen.add(key)
+                    added.append(token)
+
+        for expansion in self._match(tuple(_singular(token) for token in tokens)):
+            emit(expansion)
+
+        # Agregar contexto de obra social si no está mencionada
+        if obra_social and obra_social in self._context:
+            if fold(obra_social) not in seen:
+                emit(self._context[obra_social])
+
+        return " ".join(added)
+
+    def expand(self, query: Union[str, NormalizedText], obra_social: str = None) -> str:
+        """
+        Sufijo de expansión (memoizado por query normalizada + obra social).
+
+        Args:
+            query: Query original o su NormalizedText
+            obra_social: Obra social detectada (opcional)
+        """
+        normalized = normalize_text(query)
+        return self._expand_cached(normalized.text, obra_social.upper() if obra_social else None)
+
+    def cache_info(self):
+        """Estadísticas del cache de expansiones (hits, misses, size)"""
+        return self._expand_cached.cache_info()
+
+
+# Singleton global
+_query_expander: Optional[QueryExpander] = None
+
+
+def get_query_expander(config_path: str = None) -> QueryExpander:
+    """Obtiene el motor de expansión (singleton)"""
+    global _query_expander
+    if _query_expander is None:
+        _query_expander = QueryExpander(config_path)
+    return _query_expander
+
+
+def reset_query_expander():
+    """Resetea el singleton (útil para tests)"""
+    global _query_expander
+    _query_expander = None
+
+
+def rewrite_query(query: Union[str, NormalizedText], obra_social: str = None) -> str:
     """
     Reescribe una query para mejorar el retrieval.
 
     Args:
-        query: Query original del usuario
+        query: Query original del usuario o su NormalizedText
         obra_social: Obra social detectada (opcional)
 
     Returns:
         Query expandida con sinónimos
     """
-    # Normalizar query para matching (sin tildes, lowercase)
-    query_normalized = _normalize_for_matching(query)
-    expansions = []
-
-    # Buscar expansiones de sinónimos (patrones ya están sin tildes)
-    for pattern, expansion in SYNONYM_EXPANSIONS.items():
-        if pattern in query_normalized:
-            expansions.append(expansion)
-
-    # Si hay expansiones, agregarlas a la query
-    if expansions:
-        expansion_text = " ".join(expansions)
-        rewritten = f"{query} {expansion_text}"
-    else:
-        rewritten = query
-
-    # Agregar contexto de obra social si está presente
-    if obra_social and obra_social.upper() in OBRA_SOCIAL_CONTEXT:
-        context = " ".join(OBRA_SOCIAL_CONTEXT[obra_social.upper()])
-        if obra_social.upper() not in rewritten.upper():
-            rewritten = f"{rewritten} {context}"
-
-    return rewritten
+    normalized = normalize_text(query)
+    expansion_text = get_query_expander().expand(normalized, obra_social)
+
+    if expansion_text:
+        return f"{normalized.original} {expansion_text}"
+    return normalized.original
 
 
 def get_query_variations(query: str) -> List[str]:
@@ -5,16 +5,29 @@ Diferencia con Modo Consulta:
 - Mantiene historial de conversación
 - Puede referenciar turnos anteriores
 - Prompt más conversacional
+
+Un único router se comparte entre chats; el estado de cada conversación
+(historial, última entidad) vive en ChatSession (ver session.py).
+
+process_query (sincrónico) y aprocess_query (async) comparten las etapas
+_prepare (entidad, RAG, prompt) y _complete (historial, métricas).
 """
 import time
+import asyncio
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable, Union
 from dataclasses import dataclass
 
 import yaml
 
 from .entity_detector import EntityDetector, EntityResult, get_entity_detector
+from .normalized_text import NormalizedText
+from .session import ChatSession, RetrievalMemo
+from .history_store import build_history_backend
+from .history_policy import TokenBudgetHistory
 from ..metrics.collector import QueryMetrics, count_tokens_approximate
 
 logger = logging.getLogger(__name__)
@@ -64,13 +77,28 @@ class AgenteResult:
         }
 
 
+@dataclass
+class _LLMRequest:
+    """Consulta preparada para el LLM (estado entre _prepare y _complete)"""
+    query: str
+    session: ChatSession
+    entity_result: EntityResult
+    messages: List[Dict[str, str]]
+    context: str
+    chunks_info: list
+    chunks_count: int
+    top_similarity: float
+    start_time: float
+
+
 class AgenteRouter:
     """
     Router para Modo Agente.
 
     Flujo:
     1. Entity Detection (sin LLM)
-    2. Si entity == null → respuesta fija
+    2. Si entity == null → entidad arrastrada de la sesión (confidence="carried")
+       o, si no hay / venció, respuesta fija
     3. Si entity != null → RAG filtrado + LLM con historial
     """
 
@@ -79,14 +107,16 @@ class AgenteRouter:
         retriever,  # ChromaRetriever
         llm_client,  # GroqClient
         entity_detector: EntityDetector = None,
-        config_path: str = None
+        config_path: str = None,
+        async_llm_client=None  # AsyncGroqClient (opcional, para aprocess_query)
     ):
         self.retriever = retriever
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
         self.entity_detector = entity_detector or get_entity_detector()
 
-        # Historial de conversación por sesión
-        self.history: List[Dict[str, str]] = []
+        # Sesión por defecto (uso directo del router, sin SessionStore)
+        self.default_session = ChatSession(chat_id=None)
 
         # Cargar config del escenario
         if config_path is None:
@@ -96,23 +126,71 @@ class AgenteRouter:
             self.config = yaml.safe_load(f)
 
         self.system_prompt = self.config.get("prompt", {}).get("system", "")
-        self.top_k = self.config.get("rag", {}).get("top_k", 3)
-        self.max_history_turns = self.config.get("mode", {}).get("max_history_turns", 5)
+        rag_config = self.config.get("rag", {})
+        self.top_k = rag_config.get("top_k", 3)
+
+        # Repreguntas casi iguales (misma entidad): reusar los chunks del turno anterior
+        self.reuse_min_similarity = rag_config.get("reuse_min_similarity", 0.92)
+        self.reuse_max_turns = rag_config.get("reuse_max_turns", 2)
+        mode_config = self.config.get("mode", {})
+        self.max_history_turns = mode_config.get("max_history_turns", 5)
+
+        # Repreguntas sin entidad: reusar la última detectada durante N turnos
+        self.entity_carry_turns = mode_config.get("entity_carry_turns", 3)
+
+        # Historial por presupuesto de tokens + resumen de turnos viejos
+        self.history_policy = TokenBudgetHistory(
+            budget_tokens=mode_config.get("history_token_budget", 600),
+            summary_max_tokens=mode_config.get("summary_max_tokens", 150),
+            min_recent_turns=mode_config.get("min_recent_turns", 1),
+            max_turns=self.max_history_turns
+        )
+
+        # Persistencia del historial (memory | sqlite)
+        self.history_backend = build_history_backend(
+            self.config.get("history"), Path(config_path).parent
+        )
+
+        # Trabajo bloqueante de aprocess_query (mismo tope que el ChatDispatcher)
+        self.max_workers = (self.config.get("concurrency", {}) or {}).get("max_workers", 4)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def history(self) -> List[Dict[str, str]]:
+        """Historial de la sesión por defecto"""
+        return self.default_session.history
+
+    @history.setter
+    def history(self, value: List[Dict[str, str]]):
+        self.default_session.history = value
 
     def clear_history(self):
-        """Limpia el historial de conversación"""
-        self.history = []
+        """Limpia el historial de la sesión por defecto"""
+        self.default_session.clear()
 
     def _build_messages_with_history(
         self,
         context: str,
-        query: str
+        query: str,
+        history: List[Dict[str, str]] = None,
+        summary: str = ""
     ) -> List[Dict[str, str]]:
-        """Construye mensajes incluyendo historial"""
+        """Construye mensajes incluyendo resumen e historial"""
+        if history is None:
+            history = self.history
+
         messages = [{"role": "system", "content": self.system_prompt}]
 
+        # Resumen de los turnos que ya no se envían textuales
+        if summary:
+            messages.append({
+                "role": "system",
+                "content": f"RESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{summary}"
+            })
+
         # Agregar historial (últimos N turnos)
-        history_to_use = self.history[-self.max_history_turns * 2:]  # *2 porque hay user+assistant
+        history_to_use = history[-self.max_history_turns * 2:]  # *2 porque hay user+assistant
         messages.extend(history_to_use)
 
         # Agregar query actual con contexto
@@ -121,10 +199,145 @@ class AgenteRouter:
 
         return messages
 
+    def _retrieve(
+        self,
+        query: str,
+        normalized: NormalizedText,
+        rag_filter: Optional[str],
+        session: ChatSession
+    ) -> tuple:
+        """
+        RAG con reuso de la recuperación anterior de la sesión.
+
+        Si la query es casi la misma que la del turno anterior (misma entidad y
+        embedding cercano), se reusan esos chunks sin consultar ChromaDB. El
+        embedding se calcula una sola vez y se pasa a retrieve().
+
+        Returns:
+            (chunks, reused)
+        """
+        memo = session.last_retrieval
+        if memo is not None and memo.reuses >= self.reuse_max_turns:
+            memo = None
+
+        # Misma query normalizada: ni siquiera hace falta el embedding
+        if memo is not None and memo.matches(rag_filter, normalized.text, None, self.reuse_min_similarity):
+            memo.reuses += 1
+            return memo.chunks, True
+
+        embedding = None
+        if hasattr(self.retriever, "embed_query"):
+            embedding = self.retriever.embed_query(
+                query, obra_social_filter=rag_filter, normalized=normalized
+            )
+            if memo is not None and memo.matches(
+                rag_filter, normalized.text, embedding, self.reuse_min_similarity
+            ):
+                memo.reuses += 1
+                return memo.chunks, True
+
+        if embedding is not None:
+            chunks = self.retriever.retrieve(
+                query=query,
+                top_k=self.top_k,
+                obra_social_filter=rag_filter,
+                normalized=normalized,
+                query_embedding=embedding
+            )
+        else:
+            chunks = self.retriever.retrieve(
+                query=query,
+                top_k=self.top_k,
+                obra_social_filter=rag_filter,
+                normalized=normalized
+            )
+
+        session.last_retrieval = RetrievalMemo(
+            rag_filter=rag_filter,
+            query_text=normalized.text,
+            embedding=embedding,
+            chunks=chunks
+        )
+        return chunks, False
+
+    def _partial_callback(
+        self,
+        on_partial: Callable[[str], None],
+        llm_start: float,
+        metrics: Optional[QueryMetrics]
+    ) -> Callable[[str], None]:
+        """Adapta on_partial (texto acumulado) a on_delta (fragmentos) y mide el primer token"""
+        parts = []
+
+        def on_delta(delta: str):
+            if not parts and metrics:
+                metrics.latency_first_token_ms = (time.perf_counter() - llm_start) * 1000
+            parts.append(delta)
+            on_partial("".join(parts))
+
+        return on_delta
+
+    def _call_llm(
+        self,
+        messages: List[Dict[str, str]],
+        on_partial: Optional[Callable[[str], None]],
+        llm_start: float,
+        metrics: Optional[QueryMetrics]
+    ) -> Dict[str, Any]:
+        """
+        Llama al LLM, en streaming si hay callback y el cliente lo soporta.
+
+        on_partial recibe el texto acumulado (no el fragmento) en cada delta.
+        """
+        if on_partial is None or not hasattr(self.llm_client, "generate_stream"):
+            return self.llm_client.generate(messages)
+
+        on_delta = self._partial_callback(on_partial, llm_start, metrics)
+        return self.llm_client.generate_stream(messages, on_delta=on_delta)
+
+    async def _acall_llm(
+        self,
+        messages: List[Dict[str, str]],
+        on_partial: Optional[Callable[[str], None]],
+        llm_start: float,
+        metrics: Optional[QueryMetrics]
+    ) -> Dict[str, Any]:
+        """
+        Versión async de _call_llm.
+
+        Sin cliente async, el cliente sincrónico corre en get_executor().
+        """
+        client = self.async_llm_client
+        if client is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.get_executor(), self._call_llm, messages, on_partial, llm_start, metrics
+            )
+
+        if on_partial is None or not hasattr(client, "agenerate_stream"):
+            return await client.agenerate(messages)
+
+        on_delta = self._partial_callback(on_partial, llm_start, metrics)
+        return await client.agenerate_stream(messages, on_delta=on_delta)
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """
+        Threads del trabajo bloqueante en modo async (creados al primer uso).
+
+        Acotados a concurrency.max_workers: run_async del dispatcher no usa
+        su pool, así que el tope lo pone este executor.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="router")
+            return self._executor
+
     def process_query(
         self,
         query: str,
-        metrics: QueryMetrics = None
+        metrics: QueryMetrics = None,
+        on_partial: Callable[[str], None] = None,
+        session: ChatSession = None
     ) -> AgenteResult:
         """
         Procesa una consulta en Modo Agente.
@@ -132,17 +345,87 @@ class AgenteRouter:
         Args:
             query: Pregunta del usuario
             metrics: Objeto de métricas (opcional)
+            on_partial: Callback con la respuesta parcial mientras el LLM
+                genera (opcional; solo se invoca si se ejecuta el LLM)
+            session: Sesión del chat (historial y entidad); por defecto
+                la sesión propia del router
 
         Returns:
             AgenteResult con respuesta y metadatos
         """
+        prepared = self._prepare(query, metrics, session)
+        if isinstance(prepared, AgenteResult):
+            return prepared
+
+        llm_start = time.perf_counter()
+        try:
+            llm_result = self._call_llm(prepared.messages, on_partial, llm_start, metrics)
+        except Exception as e:
+            logger.error(f"Error en LLM: {e}")
+            llm_result = None
+
+        return self._complete(prepared, llm_result, llm_start, metrics)
+
+    async def aprocess_query(
+        self,
+        query: str,
+        metrics: QueryMetrics = None,
+        on_partial: Callable[[str], None] = None,
+        session: ChatSession = None
+    ) -> AgenteResult:
+        """
+        Versión async de process_query.
+
+        Entity detection, RAG y carga/ajuste del historial corren en
+        get_executor(); el LLM se espera sin ocupar un thread si hay
+        async_llm_client. El llamador garantiza un turno a la vez por sesión.
+        """
+        loop = asyncio.get_running_loop()
+        prepared = await loop.run_in_executor(self.get_executor(), self._prepare, query, metrics, session)
+        if isinstance(prepared, AgenteResult):
+            return prepared
+
+        llm_start = time.perf_counter()
+        try:
+            llm_result = await self._acall_llm(prepared.messages, on_partial, llm_start, metrics)
+        except Exception as e:
+            logger.error(f"Error en LLM: {e}")
+            llm_result = None
+
+        return self._complete(prepared, llm_result, llm_start, metrics)
+
+    def _prepare(
+        self,
+        query: str,
+        metrics: Optional[QueryMetrics],
+        session: Optional[ChatSession]
+    ) -> Union[AgenteResult, _LLMRequest]:
+        """
+        Etapas previas al LLM: entidad, RAG e historial.
+
+        Returns:
+            AgenteResult si la consulta se resuelve sin LLM (sin entidad), o
+            _LLMRequest con los mensajes listos para el LLM
+        """
         start_time = time.perf_counter()
+        if session is None:
+            session = self.default_session
 
         # =====================================================================
         # PASO 1: Entity Detection
         # =====================================================================
         entity_start = time.perf_counter()
-        entity_result = self.entity_detector.detect(query)
+        # Normalización única, compartida por detector y rewriter
+        normalized = NormalizedText.from_text(query)
+        entity_result = self.entity_detector.detect(normalized)
+
+        if entity_result.detected:
+            session.remember_entity(entity_result)
+        else:
+            # Repregunta ("¿Y qué planes tienen?"): arrastrar la entidad de la sesión
+            carried = session.carry_entity(self.entity_carry_turns)
+            if carried is not None:
+                entity_result = carried
         entity_time_ms = (time.perf_counter() - entity_start) * 1000
 
         logger.info(f"Entity detection: {entity_result.entity} ({entity_result.confidence}) en {entity_time_ms:.2f}ms")
@@ -162,7 +445,7 @@ class AgenteRouter:
                 metrics.tokens_input = 0
                 metrics.tokens_output = 0
                 metrics.latency_total_ms = (time.perf_counter() - start_time) * 1000
-                metrics.history_turns = len(self.history) // 2
+                metrics.history_turns = session.turns
 
             return AgenteResult(
                 respuesta=respuesta,
@@ -173,7 +456,7 @@ class AgenteRouter:
                 chunks_count=0,
                 top_similarity=0.0,
                 chunks_info=[],
-                history_turns=len(self.history) // 2,
+                history_turns=session.turns,
                 metrics=metrics
             )
 
@@ -186,11 +469,9 @@ class AgenteRouter:
         rag_start = time.perf_counter()
         rag_filter = entity_result.rag_filter
 
-        chunks = self.retriever.retrieve(
-            query=query,
-            top_k=self.top_k,
-            obra_social_filter=rag_filter
-        )
+        previous = session.last_retrieval
+        previous_ids = set(previous.chunk_ids) if previous else set()
+        chunks, reused = self._retrieve(query, normalized, rag_filter, session)
 
         # Construir contexto
         chunks_info = []
@@ -212,24 +493,34 @@ class AgenteRouter:
 
         rag_time_ms = (time.perf_counter() - rag_start) * 1000
 
+        # Chunks que ya fueron en el prompt del turno anterior
+        repeated = [c for c in chunks_info if c.chunk_id in previous_ids]
+
         if metrics:
             metrics.latency_faiss_ms = rag_time_ms
             metrics.rag_used = True
             metrics.rag_chunks_count = len(chunks)
             metrics.rag_top_similarity = top_similarity
+            metrics.rag_reused = reused
+            metrics.rag_chunks_reused = len(repeated)
+            metrics.tokens_context_reused = sum(count_tokens_approximate(c.text) for c in repeated)
 
-        logger.info(f"RAG: {len(chunks)} chunks en {rag_time_ms:.2f}ms")
+        logger.info(
+            f"RAG: {len(chunks)} chunks en {rag_time_ms:.2f}ms"
+            + (" (reusados del turno anterior)" if reused else "")
+        )
 
         # =====================================================================
         # PASO 4: LLM con historial
         # =====================================================================
-        llm_start = time.perf_counter()
 
         # Construir mensajes con historial
-        messages = self._build_messages_with_history(context, query)
+        # Ajustar historial al presupuesto (sesiones recién cargadas pueden excederlo)
+        self.history_policy.trim(session)
+        messages = self._build_messages_with_history(context, query, session.history, session.summary)
 
         # Contar tokens
-        tokens_history = sum(count_tokens_approximate(m["content"]) for m in self.history)
+        tokens_history = self.history_policy.tokens(session)
         tokens_context = count_tokens_approximate(context)
         tokens_query = count_tokens_approximate(query)
         tokens_system = count_tokens_approximate(self.system_prompt)
@@ -239,45 +530,84 @@ class AgenteRouter:
             metrics.tokens_input = tokens_input
             metrics.tokens_context = tokens_context
             metrics.tokens_history = tokens_history
+            metrics.tokens_summary = count_tokens_approximate(session.summary)
 
-        # Llamar al LLM
-        try:
-            llm_result = self.llm_client.generate(messages)
+        return _LLMRequest(
+            query=query,
+            session=session,
+            entity_result=entity_result,
+            messages=messages,
+            context=context,
+            chunks_info=chunks_info,
+            chunks_count=len(chunks),
+            top_similarity=top_similarity,
+            start_time=start_time
+        )
+
+    def _complete(
+        self,
+        request: _LLMRequest,
+        llm_result: Optional[Dict[str, Any]],
+        llm_start: float,
+        metrics: Optional[QueryMetrics]
+    ) -> AgenteResult:
+        """Etapa posterior al LLM: historial, métricas y resultado (llm_result None = excepción)"""
+        query = request.query
+        session = request.session
+
+        if llm_result is not None:
             respuesta = llm_result["respuesta"]
             tokens_output = llm_result.get("tokens_output", count_tokens_approximate(respuesta))
-        except Exception as e:
-            logger.error(f"Error en LLM: {e}")
+        else:
             respuesta = "Error al procesar la consulta."
             tokens_output = 0
 
         llm_time_ms = (time.perf_counter() - llm_start) * 1000
 
-        # Actualizar historial
-        self.history.append({"role": "user", "content": query})
-        self.history.append({"role": "assistant", "content": respuesta})
+        # Actualizar historial y entidad de la sesión
+        turn = [
+            {"role": "user", "content": query},
+            {"role": "assistant", "content": respuesta}
+        ]
+        session.history.extend(turn)
+
+        # Persistir (encolado, no bloquea)
+        if session.chat_id is not None:
+            self.history_backend.append(session.chat_id, turn)
 
-        # Truncar historial si excede límite
-        if len(self.history) > self.max_history_turns * 2:
-            self.history = self.history[-self.max_history_turns * 2:]
+        # Plegar en el resumen lo que exceda el presupuesto (el próximo prompt queda acotado)
+        folded = self.history_policy.trim(session)
+        if folded:
+            logger.info(f"Historial: {folded} turno(s) plegados en el resumen")
 
         if metrics:
             metrics.tokens_output = tokens_output
             metrics.latency_llm_ms = llm_time_ms
+            limits = (llm_result or {}).get("rate_limit") or {}
+            metrics.latency_throttle_ms = limits.get("throttle_wait_ms", 0.0)
+            metrics.llm_retries = limits.get("retries", 0)
+            metrics.llm_queue_depth = limits.get("queue_depth", 0)
+            if (llm_result or {}).get("coalesced"):
+                # Respuesta compartida: el request (y sus tokens) lo pagó otra consulta
+                metrics.llm_coalesced = True
+                metrics.tokens_input = 0
+                metrics.tokens_output = 0
             metrics.response_text = respuesta
-            metrics.latency_total_ms = (time.perf_counter() - start_time) * 1000
-            metrics.history_turns = len(self.history) // 2
+            metrics.latency_total_ms = (time.perf_counter() - request.start_time) * 1000
+            metrics.history_turns = session.turns
 
-        logger.info(f"LLM: {tokens_output} tokens en {llm_time_ms:.2f}ms | Historial: {len(self.history)//2} turnos")
+        logger.info(f"LLM: {tokens_output} tokens en {llm_time_ms:.2f}ms | Historial: {session.turns} turnos")
 
+        context = request.context
         return AgenteResult(
             respuesta=respuesta,
-            entity_result=entity_result,
+            entity_result=request.entity_result,
             rag_executed=True,
             llm_executed=True,
             context_used=context[:500] + "..." if len(context) > 500 else context,
-            chunks_count=len(chunks),
-            top_similarity=top_similarity,
-            chunks_info=chunks_info,
-            history_turns=len(self.history) // 2,
+            chunks_count=request.chunks_count,
+            top_similarity=request.top_similarity,
+            chunks_info=request.chunks_info,
+            history_turns=session.turns,
             metrics=metrics
         )
@@ -0,0 +1,252 @@
+"""
+Sesiones de conversación para Modo Agente.
+
+El router es uno solo (config, prompt, retriever y LLM compartidos); lo
+que varía por chat vive en ChatSession: historial y última entidad.
+
+La entidad detectada se recuerda para las repreguntas sin obra social
+("¿Y qué planes tienen?"), con vencimiento por cantidad de turnos.
+También se recuerda la última recuperación RAG (RetrievalMemo) para no
+volver a consultar ChromaDB cuando la repregunta es casi la misma.
+
+SessionStore mantiene las sesiones acotadas en memoria:
+- TTL por inactividad (chats que no escriben hace rato se descartan)
+- Máximo de sesiones con evicción LRU
+- Thread-safe (los workers del dispatcher acceden en paralelo)
+- Con un backend de historial (history_store.py), las sesiones nuevas se
+  cargan desde el backend: expirar/evictar solo libera memoria
+"""
+import sys
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from .entity_detector import EntityResult
+
+logger = logging.getLogger(__name__)
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """Similitud coseno entre dos embeddings (0.0 si alguno es nulo)"""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+@dataclass
+class RetrievalMemo:
+    """Última recuperación RAG de la sesión"""
+    rag_filter: Optional[str]
+    query_text: str  # Query normalizada
+    embedding: Optional[List[float]]  # None si el retriever no expone embed_query
+    chunks: List[Tuple[str, Dict, float]]
+    reuses: int = 0  # Turnos seguidos que se reusaron estos chunks
+
+    @property
+    def chunk_ids(self) -> List[str]:
+        return [metadata.get("chunk_id", "N/A") for _, metadata, _ in self.chunks]
+
+    def matches(
+        self,
+        rag_filter: Optional[str],
+        query_text: str,
+        embedding: Optional[List[float]],
+        min_similarity: float
+    ) -> bool:
+        """True si una query nueva puede reusar estos chunks"""
+        if rag_filter != self.rag_filter:
+            return False
+        if query_text == self.query_text:
+            return True
+        if embedding is None or self.embedding is None:
+            return False
+        return cosine_similarity(embedding, self.embedding) >= min_similarity
+
+
+@dataclass
+class ChatSession:
+    """Estado conversacional de un chat"""
+    chat_id: Hashable
+    history: List[Dict[str, str]] = field(default_factory=list)
+    summary: str = ""  # Resumen extractivo de los turnos plegados
+    last_entity_result: Optional[EntityResult] = None  # Última entidad detectada explícitamente
+    entity_age: int = 0  # Turnos consecutivos usando la entidad arrastrada
+    last_retrieval: Optional[RetrievalMemo] = None  # Chunks del último turno con RAG
+    created_at: float = field(default_factory=time.time)
+    last_active: float = field(default_factory=time.time)
+
+    @property
+    def last_entity(self) -> Optional[str]:
+        """Nombre de la última entidad detectada"""
+        return self.last_entity_result.entity if self.last_entity_result else None
+
+    def remember_entity(self, entity_result: EntityResult):
+        """Registra una entidad detectada en la query (reinicia el vencimiento)"""
+        self.last_entity_result = entity_result
+        self.entity_age = 0
+
+    def carry_entity(self, max_turns: int) -> Optional[EntityResult]:
+        """
+        Entidad para una repregunta sin obra social.
+
+        Args:
+            max_turns: Repreguntas seguidas que puede durar la entidad
+
+        Returns:
+            EntityResult con confidence="carried", o None si no hay o venció
+        """
+        last = self.last_entity_result
+        if last is None or self.entity_age >= max_turns:
+            return None
+
+        self.entity_age += 1
+        return EntityResult(
+            entity=last.entity,
+            entity_type=last.entity_type,
+            rag_filter=last.rag_filter,
+            matched_term=last.matched_term,
+            confidence="carried"
+        )
+
+    @property
+    def turns(self) -> int:
+        """Turnos completos (user + assistant) en el historial"""
+        return len(self.history) // 2
+
+    def clear(self):
+        """Limpia el historial y la entidad de la sesión"""
+        self.history = []
+        self.summary = ""
+        self.last_entity_result = None
+        self.entity_age = 0
+        self.last_retrieval = None
+
+    def approx_bytes(self) -> int:
+        """Memoria aproximada de la sesión (objeto + historial)"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.history) + sys.getsizeof(self.summary)
+        for message in self.history:
+            size += sys.getsizeof(message)
+            size += sum(sys.getsizeof(v) for v in message.values())
+        return size
+
+
+class SessionStore:
+    """Sesiones por chat con TTL de inactividad y evicción LRU"""
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        idle_ttl_seconds: float = 3600,
+        backend=None,
+        load_messages: int = 10
+    ):
+        """
+        Args:
+            max_sessions: Máximo de sesiones en memoria (LRU)
+            idle_ttl_seconds: Segundos sin actividad antes de descartar una sesión
+            backend: Backend de historial persistente (opcional)
+            load_messages: Mensajes a cargar del backend al crear una sesión
+        """
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.backend = backend
+        self.load_messages = load_messages
+
+        # Ordenadas por última actividad (la primera es la menos reciente)
+        self._sessions: "OrderedDict[Hashable, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, chat_id: Hashable) -> ChatSession:
+        """
+        Obtiene la sesión del chat (la crea si no existe o expiró).
+
+        Puede leer del backend: llamar desde el worker, no desde el event loop.
+        """
+        now = time.time()
+        created = False
+        with self._lock:
+            self._evict_expired(now)
+
+            session = self._sessions.get(chat_id)
+            if session is None:
+                session = ChatSession(chat_id=chat_id)
+                self._sessions[chat_id] = session
+                self.created += 1
+                created = True
+
+                while len(self._sessions) > self.max_sessions:
+                    old_id, _ = self._sessions.popitem(last=False)
+                    self.evicted += 1
+                    logger.info(f"Sesión {old_id} evictada (LRU)")
+
+            session.last_active = now
+            self._sessions.move_to_end(chat_id)
+
+        # Fuera del lock: la lectura no frena a otros chats (el dispatcher
+        # garantiza que no hay dos turnos del mismo chat en paralelo)
+        if created and self.backend is not None:
+            session.history = self.backend.load(chat_id, self.load_messages)
+
+        return session
+
+    def peek(self, chat_id: Hashable) -> Optional[ChatSession]:
+        """Retorna la sesión sin crearla ni marcar actividad"""
+        with self._lock:
+            return self._sessions.get(chat_id)
+
+    def drop(self, chat_id: Hashable) -> bool:
+        """Elimina la sesión de un chat"""
+        with self._lock:
+            return self._sessions.pop(chat_id, None) is not None
+
+    def clear(self, chat_id: Hashable):
+        """Olvida la conversación del chat (memoria y backend)"""
+        self.drop(chat_id)
+        if self.backend is not None:
+            self.backend.clear(chat_id)
+
+    def _evict_expired(self, now: float):
+        """Descarta sesiones inactivas (con el lock tomado)"""
+        cutoff = now - self.idle_ttl_seconds
+        while self._sessions:
+            chat_id, session = next(iter(self._sessions.items()))
+            if session.last_active >= cutoff:
+                break
+            del self._sessions[chat_id]
+            self.expired += 1
+            logger.info(f"Sesión {chat_id} expirada por inactividad")
+
+    def evict_expired(self) -> int:
+        """Descarta sesiones inactivas. Retorna cuántas se eliminaron."""
+        with self._lock:
+            before = len(self._sessions)
+            self._evict_expired(time.time())
+            return before - len(self._sessions)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, chat_id: Hashable) -> bool:
+        return chat_id in self._sessions
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas del store (sesiones activas, memoria, evicciones)"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "active": len(sessions),
+            "max_sessions": self.max_sessions,
+            "turns": sum(s.turns for s in sessions),
+            "memory_kb": round(sum(s.approx_bytes() for s in sessions) / 1024, 1),
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
@@ -0,0 +1,126 @@
+"""
+Edición progresiva de mensajes para respuestas en streaming.
+
+El LLM genera tokens de a poco; en vez de esperar la respuesta completa,
+el bot envía un primer mensaje apenas hay texto y lo va editando.
+
+Telegram limita las ediciones (~1 por segundo por chat), así que las
+actualizaciones se acumulan y solo se envía el último texto disponible
+cada `min_interval` segundos. El texto final siempre se envía.
+
+Independiente de Telegram: recibe callables async `send(text)` (retorna el
+mensaje creado) y `edit(message, text)`.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Límite de caracteres de un mensaje de Telegram
+MAX_MESSAGE_CHARS = 4096
+
+
+class ThrottledMessageEditor:
+    """Envía y edita un mensaje respetando un intervalo mínimo entre ediciones"""
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[Any]],
+        edit: Callable[[Any, str], Awaitable[Any]],
+        min_interval: float = 1.0,
+        min_chars: int = 20,
+        cursor: str = " …"
+    ):
+        """
+        Args:
+            send: Corrutina que envía un mensaje nuevo y lo retorna
+            edit: Corrutina que edita un mensaje ya enviado
+            min_interval: Segundos mínimos entre envíos/ediciones
+            min_chars: Caracteres mínimos antes del primer envío
+            cursor: Sufijo que indica que la respuesta sigue llegando
+        """
+        self._send = send
+        self._edit = edit
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self.cursor = cursor
+
+        self._latest = ""
+        self._shown: Optional[str] = None
+        self._message = None
+        self._last_update = 0.0
+        self._changed = asyncio.Event()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+
+        self.updates = 0
+
+    @property
+    def message(self):
+        """Mensaje enviado (None si todavía no se envió nada)"""
+        return self._message
+
+    def push(self, text: str):
+        """
+        Registra el texto parcial acumulado (no bloquea).
+
+        Debe llamarse desde el event loop; desde otro thread usar
+        loop.call_soon_threadsafe(editor.push, text).
+        """
+        if self._closed:
+            return
+        self._latest = text
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._changed.set()
+
+    async def _run(self):
+        """Loop de ediciones: espera cambios y respeta el intervalo"""
+        loop = asyncio.get_running_loop()
+        while not self._closed:
+            await self._changed.wait()
+            self._changed.clear()
+            if self._closed or len(self._latest.strip()) < self.min_chars:
+                continue
+
+            # Mientras se espera, los nuevos push() solo reemplazan _latest
+            wait = self._last_update + self.min_interval - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if self._closed:
+                break
+
+            await self._show(self._latest + self.cursor)
+
+    async def _show(self, text: str):
+        """Envía o edita el mensaje (ignora textos sin cambios)"""
+        text = text[:MAX_MESSAGE_CHARS]
+        if not text.strip() or text == self._shown:
+            return
+
+        try:
+            if self._message is None:
+                self._message = await self._send(text)
+            else:
+                await self._edit(self._message, text)
+            self._shown = text
+            self.updates += 1
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar el mensaje: {e}")
+        finally:
+            self._last_update = asyncio.get_running_loop().time()
+
+    async def finish(self, final_text: str):
+        """Detiene las ediciones parciales y deja el texto final"""
+        self._closed = True
+        self._changed.set()
+        if self._task is not None:
+            await self._task
+
+        if self._message is not None:
+            wait = self._last_update + self.min_interval - asyncio.get_running_loop().time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        await self._show(final_text)
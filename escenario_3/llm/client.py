@@ -3,13 +3,27 @@ Cliente LLM para Escenario 3 (Groq)
 ====================================
 
 Soporta historial de conversación para modo agente.
+
+Con un RateLimiter (rate_limiter.py), cada llamada espera cupo RPM/TPM y
+reintenta con backoff ante 429 / 5xx antes de propagar el error.
+
+Requests idénticos en vuelo comparten una sola llamada (SingleFlight).
+
+La disponibilidad sale del tráfico real (LLMHealth, health.py): no se
+llama a la API para saber si Groq responde, salvo tras un período ocioso.
 """
 import os
+import time
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+from typing import Dict, Any, List, Optional, Callable, Tuple
 
 from groq import Groq
 
+from .rate_limiter import RateLimiter, estimate_tokens, is_retryable, error_headers
+from .health import LLMHealth
+from .single_flight import SingleFlight, request_key, mark_coalesced
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,7 +34,11 @@ class GroqClient:
         self,
         model: str = "llama-3.3-70b-versatile",
         temperature: float = 0.3,
-        max_tokens: int = 300
+        max_tokens: int = 300,
+        rate_limiter: RateLimiter = None,
+        health: LLMHealth = None,
+        coalesce: bool = True,
+        base_url: str = None
     ):
         self.model = model
         self.temperature = temperature
@@ -30,9 +48,75 @@ class GroqClient:
         if not api_key:
             raise ValueError("GROQ_API_KEY not set")
 
-        self.client = Groq(api_key=api_key)
+        # Servidor alternativo (p.ej. el stand-in local); sin base_url, el
+        # SDK usa GROQ_BASE_URL o la API de Groq
+        self.base_url = base_url or os.getenv("GROQ_BASE_URL")
+
+        # Limitador RPM/TPM (opcional, compartible); con limitador los
+        # reintentos son suyos, no del SDK
+        self.rate_limiter = rate_limiter
+        if rate_limiter is not None:
+            self.client = Groq(api_key=api_key, base_url=self.base_url, max_retries=0)
+        else:
+            self.client = Groq(api_key=api_key, base_url=self.base_url)
+        # Salud pasiva (compartible con el cliente async)
+        self.health = health or LLMHealth()
+        self._probe_lock = threading.Lock()
+
+        # Requests idénticos concurrentes → una sola llamada
+        self.single_flight = SingleFlight() if coalesce else None
         logger.info(f"GroqClient inicializado: {model}")
 
+    def _create(self, messages: List[Dict[str, str]], **kwargs) -> Tuple[Any, Dict[str, Any]]:
+        """
+        chat.completions.create respetando el rate limit.
+
+        Returns:
+            (respuesta del SDK, datos de rate limit para las métricas)
+        """
+        limiter = self.rate_limiter
+        if limiter is None:
+            return self.client.chat.completions.create(messages=messages, **kwargs), {}
+
+        estimated = estimate_tokens(messages, kwargs.get("max_tokens") or self.max_tokens)
+        wait_ms, queue_depth = limiter.acquire(estimated)
+        attempt = 0
+        while True:
+            try:
+                raw = self.client.chat.completions.with_raw_response.create(messages=messages, **kwargs)
+                limiter.update_from_headers(raw.headers)
+                return raw.parse(), {
+                    "throttle_wait_ms": wait_ms,
+                    "retries": attempt,
+                    "queue_depth": queue_depth,
+                    "estimated_tokens": estimated
+                }
+            except Exception as e:
+                headers = error_headers(e)
+                limiter.update_from_headers(headers)
+                attempt += 1
+                if attempt > limiter.max_retries or not is_retryable(e):
+                    raise
+                delay = limiter.backoff(attempt, headers)
+                if delay > limiter.backoff_max:
+                    raise  # retry-after mayor que el tope: no se reintenta
+                status = getattr(e, "status_code", None) or type(e).__name__
+                logger.warning(f"Groq {status}: reintento {attempt}/{limiter.max_retries} en {delay:.1f}s")
+                # El reintento reserva su cupo y espera al menos el backoff
+                limiter.release(estimated)
+                retry_wait_ms, _ = limiter.acquire(estimated, min_wait=delay)
+                wait_ms += retry_wait_ms
+
+    def _record_success(self, start: float, limits: Dict[str, Any]):
+        """Registra en la salud la latencia de la llamada (sin la espera por rate limit)"""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.health.record_success(elapsed_ms - (limits or {}).get("throttle_wait_ms", 0))
+
+    def _record_usage(self, limits: Dict[str, Any], tokens_input: int, tokens_output: int):
+        """Corrige la reserva de tokens del limitador con el uso real"""
+        if self.rate_limiter is not None and limits:
+            self.rate_limiter.record_usage(limits["estimated_tokens"], tokens_input + tokens_output)
+
     def generate(
         self,
         messages: List[Dict[str, str]],
@@ -48,40 +132,169 @@ class GroqClient:
             max_tokens: Override de max tokens
 
         Returns:
-            Dict con respuesta y metadata
+            Dict con respuesta y metadata ("coalesced": True si se compartió
+            el resultado de un request idéntico en vuelo)
         """
+        temperature = temperature or self.temperature
+        max_tokens = max_tokens or self.max_tokens
+        if self.single_flight is None:
+            return self._generate(messages, temperature, max_tokens)
+
+        result, shared = self.single_flight.do(
+            request_key(self.model, messages, temperature=temperature, max_tokens=max_tokens),
+            lambda: self._generate(messages, temperature, max_tokens)
+        )
+        return mark_coalesced(result) if shared else result
+
+    def _generate(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Llamada real a Groq (sin agrupar)"""
+        start = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
+            response, limits = self._create(
+                messages,
                 model=self.model,
-                messages=messages,
-                temperature=temperature or self.temperature,
-                max_tokens=max_tokens or self.max_tokens
+                temperature=temperature,
+                max_tokens=max_tokens
             )
 
             respuesta = response.choices[0].message.content
             tokens_input = response.usage.prompt_tokens
             tokens_output = response.usage.completion_tokens
+            self._record_usage(limits, tokens_input, tokens_output)
+            self._record_success(start, limits)
 
             return {
                 "respuesta": respuesta,
                 "tokens_input": tokens_input,
                 "tokens_output": tokens_output,
-                "model": self.model
+                "model": self.model,
+                "rate_limit": limits
             }
 
         except Exception as e:
             logger.error(f"Error en Groq: {e}")
+            self.health.record_failure(e)
             raise
 
-    def is_available(self) -> bool:
-        """Verifica si el cliente está disponible"""
+    def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        on_delta: Optional[Callable[[str], None]] = None,
+        temperature: float = None,
+        max_tokens: int = None
+    ) -> Dict[str, Any]:
+        """
+        Genera respuesta en streaming.
+
+        Args:
+            messages: Lista de mensajes (system, user, assistant)
+            on_delta: Callback con cada fragmento de texto a medida que llega
+            temperature: Override de temperatura
+            max_tokens: Override de max tokens
+
+        Returns:
+            Dict con respuesta completa y metadata (mismo formato que generate)
+        """
+        temperature = temperature or self.temperature
+        max_tokens = max_tokens or self.max_tokens
+        if self.single_flight is None:
+            return self._generate_stream(messages, on_delta, temperature, max_tokens)
+
+        result, shared = self.single_flight.do(
+            request_key(self.model, messages, temperature=temperature, max_tokens=max_tokens),
+            lambda: self._generate_stream(messages, on_delta, temperature, max_tokens)
+        )
+        if not shared:
+            return result
+        # Seguidora: el stream lo recibió la líder; se entrega el texto completo de una vez
+        if on_delta:
+            on_delta(result["respuesta"])
+        return mark_coalesced(result)
+
+    def _generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        on_delta: Optional[Callable[[str], None]],
+        temperature: float,
+        max_tokens: int
+    ) -> Dict[str, Any]:
+        """Llamada real a Groq en streaming (sin agrupar)"""
+        parts: List[str] = []
+        usage = None
+        start = time.perf_counter()
+
         try:
-            # Test simple
-            response = self.client.chat.completions.create(
+            stream, limits = self._create(
+                messages,
                 model=self.model,
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=5
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
             )
-            return True
-        except Exception:
-            return False
+
+            for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        if on_delta:
+                            on_delta(delta)
+
+                # Groq informa el uso en el último chunk (x_groq.usage)
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(x_groq, "usage", None) or getattr(chunk, "usage", None) or usage
+
+        except Exception as e:
+            logger.error(f"Error en Groq (stream): {e}")
+            self.health.record_failure(e)
+            raise
+
+        respuesta = "".join(parts)
+        tokens_input = usage.prompt_tokens if usage else 0
+        tokens_output = usage.completion_tokens if usage else len(respuesta) // 4
+        self._record_usage(limits, tokens_input, tokens_output)
+        self._record_success(start, limits)
+        return {
+            "respuesta": respuesta,
+            "tokens_input": tokens_input,
+            "tokens_output": tokens_output,
+            "model": self.model,
+            "rate_limit": limits
+        }
+
+    def is_available(self, probe: bool = True) -> Optional[bool]:
+        """
+        Verifica si el cliente está disponible según el tráfico real (LLMHealth).
+
+        Solo llama a la API (probe de 1 token) si el cliente estuvo ocioso
+        más que el TTL de salud; el resultado queda registrado como tráfico.
+
+        Args:
+            probe: False para no llamar nunca a la API (p.ej. desde /status)
+
+        Returns:
+            True/False, o None si todavía no hubo tráfico ni probe
+        """
+        # Un solo probe a la vez: los demás llamadores leen el estado actual
+        if probe and self.health.is_stale() and self._probe_lock.acquire(blocking=False):
+            try:
+                if self.health.is_stale():
+                    self._probe()
+            finally:
+                self._probe_lock.release()
+        return self.health.is_healthy()
+
+    def _probe(self):
+        """Llamada mínima a la API para refrescar el estado de salud"""
+        self.health.probes += 1
+        start = time.perf_counter()
+        try:
+            _, limits = self._create(
+                [{"role": "user", "content": "test"}],
+                model=self.model,
+                max_tokens=1
+            )
+            self._record_success(start, limits)
+        except Exception as e:
+            logger.warning(f"Groq no disponible: {e}")
+            self.health.record_failure(e)
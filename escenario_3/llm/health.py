@@ -0,0 +1,131 @@
+"""
+Salud del LLM (Groq) a partir del tráfico real.
+
+Antes, is_available() hacía una llamada completa a chat.completions cada
+vez que corría /status (y al arrancar): consumía cupo de rate limit y
+sumaba un round-trip al comando.
+
+LLMHealth registra cada llamada real de los clientes:
+- Último éxito / última falla (timestamps)
+- Tasa de error en una ventana de las últimas N llamadas
+- Latencia promedio móvil exponencial (EWMA)
+
+El estado se lee sin llamar a la API. Solo si el cliente estuvo ocioso más
+que idle_ttl_seconds se justifica un probe, y su resultado cuenta como
+tráfico (queda cacheado hasta que vuelva a vencer el TTL).
+
+Thread-safe: lo comparten el cliente sincrónico y el async.
+"""
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class LLMHealth:
+    """Salud pasiva del LLM (ventana de errores + EWMA de latencia)"""
+
+    def __init__(
+        self,
+        window: int = 20,
+        latency_alpha: float = 0.2,
+        max_error_rate: float = 0.5,
+        idle_ttl_seconds: float = 300
+    ):
+        """
+        Args:
+            window: Llamadas recientes consideradas para la tasa de error
+            latency_alpha: Peso de la última latencia en el promedio móvil
+            max_error_rate: Tasa de error desde la que el LLM se considera caído
+            idle_ttl_seconds: Sin tráfico por más de este tiempo, el estado vence
+        """
+        self.latency_alpha = latency_alpha
+        self.max_error_rate = max_error_rate
+        self.idle_ttl_seconds = idle_ttl_seconds
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # True = éxito
+        self.latency_ewma_ms: Optional[float] = None
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.calls = 0
+        self.probes = 0
+
+    def record_success(self, latency_ms: float):
+        """Registra una llamada exitosa y su latencia"""
+        with self._lock:
+            self.calls += 1
+            self._outcomes.append(True)
+            self.last_success_at = time.time()
+            if self.latency_ewma_ms is None:
+                self.latency_ewma_ms = latency_ms
+            else:
+                self.latency_ewma_ms += self.latency_alpha * (latency_ms - self.latency_ewma_ms)
+
+    def record_failure(self, error: Any):
+        """Registra una llamada fallida"""
+        with self._lock:
+            self.calls += 1
+            self._outcomes.append(False)
+            self.last_failure_at = time.time()
+            self.last_error = str(error)
+
+    @property
+    def error_rate(self) -> float:
+        """Fracción de llamadas fallidas en la ventana"""
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    @property
+    def last_seen_at(self) -> Optional[float]:
+        """Timestamp de la última llamada (exitosa o no)"""
+        seen = [t for t in (self.last_success_at, self.last_failure_at) if t is not None]
+        return max(seen) if seen else None
+
+    def is_stale(self) -> bool:
+        """True si no hubo tráfico en los últimos idle_ttl_seconds (o nunca)"""
+        last_seen = self.last_seen_at
+        return last_seen is None or time.time() - last_seen > self.idle_ttl_seconds
+
+    def is_healthy(self) -> Optional[bool]:
+        """
+        Estado según el tráfico registrado.
+
+        Returns:
+            True si la última llamada funcionó o la tasa de error está bajo
+            el umbral; False si no; None si todavía no hubo llamadas
+        """
+        if self.last_seen_at is None:
+            return None
+        last_ok = (self.last_failure_at is None
+                   or (self.last_success_at or 0) >= self.last_failure_at)
+        return last_ok or self.error_rate < self.max_error_rate
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado para /status y logs (no llama a la API)"""
+        now = time.time()
+        last_seen = self.last_seen_at
+        return {
+            "healthy": self.is_healthy(),
+            "stale": self.is_stale(),
+            "error_rate": round(self.error_rate, 3),
+            "latency_ewma_ms": round(self.latency_ewma_ms, 1) if self.latency_ewma_ms is not None else None,
+            "idle_seconds": round(now - last_seen, 1) if last_seen is not None else None,
+            "last_error": self.last_error,
+            "calls": self.calls,
+            "probes": self.probes
+        }
+
+
+def build_llm_health(llm_config: Dict) -> LLMHealth:
+    """Crea el tracker de salud según llm.health de scenario.yaml"""
+    config = (llm_config or {}).get("health", {}) or {}
+    return LLMHealth(
+        window=config.get("window", 20),
+        latency_alpha=config.get("latency_alpha", 0.2),
+        max_error_rate=config.get("max_error_rate", 0.5),
+        idle_ttl_seconds=config.get("idle_ttl_seconds", 300)
+    )
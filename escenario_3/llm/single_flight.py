@@ -0,0 +1,137 @@
+"""
+Single-flight: una sola llamada al LLM por request idéntico en vuelo.
+
+Cuando cambia algo (p.ej. se suspende un convenio) muchos administrativos
+preguntan lo mismo en pocos segundos, y cada consulta dispara el mismo
+request a Groq con los mismos mensajes.
+
+SingleFlight agrupa las llamadas concurrentes con la misma clave
+(modelo + mensajes + parámetros): la primera (líder) hace el request y las
+demás (seguidoras) esperan y reciben el mismo resultado, o la misma
+excepción. Al terminar la llamada la clave se libera: no es un cache.
+
+- do(): para los workers del dispatcher (threads)
+- ado(): para el cliente async (un único event loop)
+"""
+import json
+import asyncio
+import hashlib
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+
+def request_key(model: str, messages: List[Dict[str, str]], **params) -> str:
+    """Clave estable de un request (hash de modelo, mensajes y parámetros)"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def mark_coalesced(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copia del resultado compartido, marcada para las métricas de la seguidora"""
+    return dict(result, coalesced=True)
+
+
+class _Flight:
+    """Llamada en vuelo compartida entre threads"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Agrupa llamadas idénticas concurrentes en una sola"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._futures: Dict[str, asyncio.Future] = {}
+
+        # Estadísticas
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, shared: bool):
+        with self._lock:
+            if shared:
+                self.coalesced += 1
+            else:
+                self.leaders += 1
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecuta fn() o espera la llamada idéntica que ya está en vuelo.
+
+        Returns:
+            (resultado, True si fue compartido con otra llamada)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        self._join(shared=not leader)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    async def ado(self, key: str, coro_fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Versión async de do() (las seguidoras esperan sin bloquear el loop)"""
+        future = self._futures.get(key)
+        if future is not None:
+            self._join(shared=True)
+            # shield: si una seguidora se cancela, la llamada compartida sigue
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._futures[key] = future
+        self._join(shared=False)
+        try:
+            result = await coro_fn()
+        except asyncio.CancelledError:
+            # La líder se canceló (p.ej. por su deadline): las seguidoras no
+            # se cancelan, reciben un error que pueden manejar
+            future.set_exception(TimeoutError("La llamada compartida al LLM se canceló"))
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Marcada como leída: sin warning si no hubo seguidoras
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._futures[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Llamadas hechas al LLM vs. agrupadas"""
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return {
+                "in_flight": len(self._flights) + len(self._futures),
+                "upstream": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_rate": self.coalesced / total if total else 0.0
+            }
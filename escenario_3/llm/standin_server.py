@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Servidor LLM local (stand-in de Groq) para tests de carga y latencia offline
+===========================================================================
+
+Habla el protocolo chat-completions que usa el SDK de groq (y OpenAI):
+POST /openai/v1/chat/completions (también /v1/chat/completions), con o sin
+stream (SSE). Permite correr el pipeline completo (router, rate limiter,
+clientes sync/async) sin GROQ_API_KEY real ni red.
+
+Comportamiento configurable y determinístico (con --seed):
+- Latencia hasta el primer token: fixed:MS, uniform:MIN,MAX, normal:MEDIA,DESVIO
+  o lognormal:MEDIANA,SIGMA (en milisegundos)
+- Velocidad de generación (tokens/segundo; 0 = instantáneo)
+- Errores 429: probabilidad por request y/o límite real de requests por
+  minuto, con retry-after y headers x-ratelimit-*
+- Respuestas: echo (repite la última pregunta) o canned (texto fijo por
+  palabra clave, desde un JSON/YAML)
+
+Uso:
+    python -m escenario_3.llm.standin_server --port 8787 --latency uniform:150,400 --tps 200
+
+    # En otra terminal (el SDK de groq arma la URL /openai/v1/...)
+    GROQ_BASE_URL=http://127.0.0.1:8787 GROQ_API_KEY=local python -m escenario_3.bot
+"""
+import json
+import time
+import random
+import argparse
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPLETION_PATHS = ("/openai/v1/chat/completions", "/v1/chat/completions")
+
+
+# =============================================================================
+# Configuración
+# =============================================================================
+
+class LatencyModel:
+    """Distribución de latencia hasta el primer token (spec en milisegundos)"""
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, params = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"Latencia desconocida: {spec} (usar {', '.join(self.KINDS)})")
+        values = [float(v) for v in params.split(",")] if params else [0.0]
+        expected = 1 if kind == "fixed" else 2
+        if len(values) != expected:
+            raise ValueError(f"Latencia {kind} espera {expected} parámetro(s): {spec}")
+        self.spec = spec
+        self.kind = kind
+        self.values = values
+
+    def sample(self, rng: random.Random) -> float:
+        """Latencia en segundos (nunca negativa)"""
+        if self.kind == "fixed":
+            ms = self.values[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.values)
+        elif self.kind == "normal":
+            ms = rng.gauss(*self.values)
+        else:
+            median, sigma = self.values
+            ms = median * rng.lognormvariate(0, sigma)
+        return max(ms, 0.0) / 1000
+
+
+@dataclass
+class StandinConfig:
+    """Comportamiento del servidor stand-in"""
+    latency: str = "fixed:0"
+    tokens_per_second: float = 0  # 0 = sin demora de generación
+    error_rate_429: float = 0.0  # Probabilidad de 429 por request
+    requests_per_minute: int = 0  # Límite real (ventana deslizante); 0 = sin límite
+    retry_after_seconds: float = 1.0
+    mode: str = "echo"  # echo | canned
+    canned: Dict[str, str] = field(default_factory=dict)  # palabra clave → respuesta
+    default_response: str = "Respuesta de prueba del servidor local."
+    seed: Optional[int] = None
+
+    @classmethod
+    def load_canned(cls, path: str) -> Dict[str, str]:
+        """Lee respuestas canned de un JSON o YAML {palabra_clave: respuesta}"""
+        text = Path(path).read_text(encoding="utf-8")
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(text) or {}
+        return json.loads(text)
+
+
+def count_tokens(text: str) -> int:
+    """Misma aproximación que el rate limiter (4 chars ~ 1 token)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+# =============================================================================
+# Lógica del LLM simulado (independiente de HTTP)
+# =============================================================================
+
+class StandinLLM:
+    """Genera respuestas, latencias y 429 según StandinConfig (thread-safe)"""
+
+    def __init__(self, config: StandinConfig):
+        self.config = config
+        self.latency = LatencyModel(config.latency)
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._window: deque = deque()  # timestamps de requests aceptados (último minuto)
+
+        # Estadísticas
+        self.requests = 0
+        self.rejected = 0
+        self.tokens_output = 0
+
+    def admit(self) -> Tuple[bool, Dict[str, str]]:
+        """
+        Decide si el request pasa o recibe 429.
+
+        Returns:
+            (aceptado, headers x-ratelimit-* / retry-after)
+        """
+        rpm = self.config.requests_per_minute
+        with self._lock:
+            inject_429 = self._rng.random() < self.config.error_rate_429
+            self.requests += 1
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+
+            over_limit = rpm > 0 and len(self._window) >= rpm
+            if inject_429 or over_limit:
+                self.rejected += 1
+                retry_after = self.config.retry_after_seconds
+                if over_limit:
+                    retry_after = max(retry_after, 60 - (now - self._window[0]))
+                return False, {
+                    "retry-after": f"{retry_after:.2f}",
+                    "x-ratelimit-remaining-requests": "0"
+                }
+
+            self._window.append(now)
+            headers = {}
+            if rpm > 0:
+                headers["x-ratelimit-limit-requests"] = str(rpm)
+                headers["x-ratelimit-remaining-requests"] = str(rpm - len(self._window))
+            return True, headers
+
+    def respond(self, messages: List[Dict[str, str]]) -> str:
+        """Texto de la respuesta según el modo (echo / canned)"""
+        question = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        if self.config.mode == "echo":
+            return f"Respuesta a: {question}" if question else self.config.default_response
+        lowered = question.lower()
+        for keyword, answer in self.config.canned.items():
+            if keyword.lower() in lowered:
+                return answer
+        return self.config.default_response
+
+    def tokens(self, text: str, max_tokens: Optional[int]) -> List[str]:
+        """Divide la respuesta en "tokens" (palabras con su espacio), recortada a max_tokens"""
+        words = text.split(" ")
+        pieces = [w + " " for w in words[:-1]] + [words[-1]]
+        return pieces[:max_tokens] if max_tokens else pieces
+
+    def generate(self, body: Dict[str, Any]) -> Iterator[str]:
+        """Espera la latencia al primer token y emite los tokens al ritmo configurado"""
+        with self._lock:
+            first_token_s = self.latency.sample(self._rng)
+        time.sleep(first_token_s)
+
+        pieces = self.tokens(self.respond(body.get("messages") or []), body.get("max_tokens"))
+        delay = 1 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0
+        for i, piece in enumerate(pieces):
+            if delay and i:
+                time.sleep(delay)
+            yield piece
+        with self._lock:
+            self.tokens_output += len(pieces)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "rejected_429": self.rejected,
+                "tokens_output": self.tokens_output
+            }
+
+
+# =============================================================================
+# HTTP
+# =============================================================================
+
+def _usage(messages: List[Dict[str, str]], completion_tokens: int) -> Dict[str, int]:
+    prompt_tokens = sum(count_tokens(m.get("content") or "") for m in messages)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Endpoints: POST chat/completions, GET /health, GET /stats"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive (como Groq)
+    llm: StandinLLM = None  # Lo asigna make_server
+
+    def log_message(self, format, *args):
+        logger.debug(f"standin: {format % args}")
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send_json(200, self.llm.stats())
+        else:
+            self._send_json(404, {"error": {"message": f"Ruta desconocida: {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+
+        if self.path not in COMPLETION_PATHS:
+            self._send_json(404, {"error": {"message": f"Ruta desconocida: {self.path}"}})
+            return
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "JSON inválido", "type": "invalid_request_error"}})
+            return
+
+        admitted, headers = self.llm.admit()
+        if not admitted:
+            self._send_json(429, {"error": {
+                "message": "Rate limit reached (stand-in local)",
+                "type": "tokens",
+                "code": "rate_limit_exceeded"
+            }}, headers)
+            return
+
+        completion_id = f"chatcmpl-local-{self.llm.requests}"
+        model = body.get("model", "standin")
+        messages = body.get("messages") or []
+        if body.get("stream"):
+            self._stream(completion_id, model, messages, body, headers)
+        else:
+            content = "".join(self.llm.generate(body))
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": _usage(messages, count_tokens(content))
+            }, headers)
+
+    def _stream(self, completion_id: str, model: str, messages, body, headers: Dict[str, str]):
+        """Respuesta SSE (chunked): un chunk por token y el uso en x_groq del último"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        def event(payload):
+            data = f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta: Dict[str, Any], finish_reason=None, **extra):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra
+            }
+
+        parts = []
+        try:
+            event(chunk({"role": "assistant", "content": ""}))
+            for piece in self.llm.generate(body):
+                parts.append(piece)
+                event(chunk({"content": piece}))
+            usage = _usage(messages, count_tokens("".join(parts)))
+            event(chunk({}, finish_reason="stop", x_groq={"id": completion_id, "usage": usage}))
+            event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("standin: el cliente cortó el stream")
+
+
+def make_server(config: StandinConfig, host: str = "127.0.0.1", port: int = 8787) -> ThreadingHTTPServer:
+    """Crea el servidor (port=0 elige uno libre: server.server_address[1])"""
+    handler = type("BoundStandinHandler", (StandinHandler,), {"llm": StandinLLM(config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(config: StandinConfig, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Levanta el servidor en un thread (para tests y benchmarks).
+
+    Returns:
+        (servidor, base_url para GroqClient); detener con server.shutdown()
+    """
+    server = make_server(config, host, port)
+    # poll_interval corto: shutdown() responde rápido entre tests
+    threading.Thread(target=server.serve_forever, args=(0.05,), name="llm-standin", daemon=True).start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor LLM local compatible con chat-completions (Groq/OpenAI)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", default="fixed:0",
+                        help="Latencia al primer token en ms: fixed:MS | uniform:MIN,MAX | normal:MEDIA,DESVIO | lognormal:MEDIANA,SIGMA")
+    parser.add_argument("--tps", type=float, default=0, help="Tokens por segundo (0 = instantáneo)")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Probabilidad de 429 por request")
+    parser.add_argument("--rpm", type=int, default=0, help="Límite de requests por minuto (0 = sin límite)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after (s) en los 429 inyectados")
+    parser.add_argument("--mode", choices=("echo", "canned"), default="echo")
+    parser.add_argument("--canned", help="JSON/YAML {palabra_clave: respuesta} para --mode canned")
+    parser.add_argument("--seed", type=int, help="Semilla (latencias y 429 reproducibles)")
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        latency=args.latency,
+        tokens_per_second=args.tps,
+        error_rate_429=args.error_429,
+        requests_per_minute=args.rpm,
+        retry_after_seconds=args.retry_after,
+        mode=args.mode,
+        canned=StandinConfig.load_canned(args.canned) if args.canned else {},
+        seed=args.seed
+    )
+    server = make_server(config, args.host, args.port)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.info(f"Stand-in LLM en http://{args.host}:{args.port} "
+                f"(latencia {config.latency}, {config.tokens_per_second or '∞'} tok/s, "
+                f"429 {config.error_rate_429:.0%}, modo {config.mode})")
+    logger.info(f"Usar: GROQ_BASE_URL=http://{args.host}:{args.port} GROQ_API_KEY=local")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Stats: {server.RequestHandlerClass.llm.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,18 +25,30 @@ class QueryMetrics:
     # Tiempos
     latency_faiss_ms: float = 0.0
     latency_llm_ms: float = 0.0
+    latency_first_token_ms: float = 0.0  # Streaming: hasta el primer texto del LLM
     latency_total_ms: float = 0.0
+    latency_queue_ms: float = 0.0  # Espera en el pool de workers (antes de empezar)
+    latency_throttle_ms: float = 0.0  # Espera por rate limit de Groq (cola + backoff)
 
     # Tokens
     tokens_input: int = 0
     tokens_output: int = 0
     tokens_context: int = 0
     tokens_history: int = 0  # Nuevo: tokens del historial
+    tokens_summary: int = 0  # Parte de tokens_history que es resumen
 
     # RAG
     rag_used: bool = False
     rag_chunks_count: int = 0
     rag_top_similarity: float = 0.0
+    rag_reused: bool = False  # Chunks del turno anterior (sin consultar ChromaDB)
+    rag_chunks_reused: int = 0  # Chunks que ya se habían enviado en el turno anterior
+    tokens_context_reused: int = 0  # Tokens de esos chunks (contexto repetido)
+
+    # Rate limit
+    llm_retries: int = 0  # Reintentos (429 / 5xx / conexión)
+    llm_queue_depth: int = 0  # Llamadas que ya esperaban cupo al encolarse
+    llm_coalesced: bool = False  # Resultado compartido de un request idéntico en vuelo (sin tokens propios)
 
     # Historial
     history_turns: int = 0
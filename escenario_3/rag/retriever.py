@@ -14,6 +14,7 @@ from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 
 from ..core.query_rewriter import rewrite_query
+from ..core.normalized_text import NormalizedText
 
 logger = logging.getLogger(__name__)
 
@@ -73,13 +74,32 @@ class ChromaRetriever:
         embeddings = self.model.encode(texts, normalize_embeddings=True)
         return embeddings.tolist()
 
+    def embed_query(
+        self,
+        query: str,
+        obra_social_filter: str = None,
+        use_rewriter: bool = True,
+        normalized: NormalizedText = None
+    ) -> List[float]:
+        """
+        Embedding de la query tal como la usa retrieve() (con rewriting).
+
+        Permite al router comparar turnos consecutivos antes de consultar ChromaDB.
+        """
+        search_query = query
+        if use_rewriter:
+            search_query = rewrite_query(normalized or query, obra_social_filter)
+        return self._embed_texts([search_query])[0]
+
     def retrieve(
         self,
         query: str,
         top_k: int = 5,
         obra_social_filter: str = None,
         min_score: float = 0.3,
-        use_rewriter: bool = True
+        use_rewriter: bool = True,
+        normalized: NormalizedText = None,
+        query_embedding: List[float] = None
     ) -> List[Tuple[str, Dict, float]]:
         """
         Busca chunks relevantes.
@@ -90,22 +110,20 @@ class ChromaRetriever:
             obra_social_filter: Filtrar por obra social (opcional)
             min_score: Score mínimo
             use_rewriter: Si usar query rewriting
+            normalized: NormalizedText de la query ya calculado por el router
+            query_embedding: Embedding ya calculado con embed_query (opcional)
 
         Returns:
             Lista de (texto, metadata, similarity_score)
         """
-        # Aplicar query rewriting si está habilitado
-        search_query = query
-        if use_rewriter:
-            search_query = rewrite_query(query, obra_social_filter)
-
         # Construir filtro nativo
         where_filter = None
         if obra_social_filter:
             where_filter = {"obra_social": obra_social_filter.upper()}
 
-        # Generar embedding de la query
-        query_embedding = self._embed_texts([search_query])[0]
+        # Generar embedding de la query (con query rewriting si está habilitado)
+        if query_embedding is None:
+            query_embedding = self.embed_query(query, obra_social_filter, use_rewriter, normalized)
 
         # Ejecutar query
         try:
@@ -0,0 +1,103 @@
+"""
+Fixtures compartidas para tests de Escenario 3.
+
+Los dobles de retriever y LLM permiten testear el router sin ChromaDB,
+sin modelo de embeddings y sin GROQ_API_KEY.
+"""
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+import yaml
+
+from escenario_3.core.entity_detector import EntityDetector
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+
+
+class FakeRetriever:
+    """Retriever en memoria: devuelve los chunks de la obra social filtrada"""
+
+    def __init__(self, chunks=None):
+        self.calls = 0
+        self.chunks = chunks if chunks is not None else [
+            (
+                "Teléfono Mesa Operativa: 0810-888-8274. Mail: autorizaciones@asi.com.ar",
+                {"obra_social": "ASI", "chunk_id": "asi_1"},
+                0.91,
+            ),
+            (
+                "Planes ENSALUD: Delta, Krono, Quantum.",
+                {"obra_social": "ENSALUD", "chunk_id": "ensalud_1"},
+                0.88,
+            ),
+        ]
+
+    def retrieve(self, query, top_k=5, obra_social_filter=None, **kwargs):
+        self.calls += 1
+        return [c for c in self.chunks if c[1]["obra_social"] == obra_social_filter][:top_k]
+
+
+class FakeLLM:
+    """Cliente LLM que registra los mensajes recibidos y responde un texto fijo"""
+
+    def __init__(self, respuesta="Respuesta de prueba.", model="fake-model"):
+        self.model = model
+        self.respuesta = respuesta
+        self.calls = []
+
+    def generate(self, messages, **kwargs):
+        self.calls.append(messages)
+        return {
+            "respuesta": self.respuesta,
+            "tokens_input": 100,
+            "tokens_output": 12,
+            "model": self.model,
+        }
+
+
+@pytest.fixture
+def fake_retriever():
+    return FakeRetriever()
+
+
+@pytest.fixture
+def fake_llm():
+    return FakeLLM()
+
+
+@pytest.fixture
+def make_router(tmp_path, fake_retriever, fake_llm):
+    """
+    Fábrica de AgenteRouter con dobles y overrides de scenario.yaml.
+
+    Uso: router = make_router(mode={"max_history_turns": 2})
+    El historial no se persiste salvo que se pase history={...}.
+    """
+    from escenario_3.core.router import AgenteRouter
+
+    def _make(retriever=None, llm_client=None, **overrides):
+        overrides.setdefault("history", {"backend": "memory"})
+        with open(CONFIG_DIR / "scenario.yaml", 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+        for section, values in overrides.items():
+            if isinstance(values, dict):
+                config.setdefault(section, {}).update(values)
+            else:
+                config[section] = values
+
+        config_path = tmp_path / "scenario.yaml"
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f, allow_unicode=True)
+
+        return AgenteRouter(
+            retriever=retriever or fake_retriever,
+            llm_client=llm_client or fake_llm,
+            entity_detector=EntityDetector(str(CONFIG_DIR / "entities.yaml")),
+            config_path=str(config_path)
+        )
+
+    return _make
@@ -0,0 +1,97 @@
+"""
+Tests de AgenteRouter.aprocess_query (camino async del Modo Agente).
+"""
+import time
+import asyncio
+import threading
+
+from escenario_3.core.session import ChatSession
+from escenario_3.metrics.collector import QueryMetrics
+
+
+class FakeAsyncLLM:
+    """Cliente async en memoria que registra los mensajes recibidos"""
+
+    def __init__(self, respuesta="Respuesta async."):
+        self.model = "fake-async"
+        self.respuesta = respuesta
+        self.calls = []
+
+    async def agenerate(self, messages, **kwargs):
+        self.calls.append(messages)
+        await asyncio.sleep(0)
+        return {"respuesta": self.respuesta, "tokens_input": 50, "tokens_output": 4, "model": self.model}
+
+
+class TestAsyncAgenteRouter:
+    """Tests del camino async con sesiones"""
+
+    def test_historial_por_sesion(self, make_router, fake_llm):
+        router = make_router()
+        router.async_llm_client = FakeAsyncLLM()
+        session = ChatSession(chat_id=7)
+
+        async def conversation():
+            await router.aprocess_query("telefono ASI", session=session)
+            return await router.aprocess_query("¿y el mail?", session=session)
+
+        result = asyncio.run(conversation())
+
+        assert session.turns == 2
+        assert result.entity_result.confidence == "carried"
+        assert fake_llm.calls == []
+        # El segundo prompt incluye el turno anterior
+        second = router.async_llm_client.calls[1]
+        assert any(m["content"] == "Respuesta async." for m in second if m["role"] == "assistant")
+
+    def test_sin_cliente_async_usa_el_sincronico(self, make_router, fake_llm):
+        router = make_router()
+        metrics = QueryMetrics(query_text="q")
+
+        result = asyncio.run(router.aprocess_query("telefono ASI", metrics=metrics))
+
+        assert result.respuesta == fake_llm.respuesta
+        assert len(fake_llm.calls) == 1
+        assert metrics.history_turns == 1
+
+    def test_error_del_llm_no_rompe_el_turno(self, make_router):
+        class BrokenLLM(FakeAsyncLLM):
+            async def agenerate(self, messages, **kwargs):
+                raise TimeoutError("sin respuesta")
+
+        router = make_router()
+        router.async_llm_client = BrokenLLM()
+
+        result = asyncio.run(router.aprocess_query("telefono ASI"))
+
+        assert result.respuesta == "Error al procesar la consulta."
+
+    def test_prepare_respeta_max_workers(self, make_router, fake_retriever):
+        """Sin el pool del dispatcher (run_async), el router acota el trabajo bloqueante"""
+        active = {"n": 0, "max": 0}
+        lock = threading.Lock()
+        retrieve = fake_retriever.retrieve
+
+        def slow_retrieve(*args, **kwargs):
+            with lock:
+                active["n"] += 1
+                active["max"] = max(active["max"], active["n"])
+            time.sleep(0.02)
+            with lock:
+                active["n"] -= 1
+            return retrieve(*args, **kwargs)
+
+        fake_retriever.retrieve = slow_retrieve
+        router = make_router(concurrency={"max_workers": 2})
+        router.async_llm_client = FakeAsyncLLM()
+
+        async def chats():
+            await asyncio.gather(*[
+                router.aprocess_query("telefono ASI", session=ChatSession(chat_id=chat))
+                for chat in range(6)
+            ])
+
+        asyncio.run(chats())
+
+        assert fake_retriever.calls == 6
+        assert active["max"] == 2
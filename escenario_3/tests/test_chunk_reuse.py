@@ -0,0 +1,130 @@
+"""
+Tests de reuso de chunks entre turnos consecutivos (Modo Agente).
+"""
+import math
+
+from escenario_3.core.session import ChatSession, cosine_similarity
+from escenario_3.core.normalized_text import NormalizedText
+from escenario_3.metrics.collector import QueryMetrics
+
+from escenario_3.tests.conftest import FakeRetriever
+
+VOCAB = ["telefono", "mesa", "operativa", "mail", "guardia", "internacion", "planes", "asi"]
+
+
+class EmbeddingRetriever(FakeRetriever):
+    """FakeRetriever con embed_query: bolsa de palabras sobre un vocabulario fijo"""
+
+    def __init__(self):
+        super().__init__()
+        self.embeds = 0
+        self.embeddings_received = []
+
+    def embed_query(self, query, obra_social_filter=None, normalized=None, **kwargs):
+        self.embeds += 1
+        tokens = (normalized or NormalizedText.from_text(query)).tokens
+        vector = [float(tokens.count(word)) for word in VOCAB]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def retrieve(self, query, top_k=5, obra_social_filter=None, query_embedding=None, **kwargs):
+        self.embeddings_received.append(query_embedding)
+        return super().retrieve(query, top_k, obra_social_filter)
+
+
+class TestCosineSimilarity:
+    """Tests de la similitud coseno"""
+
+    def test_iguales_y_ortogonales(self):
+        assert cosine_similarity([1.0, 0.0], [1.0, 0.0]) == 1.0
+        assert cosine_similarity([1.0, 0.0], [0.0, 1.0]) == 0.0
+
+    def test_vector_nulo(self):
+        assert cosine_similarity([0.0, 0.0], [1.0, 0.0]) == 0.0
+
+
+class TestChunkReuse:
+    """Tests del reuso de la recuperación anterior en el router"""
+
+    def test_query_cercana_no_consulta_chroma(self, make_router):
+        retriever = EmbeddingRetriever()
+        router = make_router(retriever=retriever)
+        session = ChatSession(chat_id=1)
+
+        router.process_query("telefono mesa operativa ASI", session=session)
+        metrics = QueryMetrics(query_text="q2")
+        result = router.process_query("telefono de la mesa operativa de ASI?", metrics=metrics, session=session)
+
+        assert retriever.calls == 1
+        assert metrics.rag_reused is True
+        assert result.chunks_count == 1
+        assert metrics.rag_chunks_reused == 1
+        assert metrics.tokens_context_reused > 0
+
+    def test_embedding_se_calcula_una_vez(self, make_router):
+        """retrieve() recibe el embedding ya calculado para la comparación"""
+        retriever = EmbeddingRetriever()
+        router = make_router(retriever=retriever)
+
+        router.process_query("telefono mesa operativa ASI")
+
+        assert retriever.embeds == 1
+        assert retriever.embeddings_received[0] is not None
+
+    def test_query_distinta_vuelve_a_recuperar(self, make_router):
+        retriever = EmbeddingRetriever()
+        router = make_router(retriever=retriever)
+        session = ChatSession(chat_id=1)
+
+        router.process_query("telefono mesa operativa ASI", session=session)
+        metrics = QueryMetrics(query_text="q2")
+        router.process_query("como es la internacion por guardia en ASI", metrics=metrics, session=session)
+
+        assert retriever.calls == 2
+        assert metrics.rag_reused is False
+        # El mismo chunk volvió a salir: se cuenta como repetido
+        assert metrics.rag_chunks_reused == 1
+
+    def test_otra_entidad_no_reusa(self, make_router):
+        retriever = EmbeddingRetriever()
+        router = make_router(retriever=retriever)
+        session = ChatSession(chat_id=1)
+
+        router.process_query("planes ASI", session=session)
+        metrics = QueryMetrics(query_text="q2")
+        router.process_query("planes ENSALUD", metrics=metrics, session=session)
+
+        assert retriever.calls == 2
+        assert metrics.rag_reused is False
+        assert metrics.rag_chunks_reused == 0
+
+    def test_reuso_acotado_por_turnos(self, make_router):
+        retriever = EmbeddingRetriever()
+        router = make_router(retriever=retriever, rag={"reuse_max_turns": 1})
+        session = ChatSession(chat_id=1)
+
+        for _ in range(3):
+            router.process_query("telefono mesa operativa ASI", session=session)
+
+        # Turno 1 recupera, turno 2 reusa, turno 3 vuelve a ChromaDB
+        assert retriever.calls == 2
+
+    def test_retriever_sin_embed_query_reusa_solo_query_identica(self, make_router, fake_retriever):
+        router = make_router()
+        session = ChatSession(chat_id=1)
+
+        router.process_query("telefono ASI", session=session)
+        router.process_query("¿Teléfono ASI?", session=session)  # Misma query normalizada
+        router.process_query("mail de autorizaciones ASI", session=session)
+
+        assert fake_retriever.calls == 2
+
+    def test_clear_olvida_recuperacion(self, make_router):
+        retriever = EmbeddingRetriever()
+        router = make_router(retriever=retriever)
+
+        router.process_query("telefono mesa operativa ASI")
+        router.clear_history()
+        router.process_query("telefono mesa operativa ASI")
+
+        assert retriever.calls == 2
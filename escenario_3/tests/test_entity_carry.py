@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test unitario: Arrastre de entidad en la sesión
+Verifica que las repreguntas sin obra social reusan la última detectada
+"""
+import sys
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_3.core.session import ChatSession
+from escenario_3.core.entity_detector import EntityResult
+
+
+class TestEntityCarry:
+    """Tests de confidence='carried'"""
+
+    def test_follow_up_uses_previous_entity(self, make_router, fake_retriever):
+        """'¿Y qué planes tienen?' después de ENSALUD filtra por ENSALUD"""
+        router = make_router()
+        session = ChatSession(chat_id=1)
+
+        router.process_query("telefono de ENSALUD", session=session)
+        result = router.process_query("¿Y qué planes tienen?", session=session)
+
+        assert result.entity_result.entity == "ENSALUD"
+        assert result.entity_result.confidence == "carried"
+        assert result.rag_executed is True
+        assert result.llm_executed is True
+        assert result.chunks_count == 1
+        assert fake_retriever.calls == 2
+
+    def test_carry_expires_after_n_turns(self, make_router):
+        """La entidad arrastrada vence tras N repreguntas seguidas"""
+        router = make_router(mode={"entity_carry_turns": 2})
+        session = ChatSession(chat_id=1)
+
+        router.process_query("planes ENSALUD", session=session)
+        assert router.process_query("¿y en guardia?", session=session).entity_result.confidence == "carried"
+        assert router.process_query("¿y traslados?", session=session).entity_result.confidence == "carried"
+
+        expired = router.process_query("¿y internación?", session=session)
+        assert expired.entity_result.detected is False
+        assert expired.llm_executed is False
+
+    def test_explicit_mention_resets_expiry(self, make_router):
+        """Nombrar una obra social reinicia el contador y cambia la entidad"""
+        router = make_router(mode={"entity_carry_turns": 1})
+        session = ChatSession(chat_id=1)
+
+        router.process_query("planes ENSALUD", session=session)
+        router.process_query("¿y en guardia?", session=session)
+        router.process_query("telefono ASI", session=session)
+        result = router.process_query("¿y el mail?", session=session)
+
+        assert result.entity_result.entity == "ASI"
+        assert result.entity_result.confidence == "carried"
+
+    def test_no_previous_entity(self, make_router):
+        """Sin entidad previa se mantiene la respuesta fija"""
+        router = make_router()
+        result = router.process_query("¿y qué planes tienen?", session=ChatSession(chat_id=1))
+        assert result.entity_result.confidence == "none"
+        assert result.rag_executed is False
+
+    def test_disabled(self, make_router):
+        """entity_carry_turns: 0 desactiva el arrastre"""
+        router = make_router(mode={"entity_carry_turns": 0})
+        session = ChatSession(chat_id=1)
+        router.process_query("planes ENSALUD", session=session)
+        assert router.process_query("¿y en guardia?", session=session).entity_result.detected is False
+
+    def test_clear_forgets_entity(self):
+        """Limpiar la sesión olvida la entidad"""
+        session = ChatSession(chat_id=1)
+        session.remember_entity(EntityResult("ASI", "obra_social", "ASI", "asi", "exact"))
+        session.clear()
+        assert session.carry_entity(3) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test unitario: TokenBudgetHistory
+Verifica presupuesto de tokens, resumen extractivo y prompt acotado
+"""
+import sys
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_3.core.history_policy import TokenBudgetHistory, best_sentence, summarize_turn
+from escenario_3.core.session import ChatSession
+from escenario_3.metrics.collector import QueryMetrics
+
+
+def _session(turns, answer_chars=400):
+    session = ChatSession(chat_id=1)
+    for i in range(turns):
+        session.history.append({"role": "user", "content": f"pregunta {i} sobre coseguros"})
+        session.history.append({"role": "assistant", "content": f"Respuesta {i}. " + "texto " * (answer_chars // 6)})
+    return session
+
+
+class TestExtractiveSummary:
+    """Tests del resumen extractivo"""
+
+    def test_prefers_sentence_with_data(self):
+        """Se elige la oración con datos concretos relacionados a la pregunta"""
+        answer = (
+            "Con gusto te ayudo. El coseguro de especialista de ENSALUD es $2912. "
+            "Avisame si necesitás algo más."
+        )
+        sentence = best_sentence(answer, {"coseguro", "especialista"})
+        assert "$2912" in sentence
+
+    def test_summarize_turn_format(self):
+        """Una línea por turno: pregunta → dato"""
+        line = summarize_turn("¿Teléfono de ASI?", "Claro. El teléfono es 0810-888-8274.")
+        assert line.startswith("- ¿Teléfono de ASI?")
+        assert "0810-888-8274" in line
+
+
+class TestTokenBudgetHistory:
+    """Tests del presupuesto de tokens"""
+
+    def test_within_budget_untouched(self):
+        """Si entra en el presupuesto no se pliega nada"""
+        policy = TokenBudgetHistory(budget_tokens=10_000)
+        session = _session(3)
+        assert policy.trim(session) == 0
+        assert session.turns == 3
+        assert session.summary == ""
+
+    def test_old_turns_folded_into_summary(self):
+        """Los turnos viejos pasan al resumen y los recientes quedan textuales"""
+        policy = TokenBudgetHistory(budget_tokens=250, summary_max_tokens=500)
+        session = _session(5)
+        folded = policy.trim(session)
+
+        assert folded > 0
+        assert session.turns == 5 - folded
+        assert session.history[-2]["content"] == "pregunta 4 sobre coseguros"
+        assert "pregunta 0" in session.summary
+        assert policy.tokens(session) - len(session.summary) // 4 <= 250
+
+    def test_min_recent_turns(self):
+        """Un turno enorme igual se conserva si es el mínimo"""
+        policy = TokenBudgetHistory(budget_tokens=10, min_recent_turns=1)
+        session = _session(2, answer_chars=2000)
+        policy.trim(session)
+        assert session.turns == 1
+
+    def test_summary_is_capped(self):
+        """El resumen nunca supera su tope"""
+        policy = TokenBudgetHistory(budget_tokens=50, summary_max_tokens=40)
+        session = _session(30)
+        policy.trim(session)
+        assert len(session.summary) // 4 <= 40
+
+    def test_max_turns_cap(self):
+        """max_turns limita los turnos textuales aunque sobre presupuesto"""
+        policy = TokenBudgetHistory(budget_tokens=10_000, max_turns=2)
+        session = _session(4, answer_chars=10)
+        policy.trim(session)
+        assert session.turns == 2
+        assert session.summary.count("\n") == 1
+
+
+class TestRouterBudget:
+    """El prompt del router queda acotado en conversaciones largas"""
+
+    def test_tokens_history_is_bounded(self, make_router, fake_llm):
+        """tokens_history no crece con la cantidad de turnos"""
+        fake_llm.respuesta = "Respuesta larga. " + "detalle " * 150
+        router = make_router(mode={"history_token_budget": 400, "summary_max_tokens": 100, "max_history_turns": 50})
+        session = ChatSession(chat_id=1)
+
+        history_tokens = []
+        for i in range(15):
+            metrics = QueryMetrics(query_text="q")
+            router.process_query(f"telefono ASI pregunta {i}", metrics=metrics, session=session)
+            history_tokens.append(metrics.tokens_history)
+
+        assert max(history_tokens) <= 400 + 100
+        assert session.summary
+        # El resumen viaja como mensaje de sistema
+        assert fake_llm.calls[-1][1]["content"].startswith("RESUMEN DE LA CONVERSACIÓN ANTERIOR")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
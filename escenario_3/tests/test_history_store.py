@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test unitario: SQLiteHistoryBackend
+Verifica escritura en lotes, lectura de los últimos N, compactación y reinicios
+"""
+import sys
+import time
+import sqlite3
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_3.core.history_store import SQLiteHistoryBackend, MemoryHistoryBackend, build_history_backend
+from escenario_3.core.session import SessionStore
+
+
+def _turn(i):
+    return [
+        {"role": "user", "content": f"pregunta {i}"},
+        {"role": "assistant", "content": f"respuesta {i}"},
+    ]
+
+
+@pytest.fixture
+def backend(tmp_path):
+    b = SQLiteHistoryBackend(str(tmp_path / "history.db"), flush_interval_ms=10)
+    yield b
+    b.close()
+
+
+class TestSQLiteHistoryBackend:
+    """Tests del backend SQLite"""
+
+    def test_wal_mode(self, backend):
+        """La base queda en modo WAL"""
+        conn = sqlite3.connect(backend.db_path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+    def test_load_last_messages_in_order(self, backend):
+        """load devuelve los últimos N mensajes en orden cronológico"""
+        for i in range(5):
+            backend.append(1, _turn(i))
+        history = backend.load(1, 4)
+        assert [m["content"] for m in history] == [
+            "pregunta 3", "respuesta 3", "pregunta 4", "respuesta 4"
+        ]
+
+    def test_writes_are_batched(self, backend):
+        """Muchos appends se escriben en pocas transacciones"""
+        for i in range(40):
+            backend.append(1, _turn(i))
+        backend.flush()
+        stats = backend.stats()
+        assert stats["written"] == 80
+        assert stats["batches"] < 10
+
+    def test_clear_respects_order(self, backend):
+        """clear borra lo anterior pero no lo encolado después"""
+        backend.append(1, _turn(0))
+        backend.clear(1)
+        backend.append(1, _turn(1))
+        assert [m["content"] for m in backend.load(1, 10)] == ["pregunta 1", "respuesta 1"]
+
+    def test_load_waits_for_queued_clear(self, tmp_path):
+        """Un clear encolado (sin appends pendientes) se aplica antes de leer"""
+        b = SQLiteHistoryBackend(str(tmp_path / "history.db"), flush_interval_ms=10)
+        b.append(1, _turn(0))
+        b.flush()
+
+        # Writer lento: el clear queda fuera de la cola pero sin commit
+        apply = b._apply
+        b._apply = lambda batch: time.sleep(0.2) or apply(batch)
+        b.clear(1)
+        assert b.load(1, 10) == []
+        b.close()
+
+    def test_chats_are_isolated(self, backend):
+        """Cada chat tiene su propio historial"""
+        backend.append(1, _turn(1))
+        backend.append(2, _turn(2))
+        assert backend.load(2, 10)[0]["content"] == "pregunta 2"
+
+    def test_survives_restart(self, tmp_path):
+        """El historial sobrevive al cierre del proceso"""
+        path = str(tmp_path / "history.db")
+        first = SQLiteHistoryBackend(path)
+        first.append(1, _turn(0))
+        first.close()
+
+        second = SQLiteHistoryBackend(path)
+        assert len(second.load(1, 10)) == 2
+        second.close()
+
+    def test_compaction(self, tmp_path):
+        """La compactación conserva los últimos mensajes y borra chats inactivos"""
+        backend = SQLiteHistoryBackend(str(tmp_path / "history.db"), keep_messages=4, retention_days=1)
+        for i in range(10):
+            backend.append(1, _turn(i))
+        backend.append(2, _turn(0))
+        backend.flush()
+
+        # Chat 2 inactivo hace 2 días
+        conn = sqlite3.connect(backend.db_path)
+        conn.execute("UPDATE chat_messages SET created_at = ? WHERE chat_id = '2'", (time.time() - 2 * 86400,))
+        conn.commit()
+        conn.close()
+
+        deleted = backend.compact()
+        assert deleted == 16 + 2
+        assert [m["content"] for m in backend.load(1, 10)][0] == "pregunta 8"
+        assert backend.load(2, 10) == []
+        backend.close()
+
+
+class TestSessionStoreBackend:
+    """Integración SessionStore + backend"""
+
+    def test_new_session_loads_history(self, backend):
+        """Una sesión nueva (reinicio/expirada) recupera el historial"""
+        backend.append(7, _turn(0))
+        store = SessionStore(backend=backend, load_messages=10)
+        assert store.get(7).turns == 1
+
+    def test_clear_forgets_persisted_history(self, backend):
+        """clear borra la sesión y el historial persistido"""
+        backend.append(7, _turn(0))
+        store = SessionStore(backend=backend)
+        store.get(7)
+        store.clear(7)
+        assert store.get(7).history == []
+
+    def test_router_persists_turns(self, make_router, tmp_path):
+        """El router encola cada turno en el backend"""
+        router = make_router(history={"backend": "sqlite", "sqlite_path": str(tmp_path / "h.db")})
+        store = SessionStore(backend=router.history_backend, load_messages=10)
+
+        router.process_query("telefono ASI", session=store.get(42))
+        store.drop(42)
+
+        # Sesión recreada (como tras un reinicio): historial desde SQLite
+        assert store.get(42).history[0]["content"] == "telefono ASI"
+        router.history_backend.close()
+
+
+def test_build_backend_default_is_memory(tmp_path):
+    """Sin sección history el backend es en memoria"""
+    assert isinstance(build_history_backend(None, tmp_path), MemoryHistoryBackend)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
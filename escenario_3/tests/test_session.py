@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test unitario: SessionStore
+Verifica TTL de inactividad, evicción LRU e historial separado por chat
+"""
+import sys
+import time
+import pytest
+from pathlib import Path
+
+# Agregar project root al path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from escenario_3.core.session import ChatSession, SessionStore
+
+
+class TestSessionStore:
+    """Tests del store de sesiones"""
+
+    def test_get_creates_and_reuses(self):
+        """La misma sesión se reutiliza para el mismo chat"""
+        store = SessionStore()
+        session = store.get(1)
+        assert store.get(1) is session
+        assert len(store) == 1
+
+    def test_lru_eviction(self):
+        """Al superar el máximo se descarta el chat menos reciente"""
+        store = SessionStore(max_sessions=2)
+        store.get(1)
+        store.get(2)
+        store.get(1)
+        store.get(3)
+        assert 2 not in store
+        assert 1 in store and 3 in store
+        assert store.stats()["evicted"] == 1
+
+    def test_idle_ttl(self):
+        """Las sesiones inactivas expiran"""
+        store = SessionStore(idle_ttl_seconds=60)
+        old = store.get(1)
+        old.history.append({"role": "user", "content": "hola"})
+        old.last_active = time.time() - 120
+
+        assert store.get(1) is not old
+        assert store.get(1).history == []
+        assert store.stats()["expired"] == 1
+
+    def test_drop(self):
+        """drop elimina la sesión (/start, /clear)"""
+        store = SessionStore()
+        store.get(1)
+        assert store.drop(1) is True
+        assert store.peek(1) is None
+
+    def test_stats_memory(self):
+        """stats reporta turnos y memoria aproximada"""
+        store = SessionStore()
+        session = store.get(1)
+        session.history.extend([
+            {"role": "user", "content": "x" * 1000},
+            {"role": "assistant", "content": "y" * 1000},
+        ])
+        stats = store.stats()
+        assert stats["active"] == 1
+        assert stats["turns"] == 1
+        assert stats["memory_kb"] > 2
+
+
+class TestRouterSessions:
+    """Un router compartido, historial por sesión"""
+
+    def test_histories_are_isolated(self, make_router, fake_llm):
+        """Cada chat ve solo su propio historial"""
+        router = make_router()
+        a, b = ChatSession(chat_id="a"), ChatSession(chat_id="b")
+
+        router.process_query("telefono ASI", session=a)
+        router.process_query("planes ENSALUD", session=a)
+        result = router.process_query("planes ENSALUD", session=b)
+
+        assert a.turns == 2
+        assert b.turns == 1
+        assert result.history_turns == 1
+        # El LLM del chat b no recibió mensajes del chat a
+        assert not any("telefono ASI" in m["content"] for m in fake_llm.calls[-1])
+        assert a.last_entity == "ENSALUD"
+
+    def test_default_session_compat(self, make_router):
+        """Sin session, el router usa su sesión propia (router.history)"""
+        router = make_router()
+        router.process_query("telefono ASI")
+        assert len(router.history) == 2
+        router.clear_history()
+        assert router.history == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])